@@ -0,0 +1,47 @@
+"""Create dispatch_offers table
+
+Revision ID: 3b7e9c52d1a4
+Revises: 8f2d41c7a9b3
+Create Date: 2026-10-19 09:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b7e9c52d1a4'
+down_revision = '8f2d41c7a9b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Offers of AVAILABLE deliveries made by the dispatcher (app.services.dispatch)
+    op.create_table(
+        'dispatch_offers',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('delivery_id', sa.Integer, sa.ForeignKey('deliveries.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('volunteer_id', sa.Integer, sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('quantity', sa.Integer, nullable=False),
+        sa.Column('distance_km', sa.Float, nullable=True),
+        sa.Column('status', sa.Enum('OFFERED', 'ACCEPTED', 'DECLINED', 'EXPIRED', 'WITHDRAWN',
+                                    name='offerstatus'), nullable=False),
+        sa.Column('created_at', sa.DateTime, nullable=True),
+        sa.Column('expires_at', sa.DateTime, nullable=False),
+        sa.Column('responded_at', sa.DateTime, nullable=True),
+        sa.Column('committed_delivery_id', sa.Integer, sa.ForeignKey('deliveries.id', ondelete='SET NULL'),
+                  nullable=True),
+    )
+    op.create_index('ix_dispatch_offers_id', 'dispatch_offers', ['id'])
+    op.create_index('ix_dispatch_offers_status_expires_at', 'dispatch_offers', ['status', 'expires_at'])
+    op.create_index('ix_dispatch_offers_delivery_id', 'dispatch_offers', ['delivery_id'])
+    op.create_index('ix_dispatch_offers_volunteer_id', 'dispatch_offers', ['volunteer_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_dispatch_offers_volunteer_id', table_name='dispatch_offers')
+    op.drop_index('ix_dispatch_offers_delivery_id', table_name='dispatch_offers')
+    op.drop_index('ix_dispatch_offers_status_expires_at', table_name='dispatch_offers')
+    op.drop_index('ix_dispatch_offers_id', table_name='dispatch_offers')
+    op.drop_table('dispatch_offers')
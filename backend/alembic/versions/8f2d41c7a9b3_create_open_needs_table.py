@@ -0,0 +1,49 @@
+"""Create open_needs table
+
+Revision ID: 8f2d41c7a9b3
+Revises: 6c48dc8f1e30
+Create Date: 2026-10-19 07:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+
+# revision identifiers, used by Alembic.
+revision = '8f2d41c7a9b3'
+down_revision = '6c48dc8f1e30'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Materialized open need per shelter + category (app.repositories.open_needs)
+    op.create_table(
+        'open_needs',
+        sa.Column('shelter_id', sa.Integer, sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('category_id', sa.Integer, sa.ForeignKey('categories.id'), nullable=False),
+        sa.Column('open_requests', sa.Integer, nullable=False),
+        sa.Column('quantity_requested', sa.Integer, nullable=False),
+        sa.Column('quantity_received', sa.Integer, nullable=False),
+        sa.Column('quantity_pending', sa.Integer, nullable=False),
+        sa.Column('quantity_remaining', sa.Integer, nullable=False),
+        sa.Column('urgency', sa.Float, nullable=False),
+        sa.Column('oldest_request_at', sa.DateTime, nullable=True),
+        sa.Column('last_activity_at', sa.DateTime, nullable=True),
+        sa.PrimaryKeyConstraint('shelter_id', 'category_id')
+    )
+    op.create_index('ix_open_needs_urgency', 'open_needs', [sa.text('urgency DESC')])
+    op.create_index('ix_open_needs_category_id', 'open_needs', ['category_id'])
+
+    # Fill it from the existing requests
+    from app.repositories.open_needs import rebuild_open_needs
+    session = Session(bind=op.get_bind())
+    rebuild_open_needs(session)
+    session.close()  # joined to the migration transaction: nothing is committed here
+
+
+def downgrade() -> None:
+    op.drop_index('ix_open_needs_category_id', table_name='open_needs')
+    op.drop_index('ix_open_needs_urgency', table_name='open_needs')
+    op.drop_table('open_needs')
@@ -0,0 +1,42 @@
+"""Create product_configurations table
+
+Revision ID: a4d19f07c6e2
+Revises: 3b7e9c52d1a4
+Create Date: 2026-10-19 11:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d19f07c6e2'
+down_revision = '3b7e9c52d1a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Product types managed by admins (app.product_config, /api/product-config)
+    op.create_table(
+        'product_configurations',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('product_type', sa.String(50), nullable=False, unique=True),
+        sa.Column('name', sa.String(100), nullable=False),
+        sa.Column('description', sa.Text, nullable=True),
+        sa.Column('icon', sa.String(50), nullable=True),
+        sa.Column('color', sa.String(20), nullable=True),
+        sa.Column('enabled', sa.Boolean, nullable=True),
+        sa.Column('unit_label', sa.String(20), nullable=True),
+        sa.Column('requires_quantity', sa.Boolean, nullable=True),
+        sa.Column('requires_time_window', sa.Boolean, nullable=True),
+        sa.Column('requires_description', sa.Boolean, nullable=True),
+        sa.Column('additional_fields', sa.JSON, nullable=True),
+        sa.Column('order', sa.Integer, nullable=True),
+    )
+    op.create_index('ix_product_configurations_id', 'product_configurations', ['id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_product_configurations_id', table_name='product_configurations')
+    op.drop_table('product_configurations')
@@ -2,5 +2,10 @@
 App package initialization
 Import all models to ensure they're registered with SQLAlchemy
 """
+# Primeiro import do pacote: o relógio de startup (GET /health/startup) começa aqui
+from app.core.startup import STARTUP
+
 from app import models
 from app import inventory_models
+from app import product_config
+STARTUP.mark("models")
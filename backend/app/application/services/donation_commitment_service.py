@@ -20,7 +20,10 @@ from app.repositories import (
     LocationRepository,
 )
 from app.services.inventory_service import on_delivery_cancelled, on_delivery_confirmed
-from app.core.events import get_event_bus, DonationCommitted, DonationCancelled, DonationDelivered
+from app.core.events import (
+    get_event_bus, emit_after_commit,
+    DonationCommitted, DonationCancelled, DonationDelivered, ShelterNeedsChanged,
+)
 from app.core.logging_config import get_logger
 from app.shared.exceptions import ValidationError, NotFoundError
 
@@ -188,6 +191,7 @@ class DonationCommitmentService(BaseCommitmentService[Delivery]):
             
             if request.status == "pending":
                 request.status = "active"
+            emit_after_commit(self.db, ShelterNeedsChanged(target_id, request.category_id, actor_id=user_id))
             
             deliveries.append(delivery)
         
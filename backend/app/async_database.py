@@ -0,0 +1,216 @@
+"""
+Async database path (AsyncSession) for the hottest read endpoints.
+
+The async engines mirror the sync ones in `app.database`:
+
+    sqlite:///./euajudo.db       -> sqlite+aiosqlite:///./euajudo.db
+    postgresql://... (postgres)  -> postgresql+asyncpg://...
+
+They need `sqlalchemy[asyncio]` (greenlet) and the driver. When either is
+missing, when `DATABASE_ASYNC=false`, or when a test overrides `get_db`,
+the dependencies hand out a `SyncSessionAdapter` instead: the same
+`await db.execute(stmt)` interface over the sync Session, run in the
+threadpool. Endpoints are written once, against the statements in
+`app.repositories.queries`.
+
+Environment variables:
+    DATABASE_ASYNC         auto (default: on when drivers are installed) | false
+"""
+import importlib.util
+import os
+import time
+from typing import Any, Optional, Protocol
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import exc
+
+from app.core.metrics import DB_READ_ROUTES
+from app.core.server_timing import add_timing
+from app.core.sqlite_mode import SQLITE_TUNED, apply_sqlite_pragmas
+from app.database import (
+    DATABASE_REPLICA_URL,
+    DATABASE_URL,
+    POOL_MAX_OVERFLOW,
+    POOL_PRE_PING,
+    POOL_RECYCLE,
+    POOL_SIZE,
+    POOL_TIMEOUT,
+    READ_ROUTER,
+    get_db,
+)
+
+try:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+except ImportError:  # sqlalchemy[asyncio] (greenlet) not installed
+    async_sessionmaker = create_async_engine = None
+
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "auto").lower()
+
+# scheme -> (async scheme, driver module)
+_ASYNC_DRIVERS = {
+    "sqlite": ("sqlite+aiosqlite", "aiosqlite"),
+    "postgresql": ("postgresql+asyncpg", "asyncpg"),
+    "postgres": ("postgresql+asyncpg", "asyncpg"),
+}
+
+
+class AsyncDB(Protocol):
+    """What async endpoints may use: an AsyncSession or a SyncSessionAdapter."""
+
+    async def execute(self, statement, params=None) -> Any: ...
+
+    async def get(self, entity, ident) -> Any: ...
+
+    async def close(self) -> None: ...
+
+
+def async_url(url: str) -> Optional[str]:
+    """Async-driver URL for `url`, or None when no async driver is installed for it."""
+    scheme, sep, rest = url.partition("://")
+    driver = _ASYNC_DRIVERS.get(scheme.split("+")[0])
+    if not sep or driver is None or ":memory:" in rest:
+        # :memory: would be a different database on the async connection
+        return None
+    async_scheme, module = driver
+    if importlib.util.find_spec(module) is None:
+        return None
+    return f"{async_scheme}://{rest}"
+
+
+def build_async_engine(url: str):
+    """AsyncEngine with the same pool settings as the sync engine, or None."""
+    target = async_url(url)
+    if create_async_engine is None or target is None:
+        return None
+    engine = create_async_engine(
+        target,
+        pool_size=POOL_SIZE,
+        max_overflow=POOL_MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+        pool_recycle=POOL_RECYCLE,
+        pool_pre_ping=POOL_PRE_PING,
+    )
+    if target.startswith("sqlite") and SQLITE_TUNED:
+        apply_sqlite_pragmas(engine.sync_engine)
+    return engine
+
+
+if DATABASE_ASYNC != "false":
+    async_engine = build_async_engine(DATABASE_URL)
+    async_replica_engine = build_async_engine(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else None
+else:
+    async_engine = async_replica_engine = None
+
+AsyncSessionLocal = (
+    async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False) if async_engine else None
+)
+AsyncReplicaSessionLocal = (
+    async_sessionmaker(async_replica_engine, autoflush=False, expire_on_commit=False)
+    if async_replica_engine else None
+)
+
+
+class SyncSessionAdapter:
+    """
+    `await`-able facade over a sync Session, used when AsyncSession is not
+    available. Results are buffered in the worker thread, so nothing touches
+    the connection from the event loop.
+    """
+
+    def __init__(self, session):
+        self.sync_session = session
+
+    async def execute(self, statement, params=None):
+        frozen = await run_in_threadpool(lambda: self.sync_session.execute(statement, params).freeze())
+        return frozen()
+
+    async def get(self, entity, ident):
+        return await run_in_threadpool(self.sync_session.get, entity, ident)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+
+def _use_sync_path(request: Request) -> bool:
+    return AsyncSessionLocal is None or get_db in request.app.dependency_overrides
+
+
+async def _open_adapted_primary(request: Request):
+    """Enter get_db (or its override) in the threadpool and adapt its session."""
+    dependency = request.app.dependency_overrides.get(get_db, get_db)
+    generator = dependency()
+    db = await run_in_threadpool(next, generator)
+    # Closing the generator closes the session (get_db records its own close time)
+    return SyncSessionAdapter(db), generator
+
+
+async def _close_timed(session):
+    started = time.perf_counter()
+    await session.close()
+    add_timing("db", time.perf_counter() - started)
+
+
+async def get_async_db(request: Request):
+    """AsyncSession on the primary (or the sync fallback)."""
+    if _use_sync_path(request):
+        adapter, generator = await _open_adapted_primary(request)
+        try:
+            yield adapter
+        finally:
+            await run_in_threadpool(generator.close)
+        return
+    session = AsyncSessionLocal()
+    try:
+        yield session
+    finally:
+        await _close_timed(session)
+
+
+async def _open_async_replica(request: Request):
+    reason = READ_ROUTER.primary_reason(request.scope)
+    if reason is None and AsyncReplicaSessionLocal is None:
+        reason = "no_async_replica"
+    if reason is None:
+        session = AsyncReplicaSessionLocal()
+        try:
+            await session.connection()
+        except exc.DBAPIError as e:
+            await session.close()
+            READ_ROUTER.replica_failed(e)
+            reason = "replica_error"
+        else:
+            DB_READ_ROUTES.inc("replica", "replica")
+            return session
+    DB_READ_ROUTES.inc("primary", reason)
+    return None
+
+
+async def get_async_read_db(request: Request):
+    """
+    Read-only counterpart of `get_async_db`: routed to the replica with the
+    same rules as `app.database.get_read_db` (read-your-writes, fallback).
+    """
+    if _use_sync_path(request):
+        replica = await run_in_threadpool(READ_ROUTER.open_replica_session, request.scope)
+        if replica is None:
+            adapter, generator = await _open_adapted_primary(request)
+            try:
+                yield adapter
+            finally:
+                await run_in_threadpool(generator.close)
+            return
+        adapter = SyncSessionAdapter(replica)
+        try:
+            yield adapter
+        finally:
+            await _close_timed(adapter)
+        return
+
+    session = await _open_async_replica(request)
+    if session is None:
+        session = AsyncSessionLocal()
+    try:
+        yield session
+    finally:
+        await _close_timed(session)
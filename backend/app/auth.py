@@ -6,9 +6,13 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from app.database import get_db
+from app.async_database import AsyncDB, get_async_db
+from app.repositories.queries import user_by_email
 from app.models import User
 from app.schemas import TokenData
+from app.core.server_timing import add_timing
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -35,31 +39,63 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def decode_token_email(token: str) -> Optional[str]:
+    """Return the subject (email) of a valid JWT, or None if invalid/expired."""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    return payload.get("sub")
+
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    started = time.perf_counter()
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
+        email = decode_token_email(token)
         if email is None:
             raise credentials_exception
         token_data = TokenData(email=email)
-    except JWTError:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.email == token_data.email).first()
-    if user is None:
-        raise credentials_exception
-    return user
+        
+        user = db.execute(user_by_email(token_data.email)).scalars().first()
+        if user is None:
+            raise credentials_exception
+        return user
+    finally:
+        add_timing("auth", time.perf_counter() - started)
 
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     if not current_user.active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncDB = Depends(get_async_db)) -> User:
+    """get_current_user for async endpoints (same lookup, on the async session)"""
+    started = time.perf_counter()
+    try:
+        email = decode_token_email(token)
+        user = None
+        if email is not None:
+            result = await db.execute(user_by_email(email))
+            user = result.scalars().first()
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return user
+    finally:
+        add_timing("auth", time.perf_counter() - started)
+
+async def get_current_active_user_async(current_user: User = Depends(get_current_user_async)) -> User:
+    if not current_user.active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return current_user
+
 def require_role(required_roles: list):
     def role_checker(current_user: User = Depends(get_current_active_user)) -> User:
         user_roles = current_user.roles.split(",")
@@ -79,12 +115,14 @@ def require_approved(current_user: User = Depends(get_current_active_user)) -> U
         )
     return current_user
 
-def require_admin(current_user: User = Depends(get_current_active_user)) -> User:
+def is_admin(user: User) -> bool:
     # Lidar com diferentes formatos de roles: "admin" ou "{admin}" ou "admin,volunteer"
-    roles_str = str(current_user.roles).strip("{}")
+    roles_str = str(user.roles).strip("{}")
     user_roles = [role.strip() for role in roles_str.split(",")]
-    
-    if "admin" not in user_roles:
+    return "admin" in user_roles
+
+def require_admin(current_user: User = Depends(get_current_active_user)) -> User:
+    if not is_admin(current_user):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin access required"
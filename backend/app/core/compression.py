@@ -0,0 +1,192 @@
+"""
+Compression - gzip / brotli response compression with size thresholds.
+
+`CompressionMiddleware` (pure ASGI) compresses responses when the client
+accepts it, the body is at least `COMPRESSION_MIN_SIZE` bytes and the
+content type is textual (JSON, HTML, text, JS, SVG). Brotli is preferred
+when the optional `brotli` package is installed and the client sends
+`br`; gzip otherwise. Dynamic responses use cheap levels
+(`COMPRESSION_GZIP_LEVEL`, `COMPRESSION_BROTLI_QUALITY`): the payload is
+compressed on every request.
+
+Responses that already carry `Content-Encoding` pass through untouched -
+that is how the precompressed public payloads (`app.core.response_cache`,
+compressed once per data version at maximum level) reach the client.
+Streaming responses are compressed chunk by chunk, except Server-Sent
+Events, which must reach the client as soon as they are written.
+
+Environment variables:
+    COMPRESSION_ENABLED          true (default) | false
+    COMPRESSION_MIN_SIZE         bytes; smaller bodies are sent as-is (default 1024)
+    COMPRESSION_GZIP_LEVEL       1-9 for dynamic responses (default 6)
+    COMPRESSION_BROTLI_QUALITY   0-11 for dynamic responses (default 4)
+"""
+import gzip
+import os
+import zlib
+from typing import Optional
+
+from app.core.metrics import COMPRESSED_RESPONSES
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes", "on")
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+# Levels for payloads compressed once and cached
+PRECOMPRESS_GZIP_LEVEL = 9
+PRECOMPRESS_BROTLI_QUALITY = 11
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+STREAMING_EXCLUDED_TYPES = ("text/event-stream",)
+
+
+def supported_encodings() -> tuple:
+    """Encodings this process can produce, in order of preference."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Best encoding the client accepts (honours `q=0`), or None."""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    for encoding in supported_encodings():
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str, precompress: bool = False) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=PRECOMPRESS_BROTLI_QUALITY if precompress else COMPRESSION_BROTLI_QUALITY)
+    # mtime=0: identical bytes for identical payloads (stable across processes)
+    return gzip.compress(body, compresslevel=PRECOMPRESS_GZIP_LEVEL if precompress else COMPRESSION_GZIP_LEVEL,
+                         mtime=0)
+
+
+class _StreamCompressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+            self.compress, self.finish = compressor.process, compressor.finish
+        else:
+            compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self.compress, self.finish = compressor.compress, compressor.flush
+
+
+def _header(headers, name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _add_vary(headers: list):
+    for index, (key, value) in enumerate(headers):
+        if key.lower() == b"vary":
+            if b"accept-encoding" not in value.lower():
+                headers[index] = (key, value + b", Accept-Encoding")
+            return
+    headers.append((b"vary", b"Accept-Encoding"))
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI gzip/brotli middleware (see module docstring).
+
+    Body chunks are held until `minimum_size` bytes arrived or the response
+    ended, so small responses streamed in pieces (e.g. through an
+    `@app.middleware("http")` function) are still sent uncompressed.
+    """
+
+    def __init__(self, app, minimum_size: int = None):
+        self.app = app
+        self.minimum_size = COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if not COMPRESSION_ENABLED or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding((_header(scope["headers"], b"accept-encoding") or b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None        # response start held back while deciding
+        pending = []        # body chunks held back while deciding
+        pending_size = 0
+        compressor = None
+        passthrough = False
+
+        async def flush_uncompressed(more_body: bool):
+            nonlocal start, passthrough
+            await send(start)
+            await send({"type": "http.response.body", "body": b"".join(pending), "more_body": more_body})
+            start, passthrough = None, True
+
+        async def send_wrapper(message):
+            nonlocal start, pending_size, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+                if (_header(headers, b"content-encoding") is not None
+                        or not content_type.startswith(COMPRESSIBLE_TYPES)
+                        or content_type.startswith(STREAMING_EXCLUDED_TYPES)):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                pending.append(body)
+                pending_size += len(body)
+                if pending_size < self.minimum_size:
+                    if not more_body:
+                        await flush_uncompressed(more_body=False)
+                    return
+                headers = [(k, v) for k, v in start.get("headers", []) if k.lower() != b"content-length"]
+                headers.append((b"content-encoding", encoding.encode()))
+                _add_vary(headers)
+                body = b"".join(pending)
+                pending.clear()
+                if not more_body:
+                    # Whole body known: one-shot compression with a Content-Length
+                    body = compress(body, encoding)
+                    headers.append((b"content-length", str(len(body)).encode()))
+                    COMPRESSED_RESPONSES.inc(encoding, "dynamic")
+                    await send({**start, "headers": headers})
+                    await send({"type": "http.response.body", "body": body})
+                    start = None
+                    return
+                compressor = _StreamCompressor(encoding)
+                COMPRESSED_RESPONSES.inc(encoding, "streaming")
+                await send({**start, "headers": headers})
+                start = None
+
+            chunk = compressor.compress(body)
+            if not more_body:
+                chunk += compressor.finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,140 @@
+"""
+Data Versions - per-table change counters for cache keys.
+
+Every committed ORM write bumps the version of the tables it touched:
+
+    after_flush      tables of session.new / dirty / deleted are remembered
+    do_orm_execute   bulk UPDATE / DELETE statements add their table
+    after_commit     the remembered tables are bumped - published on the
+                     invalidation bus (`data_versions` namespace), so every
+                     worker bumps them
+    after_rollback   nothing is bumped
+
+`create_all` / `drop_all` on the models' metadata bump everything (schema
+resets, tests) in this process only. Caches build their keys from
+`DATA_VERSIONS.token(tables)`, so a payload built before a write is never
+served after it. The counters themselves are per process: with the local
+bus backend, or for writes made outside the ORM (raw SQL, scripts), other
+workers only catch up through the caches' TTL.
+
+Caches that hold decoded objects rather than keying on the token (e.g.
+`app.repositories.reference_data`) register `DATA_VERSIONS.subscribe(fn)`:
+`fn(tables)` runs after every bump, with `None` for a schema-wide bump.
+"""
+import logging
+import threading
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.invalidation import INVALIDATION_BUS
+
+logger = logging.getLogger(__name__)
+
+_WRITTEN = "written_tables"
+NAMESPACE = "data_versions"
+
+
+class DataVersions:
+    """Monotonic version per table name, plus a boot id so tokens never repeat across restarts."""
+
+    def __init__(self):
+        self.boot_id = uuid.uuid4().hex[:8]
+        self._versions: Dict[str, int] = {}
+        self._epoch = 0  # bumped for every table at once (schema create/drop)
+        self._lock = threading.Lock()
+        self._subscribers: List[Callable[[Optional[Set[str]]], None]] = []
+
+    def subscribe(self, callback: Callable[[Optional[Set[str]]], None]):
+        """Call `callback(tables)` after each bump (`None` = every table)."""
+        self._subscribers.append(callback)
+
+    def _notify(self, tables: Optional[Set[str]]):
+        for callback in self._subscribers:
+            try:
+                callback(tables)
+            except Exception:
+                logger.exception("Data version subscriber %r failed", callback)
+
+    def bump(self, tables: Iterable[str]):
+        tables = set(tables)
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+        self._notify(tables)
+
+    def bump_all(self):
+        with self._lock:
+            self._epoch += 1
+        self._notify(None)
+
+    def version(self, table: str) -> int:
+        return self._versions.get(table, 0)
+
+    def token(self, tables: Iterable[str]) -> str:
+        """Opaque string that changes whenever any of `tables` changes."""
+        versions = self._versions
+        return f"{self.boot_id}.{self._epoch}." + ".".join(str(versions.get(table, 0)) for table in tables)
+
+
+DATA_VERSIONS = DataVersions()
+
+_listeners_installed = False
+
+
+def _tables_of(objects) -> Set[str]:
+    return {obj.__table__.name for obj in objects if hasattr(obj, "__table__")}
+
+
+def pending_tables(session) -> Set[str]:
+    """Tables `session` has written (flushed or pending) but not committed yet."""
+    return (set(session.info.get(_WRITTEN, ()))
+            | _tables_of(session.new) | _tables_of(session.dirty) | _tables_of(session.deleted))
+
+
+def _remember_flushed_tables(session, flush_context):
+    tables = _tables_of(session.new) | _tables_of(session.dirty) | _tables_of(session.deleted)
+    if tables:
+        session.info.setdefault(_WRITTEN, set()).update(tables)
+
+
+def _remember_bulk_tables(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None:
+            orm_execute_state.session.info.setdefault(_WRITTEN, set()).add(mapper.local_table.name)
+
+
+def _bump_committed_tables(session):
+    tables = session.info.pop(_WRITTEN, None)
+    if tables:
+        INVALIDATION_BUS.publish(NAMESPACE, ",".join(sorted(tables)))
+
+
+def _apply_bump(key: Optional[str]):
+    """Bus handler: tables committed here or in another worker (None = resync everything)."""
+    if key is None:
+        DATA_VERSIONS.bump_all()
+    else:
+        DATA_VERSIONS.bump(key.split(","))
+
+
+def _forget_tables(session):
+    session.info.pop(_WRITTEN, None)
+
+
+def install_data_versions(metadata):
+    """Attach the Session and metadata listeners. Idempotent."""
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    INVALIDATION_BUS.subscribe(NAMESPACE, _apply_bump)
+    event.listen(Session, "after_flush", _remember_flushed_tables)
+    event.listen(Session, "do_orm_execute", _remember_bulk_tables)
+    event.listen(Session, "after_commit", _bump_committed_tables)
+    event.listen(Session, "after_rollback", _forget_tables)
+    event.listen(metadata, "after_create", lambda *args, **kwargs: DATA_VERSIONS.bump_all())
+    event.listen(metadata, "after_drop", lambda *args, **kwargs: DATA_VERSIONS.bump_all())
+    _listeners_installed = True
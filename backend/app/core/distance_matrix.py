@@ -0,0 +1,256 @@
+"""
+Distance matrix - pairwise great-circle distances between delivery locations.
+
+    DISTANCE_MATRIX.sync(refs)                 follow the locations of a reference data snapshot
+    DISTANCE_MATRIX.km(a_id, b_id)             distance between two locations (None: unknown)
+    DISTANCE_MATRIX.from_point(lat, lng)       {location id: km} from a position (users)
+    DISTANCE_MATRIX.nearest(lat, lng, limit)   closest locations to a position
+
+Distances are kept as float32 (4 bytes each, well under a meter off at
+city distances) in one square array indexed by slot, one slot per located
+delivery location. Rows are filled on first use, DISTANCE_BLOCK_ROWS rows
+at a time with one vectorized haversine per block, so a lookup never pays
+for the whole n² matrix.
+
+The matrix is keyed by the reference data generation - the version of
+the location set. `sync()` with a newer snapshot compares coordinates and
+only recomputes the row and column of each location added or moved (the
+matrix is symmetric); removed locations free their slot for the next one
+added. When most of the set changed (or on the first sync) the computed
+rows are dropped instead and refilled lazily.
+
+Blocks are computed with NumPy (requirements.txt). If it cannot be
+imported the module still works as a safety net: rows live in
+`array('f')` (same float32 layout) and are computed one at a time in pure
+Python, about 20× slower. Above DISTANCE_MATRIX_MAX_LOCATIONS located locations no matrix is
+kept (n² × 4 bytes) and lookups compute the distance directly.
+
+Environment variables:
+    DISTANCE_BLOCK_ROWS             rows computed together with NumPy (default 256)
+    DISTANCE_MATRIX_MAX_LOCATIONS   largest matrix kept in memory (default 4096, 64 MB)
+"""
+import heapq
+import math
+import os
+import threading
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.geo import EARTH_RADIUS_KM, haversine_km
+
+try:
+    import numpy as np
+except ImportError:  # safety net only: pure-Python rows
+    np = None
+
+DISTANCE_BLOCK_ROWS = int(os.getenv("DISTANCE_BLOCK_ROWS", "256"))
+DISTANCE_MATRIX_MAX_LOCATIONS = int(os.getenv("DISTANCE_MATRIX_MAX_LOCATIONS", "4096"))
+
+# More than this share of the slots added or moved in one sync: drop the rows instead of patching them
+_RESET_SHARE = 0.125
+
+
+class DistanceMatrix:
+    """float32 distances between located delivery locations, for one location set version."""
+
+    def __init__(self, block_rows: int = None, max_locations: int = None, use_numpy: bool = True):
+        self.np = np if use_numpy else None
+        self.block_rows = max(1, block_rows or DISTANCE_BLOCK_ROWS) if self.np is not None else 1
+        self.max_locations = DISTANCE_MATRIX_MAX_LOCATIONS if max_locations is None else max_locations
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._slot: Dict[int, int] = {}           # location id -> slot
+        self._ids: List[Optional[int]] = []       # slot -> location id (None: free)
+        self._free: List[int] = []
+        self._lat: List[float] = []
+        self._lng: List[float] = []
+        self._capacity = 0
+        self._matrix = None                       # np.ndarray (capacity²) or List[array('f')]
+        self._phi = self._lambda = None           # radians per slot (NumPy)
+        self._computed = bytearray()              # row is up to date
+        self.rows_computed = 0
+        self.incremental_updates = 0
+        self.resets = 0
+
+    # ---- location set ----
+    def sync(self, refs) -> None:
+        """Bring the matrix to the locations of `refs` (no-op for the version already synced)."""
+        if self._version is not None and refs.generation <= self._version:
+            return
+        with self._lock:
+            if self._version is not None and refs.generation <= self._version:
+                return
+            located = {record.id: (record.latitude, record.longitude) for record in refs.locations()
+                       if record.latitude is not None and record.longitude is not None}
+            for location_id in [i for i in self._slot if i not in located]:
+                slot = self._slot.pop(location_id)
+                self._ids[slot] = None
+                self._free.append(slot)
+            changed = []
+            for location_id, (lat, lng) in located.items():
+                slot = self._slot.get(location_id)
+                if slot is None:
+                    slot = self._assign(location_id)
+                elif self._lat[slot] == lat and self._lng[slot] == lng:
+                    continue
+                self._set_coordinates(slot, lat, lng)
+                changed.append(slot)
+            self._allocate()
+            if self._matrix is not None and changed and any(self._computed):
+                if len(changed) > len(self._slot) * _RESET_SHARE:
+                    self._computed = bytearray(self._capacity)
+                    self.resets += 1
+                else:
+                    for slot in changed:
+                        self._update_row_and_column(slot)
+                    self.incremental_updates += len(changed)
+            self._version = refs.generation
+
+    def _assign(self, location_id: int) -> int:
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self._ids)
+            self._ids.append(None)
+            self._lat.append(0.0)
+            self._lng.append(0.0)
+        self._ids[slot] = location_id
+        self._slot[location_id] = slot
+        return slot
+
+    def _set_coordinates(self, slot: int, lat: float, lng: float):
+        self._lat[slot], self._lng[slot] = lat, lng
+        if self._phi is not None and slot < len(self._phi):
+            self._phi[slot], self._lambda[slot] = math.radians(lat), math.radians(lng)
+        if slot < len(self._computed):
+            self._computed[slot] = 0
+
+    def _allocate(self):
+        """Grow (25% headroom) or drop the storage to fit the slots in use."""
+        size = len(self._ids)
+        if self.np is not None and (self._phi is None or len(self._phi) < size):
+            room = max(64, 2 * len(self._phi) if self._phi is not None else 0, size)
+            self._phi = self.np.radians(self.np.array(self._lat + [0.0] * (room - size)))
+            self._lambda = self.np.radians(self.np.array(self._lng + [0.0] * (room - size)))
+        if size > self.max_locations:
+            self._matrix, self._capacity, self._computed = None, 0, bytearray()
+            return
+        if self._matrix is not None and size <= self._capacity:
+            return
+        capacity = min(self.max_locations, max(64, size + size // 4))
+        old, old_capacity = self._matrix, self._capacity
+        if self.np is not None:
+            matrix = self.np.zeros((capacity, capacity), dtype=self.np.float32)
+            if old is not None:
+                matrix[:old_capacity, :old_capacity] = old
+            self._matrix = matrix
+        else:
+            rows = old or []
+            for row in rows:
+                row.extend(array("f", bytes(4 * (capacity - old_capacity))))
+            rows.extend(array("f", bytes(4 * capacity)) for _ in range(capacity - len(rows)))
+            self._matrix = rows
+        self._computed = self._computed + bytearray(capacity - len(self._computed))
+        self._capacity = capacity
+
+    # ---- computation ----
+    def _distances_from(self, lat: float, lng: float, size: int):
+        """Distances from a point to slots [0, size)."""
+        if self.np is not None:
+            xp = self.np
+            phi, lam = math.radians(lat), math.radians(lng)
+            a = (xp.sin((self._phi[:size] - phi) / 2) ** 2
+                 + math.cos(phi) * xp.cos(self._phi[:size]) * xp.sin((self._lambda[:size] - lam) / 2) ** 2)
+            return (2 * EARTH_RADIUS_KM) * xp.arcsin(xp.sqrt(xp.clip(a, 0.0, 1.0)))
+        return [haversine_km(lat, lng, self._lat[t], self._lng[t]) for t in range(size)]
+
+    def _compute_block(self, slot: int):
+        size = len(self._ids)
+        start = slot - slot % self.block_rows
+        stop = min(start + self.block_rows, size)
+        if self.np is not None:
+            xp = self.np
+            phi, lam = self._phi[:size], self._lambda[:size]
+            rows_phi, rows_lambda = phi[start:stop, None], lam[start:stop, None]
+            a = (xp.sin((phi[None, :] - rows_phi) / 2) ** 2
+                 + xp.cos(rows_phi) * xp.cos(phi)[None, :] * xp.sin((lam[None, :] - rows_lambda) / 2) ** 2)
+            self._matrix[start:stop, :size] = (2 * EARTH_RADIUS_KM) * xp.arcsin(xp.sqrt(xp.clip(a, 0.0, 1.0)))
+        else:
+            for row in range(start, stop):
+                self._matrix[row][:size] = array("f", self._distances_from(self._lat[row], self._lng[row], size))
+        for row in range(start, stop):
+            self._computed[row] = 1
+        self.rows_computed += stop - start
+
+    def _update_row_and_column(self, slot: int):
+        size = len(self._ids)
+        distances = self._distances_from(self._lat[slot], self._lng[slot], size)
+        if self.np is not None:
+            self._matrix[slot, :size] = distances
+            self._matrix[:size, slot] = distances
+        else:
+            self._matrix[slot][:size] = array("f", distances)
+            for row, km in zip(self._matrix, distances):
+                row[slot] = km
+        self._computed[slot] = 1
+        self.rows_computed += 1
+
+    # ---- lookups ----
+    def km(self, a: int, b: int) -> Optional[float]:
+        """Distance between locations `a` and `b`; None when one of them is not in the synced set."""
+        with self._lock:
+            sa, sb = self._slot.get(a), self._slot.get(b)
+            if sa is None or sb is None:
+                return None
+            if sa == sb:
+                return 0.0
+            if self._matrix is None:
+                return haversine_km(self._lat[sa], self._lng[sa], self._lat[sb], self._lng[sb])
+            if not self._computed[sa]:
+                if self._computed[sb]:
+                    sa, sb = sb, sa
+                else:
+                    self._compute_block(sa)
+            if self.np is not None:
+                return self._matrix.item(sa, sb)
+            return self._matrix[sa][sb]
+
+    def from_point(self, lat: float, lng: float, ids: Iterable[int] = None) -> Dict[int, float]:
+        """{location id: km} from (lat, lng) to every synced location (or to `ids`)."""
+        with self._lock:
+            size = len(self._ids)
+            distances = self._distances_from(lat, lng, size) if size else []
+            if ids is None:
+                return {i: float(distances[s]) for s, i in enumerate(self._ids) if i is not None}
+            return {i: float(distances[self._slot[i]]) for i in ids if i in self._slot}
+
+    def nearest(self, lat: float, lng: float, limit: int = 10, max_km: float = None,
+                ids: Iterable[int] = None) -> List[Tuple[int, float]]:
+        """[(location id, km)] of the `limit` closest locations (among `ids`), nearest first."""
+        distances = self.from_point(lat, lng, ids)
+        candidates = ((km, i) for i, km in distances.items() if max_km is None or km <= max_km)
+        return [(i, km) for km, i in heapq.nsmallest(limit, candidates)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._matrix is None:
+                nbytes = 0
+            elif self.np is not None:
+                nbytes = self._matrix.nbytes
+            else:
+                nbytes = sum(row.itemsize * len(row) for row in self._matrix)
+            return {
+                "backend": "numpy" if self.np is not None else "python",
+                "version": self._version,
+                "locations": len(self._slot),
+                "capacity": self._capacity,
+                "enabled": self._matrix is not None,
+                "rows_ready": sum(self._computed),
+                "bytes": nbytes,
+                "rows_computed": self.rows_computed,
+                "incremental_updates": self.incremental_updates,
+                "resets": self.resets,
+            }
+
+
+DISTANCE_MATRIX = DistanceMatrix()
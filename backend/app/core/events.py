@@ -9,11 +9,19 @@ All domain events go through here. When we add Kafka:
 Usage:
     bus = get_event_bus()
     bus.emit("donation.committed", {"delivery_id": 1, "shelter_id": 5, ...})
+
+Events describing data that is still being written (inventory hooks,
+request endpoints) are queued on the session and emitted only once it
+commits; a rollback drops them:
+    emit_after_commit(db, ShelterNeedsChanged(shelter_id=5, category_id=2))
 """
 import logging
 from datetime import datetime
 from typing import Callable, Dict, List, Any
 
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import Session
+
 logger = logging.getLogger(__name__)
 
 
@@ -89,6 +97,80 @@ class NeedRequestFulfilled(DomainEvent):
         )
 
 
+class ShelterNeedsChanged(DomainEvent):
+    """Requested / received / pending quantities of a shelter changed."""
+
+    def __init__(self, shelter_id: int, category_id: int = None, actor_id: int = None):
+        super().__init__(
+            "shelter.needs_changed",
+            {"shelter_id": shelter_id, "category_id": category_id},
+            actor_id=actor_id,
+        )
+
+
+# ---- Inventory Events ----
+class InventoryStockChanged(DomainEvent):
+    """Stock levels of one shelter inventory item, as flushed."""
+
+    def __init__(self, shelter_id: int, category_id: int, item_id: int, quantity_in_stock: int,
+                 quantity_reserved: int, quantity_available: int, min_threshold: int,
+                 became_low: bool = False):
+        super().__init__(
+            "inventory.stock_changed",
+            {"shelter_id": shelter_id, "category_id": category_id, "item_id": item_id,
+             "quantity_in_stock": quantity_in_stock, "quantity_reserved": quantity_reserved,
+             "quantity_available": quantity_available, "min_threshold": min_threshold,
+             "became_low": became_low},
+        )
+
+
+class IncomingDeliveryChanged(DomainEvent):
+    """A delivery to a shelter was committed, delivered or cancelled."""
+
+    def __init__(self, shelter_id: int, delivery_id: int, category_id: int, quantity: int,
+                 state: str, actor_id: int = None):
+        super().__init__(
+            "inventory.incoming_changed",
+            {"shelter_id": shelter_id, "delivery_id": delivery_id, "category_id": category_id,
+             "quantity": quantity, "state": state},
+            actor_id=actor_id,
+        )
+
+
+# ---- Dispatch Events ----
+class DeliveryOffered(DomainEvent):
+    """The dispatcher proposed an AVAILABLE delivery to a volunteer."""
+
+    def __init__(self, offer_id: int, delivery_id: int, volunteer_id: int, quantity: int,
+                 distance_km: float, expires_at: str):
+        super().__init__(
+            "dispatch.offered",
+            {"offer_id": offer_id, "delivery_id": delivery_id, "volunteer_id": volunteer_id,
+             "quantity": quantity, "distance_km": distance_km, "expires_at": expires_at},
+        )
+
+
+class DeliveryOfferClosed(DomainEvent):
+    """A dispatcher offer was accepted, declined, expired or withdrawn."""
+
+    def __init__(self, offer_id: int, delivery_id: int, volunteer_id: int, state: str, actor_id: int = None):
+        super().__init__(
+            "dispatch.offer_closed",
+            {"offer_id": offer_id, "delivery_id": delivery_id, "volunteer_id": volunteer_id, "state": state},
+            actor_id=actor_id,
+        )
+
+
+# ---- Location Events ----
+class LocationApproved(DomainEvent):
+    def __init__(self, location_id: int, user_id: int = None, actor_id: int = None):
+        super().__init__(
+            "location.approved",
+            {"location_id": location_id, "user_id": user_id},
+            actor_id=actor_id,
+        )
+
+
 # ============================================================================
 # SYNC EVENT BUS (swap for Kafka bus later)
 # ============================================================================
@@ -150,6 +232,43 @@ def get_event_bus() -> SyncEventBus:
     return _bus
 
 
+# ============================================================================
+# TRANSACTIONAL EMIT
+# ============================================================================
+
+_PENDING_EVENTS = "pending_domain_events"
+
+
+def emit_after_commit(db: Session, event: DomainEvent):
+    """
+    Emit `event` when `db` commits (dropped on rollback). Duplicates are
+    emitted once, in the position of the last one, so a state that was
+    left and then restored (stock 5 → 3 → 5) is still emitted last.
+    """
+    if not db.in_transaction():
+        db.begin()  # so that a rollback before any SQL still drops the event
+    pending = db.info.setdefault(_PENDING_EVENTS, {})
+    key = (event.event_type, tuple(sorted(event.payload.items())))
+    pending.pop(key, None)
+    pending[key] = event
+
+
+def _emit_pending(session: Session):
+    pending = session.info.pop(_PENDING_EVENTS, None)
+    for event in (pending or {}).values():
+        _bus.emit(event)
+
+
+def _drop_pending(session: Session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop(_PENDING_EVENTS, None)
+
+
+sa_event.listen(Session, "after_commit", _emit_pending)
+# soft: also when the transaction never reached the database
+sa_event.listen(Session, "after_soft_rollback", _drop_pending)
+
+
 def register_handlers(bus: SyncEventBus):
     """
     Register all domain event handlers.
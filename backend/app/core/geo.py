@@ -0,0 +1,67 @@
+"""
+Geo - great-circle distances and a fixed grid for spatial lookups.
+
+    haversine_km(lat1, lng1, lat2, lng2)     distance in km on a spherical Earth
+    GeoGrid(cell_km).cell(lat, lng)          (row, col) of the grid cell of a point
+    GeoGrid(cell_km).ring(cell, r)           cells at Chebyshev distance r around a cell
+
+The grid uses the same step in degrees for latitude and longitude
+(cell_km / 111.32), so a cell is cell_km tall and cell_km × cos(latitude)
+wide: near the equator - all of Brazil - cells are close to square.
+`ring_min_km()` is a lower bound of the distance from a point to any cell
+of a ring, which lets searches stop expanding once nothing further away can
+beat what they already found.
+"""
+import math
+from typing import Iterator, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+Cell = Tuple[int, int]
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    half_dphi = (phi2 - phi1) / 2
+    half_dlambda = math.radians(lng2 - lng1) / 2
+    a = math.sin(half_dphi) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(half_dlambda) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GeoGrid:
+    """Square cells of `cell_km` (in latitude) on an equirectangular projection."""
+
+    def __init__(self, cell_km: float):
+        self.cell_km = cell_km
+        self.step = cell_km / KM_PER_DEGREE  # degrees per cell, both axes
+
+    def cell(self, lat: float, lng: float) -> Cell:
+        return math.floor(lat / self.step), math.floor(lng / self.step)
+
+    @staticmethod
+    def ring(center: Cell, radius: int) -> Iterator[Cell]:
+        row, col = center
+        if radius == 0:
+            yield center
+            return
+        for c in range(col - radius, col + radius + 1):
+            yield row - radius, c
+            yield row + radius, c
+        for r in range(row - radius + 1, row + radius):
+            yield r, col - radius
+            yield r, col + radius
+
+    def ring_min_km(self, lat: float, radius: int) -> float:
+        """Lower bound of the distance from a point at `lat` to the cells of ring `radius` around its cell."""
+        if radius <= 1:
+            return 0.0
+        # the ring is radius - 1 whole cells away; longitude cells are narrowest
+        # at the highest latitude the ring reaches
+        widest_lat = min(89.0, abs(lat) + radius * self.step)
+        return (radius - 1) * self.cell_km * max(math.cos(math.radians(widest_lat)), 0.01)
+
+    def rings_within(self, lat: float, km: float) -> int:
+        """Number of rings needed to cover `km` around a point at `lat`."""
+        width = self.cell_km * max(math.cos(math.radians(min(89.0, abs(lat) + km / KM_PER_DEGREE))), 0.01)
+        return int(math.ceil(km / width)) + 1
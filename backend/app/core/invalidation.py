@@ -0,0 +1,316 @@
+"""
+Invalidation Bus - cross-worker cache invalidation by namespace.
+
+Each uvicorn worker keeps its own in-process caches (the data versions
+behind the public payload cache, the reference data snapshot...). A write
+handled by one worker has to reach the others, so caches subscribe to a
+namespace and invalidations are published on it:
+
+    INVALIDATION_BUS.subscribe("reference_data", lambda key: cache.invalidate())
+    INVALIDATION_BUS.publish("reference_data")
+
+`publish()` runs this worker's handlers at once and hands the message
+
+    {"ns": "data_versions", "key": "deliveries,users", "origin": "<worker id>", "sent": <epoch>}
+
+to the backend; the other workers run their handlers when it arrives, on
+the backend's listener thread (handlers must be thread-safe). A worker
+ignores its own messages. `key=None` means "everything in the namespace";
+after a broker outage every namespace receives `None`, since messages may
+have been lost meanwhile.
+
+Backends:
+    redis    pub/sub on INVALIDATION_CHANNEL (`redis` package + REDIS_URL);
+             one listener thread per worker, reconnecting with backoff
+    sqlite   stand-in broker for a single host and for tests: messages are
+             rows of a small SQLite file that every worker polls every
+             INVALIDATION_POLL_INTERVAL seconds
+    local    this process only (single worker)
+
+Namespaces:
+    data_versions    committed table writes (key: comma-separated tables);
+                     every worker bumps the same `DATA_VERSIONS` counters
+    reference_data   explicit invalidation / hot reload of the reference data
+    payload_cache    purge of a `PayloadCache` (key: cache name)
+
+Environment variables:
+    INVALIDATION_BACKEND        auto (default: redis with REDIS_URL and the package,
+                                else sqlite with INVALIDATION_SQLITE_PATH, else local)
+                                | redis | sqlite | local
+    REDIS_URL                   redis://host:6379/0
+    INVALIDATION_CHANNEL        pub/sub channel (default euajudo:invalidation)
+    INVALIDATION_SQLITE_PATH    SQLite file shared by the workers (sqlite backend)
+    INVALIDATION_POLL_INTERVAL  sqlite polling period in seconds (default 0.02)
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+import orjson
+
+from app.core.metrics import INVALIDATION_LATENCY, INVALIDATION_MESSAGES
+
+try:
+    import redis
+except ImportError:  # optional: sqlite / local backends only
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_BACKEND = os.getenv("INVALIDATION_BACKEND", "auto").lower()
+REDIS_URL = os.getenv("REDIS_URL", "")
+INVALIDATION_CHANNEL = os.getenv("INVALIDATION_CHANNEL", "euajudo:invalidation")
+INVALIDATION_SQLITE_PATH = os.getenv("INVALIDATION_SQLITE_PATH", "")
+INVALIDATION_POLL_INTERVAL = float(os.getenv("INVALIDATION_POLL_INTERVAL", "0.02"))
+
+ALL_NAMESPACES = "*"
+
+Handler = Callable[[Optional[str]], None]
+Deliver = Callable[[dict], None]
+
+
+class LocalBackend:
+    """No broker: invalidations stay in this process."""
+
+    name = "local"
+
+    def start(self, deliver: Deliver):
+        pass
+
+    def send(self, message: dict):
+        pass
+
+    def stop(self):
+        pass
+
+
+class _ListenerThread:
+    """Daemon thread running `loop(stop_event)` until `stop()`."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start_thread(self, loop: Callable[[threading.Event], None]):
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, args=(self._stop,), name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+class SQLiteBackend(_ListenerThread):
+    """Messages as rows of a shared SQLite file, polled by every worker."""
+
+    name = "sqlite"
+    retention_seconds = 60.0
+    prune_every = 200
+
+    def __init__(self, path: str, poll_interval: float = None):
+        super().__init__("invalidation-sqlite")
+        self.path = path
+        self.poll_interval = INVALIDATION_POLL_INTERVAL if poll_interval is None else poll_interval
+        self._send_lock = threading.Lock()
+        self._sender: Optional[sqlite3.Connection] = None
+        self._sent = 0
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS invalidations ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, payload BLOB NOT NULL, created REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        return connection
+
+    def send(self, message: dict):
+        now = time.time()
+        try:
+            with self._send_lock:
+                if self._sender is None:
+                    self._sender = self._connect()
+                self._sender.execute("INSERT INTO invalidations (payload, created) VALUES (?, ?)",
+                                     (orjson.dumps(message), now))
+                self._sent += 1
+                if self._sent % self.prune_every == 0:
+                    self._sender.execute("DELETE FROM invalidations WHERE created < ?",
+                                         (now - self.retention_seconds,))
+        except sqlite3.Error:
+            logger.warning("Invalidation not written to %s", self.path, exc_info=True)
+
+    def start(self, deliver: Deliver):
+        connection = self._connect()
+        # Only messages published from now on
+        last_id = connection.execute("SELECT COALESCE(MAX(id), 0) FROM invalidations").fetchone()[0]
+
+        def loop(stop: threading.Event):
+            nonlocal last_id
+            while not stop.is_set():
+                try:
+                    rows = connection.execute(
+                        "SELECT id, payload FROM invalidations WHERE id > ? ORDER BY id", (last_id,)
+                    ).fetchall()
+                except sqlite3.Error:
+                    logger.warning("Invalidation poll failed on %s", self.path, exc_info=True)
+                    rows = []
+                for row_id, payload in rows:
+                    last_id = row_id
+                    deliver(orjson.loads(payload))
+                stop.wait(self.poll_interval)
+            connection.close()
+
+        self.start_thread(loop)
+
+    def stop(self):
+        super().stop()
+        with self._send_lock:
+            if self._sender is not None:
+                self._sender.close()
+                self._sender = None
+
+
+class RedisBackend(_ListenerThread):
+    """Redis pub/sub: publish on send, one subscriber thread per worker."""
+
+    name = "redis"
+    max_backoff = 30.0
+
+    def __init__(self, url: str, channel: str = None):
+        if redis is None:
+            raise RuntimeError("The redis invalidation backend needs the `redis` package")
+        super().__init__("invalidation-redis")
+        self.channel = channel or INVALIDATION_CHANNEL
+        self.client = redis.Redis.from_url(url)
+
+    def send(self, message: dict):
+        try:
+            self.client.publish(self.channel, orjson.dumps(message))
+        except redis.RedisError:
+            logger.warning("Invalidation not published to Redis", exc_info=True)
+
+    def start(self, deliver: Deliver):
+        def loop(stop: threading.Event):
+            failures = 0
+            while not stop.is_set():
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                try:
+                    pubsub.subscribe(self.channel)
+                    if failures:
+                        # Messages published while disconnected are lost: resync everything
+                        deliver({"ns": ALL_NAMESPACES, "key": None, "origin": ""})
+                        failures = 0
+                    while not stop.is_set():
+                        message = pubsub.get_message(timeout=1.0)
+                        if message is not None and message.get("type") == "message":
+                            deliver(orjson.loads(message["data"]))
+                except redis.RedisError:
+                    failures += 1
+                    delay = min(self.max_backoff, 0.5 * 2 ** (failures - 1))
+                    logger.warning("Redis invalidation listener disconnected, retrying in %.1fs", delay,
+                                   exc_info=failures == 1)
+                    stop.wait(delay)
+                finally:
+                    pubsub.close()
+
+        self.start_thread(loop)
+
+
+def build_backend(kind: str = None):
+    kind = INVALIDATION_BACKEND if kind is None else kind
+    if kind == "redis" or (kind == "auto" and REDIS_URL and redis is not None):
+        return RedisBackend(REDIS_URL)
+    if kind == "sqlite" or (kind == "auto" and INVALIDATION_SQLITE_PATH):
+        if not INVALIDATION_SQLITE_PATH:
+            raise RuntimeError("INVALIDATION_BACKEND=sqlite needs INVALIDATION_SQLITE_PATH")
+        return SQLiteBackend(INVALIDATION_SQLITE_PATH)
+    if kind == "auto" and REDIS_URL:
+        logger.warning("REDIS_URL is set but the `redis` package is not installed: invalidations stay local")
+    return LocalBackend()
+
+
+class InvalidationBus:
+    """Namespace -> handlers, fed by local publishes and by the backend."""
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else LocalBackend()
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._handlers: Dict[str, List[Handler]] = {}
+        self._lock = threading.Lock()
+        self._started = False
+        self.published = 0
+        self.received = 0
+
+    def subscribe(self, namespace: str, handler: Handler):
+        with self._lock:
+            self._handlers.setdefault(namespace, []).append(handler)
+
+    def publish(self, namespace: str, key: Optional[str] = None, local: bool = True):
+        """
+        Invalidate `namespace` (`key`) in this worker now and in the others via
+        the backend. `local=False`: the others only (this worker already applied it).
+        """
+        if local:
+            self._dispatch(namespace, key)
+        self.published += 1
+        INVALIDATION_MESSAGES.inc(namespace, "published")
+        self.backend.send({"ns": namespace, "key": key, "origin": self.worker_id, "sent": time.time()})
+
+    def _receive(self, message: dict):
+        if message.get("origin") == self.worker_id:
+            return
+        namespace = message.get("ns", ALL_NAMESPACES)
+        self.received += 1
+        INVALIDATION_MESSAGES.inc(namespace, "received")
+        if "sent" in message:
+            INVALIDATION_LATENCY.observe(max(0.0, time.time() - message["sent"]))
+        self._dispatch(namespace, message.get("key"))
+
+    def _dispatch(self, namespace: str, key: Optional[str]):
+        with self._lock:
+            if namespace == ALL_NAMESPACES:
+                handlers = [handler for handlers in self._handlers.values() for handler in handlers]
+            else:
+                handlers = list(self._handlers.get(namespace, ()))
+        for handler in handlers:
+            try:
+                handler(key)
+            except Exception:
+                logger.exception("Invalidation handler %r failed for %s", handler, namespace)
+
+    def start(self):
+        """Start receiving from the other workers. Idempotent."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self.backend.start(self._receive)
+
+    def stop(self):
+        with self._lock:
+            if not self._started:
+                return
+            self._started = False
+        self.backend.stop()
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend.name,
+            "worker_id": self.worker_id,
+            "listening": self._started,
+            "namespaces": sorted(self._handlers),
+            "published": self.published,
+            "received": self.received,
+        }
+
+
+INVALIDATION_BUS = InvalidationBus(build_backend())
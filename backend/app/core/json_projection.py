@@ -0,0 +1,233 @@
+"""
+JSON Projection - serialize large ORM lists without Pydantic re-validation.
+
+With `response_model=List[DeliveryResponse]` every ORM row is validated
+again (`from_attributes`) before it is dumped, which dominates the map
+endpoints once they return thousands of rows. `Projector(DeliveryResponse)`
+compiles the schema once into a plain function
+
+    def project_DeliveryResponse(obj):
+        return {"id": obj.id, "batch_id": getattr(obj, "batch_id", None), ...}
+
+(nested models become nested projectors) and `orjson` encodes the dicts.
+Output is the same JSON the response model produces: same keys and order,
+defaults for missing attributes, `before` validators applied (e.g.
+`UserResponse.roles`), floats coerced, UTC datetimes as `Z`. Schemas using
+anything the compiler cannot reproduce (after/model validators, custom
+serializers, aliases, computed fields) raise `TypeError` at import time
+instead of drifting silently.
+
+Endpoints keep `response_model=` (OpenAPI) and return `projector.response(rows)`.
+
+Sparse fieldsets: `?fields=id,status,category.name` selects top-level
+fields and, with dots, fields of nested models (`category` alone keeps the
+whole nested object). `Depends(projector.fieldset)` parses and validates
+the parameter (400 on unknown fields); `projector.dumps(rows, fields)`
+compiles - once per distinct field set - a projector that only touches
+those attributes, and `app.repositories.queries` turns the same tree into
+`load_only` / eager-load options, so unrequested columns are neither
+loaded nor encoded.
+"""
+import enum
+import threading
+import types
+import typing
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Type
+
+import orjson
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel
+from starlette.responses import Response
+
+from app.core.responses import ORJSON_OPTIONS
+from app.core.server_timing import mark_serialize_start
+
+
+def _unwrap_optional(annotation):
+    if typing.get_origin(annotation) in (typing.Union, types.UnionType):
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0], True
+    return annotation, False
+
+
+def _is_model(annotation) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, BaseModel)
+
+
+def nested_model(annotation) -> Optional[Type[BaseModel]]:
+    """The model inside `Optional[Model]` / `List[Model]`, or None for scalar fields."""
+    annotation, _ = _unwrap_optional(annotation)
+    if typing.get_origin(annotation) in (list, typing.List) and typing.get_args(annotation):
+        annotation, _ = _unwrap_optional(typing.get_args(annotation)[0])
+    return annotation if _is_model(annotation) else None
+
+
+# field name -> None (whole field) or the sub-tree of a nested model
+FieldTree = Dict[str, Optional["FieldTree"]]
+
+MAX_FIELDSET_PATHS = 64
+
+
+def parse_fields(model: Type[BaseModel], raw: Optional[str]) -> Optional[FieldTree]:
+    """
+    Parse `fields=` ("id,status,category.name") against `model`.
+    Returns None when no selection was made; raises ValueError on unknown fields.
+    """
+    if not raw or not raw.strip():
+        return None
+    paths = [path.strip() for path in raw.split(",") if path.strip()]
+    if len(paths) > MAX_FIELDSET_PATHS:
+        raise ValueError(f"At most {MAX_FIELDSET_PATHS} fields can be selected")
+    tree: FieldTree = {}
+    for path in paths:
+        node, current = tree, model
+        parts = path.split(".")
+        for depth, part in enumerate(parts):
+            field = current.model_fields.get(part)
+            if field is None:
+                raise ValueError(f"Unknown field '{path}'")
+            if depth == len(parts) - 1:
+                node[part] = None
+                break
+            current = nested_model(field.annotation)
+            if current is None:
+                raise ValueError(f"Field '{'.'.join(parts[:depth + 1])}' has no sub-fields")
+            if part in node and node[part] is None:
+                break  # whole nested object already selected
+            node = node.setdefault(part, {})
+    return tree
+
+
+def canonical_fields(tree: Optional[FieldTree]) -> str:
+    """Order-independent key of a field tree ("" = every field)."""
+    if tree is None:
+        return ""
+    return ",".join(name if sub is None else f"{name}({canonical_fields(sub)})" for name, sub in sorted(tree.items()))
+
+
+def _before_validators(model: Type[BaseModel]) -> Dict[str, list]:
+    """field name -> classmethods to run on the raw attribute, in declaration order."""
+    decorators = model.__pydantic_decorators__
+    unsupported = [
+        *(name for name, d in decorators.validators.items() if d.info.mode != "before" or d.info.each_item),
+        *(name for name, d in decorators.field_validators.items() if d.info.mode != "before"),
+        *decorators.model_validators, *decorators.field_serializers,
+        *decorators.model_serializers, *decorators.computed_fields,
+    ]
+    if unsupported:
+        raise TypeError(f"{model.__name__}: cannot project {', '.join(unsupported)}")
+    by_field: Dict[str, list] = {}
+    for decorator in (*decorators.validators.values(), *decorators.field_validators.values()):
+        for field in decorator.info.fields:
+            by_field.setdefault(field, []).append(getattr(model, decorator.cls_var_name))
+    return by_field
+
+
+class _Compiler:
+    def __init__(self):
+        self.namespace: Dict[str, Any] = {}
+        self.compiled: Dict[type, str] = {}
+
+    def bind(self, value) -> str:
+        name = f"_c{len(self.namespace)}"
+        self.namespace[name] = value
+        return name
+
+    def converter(self, annotation, include: Optional[FieldTree] = None) -> Optional[str]:
+        """Expression template ({v} = raw value) turning an attribute into its JSON value."""
+        annotation, _ = _unwrap_optional(annotation)
+        origin = typing.get_origin(annotation)
+        if _is_model(annotation):
+            return self.compile(annotation, include) + "({v})"
+        if origin in (list, typing.List) and typing.get_args(annotation):
+            item = self.converter(typing.get_args(annotation)[0], include)
+            if item is not None:
+                return "[" + item.format(v="_i") + " for _i in {v}]"
+            return "list({v})"
+        if annotation is float:
+            return "float({v})"
+        if isinstance(annotation, type) and issubclass(annotation, enum.Enum):
+            # ORM enum columns hold members; plain strings are validated like Pydantic does
+            return self.bind(annotation) + "({v}).value"
+        return None
+
+    def compile(self, model: Type[BaseModel], include: Optional[FieldTree] = None) -> str:
+        key = (model, canonical_fields(include))
+        if key in self.compiled:
+            return self.compiled[key]
+        name = f"project_{model.__name__}"
+        if name in self.namespace:
+            name = f"{name}_{len(self.namespace)}"
+        self.compiled[key] = name
+        validators = _before_validators(model)
+        items = []
+        for field_name, field in model.model_fields.items():
+            if include is not None and field_name not in include:
+                continue
+            if field.alias not in (None, field_name):
+                raise TypeError(f"{model.__name__}.{field_name}: aliases are not supported")
+            if field.is_required():
+                value = f"obj.{field_name}"
+            else:
+                value = f"getattr(obj, {field_name!r}, {self.bind(field.get_default(call_default_factory=True))})"
+            for validator in validators.get(field_name, ()):
+                value = f"{self.bind(validator)}({value})"
+            convert = self.converter(field.annotation, include[field_name] if include else None)
+            if convert is not None:
+                value = f"(None if (_v := {value}) is None else {convert.format(v='_v')})"
+            items.append(f"{field_name!r}: {value}")
+        source = f"def {name}(obj):\n    return {{{', '.join(items)}}}\n"
+        exec(compile(source, f"<projector {model.__name__}>", "exec"), self.namespace)
+        return name
+
+
+def compile_projector(model: Type[BaseModel], fields: Optional[FieldTree] = None) -> Callable[[Any], dict]:
+    """Compile `model` (and nested models, restricted to `fields`) into an ORM-object -> dict function."""
+    compiler = _Compiler()
+    return compiler.namespace[compiler.compile(model, fields)]
+
+
+class Projector:
+    """Prebuilt list serializer for one response model."""
+
+    max_fieldsets = 128
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.project = compile_projector(model)
+        self._subsets: "OrderedDict[str, Callable]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def fieldset(self, fields: Optional[str] = Query(
+            None, description="Comma-separated fields to return; dots select nested fields (category.name)")):
+        """FastAPI dependency: the parsed `fields=` tree (None = every field)."""
+        try:
+            return parse_fields(self.model, fields)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    def projector_for(self, fields: Optional[FieldTree]) -> Callable[[Any], dict]:
+        if fields is None:
+            return self.project
+        key = canonical_fields(fields)
+        project = self._subsets.get(key)
+        if project is None:
+            project = compile_projector(self.model, fields)
+            with self._lock:
+                self._subsets[key] = project
+                while len(self._subsets) > self.max_fieldsets:
+                    self._subsets.popitem(last=False)
+        return project
+
+    def dump(self, rows: Iterable, fields: Optional[FieldTree] = None) -> list:
+        project = self.projector_for(fields)
+        return [project(row) for row in rows]
+
+    def dumps(self, rows: Iterable, fields: Optional[FieldTree] = None) -> bytes:
+        return orjson.dumps(self.dump(rows, fields), option=ORJSON_OPTIONS)
+
+    def response(self, rows: Iterable, fields: Optional[FieldTree] = None, status_code: int = 200) -> Response:
+        mark_serialize_start()
+        return Response(content=self.dumps(rows, fields), status_code=status_code, media_type="application/json")
@@ -0,0 +1,105 @@
+"""
+Lazy Routers - import rarely used routers on their first request.
+
+Importing a router module pulls in its schemas and services; for the admin,
+dashboard, donations... routers that cost is paid on every cold start even
+though the first requests after a boot are almost always map reads.
+
+`add_lazy_router(app, "app.routers.dashboard", "/api/dashboard")` registers a
+placeholder route that matches the prefix. The first request under it
+imports the module, includes `module.router` in the app (same dependency
+overrides, route class and middleware as an eager router), drops the
+placeholder and re-dispatches the request. `app.openapi()` loads every
+pending router first, so /docs stays complete.
+
+Register lazy routers after the eager ones: a placeholder matches its whole
+prefix, so more specific eager routes must come first.
+
+Environment variables:
+    LAZY_ROUTERS    true (default) | false - include everything at import
+"""
+import importlib
+import os
+import threading
+import time
+from typing import Tuple
+
+from starlette.routing import BaseRoute, Match, NoMatchFound
+
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+LAZY_ROUTERS = os.getenv("LAZY_ROUTERS", "true").lower() in ("1", "true", "yes", "on")
+
+_load_lock = threading.Lock()
+
+
+def _route_path(scope) -> str:
+    path = scope["path"]
+    root_path = scope.get("root_path", "")
+    if root_path and path.startswith(root_path):
+        return path[len(root_path):]
+    return path
+
+
+class LazyRouter(BaseRoute):
+    """Placeholder route for a router that has not been imported yet."""
+
+    def __init__(self, app, module: str, prefix: str):
+        self.app = app
+        self.module = module
+        self.prefix = prefix.rstrip("/")
+        self.loaded = False
+
+    def matches(self, scope) -> Tuple[Match, dict]:
+        if scope["type"] in ("http", "websocket"):
+            path = _route_path(scope)
+            if path == self.prefix or path.startswith(self.prefix + "/"):
+                return Match.FULL, {}
+        return Match.NONE, {}
+
+    def url_path_for(self, name: str, /, **path_params):
+        raise NoMatchFound(name, path_params)
+
+    def load(self):
+        with _load_lock:
+            if self.loaded:
+                return
+            started = time.perf_counter()
+            router = importlib.import_module(self.module).router
+            self.app.include_router(router)
+            self.app.router.routes.remove(self)
+            self.app.openapi_schema = None
+            self.loaded = True
+        logger.info("Lazy router loaded", extra={"router_module": self.module,
+                                                  "duration_ms": round((time.perf_counter() - started) * 1000, 1)})
+
+    async def handle(self, scope, receive, send):
+        self.load()
+        await self.app.router(scope, receive, send)
+
+
+def add_lazy_router(app, module: str, prefix: str):
+    """Include `module.router` now (LAZY_ROUTERS=false) or on the first request under `prefix`."""
+    if not LAZY_ROUTERS:
+        app.include_router(importlib.import_module(module).router)
+        return
+    if not hasattr(app.state, "lazy_routers"):
+        app.state.lazy_routers = []
+        eager_openapi = app.openapi
+
+        def openapi():
+            load_all(app)
+            return eager_openapi()
+
+        app.openapi = openapi
+    placeholder = LazyRouter(app, module, prefix)
+    app.router.routes.append(placeholder)
+    app.state.lazy_routers.append(placeholder)
+
+
+def load_all(app):
+    """Import every pending lazy router (OpenAPI generation, warm-up)."""
+    for placeholder in getattr(app.state, "lazy_routers", []):
+        placeholder.load()
@@ -2,71 +2,288 @@
 Centralized Logging Configuration
 
 All services, repositories and routers use this configuration.
-Logs to both file and console with structured format.
+
+Pipeline (non-blocking):
+    request thread                      listener thread
+    logger.info(...) -> QueueHandler -> queue -> QueueListener -> console / rotating file
+
+Request threads only build the record (message + request id) and enqueue it;
+formatting, console I/O, file writes, rotation and gzip compression all happen
+on the single listener thread.
+
+Environment variables:
+    LOG_LEVEL               DEBUG, INFO, ... (default: argument of setup_logging)
+    LOG_FORMAT              "text" (default) or "json" (one JSON object per line)
+    LOG_MAX_BYTES           rotate when the file exceeds this size (default 10 MB, 0 = off)
+    LOG_BACKUP_COUNT        rotated files kept, gzip-compressed (default 14)
+    LOG_ROTATE_DAILY        also rotate at midnight (default true)
+    LOG_DEBUG_SAMPLE_RATE   fraction of requests whose DEBUG logs are kept (default 1.0)
 """
+import atexit
+import copy
+import gzip
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import shutil
 import sys
+import time
+import zlib
+from datetime import datetime, timedelta
 from pathlib import Path
-from datetime import datetime
+from typing import Optional
+
+from app.core.request_context import get_request_context
+
+TEXT_FORMAT = "[%(asctime)s] [%(levelname)s] [%(name)s] [%(request_id)s] %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Standard LogRecord attributes - anything else passed via `extra=` is structured data
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+# ============================================================================
+# FILTERS
+# ============================================================================
+
+class RequestContextFilter(logging.Filter):
+    """Stamp each record with the correlation id of the current request ("-" outside requests)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            ctx = get_request_context()
+            record.request_id = ctx.request_id if ctx is not None else "-"
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of DEBUG records; INFO and above always pass.
+
+    Sampling is per request (hash of the correlation id), so a sampled request
+    keeps *all* of its debug lines instead of a random scatter of them.
+    Records outside a request are sampled per record.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = max(0.0, min(1.0, rate))
+        self._threshold = int(self.rate * 0xFFFFFFFF)
+        self._counter = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        if self.rate <= 0.0:
+            return False
+        request_id = getattr(record, "request_id", "-")
+        if request_id != "-":
+            return zlib.crc32(request_id.encode()) <= self._threshold
+        self._counter += 1
+        return (self._counter * self.rate) % 1.0 < self.rate
+
+
+# ============================================================================
+# FORMATTERS
+# ============================================================================
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra=` fields are emitted as top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "timestamp": datetime.utcfromtimestamp(record.created).isoformat(timespec="milliseconds") + "Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exception"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+# ============================================================================
+# HANDLERS
+# ============================================================================
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that keeps records structured.
+
+    The stock `prepare()` runs the full formatter on the calling thread; here
+    we only merge args into the message and render the traceback text, so
+    the listener's formatter (text or JSON) still sees every field.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _gzip_namer(name: str) -> str:
+    return name + ".gz"
+
+
+def _gzip_rotator(source: str, dest: str):
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
 
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    Rotates on size *or* at midnight, whichever comes first, and gzips the
+    rotated files (`euajudo.log.1.gz`, `euajudo.log.2.gz`, ...).
+    Runs on the listener thread, so compression never blocks a request.
+    """
+
+    def __init__(self, filename, max_bytes: int = 0, backup_count: int = 14,
+                 rotate_daily: bool = True, encoding: str = "utf-8"):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count,
+                         encoding=encoding, delay=True)
+        self.namer = _gzip_namer
+        self.rotator = _gzip_rotator
+        self.rotate_daily = rotate_daily
+        self.rollover_at = self._next_midnight()
+
+    @staticmethod
+    def _next_midnight() -> float:
+        tomorrow = datetime.now().date() + timedelta(days=1)
+        return time.mktime(tomorrow.timetuple())
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.rotate_daily and time.time() >= self.rollover_at:
+            return os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = self._next_midnight()
+
+
+# ============================================================================
+# SETUP
+# ============================================================================
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
 
-def setup_logging(log_level: str = "INFO", log_dir: str = "logs"):
+
+def setup_logging(log_level: str = "INFO", log_dir: str = "logs", log_format: str = None):
     """
-    Configure application-wide logging.
-    
+    Configure application-wide, non-blocking logging.
+
     Args:
         log_level: Minimum log level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         log_dir: Directory for log files
-    
-    Format:
-        [2026-03-02 14:30:45] [INFO] [module.ClassName] Message here
+        log_format: "text" or "json" (defaults to LOG_FORMAT or "text")
+
+    Format (text):
+        [2026-03-02 14:30:45] [INFO] [module.ClassName] [3f2a...] Message here
     """
+    global _listener
+
+    log_level = os.getenv("LOG_LEVEL", log_level).upper()
+    log_format = (log_format or os.getenv("LOG_FORMAT", "text")).lower()
+
     # Create logs directory
     Path(log_dir).mkdir(exist_ok=True)
-    
-    # Log file with date
-    log_file = Path(log_dir) / f"euajudo_{datetime.now().strftime('%Y%m%d')}.log"
-    
+    log_file = Path(log_dir) / "euajudo.log"
+
+    # Stop a previous pipeline (re-configuration, tests) so its queue is flushed
+    shutdown_logging()
+
     # Configure root logger
     root_logger = logging.getLogger()
-    root_logger.setLevel(getattr(logging, log_level.upper()))
-    
+    root_logger.setLevel(getattr(logging, log_level))
+
     # Remove existing handlers
     for handler in root_logger.handlers[:]:
         root_logger.removeHandler(handler)
-    
+
     # Formatter
-    formatter = logging.Formatter(
-        fmt="[%(asctime)s] [%(levelname)s] [%(name)s] %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S"
-    )
-    
+    if log_format == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(fmt=TEXT_FORMAT, datefmt=DATE_FORMAT)
+
     # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(logging.DEBUG)
     console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
-    
-    # File handler
-    file_handler = logging.FileHandler(log_file, encoding="utf-8")
+
+    # File handler (size/daily rotation + gzip)
+    file_handler = CompressingRotatingFileHandler(
+        log_file,
+        max_bytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+        backup_count=int(os.getenv("LOG_BACKUP_COUNT", "14")),
+        rotate_daily=_env_bool("LOG_ROTATE_DAILY", True),
+    )
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(formatter)
-    root_logger.addHandler(file_handler)
-    
+
+    # Request threads only enqueue; the listener thread does all the I/O
+    log_queue = queue.SimpleQueue()
+    queue_handler = StructuredQueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter())
+    sample_rate = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+    if sample_rate < 1.0:
+        queue_handler.addFilter(DebugSamplingFilter(sample_rate))
+    root_logger.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, console_handler, file_handler, respect_handler_level=True
+    )
+    _listener.start()
+
     # Suppress noisy third-party logs
     logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
     logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
-    
-    root_logger.info(f"Logging configured: level={log_level}, file={log_file}")
+
+    root_logger.info(
+        f"Logging configured: level={log_level}, format={log_format}, file={log_file}"
+    )
+
+
+def shutdown_logging():
+    """Flush the queue and stop the listener thread (safe to call twice)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
 
 
 def get_logger(name: str) -> logging.Logger:
     """
     Get a logger for a module.
-    
+
     Args:
         name: Module name (usually __name__)
-    
+
     Returns:
         Configured logger
     """
@@ -0,0 +1,376 @@
+"""
+Metrics - Prometheus-compatible, in-process, dependency-free.
+
+Collects:
+- HTTP: latency histogram, request counter, in-flight gauge and response
+  size histogram, all labelled by *route template* (`/api/deliveries/{delivery_id}`),
+  never by raw URL, so label cardinality stays bounded.
+- Database: pool checkouts, wait time, timeouts and occupancy (per pool),
+  statement duration, and per-request statement count / total SQL time
+  (fed by `app.core.sql_instrumentation`).
+
+Exposed in the Prometheus text format (v0.0.4) by `GET /metrics`.
+
+Overhead is a handful of `perf_counter()` calls, one lock acquisition per
+observation and a `bisect` per histogram sample - cheap enough to leave on in
+production (see `benchmarks/metrics_overhead.py`).
+
+Usage:
+    REQUESTS_TOTAL.inc("GET", "/api/locations/", "200")
+    REQUEST_LATENCY.observe(0.012, "GET", "/api/locations/")
+    text = REGISTRY.render()
+"""
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+from app.core.request_context import (
+    get_request_context,
+    start_request_context,
+    reset_request_context,
+)
+
+DEFAULT_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0
+)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+# ============================================================================
+# METRIC TYPES
+# ============================================================================
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class: a named family of samples keyed by label values."""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing value."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0.0)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    type_name = "gauge"
+
+    def dec(self, *labelvalues: str, amount: float = 1.0):
+        self.inc(*labelvalues, amount=-amount)
+
+    def set(self, value: float, *labelvalues: str):
+        with self._lock:
+            self._values[labelvalues] = value
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed upper bounds (Prometheus semantics)."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labelvalues: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0]
+                self._series[labelvalues] = series
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labelvalues: str) -> int:
+        series = self._series.get(labelvalues)
+        return sum(series[0]) if series else 0
+
+    def sum(self, *labelvalues: str) -> float:
+        series = self._series.get(labelvalues)
+        return series[1] if series else 0.0
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            items = [(labels, list(s[0]), s[1]) for labels, s in self._series.items()]
+        bounds = list(self.buckets) + [math.inf]
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+                )
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class MetricsRegistry:
+    """Holds metric families and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> _Metric:
+        return self._metrics[name]
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        """Reset every sample (used by tests)."""
+        for metric in self._metrics.values():
+            metric.clear()
+
+
+# ============================================================================
+# APPLICATION METRICS
+# ============================================================================
+
+REGISTRY = MetricsRegistry()
+
+REQUESTS_TOTAL = REGISTRY.register(Counter(
+    "http_requests_total", "Total HTTP requests.", ("method", "route", "status")
+))
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency in seconds.", ("method", "route")
+))
+REQUESTS_IN_PROGRESS = REGISTRY.register(Gauge(
+    "http_requests_in_progress", "HTTP requests currently being served."
+))
+RESPONSE_SIZE = REGISTRY.register(Histogram(
+    "http_response_size_bytes", "HTTP response body size in bytes.", ("method", "route"),
+    buckets=SIZE_BUCKETS,
+))
+DB_POOL_WAIT = REGISTRY.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.", ("pool",),
+    buckets=POOL_WAIT_BUCKETS,
+))
+DB_POOL_CHECKOUTS = REGISTRY.register(Counter(
+    "db_pool_checkouts_total", "Connections checked out of the pool.", ("pool",)
+))
+DB_POOL_TIMEOUTS = REGISTRY.register(Counter(
+    "db_pool_checkout_timeouts_total", "Checkouts that gave up after pool_timeout.", ("pool",)
+))
+DB_POOL_CHECKED_OUT = REGISTRY.register(Gauge(
+    "db_pool_checked_out", "Connections currently checked out.", ("pool",)
+))
+DB_POOL_OVERFLOW = REGISTRY.register(Gauge(
+    "db_pool_overflow", "Connections open beyond pool_size (negative: pool not yet filled).", ("pool",)
+))
+DB_POOL_SIZE = REGISTRY.register(Gauge(
+    "db_pool_size", "Configured pool_size + max_overflow.", ("pool",)
+))
+DB_READ_ROUTES = REGISTRY.register(Counter(
+    "db_read_routes_total", "Read-only sessions by target engine and routing reason.", ("target", "reason")
+))
+DB_STATEMENT_LATENCY = REGISTRY.register(Histogram(
+    "db_statement_duration_seconds", "Duration of individual SQL statements.",
+))
+DB_REQUEST_STATEMENTS = REGISTRY.register(Histogram(
+    "db_request_statements", "SQL statements issued per HTTP request.", ("route",),
+    buckets=COUNT_BUCKETS,
+))
+DB_REQUEST_SQL_TIME = REGISTRY.register(Histogram(
+    "db_request_sql_duration_seconds", "Total SQL time per HTTP request.", ("route",),
+))
+COMPRESSED_RESPONSES = REGISTRY.register(Counter(
+    "http_compressed_responses_total", "Compressed responses by encoding and source.", ("encoding", "source")
+))
+RESPONSE_CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "response_cache_lookups_total", "Public payload cache lookups by cache and result.", ("cache", "result")
+))
+INVALIDATION_MESSAGES = REGISTRY.register(Counter(
+    "cache_invalidation_messages_total", "Invalidation bus messages by namespace and direction.",
+    ("namespace", "direction")
+))
+INVALIDATION_LATENCY = REGISTRY.register(Histogram(
+    "cache_invalidation_delivery_seconds", "Time from publish in one worker to handling in another.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0, 5.0),
+))
+SSE_CLIENTS = REGISTRY.register(Gauge(
+    "sse_clients", "Connected Server-Sent Events clients by stream.", ("stream",)
+))
+SSE_EVENTS = REGISTRY.register(Counter(
+    "sse_events_total", "Events published on Server-Sent Events streams.", ("stream", "event")
+))
+WEBSOCKET_CONNECTIONS = REGISTRY.register(Gauge(
+    "websocket_connections", "Open WebSocket connections by hub.", ("hub",)
+))
+WEBSOCKET_MESSAGES = REGISTRY.register(Counter(
+    "websocket_messages_total", "Messages sent to WebSocket clients by hub and type.", ("hub", "type")
+))
+WEBSOCKET_DROPPED = REGISTRY.register(Counter(
+    "websocket_dropped_total", "WebSocket clients closed for falling behind, by hub.", ("hub",)
+))
+
+
+def observe_pool_wait(seconds: float, pool: str = "primary"):
+    """Record how long a pool checkout took (called by the instrumented pool)."""
+    DB_POOL_WAIT.observe(seconds, pool)
+
+
+def observe_pool_state(pool: str, capacity: int, checked_out: int, overflow: int):
+    """Publish the current occupancy of a pool (called on checkout and checkin)."""
+    DB_POOL_SIZE.set(capacity, pool)
+    DB_POOL_CHECKED_OUT.set(checked_out, pool)
+    DB_POOL_OVERFLOW.set(overflow, pool)
+
+
+# ============================================================================
+# ASGI MIDDLEWARE
+# ============================================================================
+
+def route_template(scope) -> str:
+    """Return the matched route path (e.g. `/api/locations/{location_id}`)."""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return path if path else UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware task hop) that records HTTP and
+    per-request SQL metrics. Uses the context opened by `RequestContextMiddleware`
+    and opens its own when mounted standalone.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        ctx, token = get_request_context(), None
+        if ctx is None:
+            ctx, token = start_request_context(method, scope.get("path", ""), scope=scope)
+        status_code = 500
+        response_size = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, response_size
+            message_type = message["type"]
+            if message_type == "http.response.start":
+                status_code = message["status"]
+            elif message_type == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            REQUESTS_IN_PROGRESS.dec()
+            route = route_template(scope)
+            REQUESTS_TOTAL.inc(method, route, str(status_code))
+            REQUEST_LATENCY.observe(elapsed, method, route)
+            RESPONSE_SIZE.observe(response_size, method, route)
+            DB_REQUEST_STATEMENTS.observe(ctx.sql_count, route)
+            DB_REQUEST_SQL_TIME.observe(ctx.sql_time, route)
+            if token is not None:
+                reset_request_context(token)
+DISPATCH_OFFERS = REGISTRY.register(Counter(
+    "dispatch_offers_total", "Dispatcher offers by outcome (offered, accepted, declined, expired, withdrawn).",
+    ("state",)
+))
+DISPATCH_SOLVE = REGISTRY.register(Histogram(
+    "dispatch_solve_seconds", "Time to solve one dispatcher assignment round.",
+))
@@ -0,0 +1,440 @@
+"""
+Request Profiler - on-demand, admin-only profiling of a single request.
+
+Opt in per request with the `X-Profile` header or the `_profile` query flag:
+
+    X-Profile: 1            profile, serve the normal response and store the report
+                            (`X-Profile-Id` / `X-Profile-Url` headers point to it)
+    ?_profile=json          replace the response with the JSON report
+    ?_profile=html          replace the response with the HTML report
+
+Only authenticated admins (Bearer token) can trigger it; for anyone else the
+flag is ignored and the request is served as usual.
+
+A profile contains:
+- a *sampling* profile: a daemon thread snapshots the stacks of the threads
+  serving the request (event loop + threadpool workers that ran SQL or
+  dependencies for it) every `PROFILER_INTERVAL_MS`. Aggregated as top
+  functions (self/cumulative samples) and collapsed stacks (flamegraph input).
+- every SQL statement with its duration and offset from the request start
+  (captured by `app.core.sql_instrumentation`).
+
+Cost when not requested: one scan of the request headers and a substring
+check on the query string. No thread, no hooks, no allocation.
+
+Reports are kept in a small in-memory ring (`PROFILER_MAX_REPORTS`) and served
+by `GET /api/admin/profiles` and `GET /api/admin/profiles/{profile_id}`.
+"""
+import html
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.logging_config import get_logger
+from app.core.request_context import get_request_context
+
+logger = get_logger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY_FLAG = b"_profile"
+PROFILE_URL_PREFIX = "/api/admin/profiles"
+
+PROFILER_INTERVAL = float(os.getenv("PROFILER_INTERVAL_MS", "2")) / 1000.0
+PROFILER_MAX_REPORTS = int(os.getenv("PROFILER_MAX_REPORTS", "20"))
+PROFILER_MAX_CONCURRENT = int(os.getenv("PROFILER_MAX_CONCURRENT", "2"))
+
+_MAX_STACK_DEPTH = 64
+_MAX_SQL_STATEMENTS = 500
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Leaf frames that mean "thread is parked", not doing work for the request
+_IDLE_LEAVES = (("selectors.py", "select"), ("threading.py", "wait"), ("queue.py", "get"))
+
+_frame_labels: Dict[object, str] = {}
+
+
+# ============================================================================
+# PROFILE DATA
+# ============================================================================
+
+def _frame_label(code) -> str:
+    label = _frame_labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        if filename.startswith(_PROJECT_ROOT):
+            filename = os.path.relpath(filename, _PROJECT_ROOT)
+        else:
+            filename = "/".join(filename.replace("\\", "/").split("/")[-2:])
+        label = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+        _frame_labels[code] = label
+    return label
+
+
+def _is_idle(frame) -> bool:
+    filename = frame.f_code.co_filename
+    name = frame.f_code.co_name
+    return any(filename.endswith(f) and name == n for f, n in _IDLE_LEAVES)
+
+
+class RequestProfile:
+    """Samples and SQL statements collected for one profiled request."""
+
+    def __init__(self, method: str, path: str, request_id: str, interval: float = PROFILER_INTERVAL):
+        self.id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.request_id = request_id
+        self.interval = interval
+        self.created_at = time.time()
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.status_code: Optional[int] = None
+        self.route: Optional[str] = None
+        self.stacks: Counter = Counter()
+        self.idle_samples = 0
+        self.statements: List[dict] = []
+        self.threads = {threading.get_ident()}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    # --- hooks (called from request threads) --------------------------------
+
+    def attach_current_thread(self):
+        """Include the calling thread in the sampled set."""
+        ident = threading.get_ident()
+        if ident not in self.threads:
+            with self._lock:
+                self.threads = self.threads | {ident}
+
+    def record_sql(self, statement: str, parameters, started: float, elapsed: float):
+        if len(self.statements) >= _MAX_SQL_STATEMENTS:
+            return
+        self.statements.append({
+            "statement": statement,
+            "parameters": repr(parameters)[:200],
+            "offset_ms": round((started - self.started) * 1000, 3),
+            "duration_ms": round(elapsed * 1000, 3),
+        })
+
+    # --- sampling -----------------------------------------------------------
+
+    def start(self):
+        self._sampler = threading.Thread(target=self._sample_loop, name=f"profiler-{self.id}", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self.duration = time.perf_counter() - self.started
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        frames = sys._current_frames()
+        for ident in self.threads:
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            if _is_idle(frame):
+                self.idle_samples += 1
+                continue
+            stack = []
+            while frame is not None and len(stack) < _MAX_STACK_DEPTH:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[tuple(stack)] += 1
+
+    # --- report -------------------------------------------------------------
+
+    def top_functions(self, limit: int = 30) -> List[dict]:
+        own: Counter = Counter()
+        cumulative: Counter = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack):
+                cumulative[label] += count
+        total = sum(self.stacks.values()) or 1
+        return [
+            {
+                "function": label,
+                "self_samples": own[label],
+                "cumulative_samples": count,
+                "cumulative_pct": round(100.0 * count / total, 1),
+            }
+            for label, count in sorted(cumulative.items(), key=lambda kv: (-own[kv[0]], -kv[1]))[:limit]
+        ]
+
+    def to_dict(self) -> dict:
+        sql_time = sum(s["duration_ms"] for s in self.statements)
+        return {
+            "id": self.id,
+            "request_id": self.request_id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status_code": self.status_code,
+            "created_at": self.created_at,
+            "duration_ms": round(self.duration * 1000, 3),
+            "sampling_interval_ms": self.interval * 1000,
+            "samples": sum(self.stacks.values()),
+            "idle_samples": self.idle_samples,
+            "sql": {
+                "count": len(self.statements),
+                "total_ms": round(sql_time, 3),
+                "statements": self.statements,
+            },
+            "top_functions": self.top_functions(),
+            "collapsed_stacks": [
+                f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common()
+            ],
+        }
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "created_at": self.created_at,
+            "duration_ms": round(self.duration * 1000, 3),
+            "sql_count": len(self.statements),
+            "url": f"{PROFILE_URL_PREFIX}/{self.id}",
+        }
+
+
+def render_html(report: dict) -> str:
+    """Self-contained HTML page for a profile report."""
+    esc = html.escape
+    function_rows = "".join(
+        f"<tr><td><code>{esc(f['function'])}</code></td><td>{f['self_samples']}</td>"
+        f"<td>{f['cumulative_samples']}</td><td>{f['cumulative_pct']}%</td></tr>"
+        for f in report["top_functions"]
+    )
+    sql_rows = "".join(
+        f"<tr><td>{s['offset_ms']}</td><td>{s['duration_ms']}</td>"
+        f"<td><code>{esc(s['statement'])}</code><br><small>{esc(s['parameters'])}</small></td></tr>"
+        for s in report["sql"]["statements"]
+    )
+    stacks = esc("\n".join(report["collapsed_stacks"]))
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Profile {esc(report['id'])}</title>
+<style>
+body{{font-family:sans-serif;margin:2em}} table{{border-collapse:collapse;width:100%}}
+td,th{{border:1px solid #ddd;padding:4px;text-align:left;vertical-align:top}}
+pre{{background:#f6f6f6;padding:1em;overflow:auto;font-size:11px}}
+</style></head><body>
+<h1>{esc(report['method'])} {esc(report['path'])}</h1>
+<p>status {report['status_code']} &middot; {report['duration_ms']} ms &middot;
+{report['samples']} samples every {report['sampling_interval_ms']} ms &middot;
+{report['sql']['count']} SQL statements ({report['sql']['total_ms']} ms) &middot;
+request id <code>{esc(report['request_id'])}</code></p>
+<h2>Top functions</h2>
+<table><tr><th>Function</th><th>Self</th><th>Cumulative</th><th>%</th></tr>{function_rows}</table>
+<h2>SQL</h2>
+<table><tr><th>Offset (ms)</th><th>Duration (ms)</th><th>Statement</th></tr>{sql_rows}</table>
+<h2>Collapsed stacks</h2>
+<pre>{stacks}</pre>
+</body></html>"""
+
+
+# ============================================================================
+# STORE
+# ============================================================================
+
+class ProfileStore:
+    """Bounded, thread-safe store of the most recent reports (oldest evicted)."""
+
+    def __init__(self, max_reports: int = PROFILER_MAX_REPORTS):
+        self.max_reports = max_reports
+        self._reports: "OrderedDict[str, RequestProfile]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: RequestProfile):
+        with self._lock:
+            self._reports[profile.id] = profile
+            while len(self._reports) > self.max_reports:
+                self._reports.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        return self._reports.get(profile_id)
+
+    def list(self) -> List[RequestProfile]:
+        with self._lock:
+            return list(reversed(self._reports.values()))
+
+    def clear(self):
+        with self._lock:
+            self._reports.clear()
+
+
+PROFILE_STORE = ProfileStore()
+
+
+def current_profile() -> Optional[RequestProfile]:
+    """Profile of the request being served, if it is being profiled."""
+    ctx = get_request_context()
+    return ctx.profile if ctx is not None else None
+
+
+def attach_thread_to_profile():
+    """Called from dependencies that run in the threadpool (e.g. `get_db`)."""
+    ctx = get_request_context()
+    if ctx is not None and ctx.profile is not None:
+        ctx.profile.attach_current_thread()
+
+
+# ============================================================================
+# ASGI MIDDLEWARE
+# ============================================================================
+
+def _requested_mode(scope) -> Optional[str]:
+    """Return "store", "json" or "html" if profiling was requested, else None."""
+    value = None
+    for name, raw in scope.get("headers", ()):
+        if name == PROFILE_HEADER:
+            value = raw.decode("latin-1").strip().lower()
+            break
+    if value is None:
+        query_string = scope.get("query_string", b"")
+        if PROFILE_QUERY_FLAG not in query_string:
+            return None
+        values = parse_qs(query_string.decode("latin-1")).get("_profile")
+        if not values:
+            return None
+        value = values[0].strip().lower()
+    if value in ("json", "html"):
+        return value
+    if value in ("1", "true", "yes", "store"):
+        return "store"
+    return None
+
+
+def _bearer_token(scope) -> Optional[str]:
+    for name, raw in scope.get("headers", ()):
+        if name == b"authorization":
+            scheme, _, token = raw.decode("latin-1").partition(" ")
+            return token.strip() if scheme.lower() == "bearer" and token else None
+    return None
+
+
+def _is_admin_token(app, token: str) -> bool:
+    """Resolve the token to a user through `get_db` (honours test overrides)."""
+    from app.auth import decode_token_email, is_admin
+    from app.database import get_db
+    from app.models import User
+
+    email = decode_token_email(token)
+    if email is None:
+        return False
+    provider = getattr(app, "dependency_overrides", {}).get(get_db, get_db)
+    db_gen = provider()
+    db = next(db_gen)
+    try:
+        user = db.query(User).filter(User.email == email).first()
+        return bool(user and user.approved and is_admin(user))
+    finally:
+        db_gen.close()
+
+
+class ProfilerMiddleware:
+    """
+    Pure ASGI middleware: profiles a request when an admin asks for it.
+    Must be mounted inside `RequestContextMiddleware`.
+    """
+
+    def __init__(self, app, store: ProfileStore = PROFILE_STORE):
+        self.app = app
+        self.store = store
+        self._slots = threading.BoundedSemaphore(PROFILER_MAX_CONCURRENT)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        mode = _requested_mode(scope)
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        ctx = get_request_context()
+        token = _bearer_token(scope)
+        allowed = ctx is not None and token is not None and await run_in_threadpool(
+            _is_admin_token, scope.get("app"), token
+        )
+        if not allowed:
+            await self.app(scope, receive, send)
+            return
+        if not self._slots.acquire(blocking=False):
+            logger.warning("Profiler busy, serving request without profiling")
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self._profile(scope, receive, send, ctx, mode)
+        finally:
+            self._slots.release()
+
+    async def _profile(self, scope, receive, send, ctx, mode: str):
+        from app.core.metrics import route_template
+
+        profile = RequestProfile(scope["method"], scope.get("path", ""), ctx.request_id)
+        profile_headers = [
+            (b"x-profile-id", profile.id.encode("latin-1")),
+            (b"x-profile-url", f"{PROFILE_URL_PREFIX}/{profile.id}".encode("latin-1")),
+        ]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+                if mode != "store":
+                    return
+                message["headers"] = list(message.get("headers", [])) + profile_headers
+            elif mode != "store":
+                return
+            await send(message)
+
+        ctx.profile = profile
+        profile.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.stop()
+            ctx.profile = None
+            profile.route = route_template(scope)
+            self.store.add(profile)
+            logger.info(
+                "Request profiled",
+                extra={"profile_id": profile.id, "duration_ms": round(profile.duration * 1000, 3)},
+            )
+
+        if mode != "store":
+            report = profile.to_dict()
+            if mode == "html":
+                body = render_html(report).encode("utf-8")
+                content_type = b"text/html; charset=utf-8"
+            else:
+                body = json.dumps(report, default=str).encode("utf-8")
+                content_type = b"application/json"
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", content_type),
+                    (b"content-length", str(len(body)).encode("latin-1")),
+                    (b"x-profile-original-status", str(profile.status_code).encode("latin-1")),
+                ] + profile_headers,
+            })
+            await send({"type": "http.response.body", "body": body})
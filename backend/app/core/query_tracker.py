@@ -0,0 +1,155 @@
+"""
+Query Tracker - request-scoped N+1 detection and query budgets.
+
+An N+1 shows up as the *same* SQL text executed many times inside one
+request with different bound parameters (one query per row of a previous
+result). The tracker counts statements per request, keyed by SQL text, and
+flags any statement repeated `N_PLUS_ONE_THRESHOLD` times or more.
+
+Two consumers:
+- development: `QueryTrackerMiddleware` logs a warning at the end of a request
+  that crossed the threshold (`N_PLUS_ONE_DETECTION=warn`, the default when
+  `ENVIRONMENT=development`).
+- tests: `assert_query_budget()` (and the `query_budget` fixture / marker in
+  `tests/conftest.py`) fails when any request exceeds its statement budget.
+
+Fed by the cursor listeners in `app.core.sql_instrumentation`; costs one
+attribute check per statement when nothing is tracking.
+"""
+import os
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from app.core.logging_config import get_logger
+from app.core.metrics import route_template
+from app.core.request_context import get_request_context
+
+logger = get_logger(__name__)
+
+_default_mode = "warn" if os.getenv("ENVIRONMENT", "").lower() == "development" else "off"
+N_PLUS_ONE_DETECTION = os.getenv("N_PLUS_ONE_DETECTION", _default_mode).lower()
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+
+def _request_route(ctx) -> str:
+    return route_template(ctx.scope) if ctx.scope is not None else ctx.path
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A request issued more statements (or more repeats) than allowed."""
+
+
+class QueryTracker:
+    """Statement counts grouped by request."""
+
+    def __init__(self, repeat_threshold: int = N_PLUS_ONE_THRESHOLD):
+        self.repeat_threshold = repeat_threshold
+        self._requests: Dict[str, Counter] = defaultdict(Counter)
+        self._routes: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, ctx):
+        with self._lock:
+            self._requests[ctx.request_id][statement] += 1
+            if ctx.request_id not in self._routes:
+                self._routes[ctx.request_id] = f"{ctx.method} {_request_route(ctx)}"
+
+    def total(self, request_id: str) -> int:
+        return sum(self._requests.get(request_id, Counter()).values())
+
+    def repeated(self, request_id: str, threshold: int = None) -> List[Tuple[str, int]]:
+        """Statements executed at least `threshold` times in one request, most repeated first."""
+        threshold = threshold or self.repeat_threshold
+        counts = self._requests.get(request_id, Counter())
+        return [(sql, n) for sql, n in counts.most_common() if n >= threshold]
+
+    def requests(self) -> Dict[str, str]:
+        """request_id -> "METHOD /route" for every request seen."""
+        return dict(self._routes)
+
+
+# Trackers that observe every request (tests); the middleware uses ctx.query_tracker
+_global_trackers: List[QueryTracker] = []
+
+
+def record_statement(statement: str, ctx):
+    """Called by the cursor listener for statements issued inside a request."""
+    if ctx.query_tracker is not None:
+        ctx.query_tracker.record(statement, ctx)
+    for tracker in _global_trackers:
+        tracker.record(statement, ctx)
+
+
+def tracking_active(ctx) -> bool:
+    return ctx.query_tracker is not None or bool(_global_trackers)
+
+
+@contextmanager
+def track_queries(repeat_threshold: int = N_PLUS_ONE_THRESHOLD):
+    """Track every request served while the block runs (any thread)."""
+    tracker = QueryTracker(repeat_threshold)
+    _global_trackers.append(tracker)
+    try:
+        yield tracker
+    finally:
+        _global_trackers.remove(tracker)
+
+
+def _format_statement(sql: str) -> str:
+    return " ".join(sql.split())[:300]
+
+
+@contextmanager
+def assert_query_budget(max_queries: Optional[int] = None, max_repeats: Optional[int] = None):
+    """
+    Fail if any request served inside the block issues more than `max_queries`
+    statements, or repeats one statement more than `max_repeats` times.
+
+        with assert_query_budget(max_queries=5, max_repeats=1):
+            client.get("/api/inventory/dashboard", headers=headers)
+    """
+    threshold = (max_repeats + 1) if max_repeats is not None else N_PLUS_ONE_THRESHOLD
+    with track_queries(threshold) as tracker:
+        yield tracker
+
+    problems = []
+    for request_id, route in tracker.requests().items():
+        total = tracker.total(request_id)
+        if max_queries is not None and total > max_queries:
+            problems.append(f"{route}: {total} statements (budget {max_queries})")
+        if max_repeats is not None:
+            for sql, count in tracker.repeated(request_id):
+                problems.append(f"{route}: repeated {count}x (budget {max_repeats}): {_format_statement(sql)}")
+    if problems:
+        raise QueryBudgetExceeded("Query budget exceeded:\n  " + "\n  ".join(problems))
+
+
+class QueryTrackerMiddleware:
+    """
+    Pure ASGI middleware: when `N_PLUS_ONE_DETECTION=warn`, tracks the request's
+    statements and logs a warning for each N+1 candidate.
+    Must be mounted inside `RequestContextMiddleware`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        ctx = get_request_context()
+        if N_PLUS_ONE_DETECTION != "warn" or scope["type"] != "http" or ctx is None:
+            await self.app(scope, receive, send)
+            return
+
+        tracker = QueryTracker(N_PLUS_ONE_THRESHOLD)
+        ctx.query_tracker = tracker
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            ctx.query_tracker = None
+            for sql, count in tracker.repeated(ctx.request_id):
+                logger.warning(
+                    "Possible N+1 query",
+                    extra={"route": _request_route(ctx), "repeats": count, "sql": _format_statement(sql)},
+                )
@@ -0,0 +1,100 @@
+"""
+Request Context - per-request state shared across layers.
+
+`RequestContextMiddleware` opens a context when a request starts (assigning
+the correlation id echoed back as `X-Request-ID`); logging filters, SQLAlchemy event
+listeners, dependencies and services read it through `get_request_context()`
+without having to thread extra arguments through every function.
+
+Propagation works across Starlette's threadpool because `run_in_threadpool`
+copies the current `contextvars` context, so sync endpoints and sync
+dependencies see (and mutate) the same `RequestContext` instance.
+
+Usage:
+    ctx = get_request_context()
+    if ctx is not None:
+        ctx.sql_count += 1
+"""
+import re
+import uuid
+from contextvars import ContextVar, Token
+from typing import Optional, Tuple
+
+REQUEST_ID_HEADER = b"x-request-id"
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+class RequestContext:
+    """Mutable bag of per-request counters. Kept tiny: it lives on the hot path."""
+
+    __slots__ = ("request_id", "method", "path", "sql_count", "sql_time", "profile", "timings", "scope", "query_tracker")
+
+    def __init__(self, method: str, path: str, request_id: str = None, scope: dict = None):
+        self.request_id = request_id or uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.profile = None  # RequestProfile while an admin profiles this request
+        self.timings = None  # Server-Timing segments (dict) when enabled
+        self.scope = scope  # ASGI scope; `scope["route"]` is set once routing matched
+        self.query_tracker = None  # QueryTracker when N+1 detection is on
+
+
+_current: ContextVar[Optional[RequestContext]] = ContextVar("request_context", default=None)
+
+
+def get_request_context() -> Optional[RequestContext]:
+    """Return the context of the request being served, or None outside a request."""
+    return _current.get()
+
+
+def start_request_context(method: str, path: str, request_id: str = None,
+                          scope: dict = None) -> Tuple[RequestContext, Token]:
+    """Open a new context. Pass the returned token to `reset_request_context`."""
+    ctx = RequestContext(method, path, request_id, scope)
+    return ctx, _current.set(ctx)
+
+
+def reset_request_context(token: Token):
+    """Close the context opened by `start_request_context`."""
+    _current.reset(token)
+
+
+def _incoming_request_id(scope) -> Optional[str]:
+    """Reuse a well-formed X-Request-ID from the client/proxy, otherwise None."""
+    for name, value in scope.get("headers", ()):
+        if name == REQUEST_ID_HEADER:
+            candidate = value.decode("latin-1")
+            return candidate if _VALID_REQUEST_ID.match(candidate) else None
+    return None
+
+
+class RequestContextMiddleware:
+    """
+    Pure ASGI middleware (outermost): opens the request context and returns
+    the correlation id in the `X-Request-ID` response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        ctx, token = start_request_context(
+            scope["method"], scope.get("path", ""), _incoming_request_id(scope), scope
+        )
+        request_id_header = (REQUEST_ID_HEADER, ctx.request_id.encode("latin-1"))
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [request_id_header]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            reset_request_context(token)
@@ -0,0 +1,211 @@
+"""
+Response Cache - public payloads stored as bytes, compressed once per data version.
+
+The public map endpoints return the same JSON to every visitor until
+someone writes to the tables behind them. `PayloadCache` keeps the
+serialized body per (path, query string) together with the data version
+it was built from (`app.core.data_versions`), and stores a gzip / brotli
+copy next to it the first time a client asks for that encoding - at the
+maximum level, since it is paid once per version instead of per request.
+
+    public_deliveries = PayloadCache("deliveries", tables=("deliveries", "delivery_locations", ...))
+
+    @router.get("/", response_model=List[DeliveryResponse])
+    async def list_all_deliveries(request: Request, db=Depends(get_async_db)):
+        async def build():
+            ...
+            return delivery_list.dumps(rows)
+        return await public_deliveries.respond(request, build)
+
+Responses carry an `ETag` (data version + body checksum) and `Cache-Control:
+no-cache`, so browsers revalidate and get `304 Not Modified` while the
+data is unchanged. Entries also expire after `PUBLIC_CACHE_TTL_SECONDS`,
+for writes the ORM does not see.
+
+Rebuilds are single-flight (`app.core.single_flight`), keyed by path,
+normalized query string and data version: during a spike, the requests
+arriving while a payload is rebuilt wait for that one build instead of
+running the same queries. A request that finds its entry out of date leads
+the rebuild with its own session; concurrent readers meanwhile get the
+previous entry at once (stale-while-revalidate) as long as it is at most
+`PUBLIC_CACHE_STALE_SECONDS` past its TTL, and only wait when there is none.
+
+Only for anonymous, user-independent payloads. Endpoints reading from the
+replica pass `bypass=READ_ROUTER.reads_own_writes`: a client that just
+wrote reads the primary directly, never an entry built from a lagging
+replica (other clients may see such an entry for up to the TTL).
+
+Data versions travel between workers on the invalidation bus
+(`app.core.invalidation`); `cache.invalidate()` purges one cache in every
+worker (`payload_cache` namespace).
+
+Environment variables:
+    PUBLIC_CACHE_ENABLED        true (default) | false
+    PUBLIC_CACHE_TTL_SECONDS    max age of an entry (default 30)
+    PUBLIC_CACHE_MAX_ENTRIES    query-string variants kept per cache (default 64)
+    PUBLIC_CACHE_STALE_SECONDS  how long past the TTL an entry may still be served
+                                while it is rebuilt (default 30; 0 = never stale)
+"""
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Sequence
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.compression import COMPRESSION_MIN_SIZE, choose_encoding, compress
+from app.core.data_versions import DATA_VERSIONS
+from app.core.invalidation import INVALIDATION_BUS
+from app.core.metrics import COMPRESSED_RESPONSES, RESPONSE_CACHE_LOOKUPS
+from app.core.server_timing import mark_serialize_start
+from app.core.single_flight import SingleFlight
+
+PUBLIC_CACHE_ENABLED = os.getenv("PUBLIC_CACHE_ENABLED", "true").lower() in ("1", "true", "yes", "on")
+PUBLIC_CACHE_TTL_SECONDS = float(os.getenv("PUBLIC_CACHE_TTL_SECONDS", "30"))
+PUBLIC_CACHE_MAX_ENTRIES = int(os.getenv("PUBLIC_CACHE_MAX_ENTRIES", "64"))
+PUBLIC_CACHE_STALE_SECONDS = float(os.getenv("PUBLIC_CACHE_STALE_SECONDS", "30"))
+
+_CACHES: Dict[str, "PayloadCache"] = {}
+NAMESPACE = "payload_cache"
+
+
+class CachedPayload:
+    __slots__ = ("version", "body", "etag", "created", "encoded")
+
+    def __init__(self, version: str, body: bytes):
+        self.version = version
+        self.body = body
+        # Content hash too: after a TTL rebuild the version may be the same but the data not
+        self.etag = f'"{version}-{zlib.crc32(body):08x}"'
+        self.created = time.monotonic()
+        self.encoded: Dict[str, bytes] = {}
+
+    def encode(self, encoding: str) -> bytes:
+        encoded = self.encoded.get(encoding)
+        if encoded is None:
+            # Concurrent first requests may both compress; the result is identical
+            encoded = self.encoded[encoding] = compress(self.body, encoding, precompress=True)
+        return encoded
+
+
+class PayloadCache:
+    """Serialized (and precompressed) public payloads keyed by request and data version."""
+
+    def __init__(self, name: str, tables: Sequence[str], ttl: float = None, max_entries: int = None,
+                 media_type: str = "application/json", bypass: Callable[[dict], bool] = None,
+                 stale_seconds: float = None):
+        self.name = name
+        self.bypass = bypass
+        self.tables = tuple(tables)
+        self.ttl = PUBLIC_CACHE_TTL_SECONDS if ttl is None else ttl
+        self.stale_seconds = PUBLIC_CACHE_STALE_SECONDS if stale_seconds is None else stale_seconds
+        self.max_entries = PUBLIC_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.media_type = media_type
+        self._entries: "OrderedDict[str, CachedPayload]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        _CACHES[name] = self
+        INVALIDATION_BUS.subscribe(NAMESPACE, self._on_invalidation)
+
+    def _key(self, request: Request) -> str:
+        # ?b=2&a=1 and ?a=1&b=2 (or %2C and ,) are the same payload
+        query = urlencode(sorted(parse_qsl(request.url.query, keep_blank_values=True)))
+        return request.url.path + ("?" + query if query else "")
+
+    def get(self, key: str, version: str) -> Optional[CachedPayload]:
+        entry = self._entries.get(key)
+        if entry is None or entry.version != version or time.monotonic() - entry.created > self.ttl:
+            return None
+        return entry
+
+    def _servable_stale(self, entry: Optional[CachedPayload]) -> bool:
+        return entry is not None and time.monotonic() - entry.created <= self.ttl + self.stale_seconds
+
+    async def _rebuild(self, key: str, version: str, build: Callable[[], Awaitable[bytes]]) -> CachedPayload:
+        entry = CachedPayload(version, await build())
+        self.put(key, entry)
+        return entry
+
+    def put(self, key: str, entry: CachedPayload):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def invalidate(self):
+        """Purge this cache in every worker."""
+        INVALIDATION_BUS.publish(NAMESPACE, self.name)
+
+    def _on_invalidation(self, name: Optional[str]):
+        if name is None or name == self.name:
+            self.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "tables": list(self.tables),
+            "flights": self._flights.stats(),
+            "versions": {table: DATA_VERSIONS.version(table) for table in self.tables},
+        }
+
+    async def respond(self, request: Request, build: Callable[[], Awaitable[bytes]]) -> Response:
+        """Serve the cached payload for this request, building it with `build()` on a miss."""
+        if not PUBLIC_CACHE_ENABLED or (self.bypass is not None and self.bypass(request.scope)):
+            RESPONSE_CACHE_LOOKUPS.inc(self.name, "bypass")
+            body = await build()
+            mark_serialize_start()
+            return Response(body, media_type=self.media_type)
+
+        # Version read before building: a write during build() makes the entry stale at once
+        version = DATA_VERSIONS.token(self.tables)
+        key = self._key(request)
+        entry = self.get(key, version)
+        if entry is not None:
+            RESPONSE_CACHE_LOOKUPS.inc(self.name, "hit")
+        else:
+            flight = (key, version)
+            previous = self._entries.get(key)
+            if self._flights.in_flight(flight) and self._servable_stale(previous):
+                # Someone is already rebuilding it: serve the previous payload meanwhile
+                RESPONSE_CACHE_LOOKUPS.inc(self.name, "stale")
+                entry = previous
+            else:
+                joined = self._flights.in_flight(flight)
+                RESPONSE_CACHE_LOOKUPS.inc(self.name, "coalesced" if joined else "miss")
+                entry = await self._flights.run(flight, lambda: self._rebuild(key, version, build))
+        mark_serialize_start()
+
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if entry.etag in request.headers.get("if-none-match", ""):
+            RESPONSE_CACHE_LOOKUPS.inc(self.name, "not_modified")
+            return Response(status_code=304, headers=headers)
+
+        encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+        if encoding is None or len(entry.body) < COMPRESSION_MIN_SIZE:
+            return Response(entry.body, media_type=self.media_type, headers=headers)
+        COMPRESSED_RESPONSES.inc(encoding, "precompressed")
+        headers["Content-Encoding"] = encoding
+        body = entry.encoded.get(encoding)
+        if body is None:
+            # Max-level compression of a large payload: keep it off the event loop
+            body = await run_in_threadpool(entry.encode, encoding)
+        return Response(body, media_type=self.media_type, headers=headers)
+
+
+def payload_caches() -> Dict[str, PayloadCache]:
+    return _CACHES
+
+
+def clear_payload_caches():
+    for cache in _CACHES.values():
+        cache.clear()
@@ -0,0 +1,38 @@
+"""
+Responses - orjson rendering for endpoints without a response model.
+
+FastAPI already dumps `response_model` routes straight to JSON bytes with
+Pydantic (its `dump_json` path) as long as the route keeps the *default*
+response class. An app-wide `default_response_class=ORJSONResponse` would
+turn that path off for every typed route, so the default is swapped per
+route instead: `ORJSONRoute` uses `ORJSONResponse` only when the route has
+no response model and no explicit `response_class` (dicts and lists
+returned as-is: health, dashboard, admin summaries...).
+"""
+from typing import Any, Callable
+
+import orjson
+from fastapi.datastructures import Default, DefaultPlaceholder
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from starlette.routing import request_response
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (FastAPI's own class is deprecated)."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+class ORJSONRoute(APIRoute):
+    """APIRoute whose default response class is `ORJSONResponse` for untyped endpoints."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, endpoint, **kwargs)
+        if (self.response_field is None and isinstance(self.response_class, DefaultPlaceholder)
+                and self.response_class.value is JSONResponse):
+            self.response_class = Default(ORJSONResponse)
+            self.app = request_response(self.get_route_handler())
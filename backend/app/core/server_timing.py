@@ -0,0 +1,183 @@
+"""
+Server-Timing - per-request latency breakdown visible in browser devtools.
+
+When `SERVER_TIMING_ENABLED` is set, every response carries e.g.
+
+    Server-Timing: auth;dur=2.1, db;dur=8.4;desc="12 queries", orm;dur=3.0,
+                   serialize;dur=5.2, total;dur=21.7
+
+Segments (milliseconds; they may overlap, `total` is the wall clock):
+    auth       `get_current_user`: JWT decode + user lookup (its SQL also counts in `db`)
+    db         SQL cursor time (engine listeners) + session close in `get_db`
+    orm        ORM statement compile + row hydration, SQL time excluded
+    serialize  endpoint return -> response built: Pydantic response validation
+               and JSON encoding (FastAPI runs both inside `serialize_response`)
+    total      middleware in -> response start
+
+Hooks:
+    add_timing("auth", seconds)          from dependencies (`get_current_user`, `get_db`)
+    install_orm_timing()                 Session `do_orm_execute` listener
+    APIRouter(route_class=ServerTimingRoute)   stamps the end of the endpoint
+    mark_serialize_start()               same stamp, earlier, for self-serializing endpoints
+
+All hooks are a context-variable lookup and an `is None` check while the
+feature is disabled.
+"""
+import os
+import time
+from functools import wraps
+from inspect import iscoroutinefunction
+from typing import Callable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.request_context import get_request_context
+from app.core.responses import ORJSONRoute
+
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() in ("1", "true", "yes", "on")
+
+SERVER_TIMING_HEADER = b"server-timing"
+
+_ENDPOINT_END = "_endpoint_end"
+_ORM_ACTIVE = "_orm_active"
+
+_orm_listener_installed = False
+
+
+def add_timing(name: str, seconds: float):
+    """Accumulate `seconds` into segment `name` of the current request (no-op if disabled)."""
+    ctx = get_request_context()
+    if ctx is not None and ctx.timings is not None:
+        ctx.timings[name] = ctx.timings.get(name, 0.0) + seconds
+
+
+# ============================================================================
+# ORM HYDRATION
+# ============================================================================
+
+def _time_orm_execute(orm_execute_state):
+    ctx = get_request_context()
+    if ctx is None or ctx.timings is None or not orm_execute_state.is_select:
+        return None
+    options = orm_execute_state.execution_options
+    # Nested loads (selectin/lazy during hydration) are part of the outer measurement;
+    # streamed results must not be buffered
+    if ctx.timings.get(_ORM_ACTIVE) or options.get("yield_per") or options.get("stream_results"):
+        return None
+
+    ctx.timings[_ORM_ACTIVE] = True
+    sql_before = ctx.sql_time
+    started = time.perf_counter()
+    try:
+        # freeze() fetches and hydrates every row now, inside the measured window
+        frozen = orm_execute_state.invoke_statement().freeze()
+    finally:
+        ctx.timings[_ORM_ACTIVE] = False
+    elapsed = time.perf_counter() - started - (ctx.sql_time - sql_before)
+    ctx.timings["orm"] = ctx.timings.get("orm", 0.0) + max(elapsed, 0.0)
+    return frozen()
+
+
+def install_orm_timing():
+    """Attach the hydration timer to every Session (class-level listener). Idempotent."""
+    global _orm_listener_installed
+    if _orm_listener_installed:
+        return
+    event.listen(Session, "do_orm_execute", _time_orm_execute)
+    _orm_listener_installed = True
+
+
+# ============================================================================
+# ROUTE CLASS
+# ============================================================================
+
+def _mark_endpoint_end():
+    ctx = get_request_context()
+    if ctx is not None and ctx.timings is not None:
+        ctx.timings.setdefault(_ENDPOINT_END, time.perf_counter())
+
+
+def mark_serialize_start():
+    """For endpoints that serialize their own response (`Projector.response`)."""
+    _mark_endpoint_end()
+
+
+def _timed_endpoint(endpoint: Callable) -> Callable:
+    if iscoroutinefunction(endpoint):
+        @wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                _mark_endpoint_end()
+        return async_wrapper
+
+    @wraps(endpoint)
+    def sync_wrapper(*args, **kwargs):
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            _mark_endpoint_end()
+    return sync_wrapper
+
+
+class ServerTimingRoute(ORJSONRoute):
+    """APIRoute that records when the endpoint returned, so serialization can be timed."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+
+# ============================================================================
+# ASGI MIDDLEWARE
+# ============================================================================
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:.2f}"
+
+
+def format_server_timing(ctx, started: float, finished: float) -> str:
+    timings = ctx.timings
+    parts = []
+    if "auth" in timings:
+        parts.append(f"auth;dur={_ms(timings['auth'])}")
+    parts.append(f'db;dur={_ms(ctx.sql_time + timings.get("db", 0.0))};desc="{ctx.sql_count} queries"')
+    if "orm" in timings:
+        parts.append(f"orm;dur={_ms(timings['orm'])}")
+    if _ENDPOINT_END in timings:
+        parts.append(f"serialize;dur={_ms(max(finished - timings[_ENDPOINT_END], 0.0))}")
+    parts.append(f"total;dur={_ms(finished - started)}")
+    return ", ".join(parts)
+
+
+class ServerTimingMiddleware:
+    """
+    Pure ASGI middleware: enables the timing hooks for the request and adds
+    the `Server-Timing` header. Must be mounted inside `RequestContextMiddleware`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        ctx = get_request_context()
+        if not SERVER_TIMING_ENABLED or scope["type"] != "http" or ctx is None:
+            await self.app(scope, receive, send)
+            return
+
+        ctx.timings = {}
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                value = format_server_timing(ctx, started, time.perf_counter())
+                message["headers"] = list(message.get("headers", [])) + [
+                    (SERVER_TIMING_HEADER, value.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            ctx.timings = None
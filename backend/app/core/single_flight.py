@@ -0,0 +1,74 @@
+"""
+Single Flight - concurrent identical computations share one execution.
+
+When a popular public payload goes stale, every request arriving before it
+is rebuilt would run the same queries. `SingleFlight.run(key, fn)` lets the
+first caller (the leader) run `fn()` while the others with the same key
+await the leader's result instead of running it again:
+
+    flights = SingleFlight()
+    body = await flights.run(("/api/locations/", version), build)
+
+A failure is propagated to every waiter and nothing is remembered: the next
+call runs `fn()` again. The leader runs `fn()` itself, inside its own
+request, so request-scoped resources (the DB session) stay valid for the
+whole build; if the leader is cancelled (client disconnect) the waiters
+are cancelled too and the next caller leads a new flight.
+
+Flights belong to one event loop; a flight left behind by a closed loop
+(test clients) is discarded instead of awaited.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Key -> in-flight future, for the current event loop."""
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self.led = 0
+        self.joined = 0
+
+    def in_flight(self, key: Hashable) -> bool:
+        return self._live(key) is not None
+
+    def _live(self, key: Hashable):
+        future = self._flights.get(key)
+        if future is None:
+            return None
+        if future.get_loop() is not asyncio.get_running_loop():
+            self._flights.pop(key, None)  # left behind by another (closed) loop
+            return None
+        return future
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        future = self._live(key)
+        if future is not None:
+            self.joined += 1
+            # shield: a cancelled follower must not cancel the flight
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._flights[key] = future
+        self.led += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # retrieved: no "never retrieved" warning without followers
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._flights.get(key) is future:
+                del self._flights[key]
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._flights), "led": self.led, "joined": self.joined}
@@ -0,0 +1,163 @@
+"""
+Slow Query Log - statements above a threshold, with their query plan.
+
+Fed by the cursor listeners in `app.core.sql_instrumentation`: any statement
+slower than `SLOW_QUERY_THRESHOLD_MS` is recorded with
+- normalized SQL (literals and bind markers replaced by `?`, IN-lists collapsed)
+- bound-parameter *shapes* (types only - values may hold personal data)
+- the calling route template (or "-" outside a request)
+- the query plan: `EXPLAIN QUERY PLAN` on SQLite, `EXPLAIN` elsewhere
+
+The plan is captured asynchronously on a single background thread (one
+EXPLAIN per distinct normalized statement, cached), so the slow request is
+not made slower. Records live in a bounded ring buffer
+(`SLOW_QUERY_BUFFER_SIZE`) served by `GET /api/admin/slow-queries`.
+
+Environment variables:
+    SLOW_QUERY_THRESHOLD_MS   default 200; 0 disables the log
+    SLOW_QUERY_BUFFER_SIZE    records kept (default 200)
+    SLOW_QUERY_EXPLAIN        capture query plans (default true)
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from app.core.logging_config import get_logger
+from app.core.metrics import route_template
+
+logger = get_logger(__name__)
+
+SLOW_QUERY_THRESHOLD = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200")) / 1000.0
+SLOW_QUERY_BUFFER_SIZE = int(os.getenv("SLOW_QUERY_BUFFER_SIZE", "200"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() in ("1", "true", "yes", "on")
+
+# Execution option that marks our own EXPLAIN statements (never logged themselves)
+EXPLAIN_OPTION = "slow_query_explain"
+
+_EXPLAINABLE = ("select", "insert", "update", "delete", "with")
+_MAX_PLAN_CACHE = 500
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_BIND_MARKER = re.compile(r"%\(\w+\)s|%s|(?<![:\w]):\w+|\$\d+|\?")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """Fingerprint a statement: same shape -> same string."""
+    sql = _STRING_LITERAL.sub("?", statement)
+    sql = _BIND_MARKER.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _IN_LIST.sub("IN (?...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def parameter_shapes(parameters, executemany: bool = False):
+    """Types of the bound parameters, never their values."""
+    if executemany and isinstance(parameters, (list, tuple)) and parameters:
+        return {"executemany": len(parameters), "row": parameter_shapes(parameters[0])}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__ if parameters is not None else None
+
+
+class SlowQueryLog:
+    """Bounded ring buffer of slow statements + async plan capture."""
+
+    def __init__(self, threshold: float = SLOW_QUERY_THRESHOLD,
+                 max_records: int = SLOW_QUERY_BUFFER_SIZE, explain: bool = SLOW_QUERY_EXPLAIN):
+        self.threshold = threshold
+        self.explain = explain
+        self._records = deque(maxlen=max_records)
+        self._plans: "OrderedDict[str, object]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def record(self, conn, statement: str, parameters, elapsed: float,
+               executemany: bool = False, ctx=None) -> Optional[dict]:
+        """Store a slow statement (called from the cursor listener, on the request thread)."""
+        normalized = normalize_sql(statement)
+        route = "-"
+        if ctx is not None:
+            route = route_template(ctx.scope) if ctx.scope is not None else ctx.path
+        entry = {
+            "timestamp": time.time(),
+            "duration_ms": round(elapsed * 1000, 3),
+            "sql": normalized,
+            "parameters": parameter_shapes(parameters, executemany),
+            "route": route,
+            "method": ctx.method if ctx is not None else None,
+            "request_id": ctx.request_id if ctx is not None else None,
+            "plan": None,
+        }
+        with self._lock:
+            self._records.append(entry)
+            cached_plan = self._plans.get(normalized)
+        logger.warning(
+            "Slow query", extra={"duration_ms": entry["duration_ms"], "route": route, "sql": normalized[:500]}
+        )
+
+        if cached_plan is not None:
+            entry["plan"] = cached_plan
+        elif self.explain and normalized.split(" ", 1)[0].lower() in _EXPLAINABLE:
+            first_params = parameters[0] if executemany and parameters else parameters
+            self._submit_explain(conn.engine, statement, first_params, normalized, entry)
+        return entry
+
+    # --- EXPLAIN ------------------------------------------------------------
+
+    def _submit_explain(self, engine, statement, parameters, normalized, entry):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+            executor = self._executor
+        entry["plan"] = "pending"
+        executor.submit(self._explain, engine, statement, parameters, normalized, entry)
+
+    def _explain(self, engine, statement, parameters, normalized, entry):
+        prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+        try:
+            with engine.connect() as conn:
+                conn = conn.execution_options(**{EXPLAIN_OPTION: True})
+                rows = conn.exec_driver_sql(prefix + statement, parameters or ()).fetchall()
+            plan = [" ".join(str(col) for col in row) if len(row) > 1 else str(row[0]) for row in rows]
+        except Exception as exc:
+            plan = f"EXPLAIN failed: {exc.__class__.__name__}: {exc}"
+        entry["plan"] = plan
+        with self._lock:
+            self._plans[normalized] = plan
+            while len(self._plans) > _MAX_PLAN_CACHE:
+                self._plans.popitem(last=False)
+
+    def wait_for_plans(self, timeout: float = 5.0):
+        """Block until queued EXPLAINs are done (tests, shutdown)."""
+        with self._lock:
+            executor = self._executor
+        if executor is not None:
+            executor.submit(lambda: None).result(timeout=timeout)
+
+    # --- access -------------------------------------------------------------
+
+    def list(self, limit: int = None) -> List[dict]:
+        with self._lock:
+            records = list(reversed(self._records))
+        return records[:limit] if limit else records
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+            self._plans.clear()
+
+
+SLOW_QUERY_LOG = SlowQueryLog()
@@ -0,0 +1,70 @@
+"""
+SQL Instrumentation - SQLAlchemy cursor event listeners.
+
+Class-level listeners on `Engine`, so every engine (application, tests,
+scripts) is covered. Each statement is timed once and the measurement is
+fanned out to:
+- `db_statement_duration_seconds` (Prometheus)
+- the per-request counters on `RequestContext` (`sql_count`, `sql_time`)
+- the request profiler, when the request is being profiled
+- the slow query log, when the statement exceeds `SLOW_QUERY_THRESHOLD_MS`
+- the N+1 / query budget tracker, when something is tracking
+
+Usage:
+    install_sql_listeners()   # once, at startup (idempotent)
+"""
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.metrics import DB_STATEMENT_LATENCY
+from app.core.query_tracker import record_statement, tracking_active
+from app.core.request_context import get_request_context
+from app.core.slow_queries import EXPLAIN_OPTION, SLOW_QUERY_LOG
+
+_START_ATTR = "_metrics_started_at"
+_sql_listeners_installed = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        setattr(context, _START_ATTR, time.perf_counter())
+        ctx = get_request_context()
+        if ctx is not None and ctx.profile is not None:
+            ctx.profile.attach_current_thread()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, _START_ATTR, None) if context is not None else None
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    DB_STATEMENT_LATENCY.observe(elapsed)
+    ctx = get_request_context()
+    if ctx is not None:
+        ctx.sql_count += 1
+        ctx.sql_time += elapsed
+        if ctx.profile is not None:
+            ctx.profile.record_sql(statement, parameters, started, elapsed)
+        if tracking_active(ctx):
+            record_statement(statement, ctx)
+    if (
+        SLOW_QUERY_LOG.enabled
+        and elapsed >= SLOW_QUERY_LOG.threshold
+        and not context.execution_options.get(EXPLAIN_OPTION)
+    ):
+        SLOW_QUERY_LOG.record(conn, statement, parameters, elapsed, executemany, ctx)
+
+
+def install_sql_listeners():
+    """
+    Attach statement timing to *every* Engine (class-level listeners), so
+    engines created by tests or scripts are measured too. Idempotent.
+    """
+    global _sql_listeners_installed
+    if _sql_listeners_installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _sql_listeners_installed = True
@@ -0,0 +1,195 @@
+"""
+SQLite Mode - tuned pragmas and a single-writer queue for file databases.
+
+Small field deployments run on `sqlite:///./euajudo.db`. Out of the box
+SQLite uses a rollback journal (readers block the writer), syncs on every
+commit and fails with "database is locked" as soon as two requests commit at
+the same time. `create_sqlite_engine(url)` applies, on every new connection:
+
+    journal_mode=WAL        readers and the writer no longer block each other
+    synchronous=NORMAL      fsync at checkpoints, not per commit (safe with WAL)
+    busy_timeout            wait for a lock instead of failing immediately
+    mmap_size, cache_size   keep the hot pages in memory
+    foreign_keys=ON         enforce the declared ForeignKeys
+    temp_store=MEMORY       sorts / temp b-trees in memory
+
+and serializes write transactions through a FIFO writer queue: a connection
+joins the queue right before its first write statement and leaves it once
+the COMMIT / ROLLBACK has completed. Writers inside the process are served
+in arrival order instead of polling SQLite's busy handler, so concurrent
+commits queue up rather than time out. Reads never wait for the queue.
+
+Environment variables:
+    SQLITE_TUNED               apply this profile (default true)
+    SQLITE_SINGLE_WRITER       enable the writer queue (default true)
+    SQLITE_BUSY_TIMEOUT_MS     default 5000 (also the writer queue timeout)
+    SQLITE_MMAP_SIZE           bytes, default 268435456 (256 MB)
+    SQLITE_CACHE_SIZE_KB       default 65536 (64 MB)
+
+See `benchmarks/sqlite_modes.py` for the default vs tuned comparison.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine
+
+from app.core.metrics import Histogram, REGISTRY, POOL_WAIT_BUCKETS
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+SQLITE_TUNED = _env_bool("SQLITE_TUNED", True)
+SQLITE_SINGLE_WRITER = _env_bool("SQLITE_SINGLE_WRITER", True)
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+
+_WRITE_PREFIXES = ("insert", "update", "delete", "replace", "create", "drop", "alter")
+
+SQLITE_WRITE_QUEUE_WAIT = REGISTRY.register(Histogram(
+    "sqlite_write_queue_wait_seconds", "Time a write transaction waited for the SQLite writer queue.",
+    buckets=POOL_WAIT_BUCKETS,
+))
+
+
+def sqlite_pragmas(busy_timeout_ms: int = SQLITE_BUSY_TIMEOUT_MS) -> list:
+    return [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={busy_timeout_ms}",
+        f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}",
+        "PRAGMA foreign_keys=ON",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+class WriterQueue:
+    """FIFO lock: one write transaction at a time, granted in arrival order."""
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._waiters = deque()
+        self._held = False
+
+    def acquire(self, timeout: float) -> bool:
+        with self._mutex:
+            if not self._held and not self._waiters:
+                self._held = True
+                return True
+            granted = threading.Event()
+            self._waiters.append(granted)
+        if granted.wait(timeout):
+            return True
+        with self._mutex:
+            if granted in self._waiters:
+                self._waiters.remove(granted)
+                return False
+        # Ownership was handed over between the timeout and the mutex
+        return True
+
+    def release(self):
+        with self._mutex:
+            if self._waiters:
+                # Hand ownership straight to the next writer in line
+                self._waiters.popleft().set()
+            else:
+                self._held = False
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+
+class QueuedConnection(sqlite3.Connection):
+    """
+    sqlite3 connection that leaves the writer queue *after* the real
+    COMMIT/ROLLBACK (SQLAlchemy's commit event fires before it).
+    Subclassed per engine with its own `writer_queue`.
+    """
+
+    writer_queue: WriterQueue = None
+    holds_write_lock = False
+
+    def _leave_writer_queue(self):
+        if self.holds_write_lock:
+            self.holds_write_lock = False
+            self.writer_queue.release()
+
+    def commit(self):
+        try:
+            super().commit()
+        finally:
+            self._leave_writer_queue()
+
+    def rollback(self):
+        try:
+            super().rollback()
+        finally:
+            self._leave_writer_queue()
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._leave_writer_queue()
+
+
+def apply_sqlite_pragmas(engine: Engine, busy_timeout_ms: int = SQLITE_BUSY_TIMEOUT_MS):
+    """Run the tuned pragmas on every new DBAPI connection (sync or aiosqlite)."""
+    pragmas = sqlite_pragmas(busy_timeout_ms)
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def create_sqlite_engine(url: str, single_writer: bool = SQLITE_SINGLE_WRITER,
+                         busy_timeout_ms: int = SQLITE_BUSY_TIMEOUT_MS, **engine_kwargs) -> Engine:
+    """create_engine() for a file-backed SQLite database with the tuned profile."""
+    connect_args = dict(engine_kwargs.pop("connect_args", {}))
+    connect_args.setdefault("check_same_thread", False)
+    connect_args.setdefault("timeout", busy_timeout_ms / 1000.0)
+    queue = None
+    if single_writer:
+        queue = WriterQueue()
+        connect_args["factory"] = type("QueuedConnection", (QueuedConnection,), {"writer_queue": queue})
+
+    engine = create_engine(url, connect_args=connect_args, **engine_kwargs)
+    engine.sqlite_writer_queue = queue
+    apply_sqlite_pragmas(engine, busy_timeout_ms)
+
+    if queue is None:
+        return engine
+    timeout = busy_timeout_ms / 1000.0
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _join_writer_queue(conn, cursor, statement, parameters, context, executemany):
+        dbapi_connection = cursor.connection
+        if dbapi_connection.holds_write_lock:
+            return
+        if not statement.lstrip()[:7].lower().startswith(_WRITE_PREFIXES):
+            return
+        started = time.perf_counter()
+        if not queue.acquire(timeout):
+            raise exc.OperationalError(
+                statement, parameters, sqlite3.OperationalError("database is locked (writer queue timeout)")
+            )
+        SQLITE_WRITE_QUEUE_WAIT.observe(time.perf_counter() - started)
+        dbapi_connection.holds_write_lock = True
+
+    return engine
@@ -0,0 +1,197 @@
+"""
+Server-Sent Events - a bounded, resumable stream fanned out to many clients.
+
+A `DeltaStream` keeps the last SSE_REPLAY_SIZE events in a ring buffer,
+already encoded as SSE frames. Publishers (any thread) append to it;
+clients are async generators on the event loop that only remember the id
+of the last event they sent, so a connected client costs a cursor and a
+suspended coroutine - no thread and no queue per client:
+
+    MAP_DELTAS = DeltaStream("map")
+    MAP_DELTAS.publish("need.changed", {"shelter_id": 5})
+
+    @router.get("/map")
+    async def map_stream(request: Request):
+        return MAP_DELTAS.response(request)
+
+A publish wakes every waiting client of each event loop with one
+`call_soon_threadsafe`; each client then copies the frames past its cursor
+and writes them in a single chunk. Slow clients are paced by their own
+socket: when one falls further behind than the buffer, it gets a `reset`
+event (reload the full state) instead of the missed events.
+
+Ids are `<stream epoch>-<sequence>`. A reconnecting EventSource sends the
+last one back in `Last-Event-ID` (or `?last_event_id=`) and receives the
+events it missed; an id from another process (restart, other worker) or
+older than the buffer also gets `reset`. Without an id the client starts
+at the current position.
+
+Environment variables:
+    SSE_REPLAY_SIZE          events kept for Last-Event-ID resume (default 1024)
+    SSE_MAX_CLIENTS          concurrent clients per stream and worker (default 5000)
+    SSE_KEEPALIVE_SECONDS    comment sent on idle connections (default 15)
+    SSE_RETRY_MS             reconnection delay suggested to clients (default 3000)
+"""
+import asyncio
+import itertools
+import os
+import threading
+import uuid
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import orjson
+from fastapi import HTTPException
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+
+from app.core.metrics import SSE_CLIENTS, SSE_EVENTS
+
+SSE_REPLAY_SIZE = int(os.getenv("SSE_REPLAY_SIZE", "1024"))
+SSE_MAX_CLIENTS = int(os.getenv("SSE_MAX_CLIENTS", "5000"))
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "3000"))
+
+KEEPALIVE_FRAME = b": keepalive\n\n"
+
+
+def encode_event(event_id: str, event_type: str, data: bytes) -> bytes:
+    """One SSE frame (`data` is single-line JSON)."""
+    return b"id: %s\nevent: %s\ndata: %s\n\n" % (event_id.encode(), event_type.encode(), data)
+
+
+class DeltaStream:
+    """Ring buffer of encoded events plus a wake-up signal per event loop."""
+
+    def __init__(self, name: str, replay_size: int = None, max_clients: int = None,
+                 keepalive: float = None):
+        self.name = name
+        self.epoch = uuid.uuid4().hex[:8]
+        self.max_clients = SSE_MAX_CLIENTS if max_clients is None else max_clients
+        self.keepalive = SSE_KEEPALIVE_SECONDS if keepalive is None else keepalive
+        self._buffer: "deque[Tuple[int, bytes]]" = deque(maxlen=SSE_REPLAY_SIZE if replay_size is None
+                                                         else replay_size)
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._signals: Dict[asyncio.AbstractEventLoop, asyncio.Event] = {}
+        self.clients = 0
+        self.published = 0
+        self.resets = 0
+
+    # ---- publishing (any thread) ----
+    def publish(self, event_type: str, data: dict) -> str:
+        payload = orjson.dumps(data)
+        with self._lock:
+            self._sequence += 1
+            event_id = f"{self.epoch}-{self._sequence}"
+            self._buffer.append((self._sequence, encode_event(event_id, event_type, payload)))
+            self.published += 1
+            loops = list(self._signals)
+        SSE_EVENTS.inc(self.name, event_type)
+        for loop in loops:
+            try:
+                loop.call_soon_threadsafe(self._wake, loop)
+            except RuntimeError:  # loop closed (test clients)
+                with self._lock:
+                    self._signals.pop(loop, None)
+        return event_id
+
+    def _wake(self, loop: asyncio.AbstractEventLoop):
+        with self._lock:
+            signal = self._signals.pop(loop, None)
+        if signal is not None:
+            signal.set()
+
+    def _signal(self) -> asyncio.Event:
+        """Event set by the next publish, shared by this loop's clients."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            signal = self._signals.get(loop)
+            if signal is None:
+                signal = self._signals[loop] = asyncio.Event()
+        return signal
+
+    # ---- reading ----
+    @property
+    def last_id(self) -> str:
+        return f"{self.epoch}-{self._sequence}"
+
+    def cursor_for(self, last_event_id: Optional[str]) -> Optional[int]:
+        """Sequence to resume after, or None when the client must reset."""
+        with self._lock:
+            if not last_event_id:
+                return self._sequence
+            epoch, _, sequence = last_event_id.partition("-")
+            if epoch != self.epoch or not sequence.isdigit() or int(sequence) > self._sequence:
+                return None
+            cursor = int(sequence)
+            if self._buffer and cursor < self._buffer[0][0] - 1:
+                return None
+            return cursor
+
+    def since(self, cursor: int) -> Optional[List[Tuple[int, bytes]]]:
+        """Events after `cursor`, or None when they are no longer buffered."""
+        with self._lock:
+            if not self._buffer or cursor >= self._sequence:
+                return []
+            first = self._buffer[0][0]
+            if cursor < first - 1:
+                return None
+            return list(itertools.islice(self._buffer, cursor - first + 1, None))
+
+    def _reset(self) -> Tuple[int, bytes]:
+        with self._lock:
+            cursor = self._sequence
+        self.resets += 1
+        return cursor, encode_event(f"{self.epoch}-{cursor}", "reset", b"{}")
+
+    async def frames(self, last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """SSE frames for one client, until it disconnects."""
+        self.clients += 1
+        SSE_CLIENTS.inc(self.name)
+        try:
+            yield b"retry: %d\n\n" % SSE_RETRY_MS
+            cursor = self.cursor_for(last_event_id)
+            if cursor is None:
+                cursor, frame = self._reset()
+                yield frame
+            while True:
+                signal = self._signal()  # before reading: a publish in between sets it
+                events = self.since(cursor)
+                if events is None:
+                    cursor, frame = self._reset()
+                    yield frame
+                elif events:
+                    cursor = events[-1][0]
+                    yield b"".join(frame for _, frame in events)
+                else:
+                    try:
+                        await asyncio.wait_for(signal.wait(), self.keepalive)
+                    except asyncio.TimeoutError:
+                        yield KEEPALIVE_FRAME
+        finally:
+            self.clients -= 1
+            SSE_CLIENTS.dec(self.name)
+
+    def response(self, request: Request) -> StreamingResponse:
+        if self.clients >= self.max_clients:
+            raise HTTPException(status_code=503, detail="Too many live connections, retry later",
+                                headers={"Retry-After": str(SSE_RETRY_MS // 1000 or 1)})
+        last_event_id = request.headers.get("last-event-id") or request.query_params.get("last_event_id")
+        return StreamingResponse(
+            self.frames(last_event_id),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            buffered = len(self._buffer)
+        return {
+            "clients": self.clients,
+            "last_id": self.last_id,
+            "buffered": buffered,
+            "replay_size": self._buffer.maxlen,
+            "published": self.published,
+            "resets": self.resets,
+        }
@@ -0,0 +1,105 @@
+"""
+Startup - cold-start timing and the schema check that replaces import-time create_all.
+
+`app.main` used to call `Base.metadata.create_all()` at import time, which
+costs one round trip per table on every boot (noticeable on a cold Postgres).
+`ensure_schema()` now runs from the app lifespan and skips `create_all`
+when the database is already at the Alembic head. Heads are read straight
+from `alembic/versions/*.py` (revision / down_revision), so the check neither
+imports Alembic nor needs it installed.
+
+`STARTUP` records how long each boot phase took (imports, logging, schema,
+routers, ...) plus the first request; `GET /health/startup` returns it and
+the lifespan logs it once.
+
+Environment variables:
+    SCHEMA_AUTO_CREATE    auto (default: create_all unless at Alembic head) | always | never
+"""
+import ast
+import os
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+SCHEMA_AUTO_CREATE = os.getenv("SCHEMA_AUTO_CREATE", "auto").lower()
+
+ALEMBIC_VERSIONS_DIR = Path(__file__).resolve().parents[2] / "alembic" / "versions"
+
+_REVISION_LINE = re.compile(r"^(revision|down_revision)\s*(?::[^=]+)?=\s*(.+)$", re.MULTILINE)
+
+
+class StartupTimer:
+    """Wall-clock duration of each startup phase, in order."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases: List[Tuple[str, float]] = []
+        self.first_request: Optional[float] = None
+        self.ready: Optional[float] = None
+
+    def mark(self, phase: str):
+        """Close `phase`: everything since the previous mark."""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def mark_ready(self):
+        self.ready = time.perf_counter() - self.started
+
+    def record_first_request(self, seconds: float):
+        if self.first_request is None:
+            self.first_request = seconds
+
+    def report(self) -> Dict:
+        ms = lambda seconds: round(seconds * 1000, 1) if seconds is not None else None
+        return {
+            "phases_ms": {name: ms(seconds) for name, seconds in self.phases},
+            "ready_ms": ms(self.ready),
+            "first_request_ms": ms(self.first_request),
+        }
+
+
+STARTUP = StartupTimer()
+
+
+def alembic_heads(versions_dir: Path = ALEMBIC_VERSIONS_DIR) -> Set[str]:
+    """Revisions no other revision builds on."""
+    revisions, parents = set(), set()
+    for path in versions_dir.glob("*.py"):
+        values = dict(_REVISION_LINE.findall(path.read_text(encoding="utf-8")))
+        if "revision" not in values:
+            continue
+        revisions.add(ast.literal_eval(values["revision"]))
+        down = ast.literal_eval(values.get("down_revision", "None"))
+        if isinstance(down, str):
+            parents.add(down)
+        elif down:
+            parents.update(down)
+    return revisions - parents
+
+
+def database_revisions(engine) -> Set[str]:
+    from sqlalchemy import inspect, text
+
+    with engine.connect() as conn:
+        if not inspect(conn).has_table("alembic_version"):
+            return set()
+        return {row[0] for row in conn.execute(text("SELECT version_num FROM alembic_version"))}
+
+
+def ensure_schema(engine, metadata, mode: str = None) -> str:
+    """
+    Create missing tables unless migrations already manage the schema.
+    Returns what happened: "alembic_head", "create_all" or "disabled".
+    """
+    mode = mode or SCHEMA_AUTO_CREATE
+    if mode == "never":
+        return "disabled"
+    if mode == "auto":
+        heads = alembic_heads()
+        if heads and database_revisions(engine) == heads:
+            return "alembic_head"
+    metadata.create_all(bind=engine)
+    return "create_all"
@@ -0,0 +1,213 @@
+"""
+WebSocket Hub - push messages to the clients subscribed to a channel.
+
+A `ChannelHub` groups accepted WebSockets by channel (a shelter id, for
+instance). Publishers on any thread hand a message to every client of the
+channel; the message is encoded once and queued on each client, and one
+coroutine per client writes its queue to the socket:
+
+    SHELTER_UPDATES = ChannelHub("shelter")
+    SHELTER_UPDATES.publish(shelter_id, "stock.changed", {...})
+
+    @router.websocket("/shelter")
+    async def shelter_updates(websocket: WebSocket):
+        await websocket.accept()
+        await SHELTER_UPDATES.serve(websocket, shelter_id)
+
+Messages are JSON text frames `{"type": ..., "data": ...}`. A client that
+lets WS_QUEUE_SIZE messages pile up is closed with code 1013 (try again
+later) instead of buffering without bound; on reconnect it reloads its
+state, exactly as after a `reset` message. Idle connections get a
+`{"type": "ping"}` every WS_PING_SECONDS so proxies keep them open and dead
+peers are noticed.
+
+Environment variables:
+    WS_MAX_CONNECTIONS   concurrent clients per hub and worker (default 5000)
+    WS_QUEUE_SIZE        messages queued per client before it is dropped (default 256)
+    WS_PING_SECONDS      idle interval before a ping message (default 25)
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+import orjson
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from app.core.metrics import WEBSOCKET_CONNECTIONS, WEBSOCKET_DROPPED, WEBSOCKET_MESSAGES
+
+WS_MAX_CONNECTIONS = int(os.getenv("WS_MAX_CONNECTIONS", "5000"))
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "256"))
+WS_PING_SECONDS = float(os.getenv("WS_PING_SECONDS", "25"))
+
+# 1013: "try again later" - over capacity or too slow to keep up
+CLOSE_TRY_AGAIN = 1013
+RATE_WINDOW_SECONDS = 60
+
+_PING = orjson.dumps({"type": "ping"}).decode()
+_OVERFLOW = object()  # queued instead of the message that did not fit
+
+
+class _Client:
+    __slots__ = ("channel", "loop", "queue")
+
+    def __init__(self, channel: Hashable, queue_size: int):
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size + 1)  # + the overflow marker
+
+
+class ChannelHub:
+    """Clients by channel, with per-client bounded queues."""
+
+    def __init__(self, name: str, max_connections: int = None, queue_size: int = None,
+                 ping: float = None):
+        self.name = name
+        self.max_connections = WS_MAX_CONNECTIONS if max_connections is None else max_connections
+        self.queue_size = WS_QUEUE_SIZE if queue_size is None else queue_size
+        self.ping = WS_PING_SECONDS if ping is None else ping
+        self._channels: Dict[Hashable, Set[_Client]] = {}
+        self._lock = threading.Lock()
+        self.connections = 0
+        self.published = 0
+        self.sent = 0
+        self.dropped = 0
+        self._recent: "deque[List[int]]" = deque(maxlen=RATE_WINDOW_SECONDS)  # [second, messages sent]
+
+    # ---- publishing (any thread) ----
+    def publish(self, channel: Hashable, message_type: str, data: dict) -> int:
+        """Queue a message for every client of `channel`; returns how many there are."""
+        with self._lock:
+            clients = list(self._channels.get(channel, ()))
+            self.published += 1
+        if clients:
+            self._dispatch(clients, message_type, data)
+        return len(clients)
+
+    def broadcast(self, message_type: str, data: dict) -> int:
+        """Queue a message for every client of every channel."""
+        with self._lock:
+            clients = [client for members in self._channels.values() for client in members]
+            self.published += 1
+        if clients:
+            self._dispatch(clients, message_type, data)
+        return len(clients)
+
+    def _dispatch(self, clients: List[_Client], message_type: str, data: dict):
+        message = (message_type, orjson.dumps({"type": message_type, "data": data}).decode())
+        by_loop: Dict[asyncio.AbstractEventLoop, List[_Client]] = {}
+        for client in clients:
+            by_loop.setdefault(client.loop, []).append(client)
+        for loop, members in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(self._enqueue, members, message)
+            except RuntimeError:  # loop closed (test clients)
+                pass
+
+    def _enqueue(self, clients: List[_Client], message: Tuple[str, str]):
+        for client in clients:
+            if client.queue.qsize() < self.queue_size:
+                client.queue.put_nowait(message)
+            elif client.queue.qsize() == self.queue_size:
+                client.queue.put_nowait(_OVERFLOW)
+
+    # ---- serving ----
+    def _register(self, channel: Hashable) -> _Client:
+        client = _Client(channel, self.queue_size)
+        with self._lock:
+            self._channels.setdefault(channel, set()).add(client)
+            self.connections += 1
+        WEBSOCKET_CONNECTIONS.inc(self.name)
+        return client
+
+    def _unregister(self, client: _Client):
+        with self._lock:
+            members = self._channels.get(client.channel)
+            if members is None or client not in members:
+                return  # forgotten by clear()
+            members.discard(client)
+            if not members:
+                del self._channels[client.channel]
+            self.connections -= 1
+        WEBSOCKET_CONNECTIONS.dec(self.name)
+
+    def _count_sent(self, message_type: str):
+        second = int(time.monotonic())
+        with self._lock:
+            self.sent += 1
+            if self._recent and self._recent[-1][0] == second:
+                self._recent[-1][1] += 1
+            else:
+                self._recent.append([second, 1])
+        WEBSOCKET_MESSAGES.inc(self.name, message_type)
+
+    async def serve(self, websocket: WebSocket, channel: Hashable, hello: Optional[dict] = None):
+        """
+        Pump the messages of `channel` to an accepted `websocket` until either
+        side closes. `hello` is sent first as a `ready` message.
+        """
+        if self.connections >= self.max_connections:
+            await websocket.close(code=CLOSE_TRY_AGAIN, reason="Too many live connections")
+            return
+        client = self._register(channel)
+        closed_by_peer = asyncio.ensure_future(self._until_disconnect(websocket))
+        try:
+            await websocket.send_text(orjson.dumps({"type": "ready", "data": hello or {}}).decode())
+            while True:
+                next_message = asyncio.ensure_future(client.queue.get())
+                done, _ = await asyncio.wait({next_message, closed_by_peer}, timeout=self.ping,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if next_message not in done:
+                    next_message.cancel()
+                    if closed_by_peer in done:
+                        return
+                    await websocket.send_text(_PING)
+                    continue
+                message = next_message.result()
+                if message is _OVERFLOW:
+                    self.dropped += 1
+                    WEBSOCKET_DROPPED.inc(self.name)
+                    await websocket.close(code=CLOSE_TRY_AGAIN, reason="Client too slow, reload")
+                    return
+                message_type, frame = message
+                await websocket.send_text(frame)
+                self._count_sent(message_type)
+        except (WebSocketDisconnect, RuntimeError):  # peer gone mid-send
+            pass
+        finally:
+            closed_by_peer.cancel()
+            self._unregister(client)
+
+    @staticmethod
+    async def _until_disconnect(websocket: WebSocket):
+        """Read (and ignore) client messages until it disconnects."""
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+
+    def clear(self):
+        """Forget every client and the counters (tests); their sockets are not closed."""
+        with self._lock:
+            WEBSOCKET_CONNECTIONS.dec(self.name, amount=self.connections)
+            self._channels = {}
+            self._recent.clear()
+            self.connections = self.published = self.sent = self.dropped = 0
+
+    def stats(self) -> dict:
+        now = int(time.monotonic())
+        with self._lock:
+            recent = sum(count for second, count in self._recent if second > now - RATE_WINDOW_SECONDS)
+            channels = len(self._channels)
+        return {
+            "connections": self.connections,
+            "channels": channels,
+            "published": self.published,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "messages_per_second": round(recent / RATE_WINDOW_SECONDS, 3),
+            "max_connections": self.max_connections,
+            "queue_size": self.queue_size,
+        }
@@ -1,27 +1,294 @@
-from sqlalchemy import create_engine
+from fastapi import Depends, Request
+from sqlalchemy import create_engine, event, exc
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
 import os
+import threading
+import time
+from typing import Dict, Optional
 from dotenv import load_dotenv
 
+# Antes dos imports de app.core: eles leem variáveis de ambiente ao carregar
 load_dotenv()
 
+from app.core.logging_config import get_logger
+from app.core.metrics import (
+    DB_POOL_CHECKOUTS,
+    DB_READ_ROUTES,
+    DB_POOL_TIMEOUTS,
+    observe_pool_state,
+    observe_pool_wait,
+)
+from app.core.profiler import attach_thread_to_profile
+from app.core.request_context import get_request_context
+from app.core.server_timing import add_timing
+from app.core.sqlite_mode import SQLITE_TUNED, create_sqlite_engine
+
+logger = get_logger(__name__)
+
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./euajudo.db")
 
-# Configuração específica para cada tipo de database
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-else:
-    # PostgreSQL, MySQL, etc.
-    engine = create_engine(DATABASE_URL)
+# Réplica de leitura (opcional). Leituras públicas pesadas vão para ela;
+# quem acabou de escrever lê do primário por DB_REPLICA_STICKY_SECONDS.
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+REPLICA_STICKY_SECONDS = float(os.getenv("DB_REPLICA_STICKY_SECONDS", "5"))
+REPLICA_RETRY_SECONDS = float(os.getenv("DB_REPLICA_RETRY_SECONDS", "30"))
+
+# Pool de conexões (QueuePool). No Render o Postgres aceita poucas conexões:
+# pool_size + max_overflow por processo/worker não pode passar do limite do plano.
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+POOL_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))       # segundos esperando conexão livre
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))       # recicla conexões mais velhas (s); -1 desliga
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes", "on")
+
+# A partir desta ocupação o pool é reportado como "busy" em /health/db
+POOL_BUSY_RATIO = 0.8
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that reports checkouts, wait time, timeouts and occupancy."""
+
+    metrics_name = "primary"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            DB_POOL_TIMEOUTS.inc(self.metrics_name)
+            raise
+        finally:
+            observe_pool_wait(time.perf_counter() - started, self.metrics_name)
+        DB_POOL_CHECKOUTS.inc(self.metrics_name)
+        self._publish_state()
+        return connection
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self._publish_state()
+
+    def _publish_state(self):
+        capacity = self.size() + max(self._max_overflow, 0)
+        observe_pool_state(self.metrics_name, capacity, self.checkedout(), self.overflow())
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics_name = self.metrics_name
+        return pool
+
+
+def pool_options() -> dict:
+    """create_engine() kwargs for the tuned, instrumented QueuePool."""
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": POOL_SIZE,
+        "max_overflow": POOL_MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": POOL_PRE_PING,
+    }
+
+
+def pool_status(engine) -> dict:
+    """Occupancy of an engine's pool, for health checks."""
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__, "status": "ok"}
+
+    unlimited = pool._max_overflow < 0
+    capacity = None if unlimited else pool.size() + pool._max_overflow
+    checked_out = pool.checkedout()
+    saturation = round(checked_out / capacity, 3) if capacity else 0.0
+    if capacity is not None and checked_out >= capacity:
+        status = "saturated"
+    elif saturation >= POOL_BUSY_RATIO:
+        status = "busy"
+    else:
+        status = "ok"
+    return {
+        "pool": type(pool).__name__,
+        "status": status,
+        "size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "capacity": capacity,
+        "checked_out": checked_out,
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "saturation": saturation,
+        "timeout_seconds": pool.timeout(),
+        "checkout_timeouts": int(DB_POOL_TIMEOUTS.value(getattr(pool, "metrics_name", "primary"))),
+    }
+
+
+def build_engine(url: str, metrics_name: str = "primary"):
+    """Engine com a configuração específica para cada tipo de database."""
+    if url.startswith("sqlite"):
+        if ":memory:" in url:
+            # :memory: mantém o pool padrão (uma conexão por thread)
+            return create_engine(url, connect_args={"check_same_thread": False})
+        if SQLITE_TUNED:
+            # WAL + pragmas + fila única de escrita (ver app/core/sqlite_mode.py)
+            new_engine = create_sqlite_engine(url, **pool_options())
+        else:
+            new_engine = create_engine(url, connect_args={"check_same_thread": False}, **pool_options())
+    else:
+        # PostgreSQL, MySQL, etc.
+        new_engine = create_engine(url, **pool_options())
+    new_engine.pool.metrics_name = metrics_name
+    return new_engine
+
+
+engine = build_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 def get_db():
+    attach_thread_to_profile()
     db = SessionLocal()
     try:
         yield db
     finally:
+        started = time.perf_counter()
         db.close()
+        add_timing("db", time.perf_counter() - started)
+
+
+# ============================================================================
+# ROTEAMENTO DE LEITURAS PARA A RÉPLICA
+# ============================================================================
+
+def _client_key(scope) -> Optional[str]:
+    """Identifica o cliente pelo token (leituras anônimas nunca ficam presas ao primário)."""
+    if not scope:
+        return None
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            return value.decode("latin-1")
+    return None
+
+
+class ReadRouter:
+    """
+    Decide, por requisição, se uma leitura pode ir para a réplica.
+
+    - sem réplica configurada: primário
+    - cliente que fez commit nos últimos `sticky_seconds`: primário
+      (read-your-writes; o estado fica no processo, por worker)
+    - réplica indisponível: primário, e nova tentativa após `retry_seconds`
+    """
+
+    def __init__(self, replica_sessionmaker=None, sticky_seconds: float = REPLICA_STICKY_SECONDS,
+                 retry_seconds: float = REPLICA_RETRY_SECONDS):
+        self.replica_sessionmaker = replica_sessionmaker
+        self.sticky_seconds = sticky_seconds
+        self.retry_seconds = retry_seconds
+        self._sticky: Dict[str, float] = {}
+        self._replica_down_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.replica_sessionmaker is not None
+
+    def mark_write(self, key: Optional[str]):
+        if key is None or not self.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if len(self._sticky) > 10000:
+                self._sticky = {k: until for k, until in self._sticky.items() if until > now}
+            self._sticky[key] = now + self.sticky_seconds
+
+    def is_sticky(self, key: Optional[str]) -> bool:
+        if key is None:
+            return False
+        until = self._sticky.get(key)
+        return until is not None and until > time.monotonic()
+
+    def reads_own_writes(self, scope) -> bool:
+        """Cliente que fez commit há pouco: lê do primário (e não deve receber cache montado da réplica)."""
+        return self.enabled and self.is_sticky(_client_key(scope))
+
+    def reset(self):
+        with self._lock:
+            self._sticky.clear()
+            self._replica_down_until = 0.0
+
+    def primary_reason(self, scope) -> Optional[str]:
+        """Por que esta leitura fica no primário; None quando a réplica pode atendê-la."""
+        if not self.enabled:
+            return "no_replica"
+        if self.is_sticky(_client_key(scope)):
+            return "read_your_writes"
+        if time.monotonic() < self._replica_down_until:
+            return "replica_down"
+        return None
+
+    def replica_failed(self, error: Exception):
+        self._replica_down_until = time.monotonic() + self.retry_seconds
+        logger.warning("Read replica unavailable, falling back to primary", extra={"error": str(error)})
+
+    def open_replica_session(self, scope) -> Optional[Session]:
+        """Sessão na réplica, ou None quando a leitura deve ficar no primário."""
+        reason = self.primary_reason(scope)
+        if reason is None:
+            session = self.replica_sessionmaker()
+            try:
+                session.connection()
+            except exc.DBAPIError as e:
+                session.close()
+                self.replica_failed(e)
+                reason = "replica_error"
+            else:
+                DB_READ_ROUTES.inc("replica", "replica")
+                return session
+        DB_READ_ROUTES.inc("primary", reason)
+        return None
+
+
+if DATABASE_REPLICA_URL:
+    replica_engine = build_engine(DATABASE_REPLICA_URL, metrics_name="replica")
+    READ_ROUTER = ReadRouter(sessionmaker(autocommit=False, autoflush=False, bind=replica_engine))
+else:
+    replica_engine = None
+    READ_ROUTER = ReadRouter()
+
+
+@event.listens_for(Session, "after_flush")
+def _remember_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _stick_writer_to_primary(session):
+    if session.info.pop("wrote", False) and READ_ROUTER.enabled:
+        ctx = get_request_context()
+        if ctx is not None:
+            READ_ROUTER.mark_write(_client_key(ctx.scope))
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_write(session):
+    session.info.pop("wrote", None)
+
+
+def get_read_db(request: Request, db: Session = Depends(get_db)):
+    """
+    Sessão para dependências somente leitura: réplica quando possível,
+    senão a própria sessão do primário (get_db, que os testes sobrescrevem).
+    Nada deve ser escrito por esta sessão.
+    """
+    replica = READ_ROUTER.open_replica_session(request.scope)
+    if replica is None:
+        yield db
+        return
+    try:
+        yield replica
+    finally:
+        started = time.perf_counter()
+        replica.close()
+        add_timing("db", time.perf_counter() - started)
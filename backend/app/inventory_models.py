@@ -2,7 +2,7 @@
 Shelter Inventory Management Models
 Tracks stock, entries, exits, and transactions for shelters
 """
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Boolean, Text, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Boolean, Text, JSON, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -124,6 +124,32 @@ class ShelterRequest(Base):
     deliveries = relationship("Delivery", secondary="shelter_request_deliveries", backref="shelter_requests")
     adjustments = relationship("RequestAdjustment", back_populates="request", cascade="all, delete-orphan")
 
+class OpenNeed(Base):
+    """
+    Materialized open need per shelter and category: the open ShelterRequests
+    of the pair, summed. Maintained by app.repositories.open_needs in the same
+    transaction as the requests; only pairs with something remaining have a row.
+    """
+    __tablename__ = "open_needs"
+
+    shelter_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    category_id = Column(Integer, ForeignKey("categories.id"), primary_key=True)
+
+    open_requests = Column(Integer, nullable=False)
+    quantity_requested = Column(Integer, nullable=False)
+    quantity_received = Column(Integer, nullable=False)
+    quantity_pending = Column(Integer, nullable=False)
+    quantity_remaining = Column(Integer, nullable=False)  # requested - received - pending, per request, >= 0
+    urgency = Column(Float, nullable=False)
+
+    oldest_request_at = Column(DateTime)
+    last_activity_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_open_needs_urgency", urgency.desc()),
+        Index("ix_open_needs_category_id", "category_id"),
+    )
+
 class RequestAdjustment(Base):
     """
     History of request quantity adjustments.
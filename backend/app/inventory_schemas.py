@@ -102,6 +102,21 @@ class ShelterRequestResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class OpenNeedResponse(BaseModel):
+    shelter_id: int
+    category_id: int
+    open_requests: int
+    quantity_requested: int
+    quantity_received: int
+    quantity_pending: int
+    quantity_remaining: int
+    urgency: float
+    oldest_request_at: Optional[datetime] = None
+    last_activity_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
 # ============================================================================
 # REQUEST ADJUSTMENT SCHEMAS
 # ============================================================================
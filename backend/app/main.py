@@ -2,36 +2,93 @@
 VouAjudar API - Generic Event-Driven Order System
 Version 2.0 - Refactored with generic models
 """
+from app.core.startup import STARTUP, ensure_schema
+
+from contextlib import asynccontextmanager
+import time
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
-from app.database import engine, Base
+from app.database import engine, Base, SessionLocal
 from app.routers import (
     auth,
-    users,
     batches,
     deliveries,
-    resources,
     locations,
-    product_config,
-    dashboard,
     categories,
-    admin_unified as admin,
-    inventory
+    inventory,
+    live,
+    matching,
+    me,
+    observability
 )
+from app.core.lazy_routers import add_lazy_router
+STARTUP.mark("routers")
 
 # Setup centralized logging
-from app.core.logging_config import setup_logging
+from app.core.logging_config import setup_logging, get_logger
 setup_logging(log_level="INFO", log_dir="logs")
+logger = get_logger(__name__)
+STARTUP.mark("logging")
+
+# SQL statement timing for /metrics (all engines, including test engines)
+from app.core.metrics import MetricsMiddleware
+from app.core.sql_instrumentation import install_sql_listeners
+install_sql_listeners()
+
+# Server-Timing breakdown (SERVER_TIMING_ENABLED): ORM hydration timer
+from app.core.server_timing import ServerTimingMiddleware, install_orm_timing
+install_orm_timing()
+
+# Per-table data versions (keys of the public payload cache)
+from app.core.data_versions import install_data_versions
+from app.core.invalidation import INVALIDATION_BUS
+install_data_versions(Base.metadata)
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Per-user state projection (/api/me/state), maintained from committed rows
+from app.repositories.user_state import install_user_state
+install_user_state(Base.metadata)
+
+# Materialized open needs (open_needs table), refreshed before each commit
+from app.repositories.open_needs import install_open_needs
+install_open_needs()
+# Volunteer matching index, patched from the committed open_needs pairs
+from app.services.matching import install_matching
+install_matching()
+# Automatic dispatch of AVAILABLE deliveries (rounds started in the lifespan)
+from app.services.dispatch import start_dispatcher
 
 # Register event handlers
 from app.core.events import get_event_bus, register_handlers
 register_handlers(get_event_bus())
 
+# Live map deltas (SSE, /api/live/map) from the domain events
+from app.services.map_updates import install_map_updates
+install_map_updates(get_event_bus())
+# Live shelter dashboards (WebSocket, /api/live/shelter) from the inventory hooks
+from app.services.shelter_updates import install_shelter_updates
+install_shelter_updates(get_event_bus())
+STARTUP.mark("instrumentation")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    STARTUP.mark("server")
+    # Tabelas: create_all só quando o banco não está no head do Alembic (SCHEMA_AUTO_CREATE)
+    schema = ensure_schema(engine, Base.metadata)
+    STARTUP.mark("schema")
+    # Invalidações de cache vindas dos outros workers (Redis / SQLite)
+    INVALIDATION_BUS.start()
+    # Despacho automático de entregas disponíveis (DISPATCH_ENABLED, em um worker só)
+    dispatcher = start_dispatcher(SessionLocal)
+    STARTUP.mark_ready()
+    logger.info("Startup complete", extra={"schema": schema, **STARTUP.report()})
+    yield
+    if dispatcher is not None:
+        dispatcher.cancel()
+    INVALIDATION_BUS.stop()
+
 app = FastAPI(
     title="VouAjudar - Generic Order Management System",
     description="""Event-driven API for managing donations, deliveries, and orders of any product type.
@@ -64,19 +121,20 @@ app = FastAPI(
     license_info={
         "name": "MIT",
         "url": "https://opensource.org/licenses/MIT"
-    }
+    },
+    lifespan=lifespan
 )
 
 # Exception handler for validation errors
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
-    print(f"❌ VALIDATION ERROR: {exc.errors()}")
+    logger.warning(f"Validation error on {request.method} {request.url.path}: {exc.errors()}")
     # Não tentar serializar body se for FormData
     try:
         body_str = str(exc.body)
     except:
         body_str = "FormData (not serializable)"
-    print(f"❌ BODY RECEIVED: {body_str}")
+    logger.debug(f"Body received: {body_str}")
     
     return JSONResponse(
         status_code=422,
@@ -103,31 +161,58 @@ app.add_middleware(
 # Adicionar middleware de logging
 @app.middleware("http")
 async def log_requests(request, call_next):
+    started = time.perf_counter()
     try:
         response = await call_next(request)
+        STARTUP.record_first_request(time.perf_counter() - started)
         return response
     except Exception as e:
-        print(f"❌ Erro na requisição {request.method} {request.url}: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Erro na requisição {request.method} {request.url}: {str(e)}")
         raise
 
-# Register routers
+# gzip/brotli (COMPRESSION_MIN_SIZE); inside the metrics so response sizes are wire sizes
+from app.core.compression import CompressionMiddleware
+app.add_middleware(CompressionMiddleware)
+
+# Metrics middleware (measures the full request)
+app.add_middleware(MetricsMiddleware)
+
+# N+1 detection: warns about statements repeated within a request (dev)
+from app.core.query_tracker import QueryTrackerMiddleware
+app.add_middleware(QueryTrackerMiddleware)
+
+# Server-Timing header (auth / db / orm / serialize / total)
+app.add_middleware(ServerTimingMiddleware)
+
+# On-demand profiler (admins only, X-Profile header / ?_profile=...)
+from app.core.profiler import ProfilerMiddleware
+app.add_middleware(ProfilerMiddleware)
+
+# Request context (outermost): correlation id for logs + X-Request-ID header
+from app.core.request_context import RequestContextMiddleware
+app.add_middleware(RequestContextMiddleware)
+
+# Register routers: hot paths (map, auth, deliveries) eagerly...
 app.include_router(auth.router)
-app.include_router(users.router)
 app.include_router(batches.router)
 app.include_router(deliveries.router)
-app.include_router(resources.router)
 app.include_router(locations.router)
-app.include_router(admin.router)  # Admin V2 Unificado
-app.include_router(product_config.router)
-app.include_router(dashboard.router)
 app.include_router(categories.router)
 app.include_router(inventory.router)
+app.include_router(live.router)
+app.include_router(matching.router)
+app.include_router(me.router)
+app.include_router(observability.router)
 
-# Import and register donations router
-from .routers import donations
-app.include_router(donations.router)
+# ...the rest on their first request (LAZY_ROUTERS)
+add_lazy_router(app, "app.routers.users", "/api/users")
+add_lazy_router(app, "app.routers.resources", "/api/resources")
+add_lazy_router(app, "app.routers.admin_unified", "/api/admin")  # Admin V2 Unificado
+add_lazy_router(app, "app.routers.product_config", "/api/product-config")
+add_lazy_router(app, "app.routers.dispatch", "/api/dispatch")
+add_lazy_router(app, "app.routers.dashboard", "/api/dashboard")
+add_lazy_router(app, "app.routers.donations", "/api/donations")
+STARTUP.mark("app")
 
 @app.get("/")
 def read_root():
@@ -2,7 +2,7 @@
 Generic Models for Event-Driven Order System
 Supports any type of product and transaction
 """
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Boolean, Text, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Boolean, Text, JSON, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -12,6 +12,7 @@ from app.shared.enums import (
     OrderStatus,
     BatchStatus,
     DeliveryStatus,
+    OfferStatus,
     UserRole,
     OrderEvent
 )
@@ -260,6 +261,37 @@ class Delivery(Base):
     volunteer = relationship("User", back_populates="deliveries", foreign_keys=[volunteer_id])
     category = relationship("Category", back_populates="deliveries")
 
+
+class DispatchOffer(Base):
+    """
+    An AVAILABLE delivery proposed by the dispatcher to one idle volunteer
+    (app.services.dispatch). While OFFERED, neither the delivery nor the
+    volunteer is offered again; accepting commits the offered quantity.
+    """
+    __tablename__ = "dispatch_offers"
+
+    id = Column(Integer, primary_key=True, index=True)
+    delivery_id = Column(Integer, ForeignKey("deliveries.id", ondelete="CASCADE"), nullable=False)
+    volunteer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    distance_km = Column(Float)
+    status = Column(Enum(OfferStatus), default=OfferStatus.OFFERED, nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+    responded_at = Column(DateTime)
+    # split created on accept; cancelling it keeps the accepted offer
+    committed_delivery_id = Column(Integer, ForeignKey("deliveries.id", ondelete="SET NULL"), nullable=True)
+
+    delivery = relationship("Delivery", foreign_keys=[delivery_id])
+    volunteer = relationship("User", foreign_keys=[volunteer_id])
+
+    __table_args__ = (
+        Index("ix_dispatch_offers_status_expires_at", "status", "expires_at"),
+        Index("ix_dispatch_offers_delivery_id", "delivery_id"),
+        Index("ix_dispatch_offers_volunteer_id", "volunteer_id"),
+    )
+
 # ============================================================================
 # INGREDIENT REQUEST & RESERVATION (Specific to ingredient donations)
 # ============================================================================
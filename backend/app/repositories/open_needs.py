@@ -0,0 +1,239 @@
+"""
+Open needs - the materialized `open_needs` table: one row per shelter and
+category that still needs something, behind GET /api/inventory/needs/public.
+
+    quantity_remaining   Σ max(0, requested − received − pending) over the
+                         pair's open requests (OPEN_REQUEST_STATUSES)
+    urgency              remaining / requested × (1 + log10(1 + remaining)):
+                         the uncovered share of the need, weighted by the
+                         size of the gap on a log scale
+
+The urgency does not depend on the clock, so a row only changes when its
+requests do (consumers that care about age use oldest_request_at /
+last_activity_at at read time).
+
+Maintenance is incremental and transactional: the Session hooks record the
+(shelter_id, category_id) pairs of every flushed ShelterRequest - before and
+after the change - and just before the transaction commits those pairs are
+re-aggregated from shelter_requests and their rows replaced, in the same
+transaction. That covers the inventory hooks (on_volunteer_committed,
+on_delivery_confirmed, on_delivery_cancelled), request creation, adjustment
+and cancellation, and the donation commitment service without a call in each
+of them. Bulk INSERT / UPDATE / DELETE statements on shelter_requests rebuild
+the whole table at commit.
+
+Once committed, the refreshed pairs are published on the invalidation bus
+(`open_needs` namespace, a JSON list of [shelter_id, category_id]; None
+after a full rebuild), so in-memory readers such as the matching index
+(app.services.matching) patch just those pairs in every worker.
+
+Writes outside the ORM (raw SQL, scripts, a restored backup) are not seen:
+`check_open_needs()` compares the table with a fresh aggregation, and with
+`repair=True` rebuilds it (POST /api/admin/open-needs/check?repair=true).
+"""
+import math
+from datetime import datetime
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import delete, event, inspect, insert, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.core.invalidation import INVALIDATION_BUS
+from app.inventory_models import OpenNeed, ShelterRequest
+from app.repositories import queries
+
+Key = Tuple[int, int]  # (shelter_id, category_id)
+
+NAMESPACE = "open_needs"
+
+_KEYS = "open_need_keys"
+_REBUILD = "open_need_rebuild"
+_REFRESHED = "open_need_refreshed"  # pairs rewritten in this transaction, or None (everything)
+# pairs per statement (bound parameters stay well under SQLite's limit)
+_CHUNK = 400
+_COMPARED = ("open_requests", "quantity_requested", "quantity_received", "quantity_pending",
+             "quantity_remaining", "urgency", "oldest_request_at", "last_activity_at")
+_SAMPLE = 20
+
+
+def urgency_score(requested: int, remaining: int) -> float:
+    if requested <= 0 or remaining <= 0:
+        return 0.0
+    return round(min(remaining / requested, 1.0) * (1 + math.log10(1 + remaining)), 4)
+
+
+def _rows(totals) -> List[Dict[str, Any]]:
+    """open_needs rows for aggregated request totals (pairs with nothing remaining have none)."""
+    rows = []
+    for total in totals:
+        remaining = int(total.quantity_remaining or 0)
+        if remaining <= 0:
+            continue
+        requested = int(total.quantity_requested or 0)
+        rows.append({
+            "shelter_id": total.shelter_id,
+            "category_id": total.category_id,
+            "open_requests": total.open_requests,
+            "quantity_requested": requested,
+            "quantity_received": int(total.quantity_received or 0),
+            "quantity_pending": int(total.quantity_pending or 0),
+            "quantity_remaining": remaining,
+            "urgency": urgency_score(requested, remaining),
+            "oldest_request_at": total.oldest_request_at,
+            "last_activity_at": total.last_activity_at,
+        })
+    return rows
+
+
+def _chunks(keys: List[Key]) -> Iterable[List[Key]]:
+    for start in range(0, len(keys), _CHUNK):
+        yield keys[start:start + _CHUNK]
+
+
+def refresh_open_needs(db: Session, keys: Optional[Iterable[Key]] = None) -> int:
+    """
+    Recompute the open_needs rows of `keys` (None = the whole table) from
+    shelter_requests, in `db`'s transaction. Returns the rows written.
+    """
+    no_sync = {"synchronize_session": False}
+    if keys is None:
+        db.info[_REFRESHED] = None
+        rows = _rows(db.execute(queries.open_need_totals()).all())
+        db.execute(delete(OpenNeed).execution_options(**no_sync))
+    else:
+        keys = sorted({key for key in keys if None not in key})
+        refreshed = db.info.get(_REFRESHED, set())
+        if refreshed is not None:
+            db.info[_REFRESHED] = refreshed | set(keys)
+        rows = []
+        for chunk in _chunks(keys):
+            rows.extend(_rows(db.execute(queries.open_need_totals(chunk)).all()))
+            db.execute(delete(OpenNeed)
+                       .where(tuple_(OpenNeed.shelter_id, OpenNeed.category_id).in_(chunk))
+                       .execution_options(**no_sync))
+    if rows:
+        db.execute(insert(OpenNeed), rows)
+    return len(rows)
+
+
+def rebuild_open_needs(db: Session) -> int:
+    """Replace the whole table (caller commits)."""
+    return refresh_open_needs(db)
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def check_open_needs(db: Session, repair: bool = False) -> Dict[str, Any]:
+    """
+    Compare open_needs with a fresh aggregation of shelter_requests: pairs
+    missing from the table, rows that should not be there and rows whose
+    values differ (a sample of each). `repair=True` rebuilds the table when
+    they disagree (caller commits).
+    """
+    expected = {(row["shelter_id"], row["category_id"]): row
+                for row in _rows(db.execute(queries.open_need_totals()).all())}
+    actual = {(need.shelter_id, need.category_id): need
+              for need in db.execute(select(OpenNeed)).scalars()}
+    missing = sorted(expected.keys() - actual.keys())
+    extra = sorted(actual.keys() - expected.keys())
+    stale = sorted(
+        key for key in expected.keys() & actual.keys()
+        if any(_plain(getattr(actual[key], name)) != _plain(expected[key][name]) for name in _COMPARED)
+    )
+    consistent = not (missing or extra or stale)
+    report = {
+        "consistent": consistent,
+        "rows": len(actual),
+        "expected_rows": len(expected),
+        "missing": len(missing),
+        "extra": len(extra),
+        "stale": len(stale),
+        "sample": {
+            "missing": [list(key) for key in missing[:_SAMPLE]],
+            "extra": [list(key) for key in extra[:_SAMPLE]],
+            "stale": [list(key) for key in stale[:_SAMPLE]],
+        },
+        "repaired": False,
+    }
+    if repair and not consistent:
+        for need in actual.values():
+            db.expunge(need)  # about to be replaced under them
+        rebuild_open_needs(db)
+        report["repaired"] = True
+    return report
+
+
+# ---- Session hooks ----
+
+def _record_flushed_requests(session, flush_context):
+    keys = None
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if not isinstance(obj, ShelterRequest):
+            continue
+        if keys is None:
+            keys = session.info.setdefault(_KEYS, set())
+        state = inspect(obj)
+        keys.add((state.dict.get("shelter_id"), state.dict.get("category_id")))
+        shelter_history = state.attrs.shelter_id.history
+        category_history = state.attrs.category_id.history
+        if shelter_history.deleted or category_history.deleted:
+            keys.add((
+                shelter_history.deleted[0] if shelter_history.deleted else state.dict.get("shelter_id"),
+                category_history.deleted[0] if category_history.deleted else state.dict.get("category_id"),
+            ))
+
+
+def _record_bulk_requests(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ is ShelterRequest:
+        orm_execute_state.session.info[_REBUILD] = True
+
+
+def _refresh_before_commit(session):
+    if session.new or session.dirty or session.deleted:
+        session.flush()  # the commit's own flush runs after this hook
+    rebuild = session.info.pop(_REBUILD, False)
+    keys = session.info.pop(_KEYS, None)
+    if rebuild:
+        refresh_open_needs(session)
+    elif keys:
+        refresh_open_needs(session, keys)
+
+
+def _publish_refreshed(session):
+    if _REFRESHED not in session.info:
+        return
+    refreshed = session.info.pop(_REFRESHED)
+    if refreshed is None:
+        INVALIDATION_BUS.publish(NAMESPACE, None)
+    elif refreshed:
+        INVALIDATION_BUS.publish(NAMESPACE, orjson.dumps(sorted(refreshed)).decode())
+
+
+def _forget_requests(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop(_KEYS, None)
+        session.info.pop(_REBUILD, None)
+        session.info.pop(_REFRESHED, None)
+
+
+_listeners_installed = False
+
+
+def install_open_needs():
+    """Attach the Session listeners. Idempotent."""
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    event.listen(Session, "after_flush", _record_flushed_requests)
+    event.listen(Session, "do_orm_execute", _record_bulk_requests)
+    event.listen(Session, "before_commit", _refresh_before_commit)
+    event.listen(Session, "after_commit", _publish_refreshed)
+    event.listen(Session, "after_soft_rollback", _forget_requests)
+    _listeners_installed = True
@@ -0,0 +1,266 @@
+"""
+Read statements shared by the sync repositories and the async read path.
+
+Each function returns a `select()` carrying the eager loading its response
+model needs, so the same statement runs on a sync Session
+(`db.execute(stmt)`) and on an AsyncSession (`await db.execute(stmt)`),
+where lazy loading is not available.
+
+List statements take an optional `fields` tree (`?fields=`, see
+`app.core.json_projection`): the eager loading is then replaced by
+`fieldset_options()`, which loads only the selected columns and joins only
+the selected relations.
+"""
+from typing import Optional
+
+from pydantic import BaseModel
+from sqlalchemy import Select, case, desc, exists, func, inspect, select, tuple_
+from sqlalchemy.orm import joinedload, load_only, selectinload
+
+from app.core.json_projection import FieldTree, nested_model
+from app.models import Category, Delivery, DeliveryLocation, DispatchOffer, ProductBatch, User
+from app.inventory_models import OpenNeed, ShelterRequest
+from app.inventory_schemas import ShelterRequestResponse
+from app.shared.enums import DeliveryStatus, OfferStatus
+from app.schemas import DeliveryLocationResponse, DeliveryResponse, UserResponse
+
+PUBLIC_REQUEST_STATUSES = ("pending", "partial", "active")
+# requests that still count towards a shelter's needs (user state, open needs)
+OPEN_REQUEST_STATUSES = frozenset({"pending", "active", "partial", "partially_completed"})
+
+
+def fieldset_options(entity, model: type[BaseModel], fields: Optional[FieldTree]) -> list:
+    """
+    Loader options for serializing `entity` rows as `model` restricted to
+    `fields` (None = every field of `model`): `load_only` on the selected
+    columns, joinedload (many-to-one) / selectinload (collections) on the
+    selected relations, recursively.
+    """
+    mapper = inspect(entity)
+    names = model.model_fields if fields is None else fields
+    columns = [getattr(entity, prop.key) for prop in mapper.column_attrs
+               if prop.key in names or any(column.primary_key for column in prop.columns)]
+    options = [load_only(*columns)]
+    for name in names:
+        relationship = mapper.relationships.get(name)
+        nested = nested_model(model.model_fields[name].annotation)
+        if relationship is None or nested is None:
+            continue
+        loader = selectinload if relationship.uselist else joinedload
+        nested_options = fieldset_options(relationship.mapper.class_, nested, None if fields is None else fields[name])
+        options.append(loader(getattr(entity, name)).options(*nested_options))
+    return options
+
+
+def user_by_email(email: str) -> Select:
+    return select(User).where(User.email == email).limit(1)
+
+
+def categories(active_only: bool = True) -> Select:
+    stmt = select(Category).options(selectinload(Category.attributes))
+    if active_only:
+        stmt = stmt.where(Category.active == True)
+    return stmt.order_by(Category.sort_order, Category.display_name)
+
+
+def approved_users(fields: Optional[FieldTree] = None) -> Select:
+    stmt = select(User).where(User.approved == True)
+    if fields is not None:
+        stmt = stmt.options(*fieldset_options(User, UserResponse, fields))
+    return stmt
+
+
+def locations(active_only: bool = True, city_id: Optional[str] = None,
+              fields: Optional[FieldTree] = None) -> Select:
+    stmt = select(DeliveryLocation)
+    if fields is not None:
+        stmt = stmt.options(*fieldset_options(DeliveryLocation, DeliveryLocationResponse, fields))
+    if active_only:
+        # Apenas locations aprovadas devem aparecer no mapa
+        stmt = stmt.where(DeliveryLocation.active == True, DeliveryLocation.approved == True)
+    if city_id:
+        stmt = stmt.where(DeliveryLocation.city_id == city_id)
+    return stmt.order_by(desc(DeliveryLocation.created_at))
+
+
+def public_shelter_requests(fields: Optional[FieldTree] = None) -> Select:
+    stmt = select(ShelterRequest)
+    if fields is not None:
+        stmt = stmt.options(*fieldset_options(ShelterRequest, ShelterRequestResponse, fields))
+    return (
+        stmt
+        .where(ShelterRequest.status.in_(PUBLIC_REQUEST_STATUSES))
+        .order_by(ShelterRequest.created_at.desc())
+    )
+
+
+def _delivery_response_options():
+    """Relations DeliveryResponse serializes, joined into the same query."""
+    return (
+        joinedload(Delivery.batch).joinedload(ProductBatch.provider),
+        joinedload(Delivery.volunteer),
+        joinedload(Delivery.category),
+    )
+
+
+def _delivery_fieldset_options(fields: FieldTree):
+    return fieldset_options(Delivery, DeliveryResponse, fields)
+
+
+def map_deliveries(fields: Optional[FieldTree] = None) -> Select:
+    if fields is None:
+        options = (
+            joinedload(Delivery.delivery_location).joinedload(DeliveryLocation.owner),
+            *_delivery_response_options(),
+        )
+    else:
+        options = _delivery_fieldset_options(fields)
+    return select(Delivery).options(*options).order_by(Delivery.created_at.desc())
+
+
+def volunteer_deliveries(volunteer_id: int, fields: Optional[FieldTree] = None) -> Select:
+    if fields is None:
+        options = (joinedload(Delivery.delivery_location), *_delivery_response_options())
+    else:
+        options = _delivery_fieldset_options(fields)
+    return (
+        select(Delivery)
+        .options(*options)
+        .where(Delivery.volunteer_id == volunteer_id)
+        .order_by(Delivery.created_at.desc())
+    )
+
+
+def available_deliveries(fields: Optional[FieldTree] = None) -> Select:
+    options = _delivery_response_options() if fields is None else _delivery_fieldset_options(fields)
+    return (
+        select(Delivery)
+        .options(*options)
+        .where(Delivery.status == DeliveryStatus.AVAILABLE, Delivery.volunteer_id.is_(None))
+        .order_by(Delivery.created_at.desc())
+    )
+
+
+def owned_location_ids(user_id: int) -> Select:
+    return select(DeliveryLocation.id).where(DeliveryLocation.user_id == user_id)
+
+
+def open_rows(entity, owner_column: str, owners, statuses, columns) -> Select:
+    """`entity` rows owned by `owners` in one of `statuses`, loading only `columns` (user state)."""
+    return (
+        select(entity)
+        .options(load_only(*(getattr(entity, name) for name in columns)))
+        .where(getattr(entity, owner_column).in_(list(owners)), entity.status.in_(list(statuses)))
+    )
+
+
+def open_need_totals(keys=None) -> Select:
+    """
+    Open ShelterRequests summed per (shelter_id, category_id) - the source of
+    the open_needs table. `keys` restricts it to those pairs (None = all).
+    """
+    remaining = (ShelterRequest.quantity_requested - func.coalesce(ShelterRequest.quantity_received, 0)
+                 - func.coalesce(ShelterRequest.quantity_pending, 0))
+    stmt = (
+        select(
+            ShelterRequest.shelter_id,
+            ShelterRequest.category_id,
+            func.count().label("open_requests"),
+            func.sum(ShelterRequest.quantity_requested).label("quantity_requested"),
+            func.sum(func.coalesce(ShelterRequest.quantity_received, 0)).label("quantity_received"),
+            func.sum(func.coalesce(ShelterRequest.quantity_pending, 0)).label("quantity_pending"),
+            func.sum(case((remaining > 0, remaining), else_=0)).label("quantity_remaining"),
+            func.min(ShelterRequest.created_at).label("oldest_request_at"),
+            func.max(func.coalesce(ShelterRequest.updated_at, ShelterRequest.created_at)).label("last_activity_at"),
+        )
+        .where(ShelterRequest.status.in_(sorted(OPEN_REQUEST_STATUSES)))
+        .group_by(ShelterRequest.shelter_id, ShelterRequest.category_id)
+    )
+    if keys is not None:
+        stmt = stmt.where(tuple_(ShelterRequest.shelter_id, ShelterRequest.category_id).in_(list(keys)))
+    return stmt
+
+
+def public_open_needs(shelter_id: Optional[int] = None, category_id: Optional[int] = None) -> Select:
+    """Open needs, most urgent first (one scan of ix_open_needs_urgency)."""
+    stmt = select(OpenNeed).order_by(OpenNeed.urgency.desc(), OpenNeed.shelter_id, OpenNeed.category_id)
+    if shelter_id is not None:
+        stmt = stmt.where(OpenNeed.shelter_id == shelter_id)
+    if category_id is not None:
+        stmt = stmt.where(OpenNeed.category_id == category_id)
+    return stmt
+
+
+def open_need_rows(keys=None) -> Select:
+    """open_needs rows, restricted to `keys` [(shelter_id, category_id)] (None = all) - matching index."""
+    stmt = select(OpenNeed)
+    if keys is not None:
+        stmt = stmt.where(tuple_(OpenNeed.shelter_id, OpenNeed.category_id).in_(list(keys)))
+    return stmt
+
+
+# ---- dispatcher (app.services.dispatch) ----
+
+def dispatchable_deliveries() -> Select:
+    """AVAILABLE deliveries with something left and no open offer, oldest first."""
+    offered = exists().where(DispatchOffer.delivery_id == Delivery.id, DispatchOffer.status == OfferStatus.OFFERED)
+    return (
+        select(Delivery)
+        .options(load_only(Delivery.id, Delivery.quantity, Delivery.category_id, Delivery.pickup_location_id,
+                           Delivery.delivery_location_id, Delivery.created_at))
+        .where(Delivery.status == DeliveryStatus.AVAILABLE, Delivery.volunteer_id.is_(None),
+               Delivery.quantity > 0, ~offered)
+        .order_by(Delivery.created_at, Delivery.id)
+    )
+
+
+def idle_volunteers(busy_statuses) -> Select:
+    """Approved, active volunteers with a position, no delivery in `busy_statuses` and no open offer."""
+    busy = exists().where(Delivery.volunteer_id == User.id, Delivery.status.in_(list(busy_statuses)))
+    offered = exists().where(DispatchOffer.volunteer_id == User.id, DispatchOffer.status == OfferStatus.OFFERED)
+    return (
+        select(User)
+        .options(load_only(User.id, User.roles, User.latitude, User.longitude, User.delivery_capacity,
+                           User.tipos_produtos))
+        .where(User.approved.is_(True), User.active.is_(True), User.roles.contains("volunteer"),
+               User.latitude.is_not(None), User.longitude.is_not(None), ~busy, ~offered)
+        .order_by(User.id)
+    )
+
+
+def lapsed_offers(now) -> Select:
+    """OFFERED offers past their deadline, or whose delivery is no longer AVAILABLE."""
+    gone = ~exists().where(Delivery.id == DispatchOffer.delivery_id, Delivery.status == DeliveryStatus.AVAILABLE,
+                           Delivery.volunteer_id.is_(None))
+    return (
+        select(DispatchOffer)
+        .where(DispatchOffer.status == OfferStatus.OFFERED, (DispatchOffer.expires_at <= now) | gone)
+        .order_by(DispatchOffer.id)
+    )
+
+
+def refused_offer_pairs(delivery_ids) -> Select:
+    """(delivery_id, volunteer_id) of declined / expired offers of `delivery_ids`."""
+    return (
+        select(DispatchOffer.delivery_id, DispatchOffer.volunteer_id)
+        .where(DispatchOffer.delivery_id.in_(list(delivery_ids)),
+               DispatchOffer.status.in_([OfferStatus.DECLINED, OfferStatus.EXPIRED]))
+    )
+
+
+def volunteer_offers(volunteer_id: int, statuses=(OfferStatus.OFFERED,)) -> Select:
+    return (
+        select(DispatchOffer)
+        .where(DispatchOffer.volunteer_id == volunteer_id, DispatchOffer.status.in_(list(statuses)))
+        .order_by(DispatchOffer.expires_at)
+    )
+
+
+def volunteer_route_deliveries(volunteer_id: int, statuses) -> Select:
+    return (
+        select(Delivery)
+        .options(load_only(Delivery.id, Delivery.status, Delivery.pickup_location_id,
+                           Delivery.delivery_location_id))
+        .where(Delivery.volunteer_id == volunteer_id, Delivery.status.in_(list(statuses)))
+        .order_by(Delivery.id)
+    )
@@ -0,0 +1,322 @@
+"""
+Reference data - in-process, versioned snapshot of categories, category
+attributes and delivery locations.
+
+These rows are read on almost every request (category lists, metadata
+validation, dashboards, delivery creation) and change rarely. Readers ask
+for the current snapshot and look rows up in memory:
+
+    refs = reference_data(db)                 # sync Session
+    refs = await reference_data_async(db)     # AsyncSession / SyncSessionAdapter
+    category = refs.category(category_id)
+    attributes = refs.attributes(category_id)
+
+Snapshots hold plain records (`CategoryRecord`, `AttributeRecord`,
+`LocationRecord`), never ORM instances, so they can be shared between
+sessions and threads; they are read-only. A missing snapshot is loaded
+with the caller's session.
+
+Invalidation:
+    commit hook     every committed ORM write to the three tables (admin and
+                    category routes, location approval, shelter sign-up...)
+                    bumps the generation through `DATA_VERSIONS.subscribe` -
+                    in every worker, since table bumps travel on the
+                    invalidation bus (`app.core.invalidation`)
+    explicit        `invalidate_reference_data()` for writes the ORM does not
+                    see (raw SQL, scripts); `POST /api/admin/reference-data/reload`
+                    reloads at once (hot reload). Both publish on the bus
+                    (`reference_data` namespace)
+    TTL             snapshots older than REFERENCE_DATA_TTL_SECONDS are reloaded
+
+A snapshot loaded by a session holding uncommitted writes to these tables
+is used for that call only, never published.
+
+Environment variables:
+    REFERENCE_DATA_TTL_SECONDS       max age of a snapshot (default 300)
+"""
+import copy
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import inspect
+
+from app.core.data_versions import DATA_VERSIONS, pending_tables
+from app.core.invalidation import INVALIDATION_BUS
+from app.core.metrics import RESPONSE_CACHE_LOOKUPS
+from app.repositories import queries
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_DATA_TTL_SECONDS = float(os.getenv("REFERENCE_DATA_TTL_SECONDS", "300"))
+
+REFERENCE_TABLES = frozenset({"categories", "category_attributes", "delivery_locations"})
+NAMESPACE = "reference_data"
+
+
+@dataclass(eq=False)
+class AttributeRecord:
+    id: int
+    category_id: int
+    name: str
+    display_name: str
+    attribute_type: str
+    required: bool
+    sort_order: int
+    options: Optional[List[Dict[str, str]]]
+    min_value: Optional[float]
+    max_value: Optional[float]
+    max_length: Optional[int]
+    active: bool
+    created_at: datetime
+
+
+@dataclass(eq=False)
+class CategoryRecord:
+    id: int
+    name: str
+    display_name: str
+    description: Optional[str]
+    icon: Optional[str]
+    color: Optional[str]
+    parent_id: Optional[int]
+    sort_order: int
+    active: bool
+    created_at: datetime
+    legacy_product_type: Optional[str]
+    attributes: List[AttributeRecord] = field(default_factory=list)
+    parent: Optional["CategoryRecord"] = None
+    children: List["CategoryRecord"] = field(default_factory=list)
+
+
+@dataclass(eq=False)
+class LocationRecord:
+    id: int
+    name: str
+    address: str
+    city_id: Optional[str]
+    latitude: Optional[float]
+    longitude: Optional[float]
+    contact_person: Optional[str]
+    phone: Optional[str]
+    capacity: Optional[int]
+    daily_need: Optional[int]
+    operating_hours: Optional[str]
+    active: bool
+    approved: bool
+    created_at: datetime
+    user_id: Optional[int]
+
+
+def _record(record_type, row):
+    """Copy the column values of an ORM row into `record_type` (JSON columns deep-copied)."""
+    columns = inspect(type(row)).column_attrs.keys()
+    values = {}
+    for spec in fields(record_type):
+        if spec.name in columns:
+            value = getattr(row, spec.name)
+            values[spec.name] = copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+    return record_type(**values)
+
+
+def _order_key(row):
+    return (row.sort_order or 0, row.display_name or "")
+
+
+class ReferenceSnapshot:
+    """Immutable view of the reference tables at one generation."""
+
+    def __init__(self, generation: int, categories, locations):
+        self.generation = generation
+        self.loaded_at = time.monotonic()
+        self._categories: Dict[int, CategoryRecord] = {}
+        for row in categories:
+            record = _record(CategoryRecord, row)
+            record.attributes = [_record(AttributeRecord, attr) for attr in sorted(row.attributes, key=lambda a: a.id)]
+            self._categories[record.id] = record
+        for record in sorted(self._categories.values(), key=lambda c: c.id):
+            parent = self._categories.get(record.parent_id) if record.parent_id else None
+            if parent is not None:
+                record.parent = parent
+                parent.children.append(record)
+        self._ordered = sorted(self._categories.values(), key=_order_key)
+        self._by_name = {c.name: c for c in self._categories.values()}
+        self._by_legacy_type: Dict[str, CategoryRecord] = {}
+        for record in sorted(self._categories.values(), key=lambda c: c.id):
+            if record.active and record.legacy_product_type:
+                self._by_legacy_type.setdefault(record.legacy_product_type, record)
+
+        self._locations: Dict[int, LocationRecord] = {}
+        self._location_by_user: Dict[int, LocationRecord] = {}
+        for row in sorted(locations, key=lambda l: l.id):
+            record = _record(LocationRecord, row)
+            self._locations[record.id] = record
+            if record.user_id is not None:
+                self._location_by_user.setdefault(record.user_id, record)
+
+    # ---- categories ----
+    def category(self, category_id: Optional[int]) -> Optional[CategoryRecord]:
+        return self._categories.get(category_id)
+
+    def category_by_name(self, name: str) -> Optional[CategoryRecord]:
+        return self._by_name.get(name)
+
+    def category_by_legacy_type(self, product_type: str) -> Optional[CategoryRecord]:
+        """Active category mapped to a legacy ProductType."""
+        return self._by_legacy_type.get(product_type)
+
+    def category_name(self, category_id: Optional[int], default: str = "Unknown") -> str:
+        category = self._categories.get(category_id)
+        return category.display_name if category else default
+
+    def categories(self, active_only: bool = True) -> List[CategoryRecord]:
+        """Ordered like `queries.categories` (sort_order, display_name)."""
+        if active_only:
+            return [c for c in self._ordered if c.active]
+        return list(self._ordered)
+
+    # ---- attributes ----
+    def attributes(self, category_id: int, active_only: bool = True) -> List[AttributeRecord]:
+        category = self._categories.get(category_id)
+        if category is None:
+            return []
+        attributes = [a for a in category.attributes if a.active or not active_only]
+        return sorted(attributes, key=_order_key)
+
+    def required_attributes(self, category_id: int) -> List[AttributeRecord]:
+        return [a for a in self.attributes(category_id) if a.required]
+
+    def attribute(self, category_id: int, name: str, active_only: bool = True) -> Optional[AttributeRecord]:
+        category = self._categories.get(category_id)
+        if category is None:
+            return None
+        for attribute in category.attributes:
+            if attribute.name == name and (attribute.active or not active_only):
+                return attribute
+        return None
+
+    # ---- locations ----
+    def location(self, location_id: Optional[int]) -> Optional[LocationRecord]:
+        return self._locations.get(location_id)
+
+    def locations(self) -> List[LocationRecord]:
+        """Every delivery location (active or not), by id."""
+        return list(self._locations.values())
+
+    def location_for_user(self, user_id: int) -> Optional[LocationRecord]:
+        """The (first) delivery location owned by `user_id`."""
+        return self._location_by_user.get(user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "generation": self.generation,
+            "age_seconds": round(time.monotonic() - self.loaded_at, 1),
+            "categories": len(self._categories),
+            "attributes": sum(len(c.attributes) for c in self._categories.values()),
+            "locations": len(self._locations),
+        }
+
+
+class ReferenceDataCache:
+    """Holds the current `ReferenceSnapshot` and decides when to reload it."""
+
+    def __init__(self, ttl: float = None):
+        self.ttl = REFERENCE_DATA_TTL_SECONDS if ttl is None else ttl
+        self._snapshot: Optional[ReferenceSnapshot] = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.invalidations = 0
+
+    # ---- invalidation ----
+    def invalidate(self, reason: Optional[str] = "explicit"):
+        """Drop this worker's snapshot (use `invalidate_reference_data()` for every worker)."""
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+        logger.debug("Reference data invalidated (%s), generation %d", reason, self._generation)
+
+    def on_tables_changed(self, tables: Optional[Set[str]]):
+        """`DATA_VERSIONS` subscriber: committed writes to the reference tables."""
+        if tables is None or tables & REFERENCE_TABLES:
+            self.invalidate("tables")
+
+    # ---- reads ----
+    def _current(self) -> Optional[ReferenceSnapshot]:
+        snapshot = self._snapshot
+        if (snapshot is None or snapshot.generation != self._generation
+                or time.monotonic() - snapshot.loaded_at > self.ttl):
+            return None
+        return snapshot
+
+    def _publish(self, session, snapshot: ReferenceSnapshot) -> ReferenceSnapshot:
+        if pending_tables(session) & REFERENCE_TABLES:
+            return snapshot  # sees uncommitted rows: this caller only
+        with self._lock:
+            if snapshot.generation == self._generation:
+                self._snapshot = snapshot
+                self.loads += 1
+        return snapshot
+
+    def get(self, db) -> ReferenceSnapshot:
+        """Current snapshot, loaded with the sync Session `db` when missing or stale."""
+        snapshot = self._current()
+        if snapshot is not None:
+            RESPONSE_CACHE_LOOKUPS.inc("reference_data", "hit")
+            return snapshot
+        with self._lock:
+            generation = self._generation
+        RESPONSE_CACHE_LOOKUPS.inc("reference_data", "miss")
+        categories = db.execute(queries.categories(active_only=False)).scalars().all()
+        locations = db.execute(queries.locations(active_only=False)).scalars().all()
+        return self._publish(db, ReferenceSnapshot(generation, categories, locations))
+
+    async def aget(self, db) -> ReferenceSnapshot:
+        """`get()` for an AsyncSession or SyncSessionAdapter."""
+        snapshot = self._current()
+        if snapshot is not None:
+            RESPONSE_CACHE_LOOKUPS.inc("reference_data", "hit")
+            return snapshot
+        with self._lock:
+            generation = self._generation
+        RESPONSE_CACHE_LOOKUPS.inc("reference_data", "miss")
+        categories = (await db.execute(queries.categories(active_only=False))).scalars().all()
+        locations = (await db.execute(queries.locations(active_only=False))).scalars().all()
+        return self._publish(db.sync_session, ReferenceSnapshot(generation, categories, locations))
+
+    def reload(self, db) -> ReferenceSnapshot:
+        """Hot reload: invalidate in every worker and load a fresh snapshot here now."""
+        INVALIDATION_BUS.publish(NAMESPACE, "reload")
+        return self.get(db)
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "generation": self._generation,
+            "loads": self.loads,
+            "invalidations": self.invalidations,
+            "ttl_seconds": self.ttl,
+            "snapshot": snapshot.stats() if snapshot is not None else None,
+        }
+
+
+REFERENCE_DATA = ReferenceDataCache()
+DATA_VERSIONS.subscribe(REFERENCE_DATA.on_tables_changed)
+INVALIDATION_BUS.subscribe(NAMESPACE, REFERENCE_DATA.invalidate)
+
+
+def reference_data(db) -> ReferenceSnapshot:
+    return REFERENCE_DATA.get(db)
+
+
+async def reference_data_async(db) -> ReferenceSnapshot:
+    return await REFERENCE_DATA.aget(db)
+
+
+def invalidate_reference_data(reason: str = "explicit"):
+    """Drop the snapshot in every worker."""
+    INVALIDATION_BUS.publish(NAMESPACE, reason)
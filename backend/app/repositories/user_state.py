@@ -0,0 +1,424 @@
+"""
+User state - per-user projection of everything "in progress" for one user,
+behind the long-poll GET /api/me/state.
+
+    deliveries     active deliveries the user volunteers for
+    incoming       active deliveries to the user's delivery locations (shelters)
+    requests       the shelter's open need requests
+    batches        the provider's open batches
+    reservations   the volunteer's open ingredient reservations
+
+A user's projection is loaded from the database on first read (one query
+per section, only the summary columns) and then maintained incrementally:
+the Session hooks record every flushed Delivery / ShelterRequest /
+ProductBatch / ResourceReservation row, and once the transaction commits
+each row is removed from / put back into the sections of the users that
+own it (before and after the change) - no query. Bulk UPDATE / DELETE on
+those tables, and changes of a location's owner, drop the affected
+projections instead; they are reloaded on the next read.
+
+The version is a checksum of the projection's content, so it is the same
+in every worker, and a client gets a new version exactly when something it
+sees changed. `wait()` holds a long-poll until the version differs from
+the client's or the timeout passes.
+
+Other workers learn about committed changes on the invalidation bus
+(`user_state` namespace: the affected user and location ids) and drop
+those projections, waking their long-polls.
+
+Environment variables:
+    USER_STATE_MAX_USERS         projections kept in memory per worker (default 10000)
+    USER_STATE_POLL_TIMEOUT      default long-poll wait in seconds (default 25)
+    USER_STATE_POLL_MAX_TIMEOUT  longest wait a client may ask for (default 55)
+"""
+import asyncio
+import enum
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+import orjson
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.invalidation import INVALIDATION_BUS
+from app.core.metrics import RESPONSE_CACHE_LOOKUPS
+from app.inventory_models import ShelterRequest
+from app.models import Delivery, DeliveryLocation, ProductBatch, ResourceReservation
+from app.repositories import queries
+from app.shared.enums import BatchStatus, DeliveryStatus, OrderStatus
+
+USER_STATE_MAX_USERS = int(os.getenv("USER_STATE_MAX_USERS", "10000"))
+USER_STATE_POLL_TIMEOUT = float(os.getenv("USER_STATE_POLL_TIMEOUT", "25"))
+USER_STATE_POLL_MAX_TIMEOUT = float(os.getenv("USER_STATE_POLL_MAX_TIMEOUT", "55"))
+
+NAMESPACE = "user_state"
+
+ACTIVE_DELIVERY_STATUSES = frozenset({
+    DeliveryStatus.PENDING_CONFIRMATION, DeliveryStatus.RESERVED, DeliveryStatus.PICKED_UP,
+    DeliveryStatus.IN_TRANSIT, DeliveryStatus.IN_PROGRESS,
+})
+OPEN_REQUEST_STATUSES = queries.OPEN_REQUEST_STATUSES
+OPEN_BATCH_STATUSES = frozenset({BatchStatus.PRODUCING, BatchStatus.READY, BatchStatus.IN_DELIVERY})
+OPEN_RESERVATION_STATUSES = frozenset(OrderStatus) - {
+    OrderStatus.IDLE, OrderStatus.COMPLETED, OrderStatus.CANCELLED, OrderStatus.EXPIRED,
+}
+
+_DELIVERY_FIELDS = ("id", "status", "quantity", "category_id", "product_type", "batch_id",
+                    "pickup_location_id", "delivery_location_id", "volunteer_id", "created_at", "expires_at")
+
+
+@dataclass(frozen=True)
+class Section:
+    name: str
+    model: type
+    owner: str                 # column holding the owner: a user id, or a location id (by_location)
+    statuses: FrozenSet[Any]   # open statuses
+    fields: Tuple[str, ...]    # summary columns
+    by_location: bool = False  # owner column is a delivery location of the user
+
+
+SECTIONS = (
+    Section("deliveries", Delivery, "volunteer_id", ACTIVE_DELIVERY_STATUSES, _DELIVERY_FIELDS),
+    Section("incoming", Delivery, "delivery_location_id", ACTIVE_DELIVERY_STATUSES, _DELIVERY_FIELDS,
+            by_location=True),
+    Section("requests", ShelterRequest, "shelter_id", OPEN_REQUEST_STATUSES,
+            ("id", "status", "category_id", "quantity_requested", "quantity_received", "quantity_pending",
+             "updated_at")),
+    Section("batches", ProductBatch, "provider_id", OPEN_BATCH_STATUSES,
+            ("id", "status", "product_type", "category_id", "quantity", "quantity_available", "expires_at")),
+    Section("reservations", ResourceReservation, "volunteer_id", OPEN_RESERVATION_STATUSES,
+            ("id", "status", "request_id", "estimated_delivery", "expires_at")),
+)
+_SECTIONS_BY_MODEL: Dict[type, List[Section]] = {}
+for _section in SECTIONS:
+    _SECTIONS_BY_MODEL.setdefault(_section.model, []).append(_section)
+_COLUMNS_BY_MODEL = {
+    model: tuple(dict.fromkeys(name for s in sections for name in (*s.fields, s.owner, "status")))
+    for model, sections in _SECTIONS_BY_MODEL.items()
+}
+
+_CHANGES = "user_state_changes"
+_BULK = "user_state_bulk"
+
+
+def _plain(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _summary(section: Section, values: Dict[str, Any]) -> Dict[str, Any]:
+    return {name: _plain(values[name]) for name in section.fields}
+
+
+class UserState:
+    """One user's sections ({row id: summary}) and their content version."""
+
+    __slots__ = ("user_id", "location_ids", "sections", "version")
+
+    def __init__(self, user_id: int, location_ids: Iterable[int], sections: Dict[str, Dict[int, dict]]):
+        self.user_id = user_id
+        self.location_ids = frozenset(location_ids)
+        self.sections = sections
+        self.version = self._checksum()
+
+    def _checksum(self) -> int:
+        return zlib.crc32(orjson.dumps(self.sections, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS))
+
+    def apply(self, section: Section, row_id: int, summary: Optional[dict]) -> bool:
+        """Put (or remove, summary=None) one row; True when the content changed."""
+        if self.sections[section.name].get(row_id) == summary:
+            return False
+        # Copy on write: readers on the event loop may be serializing the old dicts
+        rows = dict(self.sections[section.name])
+        if summary is None:
+            del rows[row_id]
+        else:
+            rows[row_id] = summary
+        self.sections = {**self.sections, section.name: rows}
+        self.version = self._checksum()
+        return True
+
+    def owns(self, section: Section, owner) -> bool:
+        return owner in self.location_ids if section.by_location else owner == self.user_id
+
+    def to_dict(self) -> Dict[str, Any]:
+        sections = self.sections
+        body: Dict[str, Any] = {"version": self.version, "changed": True, "user_id": self.user_id}
+        for name, rows in sections.items():
+            body[name] = [rows[row_id] for row_id in sorted(rows)]
+        body["counts"] = {name: len(rows) for name, rows in sections.items()}
+        return body
+
+
+class UserStateProjection:
+    """Loaded projections (LRU), the location -> owner index and the long-poll waiters."""
+
+    def __init__(self, max_users: int = None):
+        self.max_users = USER_STATE_MAX_USERS if max_users is None else max_users
+        self._states: "OrderedDict[int, UserState]" = OrderedDict()
+        self._location_owners: Dict[int, int] = {}
+        # Bumped for every user a commit may have touched: a load that raced with one is not kept
+        self._touched: Dict[int, int] = {}
+        self._epoch = 0
+        self._waiters: Dict[int, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.applied = 0
+
+    # ---- reads ----
+    async def aget(self, db, user_id: int) -> UserState:
+        """The user's projection, loaded with `db` (AsyncSession / SyncSessionAdapter) when missing."""
+        with self._lock:
+            state = self._states.get(user_id)
+            if state is not None:
+                self._states.move_to_end(user_id)
+        if state is not None:
+            RESPONSE_CACHE_LOOKUPS.inc("user_state", "hit")
+            return state
+        RESPONSE_CACHE_LOOKUPS.inc("user_state", "miss")
+
+        location_ids = (await db.execute(queries.owned_location_ids(user_id))).scalars().all()
+        with self._lock:
+            for location_id in location_ids:
+                self._location_owners[location_id] = user_id
+            touched, epoch = self._touched.get(user_id, 0), self._epoch
+        sections = {}
+        for section in SECTIONS:
+            owners = location_ids if section.by_location else [user_id]
+            rows = []
+            if owners:
+                statement = queries.open_rows(section.model, section.owner, owners, section.statuses,
+                                              _COLUMNS_BY_MODEL[section.model])
+                rows = (await db.execute(statement)).scalars().all()
+            sections[section.name] = {
+                row.id: _summary(section, {name: getattr(row, name) for name in section.fields}) for row in rows
+            }
+        state = UserState(user_id, location_ids, sections)
+        with self._lock:
+            if self._touched.get(user_id, 0) == touched and self._epoch == epoch:
+                self._states[user_id] = state
+                self.loads += 1
+                while len(self._states) > self.max_users:
+                    self._states.popitem(last=False)
+        return state
+
+    async def wait(self, db, user_id: int, version: int, timeout: float) -> UserState:
+        """Block until the user's version differs from `version` or `timeout` seconds pass."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        waiter = (loop, asyncio.Event())
+        with self._lock:
+            self._waiters.setdefault(user_id, set()).add(waiter)
+        try:
+            while True:
+                waiter[1].clear()
+                state = await self.aget(db, user_id)
+                remaining = deadline - loop.time()
+                if state.version != version or remaining <= 0:
+                    return state
+                await db.close()  # no pooled connection held while waiting
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(user_id)
+                if waiters is not None:
+                    waiters.discard(waiter)
+                    if not waiters:
+                        del self._waiters[user_id]
+
+    # ---- maintenance ----
+    def _owners_of(self, section: Section, owners: Set[Any]) -> Set[int]:
+        if not section.by_location:
+            return {owner for owner in owners if owner is not None}
+        return {self._location_owners[owner] for owner in owners if owner in self._location_owners}
+
+    def apply_changes(self, changes: Iterable[dict]) -> Tuple[Set[int], Set[int]]:
+        """Committed row changes -> (users touched, locations touched); wakes their waiters."""
+        users: Set[int] = set()
+        locations: Set[int] = set()
+        with self._lock:
+            for change in changes:
+                if change["model"] is DeliveryLocation:
+                    # Owner changed: drop old and new owners, reloaded with the right locations
+                    owners = {user for user in change["owners"] if user is not None}
+                    for user_id in owners:
+                        self._drop(user_id)
+                    self._location_owners.pop(change["id"], None)
+                    locations.add(change["id"])
+                    users |= owners
+                    continue
+                values = change["values"]
+                for section in _SECTIONS_BY_MODEL[change["model"]]:
+                    owners = {values[section.owner], *change["old"].get(section.owner, ())}
+                    if section.by_location:
+                        locations |= {owner for owner in owners if owner is not None}
+                    for user_id in self._owners_of(section, owners):
+                        users.add(user_id)
+                        state = self._states.get(user_id)
+                        if state is None:
+                            continue
+                        keep = (not change["deleted"] and values["status"] in section.statuses
+                                and state.owns(section, values[section.owner]))
+                        state.apply(section, change["id"], _summary(section, values) if keep else None)
+            for user_id in users:
+                self._touched[user_id] = self._touched.get(user_id, 0) + 1
+            self.applied += 1
+        self._wake(users)
+        return users, locations
+
+    def _drop(self, user_id: int):
+        self._states.pop(user_id, None)
+        self._touched[user_id] = self._touched.get(user_id, 0) + 1
+
+    def invalidate(self, users: Iterable[int] = (), locations: Iterable[int] = ()):
+        """Drop projections (changes committed elsewhere); reloaded on the next read."""
+        with self._lock:
+            affected = set(users) | {self._location_owners[l] for l in locations if l in self._location_owners}
+            for user_id in affected:
+                self._drop(user_id)
+        self._wake(affected)
+
+    def invalidate_all(self):
+        with self._lock:
+            self._states.clear()
+            self._epoch += 1
+            affected = set(self._waiters)
+        self._wake(affected)
+
+    def clear(self):
+        """Forget every projection, the location index and the counters (tests)."""
+        with self._lock:
+            self._states.clear()
+            self._location_owners.clear()
+            self._touched.clear()
+            self._epoch += 1  # loads in flight are not kept
+            self.loads = self.applied = 0
+            affected = set(self._waiters)
+        self._wake(affected)
+
+    def _wake(self, users: Iterable[int]):
+        with self._lock:
+            waiters = [waiter for user_id in users for waiter in self._waiters.get(user_id, ())]
+        for loop, waiter_event in waiters:
+            try:
+                loop.call_soon_threadsafe(waiter_event.set)
+            except RuntimeError:  # loop closed
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "users": len(self._states),
+            "max_users": self.max_users,
+            "waiting": sum(len(w) for w in self._waiters.values()),
+            "loads": self.loads,
+            "commits_applied": self.applied,
+        }
+
+
+USER_STATE = UserStateProjection()
+
+
+# ============================================================================
+# SESSION HOOKS
+# ============================================================================
+
+def _record_flushed_rows(session, flush_context):
+    changes = None
+    for obj, deleted in ([(o, False) for o in session.new] + [(o, False) for o in session.dirty]
+                         + [(o, True) for o in session.deleted]):
+        model = type(obj)
+        if model is DeliveryLocation:
+            history = inspect(obj).attrs.user_id.history
+            if not history.has_changes():
+                continue
+            owners = {*history.deleted, *history.added}
+            changes = session.info.setdefault(_CHANGES, {}) if changes is None else changes
+            previous = changes.get((model, obj.id))
+            changes[(model, obj.id)] = {"model": model, "id": obj.id,
+                                        "owners": owners | (previous["owners"] if previous else set())}
+            continue
+        if model not in _SECTIONS_BY_MODEL:
+            continue
+        state = inspect(obj)
+        old = {}
+        for section in _SECTIONS_BY_MODEL[model]:
+            history = state.attrs[section.owner].history
+            if history.deleted:
+                old.setdefault(section.owner, set()).update(history.deleted)
+        changes = session.info.setdefault(_CHANGES, {}) if changes is None else changes
+        previous = changes.get((model, obj.id))
+        if previous is not None:
+            for name, values in previous["old"].items():
+                old.setdefault(name, set()).update(values)
+        # A deleted row cannot be loaded any more: what the identity map has
+        loaded = state.dict if deleted else None
+        changes[(model, obj.id)] = {
+            "model": model, "id": obj.id, "deleted": deleted, "old": old,
+            "values": {name: loaded.get(name) if deleted else getattr(obj, name)
+                       for name in _COLUMNS_BY_MODEL[model]},
+        }
+
+
+def _record_bulk_writes(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and (mapper.class_ in _SECTIONS_BY_MODEL or mapper.class_ is DeliveryLocation):
+            orm_execute_state.session.info[_BULK] = True
+
+
+def _apply_committed_rows(session):
+    changes = session.info.pop(_CHANGES, None)
+    if session.info.pop(_BULK, False):
+        USER_STATE.invalidate_all()
+        INVALIDATION_BUS.publish(NAMESPACE, None, local=False)
+        return
+    if not changes:
+        return
+    users, locations = USER_STATE.apply_changes(changes.values())
+    if users or locations:
+        key = orjson.dumps({"users": sorted(users), "locations": sorted(locations)}).decode()
+        INVALIDATION_BUS.publish(NAMESPACE, key, local=False)
+
+
+def _forget_rows(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop(_CHANGES, None)
+        session.info.pop(_BULK, None)
+
+
+def _apply_remote(key: Optional[str]):
+    """Bus handler: rows committed by another worker (None = resync everything)."""
+    if key is None:
+        USER_STATE.invalidate_all()
+        return
+    touched = orjson.loads(key)
+    USER_STATE.invalidate(touched["users"], touched["locations"])
+
+
+_hooks_installed = False
+
+
+def install_user_state(metadata):
+    """Attach the Session and metadata hooks and the bus subscription. Idempotent."""
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    event.listen(metadata, "after_create", lambda *args, **kwargs: USER_STATE.invalidate_all())
+    event.listen(metadata, "after_drop", lambda *args, **kwargs: USER_STATE.invalidate_all())
+    event.listen(Session, "after_flush", _record_flushed_rows)
+    event.listen(Session, "do_orm_execute", _record_bulk_writes)
+    event.listen(Session, "after_commit", _apply_committed_rows)
+    event.listen(Session, "after_soft_rollback", _forget_rows)
+    INVALIDATION_BUS.subscribe(NAMESPACE, _apply_remote)
+    _hooks_installed = True
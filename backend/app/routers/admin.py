@@ -11,8 +11,10 @@ from app.models import User, DeliveryLocation
 from app.schemas import UserResponse, DeliveryLocationResponse
 from app.repositories import BaseRepository
 from app.shared.enums import UserRole
+from app.core.server_timing import ServerTimingRoute
+from app.core.events import LocationApproved, emit_after_commit
 
-router = APIRouter(prefix="/api/admin", tags=["admin"])
+router = APIRouter(prefix="/api/admin", tags=["admin"], route_class=ServerTimingRoute)
 
 @router.get("/users", response_model=List[UserResponse])
 def list_all_users(
@@ -240,6 +242,7 @@ def approve_location(
         raise HTTPException(status_code=404, detail="Location not found")
     
     updated = repo.update(location, approved=True)
+    emit_after_commit(db, LocationApproved(location.id, location.user_id, actor_id=current_user.id))
     repo.commit()
     repo.refresh(updated)
     return updated
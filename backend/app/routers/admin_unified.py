@@ -3,7 +3,7 @@ Admin Unified Router - Painel Administrativo Profissional
 Estrutura organizada e intuitiva para gestão do sistema
 """
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, load_only
 from sqlalchemy import func, and_, or_
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
@@ -17,8 +17,12 @@ from app.models import (
 from app.schemas import UserResponse, DeliveryLocationResponse
 from app.category_schemas import CategoryResponse, CategoryAttributeResponse
 from app.shared.enums import UserRole
+from app.core.server_timing import ServerTimingRoute
+from app.core.events import LocationApproved, emit_after_commit
+from app.repositories.reference_data import reference_data
+from app.repositories.open_needs import check_open_needs
 
-router = APIRouter(prefix="/api/admin", tags=["admin"])
+router = APIRouter(prefix="/api/admin", tags=["admin"], route_class=ServerTimingRoute)
 
 # ============================================================================
 # DASHBOARD & OVERVIEW
@@ -485,6 +489,7 @@ def approve_shelter(
         raise HTTPException(status_code=404, detail="Abrigo não encontrado")
     
     location.approved = True
+    emit_after_commit(db, LocationApproved(location.id, location.user_id, actor_id=current_user.id))
     
     # Aprovar usuário associado também se solicitado
     if approve_user_too and location.user_id:
@@ -755,13 +760,13 @@ def list_deliveries(
     current_user: User = Depends(require_admin)
 ):
     """Lista todos os pedidos/deliveries com filtros"""
-    query = db.query(Delivery)
+    query = db.query(Delivery).options(joinedload(Delivery.volunteer).options(load_only(User.id, User.name)))
     
     if status:
         query = query.filter(Delivery.status == status)
     
     if location_id:
-        query = query.filter(Delivery.location_id == location_id)
+        query = query.filter(Delivery.delivery_location_id == location_id)
     
     if category_id:
         query = query.filter(Delivery.category_id == category_id)
@@ -769,6 +774,7 @@ def list_deliveries(
     deliveries = query.order_by(Delivery.created_at.desc()).all()
     
     # Enriquecer com dados relacionados
+    refs = reference_data(db)
     enriched = []
     for delivery in deliveries:
         d_data = {
@@ -777,26 +783,26 @@ def list_deliveries(
             "quantity": delivery.quantity,
             "metadata_cache": delivery.metadata_cache,
             "created_at": delivery.created_at,
-            "location_id": delivery.location_id,
+            "location_id": delivery.delivery_location_id,
             "volunteer_id": delivery.volunteer_id,
             "category_id": delivery.category_id
         }
         
         # Buscar location
-        if delivery.location_id:
-            loc = db.query(DeliveryLocation).filter(DeliveryLocation.id == delivery.location_id).first()
+        if delivery.delivery_location_id:
+            loc = refs.location(delivery.delivery_location_id)
             if loc:
                 d_data["location"] = {"id": loc.id, "name": loc.name}
         
         # Buscar voluntário
         if delivery.volunteer_id:
-            vol = db.query(User).filter(User.id == delivery.volunteer_id).first()
+            vol = delivery.volunteer
             if vol:
                 d_data["volunteer"] = {"id": vol.id, "name": vol.name}
         
         # Buscar categoria
         if delivery.category_id:
-            cat = db.query(Category).filter(Category.id == delivery.category_id).first()
+            cat = refs.category(delivery.category_id)
             if cat:
                 d_data["category"] = {"id": cat.id, "display_name": cat.display_name, "icon": cat.icon}
         
@@ -895,3 +901,23 @@ def deactivate_location(
     db.refresh(location)
     
     return location
+
+
+# ============================================================================
+# MAINTENANCE - MANUTENÇÃO
+# ============================================================================
+
+@router.post("/open-needs/check")
+def check_open_needs_table(
+    repair: bool = Query(False, description="Reconstruir a tabela se houver divergência"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """
+    Compara a tabela materializada open_needs com os pedidos (shelter_requests).
+    Com repair=true, reconstrói a tabela quando encontra divergências.
+    """
+    report = check_open_needs(db, repair=repair)
+    if report["repaired"]:
+        db.commit()
+    return report
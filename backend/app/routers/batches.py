@@ -6,14 +6,15 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models import User, ProductBatch
 from app.shared.enums import BatchStatus, ProductType
 from app.schemas import ProductBatchCreate, ProductBatchResponse
 from app.auth import get_current_active_user, require_approved
 from app.shared.validators import ProductValidatorManager, ValidatorFactory
+from app.core.server_timing import ServerTimingRoute
 
-router = APIRouter(prefix="/api/batches", tags=["batches"])
+router = APIRouter(prefix="/api/batches", tags=["batches"], route_class=ServerTimingRoute)
 
 @router.get("/", response_model=List[ProductBatchResponse])
 def list_all_batches(
@@ -115,7 +116,7 @@ def list_my_batches(
 @router.get("/ready", response_model=List[ProductBatchResponse])
 def list_ready_batches(
     product_type: Optional[ProductType] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """List ready batches available for delivery"""
     
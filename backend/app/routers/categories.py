@@ -1,10 +1,11 @@
 """
 Router para gerenciamento de categorias e metadados
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.database import get_db
+from app.async_database import AsyncDB, get_async_db
 from app.models import Category, CategoryAttribute, ProductMetadata, ProductBatch
 from app.category_schemas import (
     CategoryCreate,
@@ -15,36 +16,40 @@ from app.category_schemas import (
     CategoryAttributeUpdate,
     CategoryAttributeResponse
 )
+from app.core.server_timing import ServerTimingRoute
+from app.core.json_projection import Projector
+from app.core.response_cache import PayloadCache
+from app.repositories.reference_data import reference_data, reference_data_async
 
-router = APIRouter(prefix="/api/categories", tags=["categories"])
+router = APIRouter(prefix="/api/categories", tags=["categories"], route_class=ServerTimingRoute)
+
+category_list = Projector(CategoryResponse)
+category_cache = PayloadCache("categories", tables=("categories", "category_attributes"))
 
 # ============================================================================
 # CATEGORY ENDPOINTS
 # ============================================================================
 
 @router.get("/", response_model=List[CategoryResponse])
-def list_categories(
+async def list_categories(
+    request: Request,
     active_only: bool = True,
     include_attributes: bool = True,
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
     """
     Lista todas as categorias.
     Por padrão retorna apenas categorias ativas e inclui atributos.
     """
-    query = db.query(Category)
-    
-    if active_only:
-        query = query.filter(Category.active == True)
-    
-    categories = query.order_by(Category.sort_order, Category.display_name).all()
-    
-    return categories
+    async def build():
+        refs = await reference_data_async(db)
+        return category_list.dumps(refs.categories(active_only))
+    return await category_cache.respond(request, build)
 
 @router.get("/{category_id}", response_model=CategoryWithHierarchy)
 def get_category(category_id: int, db: Session = Depends(get_db)):
     """Obtém detalhes de uma categoria específica com hierarquia"""
-    category = db.query(Category).filter(Category.id == category_id).first()
+    category = reference_data(db).category(category_id)
     
     if not category:
         raise HTTPException(
@@ -146,22 +151,16 @@ def list_category_attributes(
     db: Session = Depends(get_db)
 ):
     """Lista atributos de uma categoria"""
+    refs = reference_data(db)
     
     # Verificar se categoria existe
-    category = db.query(Category).filter(Category.id == category_id).first()
-    if not category:
+    if not refs.category(category_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Categoria {category_id} não encontrada"
         )
     
-    query = db.query(CategoryAttribute).filter(CategoryAttribute.category_id == category_id)
-    
-    if active_only:
-        query = query.filter(CategoryAttribute.active == True)
-    
-    attributes = query.order_by(CategoryAttribute.sort_order, CategoryAttribute.display_name).all()
-    return attributes
+    return refs.attributes(category_id, active_only)
 
 @router.post("/{category_id}/attributes", response_model=CategoryAttributeResponse, status_code=status.HTTP_201_CREATED)
 def create_category_attribute(
@@ -282,10 +281,7 @@ def get_category_by_legacy_type(product_type: str, db: Session = Depends(get_db)
     Útil para compatibilidade com código antigo.
     """
     
-    category = db.query(Category).filter(
-        Category.legacy_product_type == product_type,
-        Category.active == True
-    ).first()
+    category = reference_data(db).category_by_legacy_type(product_type)
     
     if not category:
         raise HTTPException(
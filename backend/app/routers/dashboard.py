@@ -13,8 +13,9 @@ from app.models import User, ProductBatch, Delivery, ResourceRequest, ResourceRe
 from app.schemas import UserResponse
 from app.dashboard_config import get_dashboard_config, get_widget_config, WidgetDataSource
 from app.shared.enums import BatchStatus, DeliveryStatus, OrderStatus, UserRole
+from app.core.server_timing import ServerTimingRoute
 
-router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
+router = APIRouter(prefix="/api/dashboard", tags=["dashboard"], route_class=ServerTimingRoute)
 
 def has_role(user: User, role: str) -> bool:
     """Check if user has a specific role"""
@@ -2,30 +2,52 @@
 Generic Deliveries Router
 Handles deliveries of any product type
 """
-from fastapi import APIRouter, Depends, HTTPException, Body
-from sqlalchemy.orm import Session, joinedload
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Request
+from sqlalchemy import exists
+from sqlalchemy.orm import Session
+from typing import List, Optional
 from datetime import datetime, timedelta
 from app.database import get_db
-from app.models import User, ProductBatch, Delivery, DeliveryLocation, Category
+from app.async_database import AsyncDB, get_async_db
+from app.models import User, ProductBatch, Delivery
 from app.shared.enums import DeliveryStatus, BatchStatus, ProductType
 from app.schemas import DeliveryCreate, DirectDeliveryCreate, DeliveryResponse
-from app.auth import get_current_active_user, require_approved
+from app.auth import get_current_active_user, get_current_active_user_async, require_approved
+from app.repositories import queries
+from app.repositories.reference_data import reference_data, reference_data_async
 from app.shared.validators import ProductValidatorManagerCodeValidator, StatusTransitionValidator, ConfirmationCodeValidator
 from app.services.inventory_service import (
-    on_delivery_created, on_volunteer_committed,
+    on_delivery_created,
     on_delivery_confirmed, on_delivery_cancelled
 )
+from app.services.dispatch import commit_available_delivery
+from app.services.routing import ROUTE_MAX_TIME_BUDGET_MS, ROUTED_STATUSES, plan_volunteer_route
+from app.core.logging_config import get_logger
+from app.core.server_timing import ServerTimingRoute
+from app.core.json_projection import Projector
+from app.core.response_cache import PayloadCache
 
-router = APIRouter(prefix="/api/deliveries", tags=["deliveries"])
+logger = get_logger(__name__)
+
+router = APIRouter(prefix="/api/deliveries", tags=["deliveries"], route_class=ServerTimingRoute)
+
+delivery_list = Projector(DeliveryResponse)
+map_cache = PayloadCache(
+    "deliveries",
+    tables=("deliveries", "delivery_locations", "users", "product_batches", "categories", "category_attributes"),
+)
 
 @router.get("/", response_model=List[DeliveryResponse])
-def list_all_deliveries(db: Session = Depends(get_db)):
-    """List all deliveries for map view"""
-    return db.query(Delivery)\
-        .options(joinedload(Delivery.delivery_location).joinedload(DeliveryLocation.owner))\
-        .options(joinedload(Delivery.category))\
-        .order_by(Delivery.created_at.desc()).all()
+async def list_all_deliveries(
+    request: Request,
+    fields=Depends(delivery_list.fieldset),
+    db: AsyncDB = Depends(get_async_db)
+):
+    """List all deliveries for map view (`?fields=id,status,category.name` for a sparse payload)"""
+    async def build():
+        result = await db.execute(queries.map_deliveries(fields))
+        return delivery_list.dumps(result.scalars().all(), fields)
+    return await map_cache.respond(request, build)
 
 @router.get("/shelter", response_model=List[DeliveryResponse])
 def list_shelter_deliveries(
@@ -130,7 +152,7 @@ def create_delivery(
         raise HTTPException(status_code=400, detail="Batch has expired")
     
     # Verify location exists
-    location = db.query(DeliveryLocation).filter(DeliveryLocation.id == delivery.location_id).first()
+    location = reference_data(db).location(delivery.location_id)
     if not location or not location.active:
         raise HTTPException(status_code=404, detail="Delivery location not found or inactive")
     
@@ -175,23 +197,22 @@ def create_direct_delivery(
     """Shelter creates direct delivery request (no batch)"""
     
     # Buscar a DeliveryLocation associada ao usuário
-    location = db.query(DeliveryLocation).filter(
-        DeliveryLocation.user_id == current_user.id
-    ).first()
+    refs = reference_data(db)
+    location = refs.location_for_user(current_user.id)
     
     if not location:
-        print(f"❌ ERROR: No DeliveryLocation found for user_id={current_user.id}")
+        logger.warning(f"No DeliveryLocation found for user_id={current_user.id}")
         raise HTTPException(status_code=404, detail="No delivery location found for this user")
     
-    print(f"🔍 DEBUG: Usando delivery_location_id={location.id} para user_id={current_user.id}")
+    logger.debug(f"Usando delivery_location_id={location.id} para user_id={current_user.id}")
     
     # Verify category exists
-    category = db.query(Category).filter(Category.id == delivery.category_id).first()
+    category = refs.category(delivery.category_id)
     if not category:
-        print(f"❌ ERROR: Category not found. category_id={delivery.category_id}")
+        logger.warning(f"Category not found. category_id={delivery.category_id}")
         raise HTTPException(status_code=404, detail="Category not found")
     
-    print(f"✅ SUCCESS: Creating delivery for category {category.display_name}")
+    logger.debug(f"Creating delivery for category {category.display_name}")
     
     # Create direct delivery (no batch_id)
     new_delivery = Delivery(
@@ -213,7 +234,7 @@ def create_direct_delivery(
     
     db.commit()
     db.refresh(new_delivery)
-    print(f"✅ SUCCESS: Delivery created with id={new_delivery.id}")
+    logger.debug(f"Delivery created with id={new_delivery.id}")
     return new_delivery
 
 @router.post("/{delivery_id}/confirm-pickup", response_model=DeliveryResponse)
@@ -295,14 +316,14 @@ def confirm_delivery(
         raise HTTPException(status_code=422, detail="Invalid delivery code")
     
     # Mark as delivered
-    print(f"🔍 DEBUG confirm_delivery: Delivery {delivery_id} - Status antes: {delivery.status}")
-    print(f"🔍 DEBUG confirm_delivery: User {current_user.id} - Code {code}")
-    print(f"🔍 DEBUG confirm_delivery: Delivery code esperado: {delivery.delivery_code}")
+    logger.debug(f"confirm_delivery: Delivery {delivery_id} - Status antes: {delivery.status}")
+    logger.debug(f"confirm_delivery: User {current_user.id} - Code {code}")
+    logger.debug(f"confirm_delivery: Delivery code esperado: {delivery.delivery_code}")
     
     delivery.status = DeliveryStatus.DELIVERED
     delivery.delivered_at = datetime.utcnow()
     
-    print(f"✅ DEBUG confirm_delivery: Delivery {delivery_id} marcado como DELIVERED")
+    logger.debug(f"confirm_delivery: Delivery {delivery_id} marcado como DELIVERED")
     
     # Hook: notify inventory service — add to shelter stock
     on_delivery_confirmed(db, delivery, current_user.id)
@@ -311,10 +332,12 @@ def confirm_delivery(
     if delivery.batch_id:
         batch = delivery.batch
         if batch:
-            all_delivered = all(
-                d.status == DeliveryStatus.DELIVERED
-                for d in batch.deliveries
-            )
+            # One EXISTS instead of loading every delivery of the batch
+            all_delivered = not db.query(exists().where(
+                Delivery.batch_id == batch.id,
+                Delivery.id != delivery.id,
+                Delivery.status != DeliveryStatus.DELIVERED
+            )).scalar()
             if all_delivered:
                 batch.status = BatchStatus.COMPLETED
     
@@ -323,38 +346,46 @@ def confirm_delivery(
     return delivery
 
 @router.get("/my-deliveries", response_model=List[DeliveryResponse])
-def list_my_deliveries(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+async def list_my_deliveries(
+    fields=Depends(delivery_list.fieldset),
+    db: AsyncDB = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async)
 ):
     """List deliveries for current volunteer"""
-    print(f"🔍 DEBUG /my-deliveries: Buscando deliveries para user_id={current_user.id}")
+    logger.debug(f"/my-deliveries: Buscando deliveries para user_id={current_user.id}")
     
-    deliveries = db.query(Delivery).options(
-        joinedload(Delivery.category),
-        joinedload(Delivery.delivery_location),
-        joinedload(Delivery.volunteer)
-    ).filter(
-        Delivery.volunteer_id == current_user.id
-    ).order_by(Delivery.created_at.desc()).all()
+    result = await db.execute(queries.volunteer_deliveries(current_user.id, fields))
+    deliveries = result.scalars().all()
     
-    print(f"📦 DEBUG /my-deliveries: Encontradas {len(deliveries)} deliveries")
-    for d in deliveries:
-        print(f"  Delivery {d.id}: category_id={d.category_id}, category={d.category}")
-        if d.category:
-            print(f"    Category: id={d.category.id}, name={d.category.name}, display_name={d.category.display_name}")
-        else:
-            print(f"    Category: NULL - joinedload não funcionou ou category_id é NULL")
+    logger.debug(f"/my-deliveries: Encontradas {len(deliveries)} deliveries")
     
-    return deliveries
+    return delivery_list.response(deliveries, fields)
+
+@router.get("/my-route")
+async def my_route(
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lng: Optional[float] = Query(None, ge=-180, le=180),
+    budget_ms: Optional[float] = Query(None, gt=0, le=ROUTE_MAX_TIME_BUDGET_MS),
+    db: AsyncDB = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async)
+):
+    """
+    One ordered route through the current volunteer's active deliveries
+    (pickups before their drop-offs) with the estimated distance.
+    Starts from `lat` / `lng`, or the position in the profile.
+    """
+    result = await db.execute(queries.volunteer_route_deliveries(current_user.id, ROUTED_STATUSES))
+    refs = await reference_data_async(db)
+    latitude = lat if lat is not None else current_user.latitude
+    longitude = lng if lng is not None else current_user.longitude
+    route = plan_volunteer_route(result.scalars().all(), refs, latitude, longitude, budget_ms)
+    return route.to_dict(refs)
 
 @router.get("/available", response_model=List[DeliveryResponse])
-def list_available_deliveries(db: Session = Depends(get_db)):
+def list_available_deliveries(fields=Depends(delivery_list.fieldset), db: Session = Depends(get_db)):
     """List available deliveries waiting for volunteers"""
-    return db.query(Delivery).filter(
-        Delivery.status == DeliveryStatus.AVAILABLE,
-        Delivery.volunteer_id.is_(None)
-    ).order_by(Delivery.created_at.desc()).all()
+    deliveries = db.execute(queries.available_deliveries(fields)).scalars().all()
+    return delivery_list.response(deliveries, fields)
 
 @router.post("/{delivery_id}/commit", response_model=DeliveryResponse)
 def commit_to_delivery(
@@ -369,19 +400,14 @@ def commit_to_delivery(
         raise HTTPException(status_code=403, detail="Only volunteers can commit to deliveries")
     
     # Check if volunteer already has active delivery (com lógica mais flexível)
-    print(f"🔍 DEBUG: Verificando entregas ativas para volunteer_id={current_user.id}")
-    
-    all_user_deliveries = db.query(Delivery).filter(Delivery.volunteer_id == current_user.id).all()
-    print(f"📋 Todas as entregas do usuário: {len(all_user_deliveries)}")
-    for d in all_user_deliveries:
-        print(f"  - Delivery {d.id}: status={d.status}, created_at={d.created_at}")
+    logger.debug(f"Verificando entregas ativas para volunteer_id={current_user.id}")
     
     active_deliveries = db.query(Delivery).filter(
         Delivery.volunteer_id == current_user.id,
         Delivery.status.in_([DeliveryStatus.PENDING_CONFIRMATION, DeliveryStatus.RESERVED, DeliveryStatus.PICKED_UP, DeliveryStatus.IN_TRANSIT])
     ).all()
     
-    print(f"🎯 Entregas ativas encontradas: {len(active_deliveries)}")
+    logger.debug(f"Entregas ativas encontradas: {len(active_deliveries)}")
     
     # Lógica flexível: permitir múltiplas entregas se foram criadas recentemente (mesmo compromisso)
     if active_deliveries:
@@ -391,20 +417,20 @@ def commit_to_delivery(
         recent_deliveries = [d for d in active_deliveries if d.created_at > thirty_seconds_ago]
         old_deliveries = [d for d in active_deliveries if d.created_at <= thirty_seconds_ago]
         
-        print(f"📅 Entregas recentes (<30s): {len(recent_deliveries)}")
-        print(f"📅 Entregas antigas (>30s): {len(old_deliveries)}")
+        logger.debug(f"Entregas recentes (<30s): {len(recent_deliveries)}")
+        logger.debug(f"Entregas antigas (>30s): {len(old_deliveries)}")
         
         if old_deliveries:
-            print(f"❌ Usuário tem entrega antiga ativa: {old_deliveries[0].id}, status={old_deliveries[0].status}")
+            logger.debug(f"Usuário tem entrega antiga ativa: {old_deliveries[0].id}, status={old_deliveries[0].status}")
             raise HTTPException(
                 status_code=400,
                 detail="You already have an active delivery. Complete or cancel it first."
             )
         
         if recent_deliveries:
-            print(f"✅ Permitindo múltiplas entregas (criadas recentemente): {[d.id for d in recent_deliveries]}")
+            logger.debug(f"Permitindo múltiplas entregas (criadas recentemente): {[d.id for d in recent_deliveries]}")
     
-    print(f"✅ Usuário pode criar nova entrega")
+    logger.debug(f"Usuário pode criar nova entrega")
     
     # Get the delivery
     delivery = db.query(Delivery).filter(Delivery.id == delivery_id).first()
@@ -420,8 +446,8 @@ def commit_to_delivery(
     # Get quantity to commit (partial or full)
     quantity_to_commit = request.get("quantity", delivery.quantity)
     
-    print(f"🔍 DEBUG: Delivery ID={delivery.id}, original_quantity={delivery.quantity}, requested_quantity={quantity_to_commit}")
-    print(f"🔍 DEBUG: Delivery original - category_id={delivery.category_id}, product_type={delivery.product_type}")
+    logger.debug(f"Delivery ID={delivery.id}, original_quantity={delivery.quantity}, requested_quantity={quantity_to_commit}")
+    logger.debug(f"Delivery original - category_id={delivery.category_id}, product_type={delivery.product_type}")
     
     if quantity_to_commit <= 0 or quantity_to_commit > delivery.quantity:
         raise HTTPException(
@@ -438,47 +464,13 @@ def commit_to_delivery(
     
     # Always create split delivery for proper tracking and cancellation
     # This ensures we can restore quantities correctly when cancelled
-    print(f"🔍 DEBUG: Creating split delivery - original: {delivery.quantity}, committed: {quantity_to_commit}")
-    
-    # Reduce batch available quantity TEMPORARILY (until confirmation) - only if batch exists
-    if batch:
-        batch.quantity_available -= quantity_to_commit
-    
-    # Create new delivery for the committed portion
-    committed_delivery = Delivery(
-        batch_id=delivery.batch_id,
-        delivery_location_id=delivery.delivery_location_id,
-        volunteer_id=current_user.id,
-        parent_delivery_id=delivery.id,  # Track the original delivery
-        product_type=delivery.product_type,
-        category_id=delivery.category_id,  # Preservar categoria!
-        quantity=quantity_to_commit,
-        status=DeliveryStatus.PENDING_CONFIRMATION,
-        accepted_at=datetime.utcnow(),
-        expires_at=datetime.utcnow() + timedelta(hours=24),
-        pickup_code=ConfirmationCodeValidator.generate_code(),
-        delivery_code=ConfirmationCodeValidator.generate_code()
-    )
-    
-    # Reduce original delivery quantity
-    delivery.quantity -= quantity_to_commit
-    
-    # Keep original delivery even with 0 quantity to allow restoration
-    # This ensures we can restore the quantity when cancelled
-    if delivery.quantity == 0:
-        print(f"� Original delivery {delivery.id} has 0 quantity, keeping for restoration")
-        # Don't delete - keep it for potential restoration
-    
-    db.add(committed_delivery)
-    db.flush()
-    
-    # Hook: notify inventory service about volunteer commitment
-    on_volunteer_committed(db, committed_delivery, quantity_to_commit)
+    logger.debug(f"Creating split delivery - original: {delivery.quantity}, committed: {quantity_to_commit}")
+    committed_delivery = commit_available_delivery(db, delivery, current_user.id, quantity_to_commit)
     
     db.commit()
     db.refresh(committed_delivery)
     
-    print(f"✅ DEBUG: Nova delivery criada - id={committed_delivery.id}, category_id={committed_delivery.category_id}, product_type={committed_delivery.product_type}")
+    logger.debug(f"Nova delivery criada - id={committed_delivery.id}, category_id={committed_delivery.category_id}, product_type={committed_delivery.product_type}")
     
     return committed_delivery
 
@@ -490,13 +482,13 @@ def validate_delivery_code(
     current_user: User = Depends(get_current_active_user)
 ):
     """Volunteer validates delivery at destination (both FLUXO 1 and FLUXO 2)"""
-    print(f"🎯 DEBUG: Validando delivery_id={delivery_id}, user_id={current_user.id}")
+    logger.debug(f"Validando delivery_id={delivery_id}, user_id={current_user.id}")
     
     delivery = db.query(Delivery).filter(Delivery.id == delivery_id).first()
     if not delivery:
         raise HTTPException(status_code=404, detail="Delivery not found")
     
-    print(f"📋 DEBUG: Delivery encontrado - status={delivery.status}, volunteer_id={delivery.volunteer_id}")
+    logger.debug(f"Delivery encontrado - status={delivery.status}, volunteer_id={delivery.volunteer_id}")
     
     # Check if user is the volunteer
     if delivery.volunteer_id != current_user.id:
@@ -505,7 +497,7 @@ def validate_delivery_code(
     # Check status - FLUXO 1 (direct): PENDING_CONFIRMATION, FLUXO 2 (pickup): PICKED_UP
     valid_statuses = [DeliveryStatus.PENDING_CONFIRMATION, DeliveryStatus.PICKED_UP]
     if delivery.status not in valid_statuses:
-        print(f"❌ DEBUG: Status inválido! Precisa: {valid_statuses}, Atual: {delivery.status}")
+        logger.debug(f"Status inválido! Precisa: {valid_statuses}, Atual: {delivery.status}")
         raise HTTPException(
             status_code=400, 
             detail=f"Delivery must be PENDING_CONFIRMATION or PICKED_UP. Current: {delivery.status}"
@@ -527,30 +519,30 @@ def validate_delivery_code(
         expected_code = delivery.pickup_code if delivery.status == DeliveryStatus.PENDING_CONFIRMATION else delivery.delivery_code
         code_type = "pickup_code" if delivery.status == DeliveryStatus.PENDING_CONFIRMATION else "delivery_code"
     
-    print(f"🔑 DEBUG: Código recebido={code}, código esperado={expected_code} (tipo: {code_type})")
+    logger.debug(f"Código recebido={code}, código esperado={expected_code} (tipo: {code_type})")
     
     if not code or expected_code != code:
-        print(f"❌ DEBUG: Código inválido!")
+        logger.debug(f"Código inválido!")
         raise HTTPException(status_code=400, detail="Código inválido!")
     
     # Update status
-    print(f"🔄 DEBUG: Atualizando status para DELIVERED")
+    logger.debug(f"Atualizando status para DELIVERED")
     delivery.status = DeliveryStatus.DELIVERED
     delivery.delivered_at = datetime.utcnow()
     
     # CRITICAL FIX: Only call on_delivery_confirmed for direct donations (FLUXO 1)
     # For batch deliveries (FLUXO 2), this should only be called by /confirm-delivery
     if is_direct_donation:
-        print(f"🏪 DEBUG: Doação direta - chamando on_delivery_confirmed")
+        logger.debug(f"Doação direta - chamando on_delivery_confirmed")
         # Hook: notify inventory service — add to shelter stock
         on_delivery_confirmed(db, delivery, current_user.id)
     else:
-        print(f"🚚 DEBUG: Entrega com batch - NÃO chamar on_delivery_confirmed (será chamado pelo /confirm-delivery)")
+        logger.debug(f"Entrega com batch - NÃO chamar on_delivery_confirmed (será chamado pelo /confirm-delivery)")
     
     db.commit()
     db.refresh(delivery)
     
-    print(f"✅ DEBUG: Delivery finalizado com sucesso! Novo status={delivery.status}")
+    logger.debug(f"Delivery finalizado com sucesso! Novo status={delivery.status}")
     return delivery
 
 @router.delete("/{delivery_id}")
@@ -561,15 +553,15 @@ def cancel_delivery(
 ):
     """Cancel a delivery - only allowed before pickup"""
     try:
-        print(f"🚀 START CANCEL: Delivery {delivery_id} by User {current_user.id}")
+        logger.debug(f"START CANCEL: Delivery {delivery_id} by User {current_user.id}")
         
         delivery = db.query(Delivery).filter(Delivery.id == delivery_id).first()
         if not delivery:
-            print(f"❌ CANCEL ERROR: Delivery {delivery_id} not found")
+            logger.warning(f"CANCEL ERROR: Delivery {delivery_id} not found")
             raise HTTPException(status_code=404, detail="Delivery not found")
         
-        print(f"🔍 DEBUG CANCEL: Delivery ID={delivery_id}, status={delivery.status}, volunteer_id={delivery.volunteer_id}")
-        print(f"🔍 DEBUG CANCEL: User ID={current_user.id}, User roles={current_user.roles}")
+        logger.debug(f"CANCEL: Delivery ID={delivery_id}, status={delivery.status}, volunteer_id={delivery.volunteer_id}")
+        logger.debug(f"CANCEL: User ID={current_user.id}, User roles={current_user.roles}")
         
         # Check authorization - allow multiple user types to cancel
         can_cancel = False
@@ -579,7 +571,7 @@ def cancel_delivery(
         if delivery.volunteer_id == current_user.id:
             can_cancel = True
             cancel_reason = "volunteer_own_delivery"
-            print(f"✅ DEBUG CANCEL: Volunteer {current_user.id} can cancel own delivery {delivery_id}")
+            logger.debug(f"CANCEL: Volunteer {current_user.id} can cancel own delivery {delivery_id}")
         
         # 2. Provider can cancel their batch deliveries
         elif delivery.batch_id:
@@ -587,45 +579,45 @@ def cancel_delivery(
             if batch and batch.provider_id == current_user.id:
                 can_cancel = True
                 cancel_reason = "provider_batch_delivery"
-                print(f"✅ DEBUG CANCEL: Provider {current_user.id} can cancel batch delivery {delivery_id}")
+                logger.debug(f"CANCEL: Provider {current_user.id} can cancel batch delivery {delivery_id}")
         
         # 3. Shelter can cancel deliveries to their location
         else:
-            print(f"🔍 DEBUG CANCEL: Checking shelter permissions for delivery {delivery_id}")
-            print(f"🔍 DEBUG CANCEL: delivery.delivery_location_id={delivery.delivery_location_id}")
+            logger.debug(f"CANCEL: Checking shelter permissions for delivery {delivery_id}")
+            logger.debug(f"CANCEL: delivery.delivery_location_id={delivery.delivery_location_id}")
             
             if not delivery.delivery_location_id:
-                print(f"❌ DEBUG CANCEL: Delivery {delivery_id} has no delivery_location_id - cannot identify shelter")
+                logger.debug(f"CANCEL: Delivery {delivery_id} has no delivery_location_id - cannot identify shelter")
                 raise HTTPException(status_code=400, detail="Delivery has no associated location")
                 
-            location = db.query(DeliveryLocation).filter(DeliveryLocation.id == delivery.delivery_location_id).first()
-            print(f"🔍 DEBUG CANCEL: Found location={location}")
+            location = reference_data(db).location(delivery.delivery_location_id)
+            logger.debug(f"CANCEL: Found location={location}")
             if location:
-                print(f"🔍 DEBUG CANCEL: location.user_id={location.user_id}, current_user.id={current_user.id}")
-                print(f"🔍 DEBUG CANCEL: current_user.roles={current_user.roles}")
+                logger.debug(f"CANCEL: location.user_id={location.user_id}, current_user.id={current_user.id}")
+                logger.debug(f"CANCEL: current_user.roles={current_user.roles}")
                 
             if location and location.user_id == current_user.id and "shelter" in current_user.roles:
                 can_cancel = True
                 cancel_reason = "shelter_location_delivery"
-                print(f"✅ DEBUG CANCEL: Shelter {current_user.id} can cancel delivery {delivery_id}")
+                logger.debug(f"CANCEL: Shelter {current_user.id} can cancel delivery {delivery_id}")
             else:
-                print(f"❌ DEBUG CANCEL: Shelter permission check failed")
+                logger.debug(f"CANCEL: Shelter permission check failed")
         
         if not can_cancel:
-            print(f"❌ DEBUG CANCEL: User {current_user.id} cannot cancel delivery {delivery_id}")
+            logger.debug(f"CANCEL: User {current_user.id} cannot cancel delivery {delivery_id}")
             raise HTTPException(status_code=403, detail="Not authorized to cancel this delivery")
         
-        print(f"✅ DEBUG CANCEL: User {current_user.id} can cancel delivery {delivery_id} as {cancel_reason}")
+        logger.debug(f"CANCEL: User {current_user.id} can cancel delivery {delivery_id} as {cancel_reason}")
         
         # Can only cancel if not yet picked up
         if delivery.status not in [DeliveryStatus.AVAILABLE, DeliveryStatus.PENDING_CONFIRMATION, DeliveryStatus.RESERVED]:
-            print(f"❌ DEBUG CANCEL: Cannot cancel - status {delivery.status} not allowed")
+            logger.debug(f"CANCEL: Cannot cancel - status {delivery.status} not allowed")
             raise HTTPException(
                 status_code=400, 
                 detail="Cannot cancel delivery after pickup. You must complete the delivery."
             )
         
-        print(f"✅ DEBUG CANCEL: Status {delivery.status} allows cancellation")
+        logger.debug(f"CANCEL: Status {delivery.status} allows cancellation")
         
         # Return quantity based on delivery type
         quantity_returned = 0
@@ -636,76 +628,73 @@ def cancel_delivery(
             if batch:
                 batch.quantity_available += delivery.quantity
                 quantity_returned = delivery.quantity
-                print(f"🔄 DEBUG CANCEL: Returned {quantity_returned} to batch {batch.id}")
+                logger.debug(f"CANCEL: Returned {quantity_returned} to batch {batch.id}")
         elif delivery.parent_delivery_id:
             # This is a split delivery - return quantity to parent delivery
             parent_delivery = db.query(Delivery).filter(Delivery.id == delivery.parent_delivery_id).first()
             if parent_delivery:
                 parent_delivery.quantity += delivery.quantity
                 quantity_returned = delivery.quantity
-                print(f"🔄 DEBUG CANCEL: Returned {quantity_returned} to parent delivery {parent_delivery.id}")
+                logger.debug(f"CANCEL: Returned {quantity_returned} to parent delivery {parent_delivery.id}")
             else:
                 # Parent not found (shouldn't happen) - just delete
                 quantity_returned = delivery.quantity
-                print(f"⚠️ DEBUG CANCEL: Parent not found, just deleting")
+                logger.debug(f"CANCEL: Parent not found, just deleting")
         else:
             # This is a parent delivery that may have split deliveries (partial deliveries)
             # Check if there are split deliveries (children)
             child_deliveries = db.query(Delivery).filter(Delivery.parent_delivery_id == delivery_id).all()
             
             if child_deliveries:
-                print(f"🔍 DEBUG CANCEL: Parent delivery {delivery_id} has {len(child_deliveries)} split deliveries")
-                print(f"🔍 DEBUG CANCEL: Parent quantity: {delivery.quantity}, Total delivered: {sum(d.quantity for d in child_deliveries)}")
+                logger.debug(f"CANCEL: Parent delivery {delivery_id} has {len(child_deliveries)} split deliveries")
+                logger.debug(f"CANCEL: Parent quantity: {delivery.quantity}, Total delivered: {sum(d.quantity for d in child_deliveries)}")
                 
                 # Calculate remaining quantity (parent - already delivered)
                 delivered_quantity = sum(d.quantity for d in child_deliveries)
                 remaining_quantity = delivery.quantity - delivered_quantity
                 
                 if remaining_quantity > 0:
-                    print(f"🔄 DEBUG CANCEL: Returning {remaining_quantity} to batch (undelivered portion)")
+                    logger.debug(f"CANCEL: Returning {remaining_quantity} to batch (undelivered portion)")
                     # Return only the undelivered portion to batch
                     if delivery.batch_id:
                         batch = db.query(ProductBatch).filter(ProductBatch.id == delivery.batch_id).first()
                         if batch:
                             batch.quantity_available += remaining_quantity
                             quantity_returned = remaining_quantity
-                            print(f"🔄 DEBUG CANCEL: Returned {remaining_quantity} to batch {batch.id}")
+                            logger.debug(f"CANCEL: Returned {remaining_quantity} to batch {batch.id}")
                     else:
                         quantity_returned = remaining_quantity
-                        print(f"🗑️ DEBUG CANCEL: Direct delivery, returning {remaining_quantity}")
+                        logger.debug(f"CANCEL: Direct delivery, returning {remaining_quantity}")
                 else:
-                    print(f"✅ DEBUG CANCEL: All items already delivered, nothing to return")
+                    logger.debug(f"CANCEL: All items already delivered, nothing to return")
                     quantity_returned = 0
                 
                 # Delete the parent delivery - children remain as completed deliveries
-                print(f"🗑️ DEBUG CANCEL: Deleting parent delivery {delivery_id} (keeping split deliveries)")
+                logger.debug(f"CANCEL: Deleting parent delivery {delivery_id} (keeping split deliveries)")
                 
                 # IMPORTANT: Remove parent reference from children BEFORE deleting parent
                 for child in child_deliveries:
                     child.parent_delivery_id = None
-                    print(f"🔄 DEBUG CANCEL: Removed parent reference from child {child.id}")
+                    logger.debug(f"CANCEL: Removed parent reference from child {child.id}")
                 
-                print(f"🗑️ DEBUG CANCEL: Safe to delete parent delivery {delivery_id} now")
+                logger.debug(f"CANCEL: Safe to delete parent delivery {delivery_id} now")
             else:
                 # No split deliveries - regular direct delivery
                 quantity_returned = delivery.quantity
-                print(f"🗑️ DEBUG CANCEL: Direct delivery with no splits, returning {quantity_returned}")
+                logger.debug(f"CANCEL: Direct delivery with no splits, returning {quantity_returned}")
         
         # Hook: notify inventory service about cancellation
         on_delivery_cancelled(db, delivery, current_user.id)
         
         db.delete(delivery)
         db.commit()
-        print(f"✅ DEBUG CANCEL: Successfully cancelled delivery {delivery_id}, returned {quantity_returned}")
+        logger.debug(f"CANCEL: Successfully cancelled delivery {delivery_id}, returned {quantity_returned}")
         return {"message": "Delivery cancelled successfully", "quantity_returned": quantity_returned}
         
     except HTTPException:
         # Re-raise HTTP exceptions as-is
         raise
     except Exception as e:
-        print(f"💥 CANCEL EXCEPTION: Unexpected error cancelling delivery {delivery_id}: {str(e)}")
-        print(f"💥 CANCEL EXCEPTION: Error type: {type(e).__name__}")
-        import traceback
-        print(f"💥 CANCEL EXCEPTION: Traceback: {traceback.format_exc()}")
+        logger.exception(f"CANCEL EXCEPTION: Unexpected error cancelling delivery {delivery_id}: {type(e).__name__}: {str(e)}")
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
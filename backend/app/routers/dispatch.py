@@ -0,0 +1,60 @@
+"""
+Dispatch Router
+Offers of AVAILABLE deliveries made by the automatic dispatcher
+"""
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.auth import require_admin, require_approved
+from app.core.server_timing import ServerTimingRoute
+from app.database import get_db
+from app.models import User
+from app.repositories import queries
+from app.services.dispatch import DISPATCHER, accept_offer, decline_offer, offer_to_dict
+from app.shared.exceptions import DispatchError, NotFoundError
+
+router = APIRouter(prefix="/api/dispatch", tags=["dispatch"], route_class=ServerTimingRoute)
+
+
+@router.get("/offers")
+def my_offers(db: Session = Depends(get_db), current_user: User = Depends(require_approved)) -> List[dict]:
+    """Open offers for the current volunteer, soonest to expire first"""
+    return [offer_to_dict(offer) for offer in db.execute(queries.volunteer_offers(current_user.id)).scalars()]
+
+
+@router.post("/offers/{offer_id}/accept")
+def accept(offer_id: int, db: Session = Depends(get_db), current_user: User = Depends(require_approved)):
+    """Accept an offer: the offered quantity is committed to the volunteer (like /deliveries/{id}/commit)"""
+    try:
+        offer = accept_offer(db, offer_id, current_user)
+    except NotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    except DispatchError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    return offer_to_dict(offer)
+
+
+@router.post("/offers/{offer_id}/decline")
+def decline(offer_id: int, db: Session = Depends(get_db), current_user: User = Depends(require_approved)):
+    """Decline an offer (the delivery is not offered to this volunteer again)"""
+    try:
+        offer = decline_offer(db, offer_id, current_user)
+    except NotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    except DispatchError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    return offer_to_dict(offer)
+
+
+@router.get("/status")
+def dispatch_status(current_user: User = Depends(require_admin)):
+    """Dispatcher settings and the last round of this process"""
+    return DISPATCHER.stats()
+
+
+@router.post("/run")
+def run_dispatch(db: Session = Depends(get_db), current_user: User = Depends(require_admin)):
+    """Run one dispatch round now (also when the background dispatcher is disabled)"""
+    return DISPATCHER.run_once(db)
@@ -29,8 +29,9 @@ from ..application.dtos import (
     DeliveryResponse,
 )
 from ..shared.exceptions import DonationError
+from app.core.server_timing import ServerTimingRoute
 
-router = APIRouter(prefix="/api/donations", tags=["donations"])
+router = APIRouter(prefix="/api/donations", tags=["donations"], route_class=ServerTimingRoute)
 
 
 # ============================================================================
@@ -2,15 +2,18 @@
 Inventory Management Router for Shelters
 Handles stock tracking, transactions, requests, and distributions
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session, joinedload, load_only
 from sqlalchemy import func, and_, or_
 from typing import List, Optional
 from datetime import datetime, timedelta
 
-from app.database import get_db
+from app.database import READ_ROUTER, get_db
+from app.async_database import AsyncDB, get_async_read_db
+from app.repositories import queries
+from app.repositories.reference_data import reference_data
 from app.auth import get_current_user
-from app.models import User, Category, Delivery, DeliveryLocation
+from app.models import User, Delivery
 from app.inventory_models import (
     InventoryItem, InventoryTransaction, ShelterRequest,
     RequestAdjustment, ShelterRequestDelivery, DistributionRecord, TransactionType
@@ -20,14 +23,28 @@ from app.inventory_schemas import (
     InventoryTransactionResponse, ShelterRequestCreate, ShelterRequestUpdate,
     ShelterRequestResponse, RequestAdjustmentCreate, RequestAdjustmentResponse,
     DistributionRecordCreate, DistributionRecordResponse, DistributionRecordUpdate, DistributionRecordCancel,
-    InventoryStats, CategoryStock, RecentActivity, ShelterDashboardData
+    InventoryStats, CategoryStock, RecentActivity, ShelterDashboardData, OpenNeedResponse
 )
 from app.shared.enums import DeliveryStatus
 from app.services.inventory_service import (
     get_or_create_inventory_item, on_distribution
 )
+from app.core.events import NeedRequestCreated, ShelterNeedsChanged, emit_after_commit
+from app.core.logging_config import get_logger
+from app.core.server_timing import ServerTimingRoute
+from app.core.json_projection import Projector
+from app.core.response_cache import PayloadCache
 
-router = APIRouter(prefix="/api/inventory", tags=["inventory"])
+logger = get_logger(__name__)
+
+router = APIRouter(prefix="/api/inventory", tags=["inventory"], route_class=ServerTimingRoute)
+
+shelter_request_list = Projector(ShelterRequestResponse)
+public_requests_cache = PayloadCache(
+    "shelter_requests", tables=("shelter_requests",), bypass=READ_ROUTER.reads_own_writes
+)
+open_need_list = Projector(OpenNeedResponse)
+public_needs_cache = PayloadCache("open_needs", tables=("open_needs",), bypass=READ_ROUTER.reads_own_writes)
 
 def has_role(user: User, role: str) -> bool:
     """Check if user has a specific role"""
@@ -69,16 +86,16 @@ def create_inventory_item(
     if not has_role(current_user, 'shelter'):
         raise HTTPException(status_code=403, detail="Only shelters can manage inventory")
     
-    print(f"🔍 DEBUG Backend - Item recebido:")
-    print(f"  category_id: {item.category_id}")
-    print(f"  quantity_in_stock: {item.quantity_in_stock}")
-    print(f"  metadata_cache: {item.metadata_cache}")
+    logger.debug(
+        f"Item recebido: category_id={item.category_id}, "
+        f"quantity_in_stock={item.quantity_in_stock}, metadata_cache={item.metadata_cache}"
+    )
     
     # Create a unique key for type+unit combination from metadata
     tipo = item.metadata_cache.get('tipo') if item.metadata_cache else None
     unidade = item.metadata_cache.get('unidade') if item.metadata_cache else None
     
-    print(f"🔍 DEBUG Backend - Tipo: {tipo}, Unidade: {unidade}")
+    logger.debug(f"Tipo: {tipo}, Unidade: {unidade}")
     
     # Get all items for this category and shelter
     existing_items = db.query(InventoryItem).filter(
@@ -86,9 +103,7 @@ def create_inventory_item(
         InventoryItem.category_id == item.category_id
     ).all()
     
-    print(f"🔍 DEBUG Backend - Itens existentes na categoria: {len(existing_items)}")
-    for i, existing_item in enumerate(existing_items):
-        print(f"  Item {i}: id={existing_item.id}, metadata={existing_item.metadata_cache}")
+    logger.debug(f"Itens existentes na categoria: {len(existing_items)}")
     
     # If we have tipo and unidade, look for exact match in metadata
     existing = None
@@ -99,7 +114,7 @@ def create_inventory_item(
                 existing_item.metadata_cache.get('unidade') == unidade):
                 existing = existing_item
                 break
-        print(f"🔍 DEBUG Backend - Correspondência encontrada: {existing.id if existing else 'None'}")
+        logger.debug(f"Correspondência encontrada: {existing.id if existing else 'None'}")
     # If no tipo/unidade, always create new item (don't overwrite existing)
     
     if existing:
@@ -576,19 +591,36 @@ def cancel_distribution(
 # ============================================================================
 
 @router.get("/requests/public", response_model=List[ShelterRequestResponse])
-def list_public_shelter_requests(
-    db: Session = Depends(get_db)
+async def list_public_shelter_requests(
+    request: Request,
+    fields=Depends(shelter_request_list.fieldset),
+    db: AsyncDB = Depends(get_async_read_db)
 ):
     """
     Public endpoint to list all active shelter donation requests.
     Used by map view to show shelter needs without authentication.
     Only returns active requests (pending, partial, active status).
     """
-    query = db.query(ShelterRequest).filter(
-        ShelterRequest.status.in_(['pending', 'partial', 'active'])
-    )
-    
-    return query.order_by(ShelterRequest.created_at.desc()).all()
+    async def build():
+        result = await db.execute(queries.public_shelter_requests(fields))
+        return shelter_request_list.dumps(result.scalars().all(), fields)
+    return await public_requests_cache.respond(request, build)
+
+@router.get("/needs/public", response_model=List[OpenNeedResponse])
+async def list_public_open_needs(
+    request: Request,
+    shelter_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    db: AsyncDB = Depends(get_async_read_db)
+):
+    """
+    Public open needs per shelter and category, most urgent first, with the
+    remaining quantity already computed (materialized open_needs table).
+    """
+    async def build():
+        result = await db.execute(queries.public_open_needs(shelter_id, category_id))
+        return open_need_list.dumps(result.scalars().all())
+    return await public_needs_cache.respond(request, build)
 
 @router.get("/requests", response_model=List[ShelterRequestResponse])
 def list_shelter_requests(
@@ -618,8 +650,7 @@ def create_shelter_request(
         raise HTTPException(status_code=403, detail="Only shelters can create requests")
     
     # Verify category exists
-    category = db.query(Category).filter(Category.id == request.category_id).first()
-    if not category:
+    if not reference_data(db).category(request.category_id):
         raise HTTPException(status_code=404, detail="Category not found")
     
     # Create request
@@ -640,6 +671,8 @@ def create_shelter_request(
     
     # Ensure inventory item row exists for this category
     get_or_create_inventory_item(db, current_user.id, request.category_id)
+    emit_after_commit(db, NeedRequestCreated(db_request.id, current_user.id, request.category_id,
+                                             request.quantity_requested))
     
     db.commit()
     db.refresh(db_request)
@@ -725,6 +758,7 @@ def adjust_request(
             request.quantity_cancelled = quantity_before - request.quantity_received
         
         request.updated_at = datetime.utcnow()
+        emit_after_commit(db, ShelterNeedsChanged(current_user.id, request.category_id, actor_id=current_user.id))
     
     db.commit()
     db.refresh(db_adjustment)
@@ -755,17 +789,16 @@ def get_shelter_dashboard(
     # Transactions this month
     month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
     
-    received_this_month = db.query(func.sum(InventoryTransaction.quantity_change)).join(InventoryItem).filter(
+    monthly_totals = dict(db.query(
+        InventoryTransaction.transaction_type, func.sum(InventoryTransaction.quantity_change)
+    ).join(InventoryItem).filter(
         InventoryItem.shelter_id == current_user.id,
-        InventoryTransaction.transaction_type == TransactionType.DONATION_RECEIVED,
+        InventoryTransaction.transaction_type.in_([TransactionType.DONATION_RECEIVED, TransactionType.DONATION_GIVEN]),
         InventoryTransaction.created_at >= month_start
-    ).scalar() or 0
+    ).group_by(InventoryTransaction.transaction_type).all())
     
-    distributed_this_month = abs(db.query(func.sum(InventoryTransaction.quantity_change)).join(InventoryItem).filter(
-        InventoryItem.shelter_id == current_user.id,
-        InventoryTransaction.transaction_type == TransactionType.DONATION_GIVEN,
-        InventoryTransaction.created_at >= month_start
-    ).scalar() or 0)
+    received_this_month = monthly_totals.get(TransactionType.DONATION_RECEIVED) or 0
+    distributed_this_month = abs(monthly_totals.get(TransactionType.DONATION_GIVEN) or 0)
     
     # Active requests (pending, active, partially_completed)
     active_requests = db.query(ShelterRequest).filter(
@@ -784,13 +817,13 @@ def get_shelter_dashboard(
     )
     
     # Inventory by category
+    refs = reference_data(db)
     inventory_by_category = []
     for item in inventory_items:
-        category = db.query(Category).filter(Category.id == item.category_id).first()
         inventory_by_category.append(CategoryStock(
             id=item.id,
             category_id=item.category_id,
-            category_name=category.display_name if category else "Unknown",
+            category_name=refs.category_name(item.category_id),
             quantity_in_stock=item.quantity_in_stock,
             quantity_reserved=item.quantity_reserved,
             quantity_available=item.quantity_available,
@@ -804,14 +837,14 @@ def get_shelter_dashboard(
         InventoryItem.shelter_id == current_user.id
     ).order_by(InventoryTransaction.created_at.desc()).limit(10).all()
     
+    items_by_id = {item.id: item for item in inventory_items}
     recent_transactions = []
     for txn in recent_txns:
-        item = db.query(InventoryItem).filter(InventoryItem.id == txn.inventory_item_id).first()
-        category = db.query(Category).filter(Category.id == item.category_id).first() if item else None
+        item = items_by_id.get(txn.inventory_item_id)
         
         recent_transactions.append(RecentActivity(
             transaction_type=txn.transaction_type.value,
-            category_name=category.display_name if category else "Unknown",
+            category_name=refs.category_name(item.category_id) if item else "Unknown",
             quantity=txn.quantity_change,
             created_at=txn.created_at,
             notes=txn.notes
@@ -822,7 +855,7 @@ def get_shelter_dashboard(
         CategoryStock(
             id=item.id,
             category_id=item.category_id,
-            category_name=db.query(Category).filter(Category.id == item.category_id).first().display_name,
+            category_name=refs.category_name(item.category_id),
             quantity_in_stock=item.quantity_in_stock,
             quantity_reserved=item.quantity_reserved,
             quantity_available=item.quantity_available,
@@ -858,14 +891,15 @@ def list_shelter_deliveries(
         raise HTTPException(status_code=403, detail="Only shelters can access this")
     
     # Find shelter's location
-    location = db.query(DeliveryLocation).filter(
-        DeliveryLocation.user_id == current_user.id
-    ).first()
+    refs = reference_data(db)
+    location = refs.location_for_user(current_user.id)
     
     if not location:
         return []
     
-    query = db.query(Delivery).filter(
+    query = db.query(Delivery).options(
+        joinedload(Delivery.volunteer).options(load_only(User.id, User.name))
+    ).filter(
         Delivery.delivery_location_id == location.id
     )
     
@@ -876,14 +910,13 @@ def list_shelter_deliveries(
     
     result = []
     for d in deliveries:
-        volunteer = db.query(User).filter(User.id == d.volunteer_id).first() if d.volunteer_id else None
-        category = db.query(Category).filter(Category.id == d.category_id).first() if d.category_id else None
+        volunteer = d.volunteer
         result.append({
             "id": d.id,
             "quantity": d.quantity,
             "status": d.status.value if hasattr(d.status, 'value') else str(d.status),
             "category_id": d.category_id,
-            "category_name": category.display_name if category else "N/A",
+            "category_name": refs.category_name(d.category_id, default="N/A"),
             "volunteer_name": volunteer.name if volunteer else None,
             "delivery_code": d.delivery_code,
             "pickup_code": d.pickup_code,
@@ -918,6 +951,7 @@ def cancel_shelter_request(
     
     request.status = 'cancelled'
     request.updated_at = datetime.utcnow()
+    emit_after_commit(db, ShelterNeedsChanged(current_user.id, request.category_id, actor_id=current_user.id))
     
     db.commit()
     
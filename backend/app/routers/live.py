@@ -0,0 +1,109 @@
+"""
+Live Updates Router
+Server-Sent Events streams for the public map, WebSockets for shelter dashboards
+"""
+import asyncio
+import os
+from typing import Optional
+
+import orjson
+from fastapi import APIRouter, Depends, Request, WebSocket, WebSocketDisconnect
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.auth import decode_token_email
+from app.core.server_timing import ServerTimingRoute
+from app.database import get_db
+from app.repositories.queries import user_by_email
+from app.services.map_updates import MAP_DELTAS
+from app.services.shelter_updates import SHELTER_UPDATES
+
+# 1008: policy violation - missing / invalid token or not allowed on the channel
+CLOSE_NOT_ALLOWED = 1008
+
+# Seconds a shelter socket has to send its {"type": "auth"} message after connecting
+LIVE_AUTH_TIMEOUT_SECONDS = float(os.getenv("LIVE_AUTH_TIMEOUT_SECONDS", "10"))
+
+router = APIRouter(prefix="/api/live", tags=["live"], route_class=ServerTimingRoute)
+
+
+@router.get("/map")
+async def map_updates(request: Request):
+    """
+    Public SSE stream of map deltas (need.changed, need_request.created,
+    need_request.fulfilled, location.approved, reset).
+    Reconnections resume from Last-Event-ID; `reset` means: reload everything.
+    """
+    return MAP_DELTAS.response(request)
+
+
+@router.get("/map/status")
+def map_updates_status():
+    """Connected clients and replay buffer of the map stream (this worker)"""
+    return MAP_DELTAS.stats()
+
+
+def _shelter_channel(db: Session, token: str, shelter_id: Optional[int]) -> Optional[int]:
+    """Shelter whose updates the token holder may follow, or None."""
+    try:
+        email = decode_token_email(token) if token else None
+        user = db.execute(user_by_email(email)).scalars().first() if email else None
+        if user is None or not user.active:
+            return None
+        roles = user.roles.split(",")
+        if "admin" in roles and shelter_id is not None:
+            return shelter_id
+        if "shelter" in roles and shelter_id in (None, user.id):
+            return user.id
+        return None
+    finally:
+        db.close()  # the socket may stay open for hours: do not hold a connection
+
+
+async def _auth_token(websocket: WebSocket) -> Optional[str]:
+    """
+    Token of the first client message, {"type": "auth", "token": ...}:
+    "" when missing, malformed or late, None when the client went away.
+    """
+    try:
+        message = await asyncio.wait_for(websocket.receive_text(), LIVE_AUTH_TIMEOUT_SECONDS)
+        message = orjson.loads(message)
+    except WebSocketDisconnect:
+        return None
+    except (asyncio.TimeoutError, KeyError, orjson.JSONDecodeError):
+        return ""
+    if not isinstance(message, dict) or message.get("type") != "auth" or not isinstance(message.get("token"), str):
+        return ""
+    return message["token"]
+
+
+@router.websocket("/shelter")
+async def shelter_updates(
+    websocket: WebSocket,
+    shelter_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    WebSocket with the live changes of a shelter dashboard (stock.changed,
+    alert.low_stock, delivery.incoming, needs.changed, reset, ping).
+    Browsers cannot send headers here, and a token in the URL would end up
+    in access logs, so the client sends {"type": "auth", "token": <JWT>} as
+    its first message; shelters follow their own channel, admins pass
+    `?shelter_id=`.
+    """
+    await websocket.accept()
+    token = await _auth_token(websocket)
+    if token is None:
+        db.close()
+        return
+    channel = await run_in_threadpool(_shelter_channel, db, token, shelter_id)
+    if channel is None:
+        await websocket.close(code=CLOSE_NOT_ALLOWED)
+        return
+    await SHELTER_UPDATES.serve(websocket, channel, hello={"shelter_id": channel})
+
+
+@router.get("/shelter/status")
+def shelter_updates_status():
+    """Connections and message rate of the shelter dashboard sockets (this worker)"""
+    return SHELTER_UPDATES.stats()
@@ -2,34 +2,41 @@
 Delivery Locations Router
 Uses Repository pattern to avoid code duplication
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
+from typing import List, Optional
+from app.database import READ_ROUTER, get_db, get_read_db
+from app.async_database import AsyncDB, get_async_read_db
+from app.repositories import queries
 from app.models import User, DeliveryLocation
 from app.schemas import DeliveryLocationCreate, DeliveryLocationResponse
 from app.auth import get_current_active_user, require_role
 from app.repositories import BaseRepository
+from app.repositories.reference_data import reference_data_async
+from app.core.server_timing import ServerTimingRoute
+from app.core.json_projection import Projector
+from app.core.response_cache import PayloadCache
+from app.core.events import LocationApproved, emit_after_commit
+from app.core.distance_matrix import DISTANCE_MATRIX
 
-router = APIRouter(prefix="/api/locations", tags=["locations"])
+router = APIRouter(prefix="/api/locations", tags=["locations"], route_class=ServerTimingRoute)
+
+location_list = Projector(DeliveryLocationResponse)
+location_cache = PayloadCache("locations", tables=("delivery_locations",), bypass=READ_ROUTER.reads_own_writes)
 
 @router.get("/", response_model=List[DeliveryLocationResponse])
-def list_locations(
+async def list_locations(
+    request: Request,
     active_only: bool = True,
     city_id: str = None,
-    db: Session = Depends(get_db)
+    fields=Depends(location_list.fieldset),
+    db: AsyncDB = Depends(get_async_read_db)
 ):
     """List delivery locations"""
-    repo = BaseRepository(DeliveryLocation, db)
-    
-    filters = {}
-    if active_only:
-        filters['active'] = True
-        filters['approved'] = True  # Apenas locations aprovadas devem aparecer no mapa
-    if city_id:
-        filters['city_id'] = city_id
-    
-    return repo.filter_by(**filters)
+    async def build():
+        result = await db.execute(queries.locations(active_only, city_id, fields))
+        return location_list.dumps(result.scalars().all(), fields)
+    return await location_cache.respond(request, build)
 
 @router.post("/", response_model=DeliveryLocationResponse, status_code=201)
 def create_location(
@@ -79,8 +86,33 @@ def debug_locations(
     
     return debug_info
 
+@router.get("/nearest")
+async def nearest_locations(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    limit: int = Query(10, ge=1, le=50),
+    max_km: Optional[float] = Query(None, gt=0),
+    db: AsyncDB = Depends(get_async_read_db)
+):
+    """Active, approved locations closest to (lat, lng), nearest first"""
+    refs = await reference_data_async(db)
+    DISTANCE_MATRIX.sync(refs)
+    eligible = [location.id for location in refs.locations() if location.active and location.approved]
+    nearest = []
+    for location_id, km in DISTANCE_MATRIX.nearest(lat, lng, limit, max_km, eligible):
+        location = refs.location(location_id)
+        nearest.append({
+            "id": location.id,
+            "name": location.name,
+            "address": location.address,
+            "latitude": location.latitude,
+            "longitude": location.longitude,
+            "distance_km": round(km, 3),
+        })
+    return nearest
+
 @router.get("/{location_id}", response_model=DeliveryLocationResponse)
-def get_location(location_id: int, db: Session = Depends(get_db)):
+def get_location(location_id: int, db: Session = Depends(get_read_db)):
     """Get location by ID"""
     repo = BaseRepository(DeliveryLocation, db)
     location = repo.get_by_id(location_id)
@@ -136,6 +168,7 @@ def approve_location(
         raise HTTPException(status_code=404, detail="Location not found")
     
     updated = repo.update(location, approved=True)
+    emit_after_commit(db, LocationApproved(location.id, location.user_id, actor_id=current_user.id))
     repo.commit()
     repo.refresh(updated)
     return updated
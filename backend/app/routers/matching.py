@@ -0,0 +1,54 @@
+"""
+Matching Router
+Ranked feed of open needs for the logged-in volunteer
+"""
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+
+from app.async_database import AsyncDB, get_async_db
+from app.auth import get_current_active_user_async
+from app.core.server_timing import ServerTimingRoute
+from app.models import User
+from app.repositories.reference_data import reference_data_async
+from app.services.matching import NEED_INDEX, volunteer_categories
+
+router = APIRouter(prefix="/api/matching", tags=["matching"], route_class=ServerTimingRoute)
+
+
+@router.get("/feed")
+async def matching_feed(
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lng: Optional[float] = Query(None, ge=-180, le=180),
+    category_id: Optional[int] = None,
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncDB = Depends(get_async_db)
+):
+    """
+    Open needs ranked for the current volunteer by distance, urgency and time
+    without activity, within their declared categories (`tipos_produtos`,
+    or `category_id`), with the quantity their capacity allows.
+    `lat` / `lng` override the position in the profile.
+    """
+    response.headers["Cache-Control"] = "no-store"
+    latitude = lat if lat is not None else current_user.latitude
+    longitude = lng if lng is not None else current_user.longitude
+    if latitude is None or longitude is None:
+        raise HTTPException(status_code=400, detail="Location required: send lat and lng or set it in the profile")
+
+    await NEED_INDEX.refresh(db)
+    refs = await reference_data_async(db)
+    categories = volunteer_categories(refs, category_id if category_id is not None else current_user.tipos_produtos)
+    matches = NEED_INDEX.search(latitude, longitude, categories, current_user.delivery_capacity, limit)
+
+    feed = []
+    for match in matches:
+        item = match.to_dict()
+        location = refs.location(match.need.location_id)
+        item["location_name"] = location.name if location else None
+        item["address"] = location.address if location else None
+        item["category_name"] = refs.category_name(match.need.category_id)
+        feed.append(item)
+    return feed
@@ -0,0 +1,39 @@
+"""
+Current User Router
+Consolidated, versioned state of the logged-in user (long-poll)
+"""
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Response
+
+from app.async_database import AsyncDB, get_async_db
+from app.auth import get_current_active_user_async
+from app.core.server_timing import ServerTimingRoute
+from app.models import User
+from app.repositories.user_state import USER_STATE, USER_STATE_POLL_MAX_TIMEOUT, USER_STATE_POLL_TIMEOUT
+
+router = APIRouter(prefix="/api/me", tags=["me"], route_class=ServerTimingRoute)
+
+
+@router.get("/state")
+async def my_state(
+    response: Response,
+    version: Optional[int] = None,
+    timeout: float = Query(USER_STATE_POLL_TIMEOUT, ge=0, le=USER_STATE_POLL_MAX_TIMEOUT),
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncDB = Depends(get_async_db)
+):
+    """
+    Everything in progress for the current user (active deliveries, incoming
+    deliveries, open requests, batches and reservations) with its version.
+    With `?version=` the request waits up to `timeout` seconds for a different
+    version and answers `{"version": ..., "changed": false}` if nothing changed.
+    """
+    response.headers["Cache-Control"] = "no-store"
+    if version is None:
+        state = await USER_STATE.aget(db, current_user.id)
+    else:
+        state = await USER_STATE.wait(db, current_user.id, version, timeout)
+        if state.version == version:
+            return {"version": version, "changed": False}
+    return state.to_dict()
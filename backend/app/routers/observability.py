@@ -0,0 +1,130 @@
+"""
+Observability Router
+Prometheus scrape endpoint and operational diagnostics
+"""
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import HTMLResponse, PlainTextResponse
+from sqlalchemy.orm import Session
+
+from app.auth import require_admin
+from app.database import engine, get_db, pool_status, replica_engine
+from app.async_database import AsyncSessionLocal
+from app.core.metrics import REGISTRY
+from app.core.profiler import PROFILE_STORE, render_html
+from app.core.compression import supported_encodings
+from app.core.distance_matrix import DISTANCE_MATRIX
+from app.core.invalidation import INVALIDATION_BUS
+from app.core.response_cache import PUBLIC_CACHE_ENABLED, payload_caches
+from app.core.slow_queries import SLOW_QUERY_LOG
+from app.core.startup import STARTUP
+from app.models import User
+from app.repositories.reference_data import REFERENCE_DATA
+from app.repositories.user_state import USER_STATE
+from app.services.matching import NEED_INDEX
+from app.core.server_timing import ServerTimingRoute
+
+router = APIRouter(tags=["observability"], route_class=ServerTimingRoute)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Se definido, o scrape precisa enviar "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def prometheus_metrics(authorization: Optional[str] = Header(None)):
+    """Prometheus text exposition of HTTP and database metrics"""
+    if METRICS_TOKEN and authorization != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+
+    return PlainTextResponse(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@router.get("/health/db")
+def database_pool_health():
+    """
+    Connection pool saturation. Reads pool counters only - never checks out
+    a connection, so it answers instantly even when the pool is exhausted.
+    """
+    status = {"pool": pool_status(engine), "async_sessions": AsyncSessionLocal is not None}
+    if replica_engine is not None:
+        status["replica_pool"] = pool_status(replica_engine)
+    return status
+
+
+@router.get("/health/startup")
+def startup_timing():
+    """Cold-start breakdown of this process: boot phases and the first request"""
+    return STARTUP.report()
+
+
+@router.get("/health/cache")
+def public_cache_health():
+    """Public payload caches: entries and the data versions they are keyed on"""
+    return {
+        "enabled": PUBLIC_CACHE_ENABLED,
+        "encodings": list(supported_encodings()),
+        "caches": {name: cache.stats() for name, cache in payload_caches().items()},
+        "reference_data": REFERENCE_DATA.stats(),
+        "user_state": USER_STATE.stats(),
+        "need_index": NEED_INDEX.stats(),
+        "distance_matrix": DISTANCE_MATRIX.stats(),
+        "invalidation": INVALIDATION_BUS.stats(),
+    }
+
+
+@router.get("/api/admin/reference-data")
+def reference_data_status(current_user: User = Depends(require_admin)):
+    """Reference data cache (categories, attributes, locations): generation and snapshot size"""
+    return REFERENCE_DATA.stats()
+
+
+@router.post("/api/admin/reference-data/reload")
+def reload_reference_data(db: Session = Depends(get_db), current_user: User = Depends(require_admin)):
+    """Hot reload: drop the snapshot in every worker and load a fresh one here"""
+    REFERENCE_DATA.reload(db)
+    return REFERENCE_DATA.stats()
+
+
+@router.get("/api/admin/profiles")
+def list_profiles(current_user: User = Depends(require_admin)):
+    """Most recent request profiles (newest first)"""
+    return [profile.summary() for profile in PROFILE_STORE.list()]
+
+
+@router.get("/api/admin/profiles/{profile_id}")
+def get_profile(
+    profile_id: str,
+    format: str = Query("json", pattern="^(json|html)$"),
+    current_user: User = Depends(require_admin),
+):
+    """Full profile report: sampled stacks and SQL statements with timings"""
+    profile = PROFILE_STORE.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+
+    report = profile.to_dict()
+    if format == "html":
+        return HTMLResponse(render_html(report))
+    return report
+
+
+@router.get("/api/admin/slow-queries")
+def list_slow_queries(
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(require_admin),
+):
+    """Slowest recent statements (newest first) with normalized SQL, route and query plan"""
+    return {
+        "threshold_ms": SLOW_QUERY_LOG.threshold * 1000,
+        "queries": SLOW_QUERY_LOG.list(limit),
+    }
+
+
+@router.delete("/api/admin/slow-queries", status_code=status.HTTP_204_NO_CONTENT)
+def clear_slow_queries(current_user: User = Depends(require_admin)):
+    """Empty the slow query buffer"""
+    SLOW_QUERY_LOG.clear()
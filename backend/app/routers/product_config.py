@@ -8,9 +8,10 @@ from typing import List
 from app.database import get_db
 from app.product_config import ProductConfiguration
 from app.auth import get_current_active_user, require_role
+from app.core.server_timing import ServerTimingRoute
 from pydantic import BaseModel
 
-router = APIRouter(prefix="/api/product-config", tags=["product-config"])
+router = APIRouter(prefix="/api/product-config", tags=["product-config"], route_class=ServerTimingRoute)
 
 # Pydantic schemas
 class ProductConfigurationBase(BaseModel):
@@ -20,8 +20,9 @@ from app.auth import get_current_active_user, require_approved
 from app.shared.validators import ProductValidatorManagerCodeValidator, ConfirmationCodeValidator
 from app.repositories import BaseRepository
 from app.services.transaction_service import get_transaction_service, TransactionError
+from app.core.server_timing import ServerTimingRoute
 
-router = APIRouter(prefix="/api/resources", tags=["resources"])
+router = APIRouter(prefix="/api/resources", tags=["resources"], route_class=ServerTimingRoute)
 
 @router.get("/", response_model=List[ResourceRequestResponse])
 def list_all_requests(
@@ -5,15 +5,22 @@ from app.database import get_db
 from app.models import User
 from app.schemas import UserResponse, UserUpdate
 from app.auth import get_current_active_user, require_role
+from app.core.server_timing import ServerTimingRoute
+from app.core.json_projection import Projector
+from app.repositories import queries
 
-router = APIRouter(prefix="/api/users", tags=["users"])
+router = APIRouter(prefix="/api/users", tags=["users"], route_class=ServerTimingRoute)
+
+user_list = Projector(UserResponse)
 
 @router.get("/", response_model=List[UserResponse])
 def get_all_users(
+    fields=Depends(user_list.fieldset),
     db: Session = Depends(get_db)
 ):
     """Get all approved users - for login modal selection"""
-    return db.query(User).filter(User.approved == True).all()
+    users = db.execute(queries.approved_users(fields)).scalars().all()
+    return user_list.response(users, fields)
 
 @router.get("/pending-approval", response_model=List[UserResponse])
 def get_pending_users(
@@ -0,0 +1,403 @@
+"""
+Dispatch - automatic offers of AVAILABLE deliveries to idle volunteers.
+
+Every DISPATCH_INTERVAL_SECONDS a round:
+
+    1. closes lapsed offers: EXPIRED past expires_at, WITHDRAWN when the
+       delivery was taken (self-selected) or cancelled meanwhile
+    2. collects the AVAILABLE deliveries without an open offer (placed at
+       their pickup location, or the destination for direct deliveries) and
+       the idle volunteers: approved, with a position, no active delivery
+       and no open offer
+    3. solves the assignment (`assign()`) and stores one OFFERED
+       DispatchOffer per pair, expiring DISPATCH_OFFER_TIMEOUT_SECONDS later;
+       `dispatch.offered` is emitted on the event bus after commit
+
+The volunteer answers with POST /api/dispatch/offers/{id}/accept - the
+offered quantity is committed exactly like POST /api/deliveries/{id}/commit
+- or /decline. Every closed offer emits `dispatch.offer_closed`. A pair that
+was declined or expired is not offered again.
+
+Assignment: for each delivery the DISPATCH_CANDIDATES nearest eligible
+volunteers within DISPATCH_MAX_DISTANCE_KM are found on a grid
+(app.core.geo.GeoGrid) - the categories a volunteer declared
+(tipos_produtos) must include the delivery's. The candidate pairs are then
+taken greedily by increasing distance, skipping deliveries and volunteers
+already paired. Greedy on edges sorted by weight is a 1/2-approximation of
+the maximum-weight matching for any weight that decreases with the
+distance, on the candidate graph, in O(E log E) with E = deliveries ×
+DISPATCH_CANDIDATES: 10k × 10k solves in about a second
+(benchmarks/dispatch.py), where an exact min-cost matching (Hungarian,
+O(n³)) would take hours.
+
+The dispatcher is off by default; enable it on ONE worker (or one
+process) with DISPATCH_ENABLED - rounds are not coordinated across
+workers.
+
+Environment variables:
+    DISPATCH_ENABLED                  true | false (default) - run rounds in the background
+    DISPATCH_INTERVAL_SECONDS         time between rounds (default 30)
+    DISPATCH_OFFER_TIMEOUT_SECONDS    time a volunteer has to accept (default 120)
+    DISPATCH_MAX_DISTANCE_KM          farthest pickup offered (default 30)
+    DISPATCH_CANDIDATES               nearest volunteers considered per delivery (default 8)
+    DISPATCH_CELL_KM                  grid cell size in km (default 1)
+"""
+import asyncio
+import heapq
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.events import DeliveryOfferClosed, DeliveryOffered, emit_after_commit
+from app.core.geo import KM_PER_DEGREE, GeoGrid, haversine_km
+from app.core.logging_config import get_logger
+from app.core.metrics import DISPATCH_OFFERS, DISPATCH_SOLVE
+from app.models import Delivery, DispatchOffer, ProductBatch, User
+from app.repositories import queries
+from app.repositories.reference_data import reference_data
+from app.services.inventory_service import on_volunteer_committed
+from app.services.matching import volunteer_categories
+from app.shared.enums import DeliveryStatus, OfferStatus
+from app.shared.exceptions import DispatchError, NotFoundError
+from app.shared.validators import ConfirmationCodeValidator
+
+logger = get_logger(__name__)
+
+DISPATCH_ENABLED = os.getenv("DISPATCH_ENABLED", "false").lower() in ("1", "true", "yes", "on")
+DISPATCH_INTERVAL_SECONDS = float(os.getenv("DISPATCH_INTERVAL_SECONDS", "30"))
+DISPATCH_OFFER_TIMEOUT_SECONDS = float(os.getenv("DISPATCH_OFFER_TIMEOUT_SECONDS", "120"))
+DISPATCH_MAX_DISTANCE_KM = float(os.getenv("DISPATCH_MAX_DISTANCE_KM", "30"))
+DISPATCH_CANDIDATES = int(os.getenv("DISPATCH_CANDIDATES", "8"))
+DISPATCH_CELL_KM = float(os.getenv("DISPATCH_CELL_KM", "1"))
+
+# A volunteer with one of these is busy (same rule as POST /api/deliveries/{id}/commit)
+BUSY_STATUSES = frozenset({
+    DeliveryStatus.PENDING_CONFIRMATION, DeliveryStatus.RESERVED, DeliveryStatus.PICKED_UP,
+    DeliveryStatus.IN_TRANSIT, DeliveryStatus.IN_PROGRESS,
+})
+# delivery ids per statement (bound parameters stay well under SQLite's limit)
+_CHUNK = 400
+
+
+# ---- assignment ----
+
+@dataclass(eq=False)
+class Job:
+    id: int
+    latitude: float
+    longitude: float
+    quantity: int
+    category_id: Optional[int] = None
+
+
+@dataclass(eq=False)
+class Courier:
+    id: int
+    latitude: float
+    longitude: float
+    capacity: Optional[int] = None
+    categories: Optional[Set[int]] = None  # None = any category
+
+
+@dataclass
+class Assignment:
+    job: Job
+    courier: Courier
+    distance_km: float
+
+    @property
+    def quantity(self) -> int:
+        if not self.courier.capacity:
+            return self.job.quantity
+        return min(self.job.quantity, self.courier.capacity)
+
+
+def assign(jobs: Sequence[Job], couriers: Sequence[Courier], max_distance_km: float = None,
+           candidates: int = None, cell_km: float = None,
+           excluded: FrozenSet[Tuple[int, int]] = frozenset()) -> List[Assignment]:
+    """
+    Pair jobs with couriers (each at most once), nearest first over each
+    job's `candidates` nearest eligible couriers. `excluded` holds
+    (job id, courier id) pairs never to make. Ties go to the earlier job.
+    """
+    max_distance_km = DISPATCH_MAX_DISTANCE_KM if max_distance_km is None else max_distance_km
+    candidates = DISPATCH_CANDIDATES if candidates is None else candidates
+    grid = GeoGrid(DISPATCH_CELL_KM if cell_km is None else cell_km)
+    buckets: Dict[Tuple[int, int], list] = {}  # cell -> [(latitude, longitude, index, categories, id)]
+    for index, courier in enumerate(couriers):
+        buckets.setdefault(grid.cell(courier.latitude, courier.longitude), []).append(
+            (courier.latitude, courier.longitude, index, courier.categories, courier.id))
+
+    edges: List[Tuple[float, int, int]] = []
+    for j, job in enumerate(jobs):
+        # candidates are ranked on the equirectangular approximation (no trig
+        # per pair, well under 1% off at these distances); kept pairs get haversine
+        nearest: List[Tuple[float, int]] = []  # max-heap on distance: (-distance, courier index)
+        latitude, longitude, category_id = job.latitude, job.longitude, job.category_id
+        center = grid.cell(latitude, longitude)
+        x_scale = math.cos(math.radians(latitude))
+        for radius in range(grid.rings_within(job.latitude, max_distance_km) + 1):
+            if len(nearest) >= candidates and -nearest[0][0] <= grid.ring_min_km(latitude, radius):
+                break
+            for cell in grid.ring(center, radius):
+                for lat, lng, c, categories, courier_id in buckets.get(cell, ()):
+                    if categories is not None and category_id is not None and category_id not in categories:
+                        continue
+                    if excluded and (job.id, courier_id) in excluded:
+                        continue
+                    distance = KM_PER_DEGREE * math.hypot(lat - latitude, (lng - longitude) * x_scale)
+                    if distance > max_distance_km:
+                        continue
+                    if len(nearest) < candidates:
+                        heapq.heappush(nearest, (-distance, c))
+                    elif distance < -nearest[0][0]:
+                        heapq.heapreplace(nearest, (-distance, c))
+        for _, c in nearest:
+            courier = couriers[c]
+            edges.append((haversine_km(job.latitude, job.longitude, courier.latitude, courier.longitude), j, c))
+
+    edges.sort()
+    job_taken = [False] * len(jobs)
+    courier_taken = [False] * len(couriers)
+    assignments = []
+    for distance, j, c in edges:
+        if job_taken[j] or courier_taken[c]:
+            continue
+        job_taken[j] = courier_taken[c] = True
+        assignments.append(Assignment(jobs[j], couriers[c], distance))
+    return assignments
+
+
+# ---- committing a delivery ----
+
+def commit_available_delivery(db: Session, delivery: Delivery, volunteer_id: int, quantity: int) -> Delivery:
+    """
+    Split `quantity` off an AVAILABLE delivery into a PENDING_CONFIRMATION
+    delivery of `volunteer_id` and notify the inventory (caller commits).
+    Shared by POST /api/deliveries/{id}/commit and accepted offers.
+    """
+    # Reduce batch available quantity TEMPORARILY (until confirmation) - only if batch exists
+    batch = db.get(ProductBatch, delivery.batch_id) if delivery.batch_id else None
+    if batch:
+        batch.quantity_available -= quantity
+
+    # New delivery for the committed portion; the original keeps the rest
+    # (even 0, so that a cancellation can restore it)
+    committed_delivery = Delivery(
+        batch_id=delivery.batch_id,
+        delivery_location_id=delivery.delivery_location_id,
+        volunteer_id=volunteer_id,
+        parent_delivery_id=delivery.id,
+        product_type=delivery.product_type,
+        category_id=delivery.category_id,
+        quantity=quantity,
+        status=DeliveryStatus.PENDING_CONFIRMATION,
+        accepted_at=datetime.utcnow(),
+        expires_at=datetime.utcnow() + timedelta(hours=24),
+        pickup_code=ConfirmationCodeValidator.generate_code(),
+        delivery_code=ConfirmationCodeValidator.generate_code()
+    )
+    delivery.quantity -= quantity
+    db.add(committed_delivery)
+    db.flush()
+
+    # Hook: notify inventory service about volunteer commitment
+    on_volunteer_committed(db, committed_delivery, quantity)
+    return committed_delivery
+
+
+# ---- offers ----
+
+def _close(db: Session, offer: DispatchOffer, state: OfferStatus, actor_id: int = None):
+    offer.status = state
+    offer.responded_at = datetime.utcnow()
+    emit_after_commit(db, DeliveryOfferClosed(offer.id, offer.delivery_id, offer.volunteer_id, state.value,
+                                              actor_id=actor_id))
+    DISPATCH_OFFERS.inc(state.value)
+
+
+def _open_offer(db: Session, offer_id: int, volunteer: User) -> DispatchOffer:
+    offer = db.get(DispatchOffer, offer_id)
+    if offer is None or offer.volunteer_id != volunteer.id:
+        raise NotFoundError("Offer not found")
+    if offer.status != OfferStatus.OFFERED:
+        raise DispatchError(f"Offer is already {offer.status.value}")
+    if offer.expires_at <= datetime.utcnow():
+        _close(db, offer, OfferStatus.EXPIRED)
+        db.commit()
+        raise DispatchError("Offer expired")
+    return offer
+
+
+def accept_offer(db: Session, offer_id: int, volunteer: User) -> DispatchOffer:
+    """Commit the offered quantity of the delivery to `volunteer` (commits)."""
+    offer = _open_offer(db, offer_id, volunteer)
+    delivery = offer.delivery
+    if (delivery.status != DeliveryStatus.AVAILABLE or delivery.volunteer_id is not None
+            or delivery.quantity <= 0):
+        _close(db, offer, OfferStatus.WITHDRAWN)
+        db.commit()
+        raise DispatchError("Delivery is no longer available")
+    busy = db.execute(
+        select(Delivery.id).where(Delivery.volunteer_id == volunteer.id, Delivery.status.in_(list(BUSY_STATUSES)))
+    ).first()
+    if busy is not None:
+        raise DispatchError("You already have an active delivery. Complete or cancel it first.")
+
+    committed = commit_available_delivery(db, delivery, volunteer.id, min(offer.quantity, delivery.quantity))
+    offer.committed_delivery_id = committed.id
+    _close(db, offer, OfferStatus.ACCEPTED, actor_id=volunteer.id)
+    db.commit()
+    return offer
+
+
+def decline_offer(db: Session, offer_id: int, volunteer: User) -> DispatchOffer:
+    offer = _open_offer(db, offer_id, volunteer)
+    _close(db, offer, OfferStatus.DECLINED, actor_id=volunteer.id)
+    db.commit()
+    return offer
+
+
+def offer_to_dict(offer: DispatchOffer) -> Dict[str, Any]:
+    return {
+        "id": offer.id,
+        "delivery_id": offer.delivery_id,
+        "quantity": offer.quantity,
+        "distance_km": offer.distance_km,
+        "status": offer.status.value,
+        "created_at": offer.created_at.isoformat() if offer.created_at else None,
+        "expires_at": offer.expires_at.isoformat(),
+        "committed_delivery_id": offer.committed_delivery_id,
+    }
+
+
+# ---- rounds ----
+
+class Dispatcher:
+    """Runs dispatch rounds (one at a time in this process) and keeps their counters."""
+
+    def __init__(self, offer_timeout: float = None):
+        self.offer_timeout = DISPATCH_OFFER_TIMEOUT_SECONDS if offer_timeout is None else offer_timeout
+        self._lock = threading.Lock()
+        self.rounds = 0
+        self.offered = 0
+        self.last_round: Optional[Dict[str, Any]] = None
+
+    def _close_lapsed(self, db: Session, now: datetime) -> Dict[str, int]:
+        closed = {OfferStatus.EXPIRED.value: 0, OfferStatus.WITHDRAWN.value: 0}
+        for offer in db.execute(queries.lapsed_offers(now)).scalars().all():
+            delivery = offer.delivery
+            gone = (delivery is None or delivery.status != DeliveryStatus.AVAILABLE
+                    or delivery.volunteer_id is not None)
+            state = OfferStatus.WITHDRAWN if gone else OfferStatus.EXPIRED
+            _close(db, offer, state)
+            closed[state.value] += 1
+        return closed
+
+    def run_once(self, db: Session) -> Dict[str, Any]:
+        """One round with `db` (commits). Returns what it did."""
+        with self._lock:
+            started = time.perf_counter()
+            now = datetime.utcnow()
+            closed = self._close_lapsed(db, now)
+            db.flush()
+            refs = reference_data(db)
+
+            jobs = []
+            for delivery in db.execute(queries.dispatchable_deliveries()).scalars().all():
+                location = refs.location(delivery.pickup_location_id or delivery.delivery_location_id)
+                if location is None or location.latitude is None or location.longitude is None:
+                    continue
+                jobs.append(Job(delivery.id, location.latitude, location.longitude, delivery.quantity,
+                                delivery.category_id))
+            couriers = [
+                Courier(user.id, user.latitude, user.longitude, user.delivery_capacity,
+                        volunteer_categories(refs, user.tipos_produtos))
+                for user in db.execute(queries.idle_volunteers(BUSY_STATUSES)).scalars().all()
+                if "volunteer" in user.roles.split(",")
+            ]
+            excluded = set()
+            job_ids = [job.id for job in jobs]
+            for start in range(0, len(job_ids), _CHUNK):
+                excluded.update(tuple(pair) for pair in
+                                db.execute(queries.refused_offer_pairs(job_ids[start:start + _CHUNK])).all())
+
+            solve_started = time.perf_counter()
+            assignments = assign(jobs, couriers, excluded=frozenset(excluded)) if jobs and couriers else []
+            solve_seconds = time.perf_counter() - solve_started
+            DISPATCH_SOLVE.observe(solve_seconds)
+
+            expires_at = now + timedelta(seconds=self.offer_timeout)
+            offers = [
+                DispatchOffer(delivery_id=a.job.id, volunteer_id=a.courier.id, quantity=a.quantity,
+                              distance_km=round(a.distance_km, 3), status=OfferStatus.OFFERED,
+                              created_at=now, expires_at=expires_at)
+                for a in assignments
+            ]
+            db.add_all(offers)
+            db.flush()
+            for offer in offers:
+                emit_after_commit(db, DeliveryOffered(offer.id, offer.delivery_id, offer.volunteer_id, offer.quantity,
+                                                      offer.distance_km, expires_at.isoformat()))
+            db.commit()
+            DISPATCH_OFFERS.inc(OfferStatus.OFFERED.value, amount=len(offers))
+
+            self.rounds += 1
+            self.offered += len(offers)
+            self.last_round = {
+                "at": now.isoformat(),
+                "deliveries": len(jobs),
+                "volunteers": len(couriers),
+                "offered": len(offers),
+                "closed": closed,
+                "solve_ms": round(solve_seconds * 1000, 2),
+                "total_ms": round((time.perf_counter() - started) * 1000, 2),
+            }
+            return self.last_round
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": DISPATCH_ENABLED,
+            "interval_seconds": DISPATCH_INTERVAL_SECONDS,
+            "offer_timeout_seconds": self.offer_timeout,
+            "rounds": self.rounds,
+            "offered": self.offered,
+            "last_round": self.last_round,
+        }
+
+
+DISPATCHER = Dispatcher()
+
+
+def _run_round(session_factory):
+    db = session_factory()
+    try:
+        DISPATCHER.run_once(db)
+    finally:
+        db.close()
+
+
+async def _dispatch_forever(session_factory, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(_run_round, session_factory)
+        except Exception:
+            logger.exception("Dispatch round failed")
+
+
+def start_dispatcher(session_factory, interval: float = None) -> Optional[asyncio.Task]:
+    """Background rounds every `interval` seconds when DISPATCH_ENABLED (cancel the task to stop)."""
+    if not DISPATCH_ENABLED:
+        return None
+    interval = DISPATCH_INTERVAL_SECONDS if interval is None else interval
+    logger.info("Dispatcher enabled: a round every %.0fs", interval)
+    return asyncio.create_task(_dispatch_forever(session_factory, interval))
@@ -11,8 +11,18 @@ Stock Flow:
 - Request adjusted (increase/decrease) → no stock change (just the request quantity)
 - Request cancelled → no stock change (was requesting from outside)
 
+Hooks that change a shelter's request quantities queue a
+ShelterNeedsChanged event, emitted when the caller commits (live map
+updates, app.services.map_updates). Deliveries committed to, delivered to
+or cancelled for a shelter queue an IncomingDeliveryChanged event, and every
+flushed change to an InventoryItem's stock levels - whether it comes from
+these hooks or from the inventory endpoints - queues an
+InventoryStockChanged event (live shelter dashboards,
+app.services.shelter_updates).
+
 Now uses Repository Pattern for all data access.
 """
+from sqlalchemy import event as sa_event, inspect
 from sqlalchemy.orm import Session
 from datetime import datetime
 from typing import Optional, Tuple
@@ -28,6 +38,10 @@ from app.repositories import (
     ShelterRequestRepository,
     LocationRepository,
 )
+from app.core.events import (
+    IncomingDeliveryChanged, InventoryStockChanged, NeedRequestFulfilled, ShelterNeedsChanged,
+    emit_after_commit,
+)
 from app.core.logging_config import get_logger
 
 logger = get_logger(__name__)
@@ -98,6 +112,7 @@ def on_delivery_created(db: Session, delivery: Delivery, shelter_id: int):
     """
     if delivery.category_id:
         get_or_create_inventory_item(db, shelter_id, delivery.category_id)
+        emit_after_commit(db, ShelterNeedsChanged(shelter_id, delivery.category_id))
 
 
 def on_volunteer_committed(
@@ -110,6 +125,10 @@ def on_volunteer_committed(
     shelter_id = _get_shelter_id_for_delivery(db, committed_delivery)
     if not shelter_id or not committed_delivery.category_id:
         return
+    emit_after_commit(db, IncomingDeliveryChanged(
+        shelter_id, committed_delivery.id, committed_delivery.category_id, quantity, "committed",
+        actor_id=committed_delivery.volunteer_id,
+    ))
 
     request = _find_shelter_request_for_delivery(
         db, shelter_id, committed_delivery.category_id
@@ -129,6 +148,7 @@ def on_volunteer_committed(
     if request.status == "pending":
         request.status = "active"
     request.updated_at = datetime.utcnow()
+    emit_after_commit(db, ShelterNeedsChanged(shelter_id, committed_delivery.category_id))
 
 
 def on_delivery_confirmed(
@@ -159,6 +179,9 @@ def on_delivery_confirmed(
         delivery_id=delivery.id,
         notes=f"Received {quantity} units from delivery #{delivery.id}",
     )
+    emit_after_commit(db, IncomingDeliveryChanged(
+        shelter_id, delivery.id, delivery.category_id, quantity, "delivered", actor_id=user_id
+    ))
 
     # 2. Update ShelterRequest
     request = _find_shelter_request_for_delivery(
@@ -170,9 +193,11 @@ def on_delivery_confirmed(
         if request.quantity_received >= request.quantity_requested:
             request.status = "completed"
             request.completed_at = datetime.utcnow()
+            emit_after_commit(db, NeedRequestFulfilled(request.id, shelter_id))
         elif request.quantity_received > 0:
             request.status = "partially_completed"
         request.updated_at = datetime.utcnow()
+        emit_after_commit(db, ShelterNeedsChanged(shelter_id, delivery.category_id))
 
 
 def on_delivery_cancelled(
@@ -187,6 +212,9 @@ def on_delivery_cancelled(
     shelter_id = _get_shelter_id_for_delivery(db, delivery)
     if not shelter_id or not delivery.category_id:
         return
+    emit_after_commit(db, IncomingDeliveryChanged(
+        shelter_id, delivery.id, delivery.category_id, delivery.quantity, "cancelled", actor_id=user_id
+    ))
 
     # Find link before removing it
     link = db.query(ShelterRequestDelivery).filter(
@@ -217,6 +245,7 @@ def on_delivery_cancelled(
             ).count()
             if remaining_links == 0 and request.quantity_received == 0:
                 request.status = "pending"
+            emit_after_commit(db, ShelterNeedsChanged(shelter_id, delivery.category_id))
         # Use bulk delete to avoid double-delete warning from ORM cascade
         db.query(ShelterRequestDelivery).filter(
             ShelterRequestDelivery.delivery_id == delivery.id
@@ -254,3 +283,44 @@ def on_distribution(
     )
 
     return item
+
+
+# ============================================================================
+# STOCK HOOK
+# ============================================================================
+
+_STOCK_FIELDS = ("quantity_in_stock", "quantity_reserved", "quantity_available", "min_threshold")
+
+
+def _is_low(available: Optional[int], threshold: Optional[int]) -> bool:
+    """Same rule as the dashboard's is_low_stock."""
+    return (available or 0) <= (threshold or 0)
+
+
+def _queue_stock_changes(session: Session, flush_context):
+    """Queue an InventoryStockChanged for every flushed change to stock levels."""
+    for item in list(session.new) + list(session.dirty):
+        if not isinstance(item, InventoryItem):
+            continue
+        state = inspect(item)
+        history = {name: state.attrs[name].history for name in _STOCK_FIELDS}
+        if item not in session.new and not any(h.has_changes() for h in history.values()):
+            continue
+
+        def before(name):
+            deleted = history[name].deleted
+            return deleted[0] if deleted else getattr(item, name)
+
+        became_low = (
+            item not in session.new
+            and _is_low(item.quantity_available, item.min_threshold)
+            and not _is_low(before("quantity_available"), before("min_threshold"))
+        )
+        emit_after_commit(session, InventoryStockChanged(
+            item.shelter_id, item.category_id, item.id, item.quantity_in_stock or 0,
+            item.quantity_reserved or 0, item.quantity_available or 0, item.min_threshold or 0,
+            became_low=became_low,
+        ))
+
+
+sa_event.listen(Session, "after_flush", _queue_stock_changes)
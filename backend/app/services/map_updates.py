@@ -0,0 +1,59 @@
+"""
+Map Updates - live deltas for the public map, sourced from the domain event bus.
+
+Domain events (emitted after commit) become small map deltas:
+
+    shelter.needs_changed    → need.changed            {shelter_id, category_id}
+    need_request.created     → need_request.created    {request_id, shelter_id, category_id, quantity}
+    need_request.fulfilled   → need_request.fulfilled  {request_id, shelter_id}
+    location.approved        → location.approved       {location_id, user_id}
+
+Deltas are hints: clients refetch the affected shelter / location from the
+cached public endpoints. They travel between workers on the invalidation
+bus (`map_deltas` namespace), so every worker's MAP_DELTAS stream
+(GET /api/live/map) carries the events of all workers.
+"""
+from typing import Optional
+
+import orjson
+
+from app.core.events import DomainEvent, SyncEventBus
+from app.core.invalidation import INVALIDATION_BUS
+from app.core.logging_config import get_logger
+from app.core.sse import DeltaStream
+
+logger = get_logger(__name__)
+
+NAMESPACE = "map_deltas"
+
+# domain event type → (delta type, public payload fields)
+DELTAS = {
+    "shelter.needs_changed": ("need.changed", ("shelter_id", "category_id")),
+    "need_request.created": ("need_request.created", ("request_id", "shelter_id", "category_id", "quantity")),
+    "need_request.fulfilled": ("need_request.fulfilled", ("request_id", "shelter_id")),
+    "location.approved": ("location.approved", ("location_id", "user_id")),
+}
+
+MAP_DELTAS = DeltaStream("map")
+
+
+def _on_domain_event(event: DomainEvent):
+    delta_type, fields = DELTAS[event.event_type]
+    delta = {"type": delta_type, "data": {name: event.payload.get(name) for name in fields}}
+    INVALIDATION_BUS.publish(NAMESPACE, orjson.dumps(delta).decode())
+
+
+def _on_delta(key: Optional[str]):
+    if key is None:
+        # Resync after a broker outage: deltas may have been lost
+        MAP_DELTAS.publish("reset", {})
+        return
+    delta = orjson.loads(key)
+    MAP_DELTAS.publish(delta["type"], delta["data"])
+
+
+def install_map_updates(bus: SyncEventBus):
+    """Feed MAP_DELTAS from `bus` (call once, like register_handlers)."""
+    for event_type in DELTAS:
+        bus.subscribe(event_type, _on_domain_event)
+    INVALIDATION_BUS.subscribe(NAMESPACE, _on_delta)
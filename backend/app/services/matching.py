@@ -0,0 +1,331 @@
+"""
+Matching - ranked feed of open needs for a volunteer (GET /api/matching/feed).
+
+For the volunteer's position (User.latitude / longitude, or the position
+the app sends), declared categories (User.tipos_produtos) and capacity
+(User.delivery_capacity), every open need within MATCH_MAX_DISTANCE_KM is
+scored
+
+    score = W_DISTANCE / (1 + distance_km / MATCH_DISTANCE_SCALE_KM)
+          + W_URGENCY  × urgency / (1 + urgency)
+          + W_STALE    × min(hours since the last activity / MATCH_STALENESS_HOURS, 1)
+
+so a close need wins, but a large, uncovered or long-forgotten one a bit
+further away beats a nearby need that is almost covered - the peripheral
+shelters come up instead of the central ones being over-served. The
+suggested quantity is what is left, capped at the volunteer's capacity.
+
+Open needs come from the materialized `open_needs` table (one row per
+shelter and category, app.repositories.open_needs) placed at the shelter's
+approved, active delivery location. `NEED_INDEX` keeps them in memory,
+bucketed by grid cell (app.core.geo.GeoGrid) both for every category and
+per category, so a query reads only the cells around the volunteer, in
+rings of growing distance, and stops as soon as no farther ring can beat
+the top `limit` already found.
+
+The index is loaded on the first query and then patched: committed
+open_needs pairs arrive on the invalidation bus (`open_needs` namespace)
+and only those pairs are re-read on the next query; a change to
+delivery_locations (or a bus resync) reloads everything.
+
+Environment variables:
+    MATCH_CELL_KM             grid cell size in km (default 5)
+    MATCH_MAX_DISTANCE_KM     needs farther away are never suggested (default 100)
+    MATCH_DISTANCE_SCALE_KM   distance at which the distance term halves (default 5)
+    MATCH_STALENESS_HOURS     hours without activity for the full staleness term (default 72)
+    MATCH_WEIGHT_DISTANCE     default 0.45
+    MATCH_WEIGHT_URGENCY      default 0.35
+    MATCH_WEIGHT_STALENESS    default 0.2
+"""
+import heapq
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import orjson
+
+from app.core.data_versions import DATA_VERSIONS
+from app.core.geo import GeoGrid, haversine_km
+from app.core.invalidation import INVALIDATION_BUS
+from app.core.metrics import RESPONSE_CACHE_LOOKUPS
+from app.repositories import queries
+from app.repositories.open_needs import NAMESPACE as OPEN_NEEDS_NAMESPACE
+from app.repositories.reference_data import ReferenceSnapshot, reference_data_async
+
+MATCH_CELL_KM = float(os.getenv("MATCH_CELL_KM", "5"))
+MATCH_MAX_DISTANCE_KM = float(os.getenv("MATCH_MAX_DISTANCE_KM", "100"))
+MATCH_DISTANCE_SCALE_KM = float(os.getenv("MATCH_DISTANCE_SCALE_KM", "5"))
+MATCH_STALENESS_HOURS = float(os.getenv("MATCH_STALENESS_HOURS", "72"))
+MATCH_WEIGHT_DISTANCE = float(os.getenv("MATCH_WEIGHT_DISTANCE", "0.45"))
+MATCH_WEIGHT_URGENCY = float(os.getenv("MATCH_WEIGHT_URGENCY", "0.35"))
+MATCH_WEIGHT_STALENESS = float(os.getenv("MATCH_WEIGHT_STALENESS", "0.2"))
+
+Key = Tuple[int, int]  # (shelter_id, category_id)
+
+# keys per SELECT when patching (bound parameters stay well under SQLite's limit)
+_CHUNK = 400
+_LOCATION_TABLES = frozenset({"delivery_locations"})
+
+
+@dataclass(eq=False)
+class IndexedNeed:
+    shelter_id: int
+    category_id: int
+    location_id: int
+    latitude: float
+    longitude: float
+    quantity_remaining: int
+    urgency: float
+    last_activity: float  # epoch seconds
+
+    @property
+    def key(self) -> Key:
+        return self.shelter_id, self.category_id
+
+
+@dataclass
+class Match:
+    need: IndexedNeed
+    distance_km: float
+    score: float
+    suggested_quantity: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        need = self.need
+        return {
+            "shelter_id": need.shelter_id,
+            "category_id": need.category_id,
+            "location_id": need.location_id,
+            "latitude": need.latitude,
+            "longitude": need.longitude,
+            "distance_km": round(self.distance_km, 2),
+            "quantity_remaining": need.quantity_remaining,
+            "urgency": need.urgency,
+            "suggested_quantity": self.suggested_quantity,
+            "score": round(self.score, 4),
+        }
+
+
+def _epoch(value: Optional[datetime]) -> float:
+    if value is None:
+        return time.time()
+    return value.replace(tzinfo=timezone.utc).timestamp()  # naive UTC columns
+
+
+def indexed_need(row, refs: ReferenceSnapshot) -> Optional[IndexedNeed]:
+    """Index entry of an open_needs row, or None when its shelter has no usable location."""
+    location = refs.location_for_user(row.shelter_id)
+    if (location is None or not location.approved or not location.active
+            or location.latitude is None or location.longitude is None):
+        return None
+    return IndexedNeed(
+        shelter_id=row.shelter_id,
+        category_id=row.category_id,
+        location_id=location.id,
+        latitude=location.latitude,
+        longitude=location.longitude,
+        quantity_remaining=row.quantity_remaining,
+        urgency=row.urgency,
+        last_activity=_epoch(row.last_activity_at or row.oldest_request_at),
+    )
+
+
+class NeedIndex:
+    """Open needs bucketed by grid cell, for every category (None) and per category."""
+
+    def __init__(self, cell_km: float = None, max_distance_km: float = None):
+        self.grid = GeoGrid(MATCH_CELL_KM if cell_km is None else cell_km)
+        self.max_distance_km = MATCH_MAX_DISTANCE_KM if max_distance_km is None else max_distance_km
+        self._needs: Dict[Key, IndexedNeed] = {}
+        self._cells: Dict[Optional[int], Dict[Tuple[int, int], Dict[Key, IndexedNeed]]] = {}
+        self._max_urgency = 0.0  # upper bound: only raised between full loads
+        self._loaded = False
+        self._dirty: Set[Key] = set()
+        self._generation = 0  # bumped by full invalidations: a load that raced with one is not kept
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.patches = 0
+        self.queries = 0
+
+    # ---- maintenance ----
+    def _add(self, need: IndexedNeed):
+        self._needs[need.key] = need
+        cell = self.grid.cell(need.latitude, need.longitude)
+        for category in (None, need.category_id):
+            self._cells.setdefault(category, {}).setdefault(cell, {})[need.key] = need
+        self._max_urgency = max(self._max_urgency, need.urgency)
+
+    def _remove(self, key: Key):
+        need = self._needs.pop(key, None)
+        if need is None:
+            return
+        cell = self.grid.cell(need.latitude, need.longitude)
+        for category in (None, need.category_id):
+            buckets = self._cells[category]
+            buckets[cell].pop(key, None)
+            if not buckets[cell]:
+                del buckets[cell]
+
+    def replace(self, needs: Iterable[IndexedNeed], generation: int = None):
+        """Replace the whole index (loaded at `generation`, None = current)."""
+        with self._lock:
+            self._needs, self._cells, self._max_urgency = {}, {}, 0.0
+            for need in needs:
+                self._add(need)
+            self._loaded = generation is None or generation == self._generation
+            self.loads += 1
+
+    def patch(self, keys: Iterable[Key], needs: Iterable[IndexedNeed]):
+        """Replace the entries of `keys` with `needs` (keys without one are removed)."""
+        with self._lock:
+            for key in keys:
+                self._remove(key)
+            for need in needs:
+                self._add(need)
+            self.patches += 1
+
+    def mark_dirty(self, keys: Optional[Iterable[Key]] = None):
+        """Re-read `keys` (None = everything) on the next query."""
+        with self._lock:
+            if keys is None:
+                self._loaded = False
+                self._generation += 1
+                self._dirty.clear()
+            elif self._loaded:
+                self._dirty.update(keys)
+
+    def on_tables_changed(self, tables: Optional[Set[str]]):
+        """`DATA_VERSIONS` subscriber: shelters moved, were approved or deactivated."""
+        if tables is None or tables & _LOCATION_TABLES:
+            self.mark_dirty()
+
+    async def refresh(self, db):
+        """Load or patch the index with `db` (AsyncSession / SyncSessionAdapter) when needed."""
+        with self._lock:
+            loaded, dirty, generation = self._loaded, self._dirty, self._generation
+            self._dirty = set()
+        if loaded and not dirty:
+            RESPONSE_CACHE_LOOKUPS.inc("need_index", "hit")
+            return
+        RESPONSE_CACHE_LOOKUPS.inc("need_index", "miss")
+        refs = await reference_data_async(db)
+        if not loaded:
+            rows = (await db.execute(queries.open_need_rows())).scalars().all()
+            self.replace((need for need in (indexed_need(row, refs) for row in rows) if need is not None),
+                         generation)
+            return
+        keys = sorted(dirty)
+        needs = []
+        for start in range(0, len(keys), _CHUNK):
+            rows = (await db.execute(queries.open_need_rows(keys[start:start + _CHUNK]))).scalars().all()
+            needs.extend(need for need in (indexed_need(row, refs) for row in rows) if need is not None)
+        self.patch(keys, needs)
+
+    # ---- queries ----
+    def _bound(self, distance_km: float, urgency_term: float) -> float:
+        """Best score any need at least `distance_km` away can reach."""
+        return (MATCH_WEIGHT_DISTANCE / (1 + distance_km / MATCH_DISTANCE_SCALE_KM)
+                + MATCH_WEIGHT_URGENCY * urgency_term + MATCH_WEIGHT_STALENESS)
+
+    def search(self, latitude: float, longitude: float, categories: Optional[Set[int]] = None,
+               capacity: Optional[int] = None, limit: int = 20, now: float = None) -> List[Match]:
+        """Top `limit` needs for a volunteer at (latitude, longitude); `categories` None = any."""
+        now = time.time() if now is None else now
+        stale_seconds = MATCH_STALENESS_HOURS * 3600
+        center = self.grid.cell(latitude, longitude)
+        rings = self.grid.rings_within(latitude, self.max_distance_km)
+        top: List[Tuple[float, int, IndexedNeed, float]] = []  # min-heap on score
+        with self._lock:
+            self.queries += 1
+            grids = [self._cells.get(category) for category in ([None] if categories is None else categories)]
+            grids = [buckets for buckets in grids if buckets]
+            urgency_term = self._max_urgency / (1 + self._max_urgency)
+            for radius in range(rings + 1):
+                if len(top) >= limit and top[0][0] >= self._bound(self.grid.ring_min_km(latitude, radius),
+                                                                  urgency_term):
+                    break
+                for cell in self.grid.ring(center, radius):
+                    for buckets in grids:
+                        bucket = buckets.get(cell)
+                        if not bucket:
+                            continue
+                        for need in bucket.values():
+                            distance = haversine_km(latitude, longitude, need.latitude, need.longitude)
+                            if distance > self.max_distance_km:
+                                continue
+                            score = (MATCH_WEIGHT_DISTANCE / (1 + distance / MATCH_DISTANCE_SCALE_KM)
+                                     + MATCH_WEIGHT_URGENCY * need.urgency / (1 + need.urgency)
+                                     + MATCH_WEIGHT_STALENESS * min(max(now - need.last_activity, 0)
+                                                                    / stale_seconds, 1.0))
+                            if len(top) < limit:
+                                heapq.heappush(top, (score, len(top), need, distance))
+                            elif score > top[0][0]:
+                                heapq.heapreplace(top, (score, top[0][1], need, distance))
+        matches = []
+        for score, _, need, distance in sorted(top, key=lambda entry: (-entry[0], entry[2].key)):
+            suggested = need.quantity_remaining if not capacity else min(need.quantity_remaining, capacity)
+            matches.append(Match(need, distance, score, suggested))
+        return matches
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": self._loaded,
+            "needs": len(self._needs),
+            "cells": len(self._cells.get(None, {})),
+            "categories": len(self._cells) - (None in self._cells),
+            "dirty": len(self._dirty),
+            "loads": self.loads,
+            "patches": self.patches,
+            "queries": self.queries,
+        }
+
+
+def volunteer_categories(refs: ReferenceSnapshot, declared) -> Optional[Set[int]]:
+    """
+    Category ids (with their subcategories) for a volunteer's `tipos_produtos`
+    - legacy product types, category names or ids. None = nothing declared
+    (any category).
+    """
+    if not declared:
+        return None
+    if isinstance(declared, (str, int)):
+        declared = [declared]
+    categories: Set[int] = set()
+    pending = []
+    for value in declared:
+        if isinstance(value, int) or (isinstance(value, str) and value.isdigit()):
+            category = refs.category(int(value))
+        else:
+            category = refs.category_by_legacy_type(value) or refs.category_by_name(value)
+        if category is not None:
+            pending.append(category)
+    while pending:
+        category = pending.pop()
+        if category.id not in categories:
+            categories.add(category.id)
+            pending.extend(category.children)
+    return categories
+
+
+NEED_INDEX = NeedIndex()
+
+
+def _on_open_needs(key: Optional[str]):
+    """Bus handler: open_needs pairs committed by any worker (None = rebuilt / resync)."""
+    NEED_INDEX.mark_dirty(None if key is None else [tuple(pair) for pair in orjson.loads(key)])
+
+
+_installed = False
+
+
+def install_matching():
+    """Keep NEED_INDEX in step with open_needs and the delivery locations. Idempotent."""
+    global _installed
+    if _installed:
+        return
+    INVALIDATION_BUS.subscribe(OPEN_NEEDS_NAMESPACE, _on_open_needs)
+    DATA_VERSIONS.subscribe(NEED_INDEX.on_tables_changed)
+    _installed = True
@@ -0,0 +1,328 @@
+"""
+Routing - one ordered route through a volunteer's accepted deliveries
+(GET /api/deliveries/my-route).
+
+Every active delivery of the volunteer becomes one or two stops:
+
+    PENDING_CONFIRMATION / RESERVED with a pickup location   pickup, then drop-off
+    direct donations (no pickup location), PICKED_UP,
+    IN_TRANSIT                                              drop-off only
+
+and the planner orders them - starting from the volunteer's position when
+known, open-ended (no return) - minimizing the total distance, with every
+pickup before its drop-off (a pickup-and-delivery problem):
+
+    1. construction: nearest feasible stop first
+    2. local search: moving one stop, or a delivery's pickup + drop-off
+       pair, to its cheapest feasible position, while the route improves
+    3. perturbation: while time is left, a few random pairs are taken out
+       and reinserted at their cheapest positions, followed by 2.; the
+       best route found is kept
+
+Steps 2 and 3 stop at the time budget (ROUTE_TIME_BUDGET_MS, or the
+caller's), so the answer time is bounded whatever the number of stops.
+
+Distances are great-circle (app.core.geo), straight-line: the estimate
+is a lower bound of the road distance. Distances between delivery
+locations come from the shared matrix (app.core.distance_matrix).
+
+Environment variables:
+    ROUTE_TIME_BUDGET_MS       default time budget of a plan (default 50)
+    ROUTE_MAX_TIME_BUDGET_MS   longest budget a client may ask for (default 500)
+    ROUTE_SPEED_KMH            average speed for the time estimate (default 20)
+"""
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.distance_matrix import DISTANCE_MATRIX
+from app.core.geo import haversine_km
+from app.repositories.reference_data import ReferenceSnapshot
+from app.shared.enums import DeliveryStatus
+
+ROUTE_TIME_BUDGET_MS = float(os.getenv("ROUTE_TIME_BUDGET_MS", "50"))
+ROUTE_MAX_TIME_BUDGET_MS = float(os.getenv("ROUTE_MAX_TIME_BUDGET_MS", "500"))
+ROUTE_SPEED_KMH = float(os.getenv("ROUTE_SPEED_KMH", "20"))
+
+# Deliveries still to pick up (when they have a pickup location) / only to drop off
+TO_PICK_UP = frozenset({DeliveryStatus.PENDING_CONFIRMATION, DeliveryStatus.RESERVED})
+TO_DROP_OFF = frozenset({DeliveryStatus.PICKED_UP, DeliveryStatus.IN_TRANSIT})
+ROUTED_STATUSES = TO_PICK_UP | TO_DROP_OFF
+
+PICKUP, DROPOFF = "pickup", "dropoff"
+
+
+@dataclass(eq=False)
+class Stop:
+    delivery_id: int
+    action: str  # PICKUP | DROPOFF
+    location_id: Optional[int]
+    latitude: float
+    longitude: float
+
+
+@dataclass
+class Route:
+    stops: List[Stop]
+    legs_km: List[float]          # leg ending at each stop
+    distance_km: float
+    elapsed_ms: float
+    iterations: int = 0
+    unroutable: List[int] = field(default_factory=list)  # deliveries without coordinates
+
+    def to_dict(self, refs: ReferenceSnapshot = None) -> Dict[str, Any]:
+        stops = []
+        for sequence, (stop, leg) in enumerate(zip(self.stops, self.legs_km), start=1):
+            location = refs.location(stop.location_id) if refs is not None else None
+            stops.append({
+                "sequence": sequence,
+                "delivery_id": stop.delivery_id,
+                "action": stop.action,
+                "location_id": stop.location_id,
+                "location_name": location.name if location else None,
+                "address": location.address if location else None,
+                "latitude": stop.latitude,
+                "longitude": stop.longitude,
+                "leg_km": round(leg, 3),
+            })
+        return {
+            "stops": stops,
+            "distance_km": round(self.distance_km, 3),
+            "estimated_minutes": round(self.distance_km / ROUTE_SPEED_KMH * 60, 1),
+            "unroutable": self.unroutable,
+            "elapsed_ms": round(self.elapsed_ms, 2),
+            "iterations": self.iterations,
+        }
+
+
+def delivery_stops(deliveries, refs: ReferenceSnapshot) -> Tuple[List[Tuple[Optional[Stop], Stop]], List[int]]:
+    """(pickup or None, drop-off) per routable delivery, and the ids of those without coordinates."""
+    pairs, unroutable = [], []
+    for delivery in deliveries:
+        if delivery.status not in ROUTED_STATUSES:
+            continue
+        destination = refs.location(delivery.delivery_location_id)
+        needs_pickup = bool(delivery.pickup_location_id) and delivery.status in TO_PICK_UP
+        origin = refs.location(delivery.pickup_location_id) if needs_pickup else None
+        if (destination is None or destination.latitude is None
+                or needs_pickup and (origin is None or origin.latitude is None)):
+            unroutable.append(delivery.id)
+            continue
+        pickup = Stop(delivery.id, PICKUP, origin.id, origin.latitude, origin.longitude) if origin else None
+        pairs.append((pickup, Stop(delivery.id, DROPOFF, destination.id, destination.latitude,
+                                   destination.longitude)))
+    return pairs, unroutable
+
+
+class _Planner:
+    """Search state over stop indices (0 = the start, when there is one)."""
+
+    def __init__(self, pairs: Sequence[Tuple[Optional[Stop], Stop]], distance: Callable[[Stop, Stop], float],
+                 start: Optional[Stop], deadline: float, rng: random.Random):
+        self.nodes: List[Stop] = [start] if start is not None else []
+        self.has_start = start is not None
+        self.partner: Dict[int, int] = {}  # pickup -> drop-off and drop-off -> pickup
+        self.is_pickup: Dict[int, bool] = {}
+        self.pairs: List[Tuple[Optional[int], int]] = []
+        for pickup, dropoff in pairs:
+            p = None
+            if pickup is not None:
+                p = len(self.nodes)
+                self.nodes.append(pickup)
+                self.is_pickup[p] = True
+            d = len(self.nodes)
+            self.nodes.append(dropoff)
+            self.is_pickup[d] = False
+            if p is not None:
+                self.partner[p], self.partner[d] = d, p
+            self.pairs.append((p, d))
+        n = len(self.nodes)
+        self.km = [[0.0] * n for _ in range(n)]
+        for i in range(n):
+            for j in range(i + 1, n):
+                self.km[i][j] = self.km[j][i] = distance(self.nodes[i], self.nodes[j])
+        self.deadline = deadline
+        self.rng = rng
+        self.iterations = 0
+
+    def out_of_time(self) -> bool:
+        return time.perf_counter() >= self.deadline
+
+    def cost(self, route: List[int]) -> float:
+        km = self.km
+        total = km[0][route[0]] if self.has_start and route else 0.0
+        for a, b in zip(route, route[1:]):
+            total += km[a][b]
+        return total
+
+    # ---- insertion deltas ----
+    def _insert_delta(self, route: List[int], position: int, node: int) -> float:
+        km = self.km
+        before = route[position - 1] if position > 0 else (0 if self.has_start else None)
+        after = route[position] if position < len(route) else None
+        delta = 0.0
+        if before is not None:
+            delta += km[before][node]
+        if after is not None:
+            delta += km[node][after]
+            if before is not None:
+                delta -= km[before][after]
+        return delta
+
+    def _best_pair_insertion(self, route: List[int], p: Optional[int], d: int) -> Tuple[float, int, int]:
+        """Cheapest (delta, pickup position, drop-off position) for the pair in `route` (positions in `route`)."""
+        if p is None:
+            return min((self._insert_delta(route, j, d), -1, j) for j in range(len(route) + 1))
+        km = self.km
+        best = (float("inf"), 0, 0)
+        for i in range(len(route) + 1):
+            p_delta = self._insert_delta(route, i, p)
+            # both at i: before, p, d, after
+            before = route[i - 1] if i > 0 else (0 if self.has_start else None)
+            after = route[i] if i < len(route) else None
+            together = km[p][d]
+            if before is not None:
+                together += km[before][p]
+            if after is not None:
+                together += km[d][after]
+                if before is not None:
+                    together -= km[before][after]
+            if together < best[0]:
+                best = (together, i, i)
+            for j in range(i + 1, len(route) + 1):
+                delta = p_delta + self._insert_delta(route, j, d)
+                if delta < best[0]:
+                    best = (delta, i, j)
+        return best
+
+    @staticmethod
+    def _apply_pair(route: List[int], p: Optional[int], d: int, i: int, j: int) -> List[int]:
+        if p is None:
+            return route[:j] + [d] + route[j:]
+        return route[:i] + [p] + route[i:j] + [d] + route[j:]
+
+    # ---- construction ----
+    def construct(self) -> List[int]:
+        """Nearest feasible stop first."""
+        km = self.km
+        pending = {d if p is None else p for p, d in self.pairs}
+        route: List[int] = []
+        current = 0 if self.has_start else None
+        while pending:
+            if current is None:
+                node = min(pending)
+            else:
+                node = min(pending, key=lambda candidate: (km[current][candidate], candidate))
+            pending.discard(node)
+            route.append(node)
+            if self.is_pickup[node]:
+                pending.add(self.partner[node])
+            current = node
+        return route
+
+    # ---- improvement ----
+    def _relocate_stop(self, route: List[int], cost: float) -> Tuple[List[int], float]:
+        for index, node in enumerate(route):
+            if self.out_of_time():
+                break
+            rest = route[:index] + route[index + 1:]
+            partner = self.partner.get(node)
+            if partner is None:
+                low, high = 0, len(rest)
+            elif self.is_pickup[node]:
+                low, high = 0, rest.index(partner)
+            else:
+                low, high = rest.index(partner) + 1, len(rest)
+            removed = self.cost(rest)
+            for position in range(low, high + 1):
+                candidate_cost = removed + self._insert_delta(rest, position, node)
+                if candidate_cost < cost - 1e-9:
+                    return rest[:position] + [node] + rest[position:], candidate_cost
+        return route, cost
+
+    def _relocate_pair(self, route: List[int], cost: float) -> Tuple[List[int], float]:
+        for p, d in self.pairs:
+            if p is None or self.out_of_time():
+                continue
+            rest = [node for node in route if node != p and node != d]
+            delta, i, j = self._best_pair_insertion(rest, p, d)
+            candidate_cost = self.cost(rest) + delta
+            if candidate_cost < cost - 1e-9:
+                return self._apply_pair(rest, p, d, i, j), candidate_cost
+        return route, cost
+
+    def local_search(self, route: List[int], cost: float) -> Tuple[List[int], float]:
+        while not self.out_of_time():
+            self.iterations += 1
+            improved, improved_cost = self._relocate_stop(route, cost)
+            if improved_cost >= cost:
+                improved, improved_cost = self._relocate_pair(route, cost)
+            if improved_cost >= cost:
+                break
+            route, cost = improved, improved_cost
+        return route, cost
+
+    def perturb(self, route: List[int]) -> List[int]:
+        removed = self.rng.sample(self.pairs, min(len(self.pairs), max(2, len(self.pairs) // 4)))
+        drop = {node for pair in removed for node in pair if node is not None}
+        route = [node for node in route if node not in drop]
+        for p, d in removed:
+            _, i, j = self._best_pair_insertion(route, p, d)
+            route = self._apply_pair(route, p, d, i, j)
+        return route
+
+
+def plan_route(pairs: Sequence[Tuple[Optional[Stop], Stop]], distance: Callable[[Stop, Stop], float] = None,
+               start: Optional[Stop] = None, budget_ms: float = None, seed: int = 0) -> Route:
+    """
+    Order the stops of `pairs` [(pickup or None, drop-off)] from `start`
+    (None: from the first stop) within `budget_ms` milliseconds.
+    """
+    started = time.perf_counter()
+    budget_ms = ROUTE_TIME_BUDGET_MS if budget_ms is None else budget_ms
+    if distance is None:
+        def distance(a, b):
+            return haversine_km(a.latitude, a.longitude, b.latitude, b.longitude)
+    planner = _Planner(pairs, distance, start, started + budget_ms / 1000, random.Random(seed))
+    route = planner.construct()
+    cost = planner.cost(route)
+    best, best_cost = planner.local_search(route, cost)
+    if len(planner.pairs) > 2:
+        while not planner.out_of_time():
+            candidate = planner.perturb(best)
+            candidate, candidate_cost = planner.local_search(candidate, planner.cost(candidate))
+            if candidate_cost < best_cost - 1e-9:
+                best, best_cost = candidate, candidate_cost
+
+    legs = []
+    previous = 0 if planner.has_start else None
+    for node in best:
+        legs.append(planner.km[previous][node] if previous is not None else 0.0)
+        previous = node
+    return Route(
+        stops=[planner.nodes[node] for node in best],
+        legs_km=legs,
+        distance_km=best_cost,
+        elapsed_ms=(time.perf_counter() - started) * 1000,
+        iterations=planner.iterations,
+    )
+
+
+def plan_volunteer_route(deliveries, refs: ReferenceSnapshot, latitude: float = None, longitude: float = None,
+                         budget_ms: float = None) -> Route:
+    """Route through `deliveries` (the volunteer's), from (latitude, longitude) when given."""
+    pairs, unroutable = delivery_stops(deliveries, refs)
+    start = Stop(0, "start", None, latitude, longitude) if latitude is not None and longitude is not None else None
+    DISTANCE_MATRIX.sync(refs)
+
+    def distance(a: Stop, b: Stop) -> float:
+        km = None
+        if a.location_id is not None and b.location_id is not None:
+            km = DISTANCE_MATRIX.km(a.location_id, b.location_id)
+        return haversine_km(a.latitude, a.longitude, b.latitude, b.longitude) if km is None else km
+
+    route = plan_route(pairs, distance, start, budget_ms)
+    route.unroutable = unroutable
+    return route
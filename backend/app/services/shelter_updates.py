@@ -0,0 +1,77 @@
+"""
+Shelter Updates - live dashboard messages for shelter operators.
+
+Domain events queued by app.services.inventory_service (emitted after
+commit) become messages on the shelter's WebSocket channel:
+
+    inventory.stock_changed      → stock.changed       {item_id, category_id, quantity_in_stock,
+                                                        quantity_reserved, quantity_available,
+                                                        min_threshold, is_low_stock}
+                                 → alert.low_stock     {item_id, category_id, quantity_available,
+                                                        min_threshold}   (when it just became low)
+    inventory.incoming_changed   → delivery.incoming   {delivery_id, category_id, quantity, state}
+    shelter.needs_changed        → needs.changed       {category_id}
+
+The dashboard connects first, then loads GET /api/inventory/dashboard once
+and applies the messages on top of it; `reset` (or a close with code 1013)
+means: reload the dashboard. Messages travel between workers on the
+invalidation bus (`shelter_updates` namespace), so a shelter's sockets see
+the changes made through any worker.
+"""
+from typing import Optional
+
+import orjson
+
+from app.core.events import DomainEvent, SyncEventBus
+from app.core.invalidation import INVALIDATION_BUS
+from app.core.logging_config import get_logger
+from app.core.websocket_hub import ChannelHub
+
+logger = get_logger(__name__)
+
+NAMESPACE = "shelter_updates"
+
+SHELTER_UPDATES = ChannelHub("shelter")
+
+_STOCK_FIELDS = ("item_id", "category_id", "quantity_in_stock", "quantity_reserved",
+                 "quantity_available", "min_threshold")
+
+
+def _messages(event: DomainEvent):
+    """(message type, data) pairs for the shelter of `event`."""
+    payload = event.payload
+    if event.event_type == "inventory.stock_changed":
+        stock = {name: payload[name] for name in _STOCK_FIELDS}
+        stock["is_low_stock"] = stock["quantity_available"] <= stock["min_threshold"]
+        yield "stock.changed", stock
+        if payload["became_low"]:
+            yield "alert.low_stock", {name: stock[name] for name in
+                                      ("item_id", "category_id", "quantity_available", "min_threshold")}
+    elif event.event_type == "inventory.incoming_changed":
+        yield "delivery.incoming", {name: payload[name] for name in
+                                    ("delivery_id", "category_id", "quantity", "state")}
+    elif event.event_type == "shelter.needs_changed":
+        yield "needs.changed", {"category_id": payload["category_id"]}
+
+
+def _on_domain_event(event: DomainEvent):
+    shelter_id = event.payload["shelter_id"]
+    for message_type, data in _messages(event):
+        message = {"shelter_id": shelter_id, "type": message_type, "data": data}
+        INVALIDATION_BUS.publish(NAMESPACE, orjson.dumps(message).decode())
+
+
+def _on_message(key: Optional[str]):
+    if key is None:
+        # Resync after a broker outage: messages may have been lost
+        SHELTER_UPDATES.broadcast("reset", {})
+        return
+    message = orjson.loads(key)
+    SHELTER_UPDATES.publish(message["shelter_id"], message["type"], message["data"])
+
+
+def install_shelter_updates(bus: SyncEventBus):
+    """Feed SHELTER_UPDATES from `bus` (call once, like register_handlers)."""
+    for event_type in ("inventory.stock_changed", "inventory.incoming_changed", "shelter.needs_changed"):
+        bus.subscribe(event_type, _on_domain_event)
+    INVALIDATION_BUS.subscribe(NAMESPACE, _on_message)
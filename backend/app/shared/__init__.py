@@ -9,6 +9,7 @@ Inclui:
 from .exceptions import (
     DomainError,
     DonationError,
+    DispatchError,
     ValidationError,
     NotFoundError,
     UnauthorizedError,
@@ -20,6 +21,7 @@ __all__ = [
     # Exceptions
     "DomainError",
     "DonationError",
+    "DispatchError",
     "ValidationError",
     "NotFoundError",
     "UnauthorizedError",
@@ -85,6 +85,17 @@ class DeliveryStatus(str, Enum):
     CANCELLED = "cancelled"
     EXPIRED = "expired"
 
+class OfferStatus(str, Enum):
+    """
+    Status of a dispatcher offer (delivery proposed to one volunteer).
+    OFFERED → ACCEPTED | DECLINED | EXPIRED | WITHDRAWN
+    """
+    OFFERED = "offered"            # Waiting for the volunteer's answer
+    ACCEPTED = "accepted"          # Volunteer accepted: delivery committed to them
+    DECLINED = "declined"          # Volunteer said no
+    EXPIRED = "expired"            # No answer before expires_at
+    WITHDRAWN = "withdrawn"        # Delivery taken or gone before the answer
+
 # ============================================================================
 # USER ROLES
 # ============================================================================
@@ -8,6 +8,7 @@ Hierarquia:
   - UnauthorizedError
   - DonationError
   - InventoryError
+  - DispatchError
 """
 
 
@@ -46,3 +47,8 @@ class DonationError(DomainError):
 class InventoryError(DomainError):
     """Erro em operações de inventário."""
     pass
+
+
+class DispatchError(DomainError):
+    """Erro em ofertas do despacho automático."""
+    pass
@@ -1,48 +1,40 @@
 """
 Helper functions para trabalhar com sistema de categorias e metadados
 Facilita a transição do ProductType legado para o novo sistema
+
+Categorias e atributos vêm do cache de dados de referência
+(app.repositories.reference_data), não de consultas a cada chamada.
 """
 from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
-from app.models import Category, CategoryAttribute, ProductBatch, ProductMetadata, Delivery
+from app.models import ProductBatch, ProductMetadata, Delivery
+from app.repositories.reference_data import AttributeRecord, CategoryRecord, reference_data
 
 # ============================================================================
 # CATEGORY HELPERS
 # ============================================================================
 
-def get_category_by_legacy_type(db: Session, product_type: str) -> Optional[Category]:
+def get_category_by_legacy_type(db: Session, product_type: str) -> Optional[CategoryRecord]:
     """
     Obtém categoria baseada no ProductType legado.
     Útil para manter compatibilidade com código existente.
     """
-    return db.query(Category).filter(
-        Category.legacy_product_type == product_type,
-        Category.active == True
-    ).first()
+    return reference_data(db).category_by_legacy_type(product_type)
 
-def get_or_create_category_from_legacy(db: Session, product_type: str) -> Optional[Category]:
+def get_or_create_category_from_legacy(db: Session, product_type: str) -> Optional[CategoryRecord]:
     """
     Obtém categoria existente ou retorna None se não encontrar.
     Não cria automaticamente para evitar inconsistências.
     """
     return get_category_by_legacy_type(db, product_type)
 
-def get_category_attributes(db: Session, category_id: int, active_only: bool = True) -> List[CategoryAttribute]:
+def get_category_attributes(db: Session, category_id: int, active_only: bool = True) -> List[AttributeRecord]:
     """Obtém todos os atributos de uma categoria"""
-    query = db.query(CategoryAttribute).filter(CategoryAttribute.category_id == category_id)
-    
-    if active_only:
-        query = query.filter(CategoryAttribute.active == True)
-    
-    return query.order_by(CategoryAttribute.sort_order).all()
+    return reference_data(db).attributes(category_id, active_only)
 
-def get_required_attributes(db: Session, category_id: int) -> List[CategoryAttribute]:
+def get_required_attributes(db: Session, category_id: int) -> List[AttributeRecord]:
     """Obtém apenas atributos obrigatórios de uma categoria"""
-    return db.query(CategoryAttribute).filter(
-        CategoryAttribute.category_id == category_id,
-        CategoryAttribute.required == True,
-        CategoryAttribute.active == True
-    ).all()
+    return reference_data(db).required_attributes(category_id)
 
 # ============================================================================
 # METADATA HELPERS
@@ -82,11 +74,7 @@ def set_batch_metadata(
     # Criar novos metadados
     for attr_name, value in metadata.items():
         # Buscar atributo
-        attr = db.query(CategoryAttribute).filter(
-            CategoryAttribute.category_id == batch.category_id,
-            CategoryAttribute.name == attr_name,
-            CategoryAttribute.active == True
-        ).first()
+        attr = reference_data(db).attribute(batch.category_id, attr_name)
         
         if not attr:
             if validate:
@@ -232,11 +220,7 @@ def validate_metadata(
     
     # Validar cada metadado fornecido
     for attr_name, value in metadata.items():
-        attr = db.query(CategoryAttribute).filter(
-            CategoryAttribute.category_id == category_id,
-            CategoryAttribute.name == attr_name,
-            CategoryAttribute.active == True
-        ).first()
+        attr = reference_data(db).attribute(category_id, attr_name)
         
         if not attr:
             errors.append(f"Atributo '{attr_name}' não existe para esta categoria")
@@ -280,10 +264,7 @@ def format_metadata_for_display(
     formatted = {}
     
     for attr_name, value in metadata.items():
-        attr = db.query(CategoryAttribute).filter(
-            CategoryAttribute.category_id == category_id,
-            CategoryAttribute.name == attr_name
-        ).first()
+        attr = reference_data(db).attribute(category_id, attr_name, active_only=False)
         
         if not attr:
             continue
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Benchmark de carga: caminho síncrono (threadpool) vs assíncrono (AsyncSession).
+
+Sobe o app com uvicorn duas vezes sobre o mesmo banco populado - com
+DATABASE_ASYNC=false (Session síncrona no threadpool, via SyncSessionAdapter)
+e com DATABASE_ASYNC=auto (AsyncSession) - e aplica carga em malha
+aberta (taxa fixa de chegada, sem esperar respostas) nos endpoints quentes:
+mapa (/api/deliveries/, /api/locations/), pedidos públicos, categorias,
+/api/auth/me e /api/deliveries/my-deliveries.
+
+A taxa sobe em degraus até o p99 passar de --p99-ms (ou aparecerem erros);
+o resultado é a maior vazão sustentável com p99 dentro do alvo.
+
+Sem greenlet + aiosqlite/asyncpg instalados o modo "auto" cai no adaptador
+síncrono; o benchmark mostra o modo efetivo (campo async_sessions de /health/db).
+
+Uso (a partir de backend/):
+    python benchmarks/async_load.py [--p99-ms 100] [--start-rps 50] [--step 50]
+        [--max-rps 2000] [--duration 5] [--seed-rows 500]
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+DB_PATH = "./bench_async_load.db"
+DB_URL = f"sqlite:///{DB_PATH}"
+
+
+def remove_db():
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(DB_PATH + suffix):
+            os.remove(DB_PATH + suffix)
+
+
+def seed(rows: int) -> str:
+    """Popula o banco de benchmark e devolve um token de voluntário."""
+    from app.database import Base
+    from app.models import User, Category, DeliveryLocation, Delivery
+    from app.inventory_models import ShelterRequest
+    from app.shared.enums import DeliveryStatus, ProductType
+    from app.auth import create_access_token
+
+    engine = create_engine(DB_URL)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    volunteer = User(email="voluntario@bench.org", name="Voluntário", roles="volunteer",
+                     hashed_password="x", approved=True)
+    shelter = User(email="abrigo@bench.org", name="Abrigo", roles="shelter", hashed_password="x", approved=True)
+    categories = [Category(name=f"cat_{i}", display_name=f"Categoria {i}", sort_order=i) for i in range(12)]
+    db.add_all([volunteer, shelter, *categories])
+    db.flush()
+    locations = [
+        DeliveryLocation(name=f"Local {i}", address=f"Rua {i}", user_id=shelter.id, approved=True,
+                         latitude=-19.9 + random.random() / 10, longitude=-43.9 + random.random() / 10)
+        for i in range(rows // 10 or 1)
+    ]
+    db.add_all(locations)
+    db.flush()
+    for i in range(rows):
+        category = categories[i % len(categories)]
+        db.add(ShelterRequest(shelter_id=shelter.id, category_id=category.id, quantity_requested=10,
+                              status="active"))
+        db.add(Delivery(delivery_location_id=locations[i % len(locations)].id,
+                        volunteer_id=volunteer.id if i % 5 == 0 else None, product_type=ProductType.MEAL,
+                        category_id=category.id, quantity=1, status=DeliveryStatus.AVAILABLE))
+    db.commit()
+    db.close()
+    engine.dispose()
+    return create_access_token(data={"sub": "voluntario@bench.org"})
+
+
+def start_server(mode: str, port: int) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_URL=DB_URL, DATABASE_ASYNC=mode, LOG_LEVEL="WARNING",
+               SLOW_QUERY_THRESHOLD_MS="0")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health/db", timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"uvicorn ({mode}) não subiu")
+
+
+async def run_step(base_url: str, token: str, rps: int, duration: float):
+    """Dispara `rps` requisições por segundo durante `duration` s; devolve (latências, erros)."""
+    paths = [
+        ("/api/deliveries/", None),
+        ("/api/locations/", None),
+        ("/api/inventory/requests/public", None),
+        ("/api/categories/", None),
+        ("/api/auth/me", token),
+        ("/api/deliveries/my-deliveries", token),
+    ]
+    latencies, errors = [], [0]
+    limits = httpx.Limits(max_connections=1000, max_keepalive_connections=200)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=10) as client:
+
+        async def one(path, auth):
+            headers = {"Authorization": f"Bearer {auth}"} if auth else {}
+            started = time.perf_counter()
+            try:
+                response = await client.get(path, headers=headers)
+                if response.status_code != 200:
+                    errors[0] += 1
+                    return
+            except httpx.HTTPError:
+                errors[0] += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+        tasks = []
+        interval = 1.0 / rps
+        started = time.perf_counter()
+        for i in range(int(rps * duration)):
+            delay = started + i * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one(*paths[i % len(paths)])))
+        await asyncio.gather(*tasks)
+    return latencies, errors[0]
+
+
+def p99(latencies):
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000 if ordered else float("inf")
+
+
+def measure(mode: str, port: int, token: str, args) -> None:
+    process = start_server(mode, port)
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        effective = httpx.get(f"{base_url}/health/db").json().get("async_sessions")
+        print(f"\nDATABASE_ASYNC={mode} (AsyncSession ativo: {effective})")
+        asyncio.run(run_step(base_url, token, args.start_rps, 1.0))  # aquecimento
+        best = 0
+        rps = args.start_rps
+        while rps <= args.max_rps:
+            latencies, errors = asyncio.run(run_step(base_url, token, rps, args.duration))
+            tail = p99(latencies)
+            print(f"  rps={rps:>5} ok={len(latencies):>6} erros={errors:>4} p99={tail:8.1f}ms")
+            if errors or tail > args.p99_ms:
+                break
+            best = rps
+            rps += args.step
+        print(f"  => máximo sustentável com p99 <= {args.p99_ms:.0f}ms: {best} rps")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--p99-ms", type=float, default=100.0)
+    parser.add_argument("--start-rps", type=int, default=50)
+    parser.add_argument("--step", type=int, default=50)
+    parser.add_argument("--max-rps", type=int, default=2000)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--seed-rows", type=int, default=500)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    remove_db()
+    token = seed(args.seed_rows)
+    try:
+        for mode in ("false", "auto"):
+            measure(mode, args.port, token, args)
+    finally:
+        remove_db()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: compressão dos payloads públicos do mapa.
+
+Monta o JSON de /api/deliveries/ com --rows entregas (mesmo projetor do
+endpoint) e mostra, para cada codificação/nível, tamanho, razão e tempo de
+compressão. Depois compara o custo por requisição:
+
+    sem cache     serialização + gzip dinâmico (COMPRESSION_GZIP_LEVEL) a cada requisição
+    com cache     PayloadCache: bytes já comprimidos (nível máximo) servidos direto
+
+brotli só aparece se o pacote `brotli` estiver instalado.
+
+Uso (a partir de backend/):
+    python benchmarks/compression.py [--rows 10000] [--requests 20]
+"""
+import argparse
+import asyncio
+import gzip
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.requests import Request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def build_rows(count: int):
+    from app.models import Category, Delivery, DeliveryLocation, User
+    from app.shared.enums import DeliveryStatus, ProductType
+
+    volunteer = User(id=1, email="voluntario@bench.org", name="Voluntário", roles="volunteer",
+                     approved=True, active=True, created_at=datetime(2026, 1, 1))
+    categories = [Category(id=i, name=f"cat_{i}", display_name=f"Categoria {i}", icon="📦", active=True)
+                  for i in range(12)]
+    location = DeliveryLocation(id=1, name="Abrigo Central", address="Rua da Bahia, 1000")
+    return [
+        Delivery(id=i, delivery_location_id=1, delivery_location=location, product_type=ProductType.MEAL,
+                 category_id=categories[i % 12].id, category=categories[i % 12], quantity=1 + i % 7,
+                 volunteer_id=1 if i % 3 == 0 else None, volunteer=volunteer if i % 3 == 0 else None,
+                 status=DeliveryStatus.AVAILABLE, created_at=datetime(2026, 1, 2, 10, i % 60))
+        for i in range(count)
+    ]
+
+
+def timed(fn, repeat: int = 3):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return result, statistics.median(samples) * 1000
+
+
+def fake_request(path: str) -> Request:
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": b"", "root_path": "",
+                    "headers": [(b"accept-encoding", b"gzip, br")]})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    from app.core.compression import COMPRESSION_GZIP_LEVEL, compress
+    from app.core.json_projection import Projector
+    from app.core.response_cache import PayloadCache
+    from app.schemas import DeliveryResponse
+
+    rows = build_rows(args.rows)
+    projector = Projector(DeliveryResponse)
+    body = projector.dumps(rows)
+    print(f"payload: {args.rows} entregas, {len(body) / 1024:.0f} KiB\n")
+
+    variants = [(f"gzip-{level}", lambda level=level: gzip.compress(body, compresslevel=level, mtime=0))
+                for level in (1, 6, 9)]
+    if brotli is not None:
+        variants += [(f"br-{quality}", lambda quality=quality: brotli.compress(body, quality=quality))
+                     for quality in (4, 11)]
+    print(f"{'codificação':<12} {'tamanho':>10} {'razão':>7} {'tempo':>9}")
+    for name, fn in variants:
+        compressed, ms = timed(fn)
+        print(f"{name:<12} {len(compressed) / 1024:>8.0f}KiB {len(body) / len(compressed):>6.1f}x {ms:>7.1f}ms")
+
+    def uncached():
+        return compress(projector.dumps(rows), "gzip")
+
+    _, per_request = timed(uncached, repeat=args.requests)
+
+    cache = PayloadCache("bench", tables=("deliveries",))
+
+    async def build():
+        return projector.dumps(rows)
+
+    async def cached_requests():
+        await cache.respond(fake_request("/api/deliveries/"), build)  # 1ª: serializa + comprime
+        samples = []
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            await cache.respond(fake_request("/api/deliveries/"), build)
+            samples.append(time.perf_counter() - started)
+        return statistics.median(samples) * 1000
+
+    hit = asyncio.run(cached_requests())
+    print(f"\npor requisição (gzip-{COMPRESSION_GZIP_LEVEL} dinâmico, sem cache): {per_request:8.2f}ms")
+    print(f"por requisição (precomprimido, cache quente):  {hit:8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark: rodada do despacho automático (app.services.dispatch.assign).
+
+Gera --deliveries entregas disponíveis e --volunteers voluntários ociosos
+espalhados pela região metropolitana de BH e mede o tempo de resolver a
+atribuição (vizinhos candidatos na grade + guloso por distância), quantos
+pares saem e a distância média. Com --exact N compara, numa amostra N×N, o
+guloso com a atribuição de custo mínimo exata (húngaro, O(n³)).
+
+Uso (a partir de backend/):
+    python benchmarks/dispatch.py [--deliveries 10000] [--volunteers 10000] [--exact 300]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CENTER = (-19.9191, -43.9386)
+CATEGORIES = 6
+
+
+def points(count: int, rng: random.Random):
+    return [(CENTER[0] + rng.gauss(0, 0.15), CENTER[1] + rng.gauss(0, 0.15)) for _ in range(count)]
+
+
+def hungarian(cost):
+    """Atribuição de custo mínimo de uma matriz quadrada (potenciais, O(n³))."""
+    n = len(cost)
+    inf = float("inf")
+    u, v, p, way = [0.0] * (n + 1), [0.0] * (n + 1), [0] * (n + 1), [0] * (n + 1)
+    for i in range(1, n + 1):
+        p[0], j0 = i, 0
+        minv, used = [inf] * (n + 1), [False] * (n + 1)
+        while True:
+            used[j0] = True
+            i0, delta, j1 = p[j0], inf, 0
+            for j in range(1, n + 1):
+                if not used[j]:
+                    current = cost[i0 - 1][j - 1] - u[i0] - v[j]
+                    if current < minv[j]:
+                        minv[j], way[j] = current, j0
+                    if minv[j] < delta:
+                        delta, j1 = minv[j], j
+            for j in range(n + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    return [(p[j] - 1, j - 1) for j in range(1, n + 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deliveries", type=int, default=10000)
+    parser.add_argument("--volunteers", type=int, default=10000)
+    parser.add_argument("--exact", type=int, default=300, help="amostra N×N comparada com o ótimo (0 = não)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    from app.core.geo import haversine_km
+    from app.services.dispatch import DISPATCH_MAX_DISTANCE_KM, Courier, Job, assign
+
+    rng = random.Random(1)
+    jobs = [Job(i, lat, lng, rng.randint(1, 30), 1 + i % CATEGORIES)
+            for i, (lat, lng) in enumerate(points(args.deliveries, rng))]
+    couriers = [Courier(i, lat, lng, rng.choice([None, 5, 10, 20]),
+                        None if i % 3 else {1 + i % CATEGORIES, 1 + (i + 1) % CATEGORIES})
+                for i, (lat, lng) in enumerate(points(args.volunteers, rng))]
+
+    times = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        assignments = assign(jobs, couriers)
+        times.append(time.perf_counter() - start)
+    distances = [a.distance_km for a in assignments]
+    print(f"{args.deliveries} entregas × {args.volunteers} voluntários: "
+          f"mediana {statistics.median(times) * 1000:.0f} ms, {len(assignments)} ofertas, "
+          f"distância média {statistics.mean(distances) if distances else 0:.2f} km")
+
+    if args.exact:
+        n = args.exact
+        sample_jobs = [Job(j.id, j.latitude, j.longitude, j.quantity) for j in jobs[:n]]
+        sample_couriers = [Courier(c.id, c.latitude, c.longitude) for c in couriers[:n]]
+        greedy = assign(sample_jobs, sample_couriers, max_distance_km=1e9, candidates=n)
+        start = time.perf_counter()
+        cost = [[haversine_km(j.latitude, j.longitude, c.latitude, c.longitude) for c in sample_couriers]
+                for j in sample_jobs]
+        exact = hungarian(cost)
+        exact_seconds = time.perf_counter() - start
+        greedy_km = sum(a.distance_km for a in greedy)
+        exact_km = sum(cost[i][j] for i, j in exact)
+        print(f"amostra {n}×{n}: guloso {greedy_km:.1f} km x ótimo {exact_km:.1f} km "
+              f"({greedy_km / exact_km:.2f}×), húngaro em {exact_seconds * 1000:.0f} ms "
+              f"(limite de distância {DISPATCH_MAX_DISTANCE_KM:.0f} km ignorado)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark: matriz de distâncias entre locais (app.core.distance_matrix).
+
+Gera --locations locais espalhados pela região metropolitana de BH e mede,
+para cada backend disponível (NumPy e Python puro): o tempo de preencher a
+matriz inteira, de uma atualização incremental (um local movido e um
+novo) contra o recálculo completo, e o custo de uma consulta km(a, b) já
+calculada contra haversine_km direto.
+
+Uso (a partir de backend/):
+    python benchmarks/distance_matrix.py [--locations 2000] [--lookups 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CENTER = (-19.9191, -43.9386)
+
+
+class Snapshot:
+    def __init__(self, generation, points):
+        self.generation = generation
+        self._records = [SimpleNamespace(id=i, latitude=lat, longitude=lng) for i, (lat, lng) in points.items()]
+
+    def locations(self):
+        return self._records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--locations", type=int, default=2000)
+    parser.add_argument("--lookups", type=int, default=100000)
+    args = parser.parse_args()
+
+    from app.core.distance_matrix import DISTANCE_MATRIX_MAX_LOCATIONS, DistanceMatrix, np
+    from app.core.geo import haversine_km
+
+    rng = random.Random(1)
+    points = {i: (CENTER[0] + rng.gauss(0, 0.15), CENTER[1] + rng.gauss(0, 0.15)) for i in range(args.locations)}
+    pairs = [(rng.randrange(args.locations), rng.randrange(args.locations)) for _ in range(args.lookups)]
+
+    for use_numpy in ([True] if np is not None else []) + [False]:
+        matrix = DistanceMatrix(max_locations=max(args.locations + 1, DISTANCE_MATRIX_MAX_LOCATIONS),
+                                use_numpy=use_numpy)
+        matrix.sync(Snapshot(1, points))
+        start = time.perf_counter()
+        for location_id in points:
+            if not matrix._computed[matrix._slot[location_id]]:
+                matrix._compute_block(matrix._slot[location_id])
+        full = time.perf_counter() - start
+
+        moved = dict(points)
+        moved[0] = (CENTER[0], CENTER[1])
+        moved[args.locations] = (CENTER[0] + 0.01, CENTER[1])
+        start = time.perf_counter()
+        matrix.sync(Snapshot(2, moved))
+        incremental = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for a, b in pairs:
+            matrix.km(a, b)
+        lookup = (time.perf_counter() - start) / len(pairs)
+        stats = matrix.stats()
+        print(f"{stats['backend']}: matriz {args.locations}² em {full * 1000:.0f} ms "
+              f"({stats['bytes'] / 2 ** 20:.1f} MB float32), 2 locais atualizados em {incremental * 1000:.2f} ms, "
+              f"km(a, b) {lookup * 1e6:.2f} µs")
+
+    start = time.perf_counter()
+    for a, b in pairs:
+        haversine_km(*points[a], *points[b])
+    print(f"haversine_km direto: {(time.perf_counter() - start) / len(pairs) * 1e6:.2f} µs por par")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark: payload completo x sparse fieldset (?fields=) em /api/deliveries/.
+
+Popula um SQLite temporário com --rows entregas (com lote, voluntário e
+categoria) e mede, para cada seleção de campos, o tempo de consulta
+(load_only + eager loading da seleção), o de serialização e o tamanho do
+JSON - o que o mapa paga a cada cache miss.
+
+Uso (a partir de backend/):
+    python benchmarks/fieldsets.py [--rows 10000] [--repeat 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SELECTIONS = [
+    ("completo", None),
+    ("mapa", "id,status,delivery_location_id,category_id,category.icon"),
+    ("mínimo", "id,status"),
+]
+
+
+def seed(session_factory, count: int):
+    from app.models import Category, Delivery, DeliveryLocation, ProductBatch, User
+    from app.shared.enums import BatchStatus, DeliveryStatus, ProductType
+
+    db = session_factory()
+    volunteer = User(email="voluntario@bench.org", name="Voluntário", roles="volunteer,provider",
+                     hashed_password="x" * 60, approved=True, address="Rua A, 10")
+    categories = [Category(name=f"cat_{i}", display_name=f"Categoria {i}", icon="📦") for i in range(12)]
+    db.add_all([volunteer, *categories])
+    db.flush()
+    location = DeliveryLocation(name="Abrigo Central", address="Rua da Bahia, 1000", latitude=-19.92,
+                                longitude=-43.94, approved=True)
+    batch = ProductBatch(provider_id=volunteer.id, product_type=ProductType.MEAL, quantity=count,
+                         quantity_available=count, status=BatchStatus.READY, description="Marmitas")
+    db.add_all([location, batch])
+    db.flush()
+    db.add_all([
+        Delivery(delivery_location_id=location.id, batch_id=batch.id, product_type=ProductType.MEAL,
+                 category_id=categories[i % 12].id, quantity=1 + i % 7,
+                 volunteer_id=volunteer.id if i % 3 == 0 else None, pickup_code=f"{i:06d}",
+                 status=DeliveryStatus.RESERVED if i % 3 == 0 else DeliveryStatus.AVAILABLE)
+        for i in range(count)
+    ])
+    db.commit()
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.database import Base
+    from app.core.json_projection import Projector, parse_fields
+    from app.repositories import queries
+    from app.schemas import DeliveryResponse
+
+    path = os.path.join(tempfile.mkdtemp(), "fieldsets.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    seed(session_factory, args.rows)
+    projector = Projector(DeliveryResponse)
+
+    print(f"{args.rows} entregas\n")
+    print(f"{'seleção':<10} {'consulta':>10} {'serialização':>13} {'tamanho':>10}")
+    for name, raw in SELECTIONS:
+        fields = parse_fields(DeliveryResponse, raw)
+        query_ms, dump_ms = [], []
+        for _ in range(args.repeat):
+            db = session_factory()
+            started = time.perf_counter()
+            rows = db.execute(queries.map_deliveries(fields)).scalars().all()
+            loaded = time.perf_counter()
+            body = projector.dumps(rows, fields)
+            query_ms.append((loaded - started) * 1000)
+            dump_ms.append((time.perf_counter() - loaded) * 1000)
+            db.close()
+        print(f"{name:<10} {statistics.median(query_ms):>8.1f}ms {statistics.median(dump_ms):>11.1f}ms "
+              f"{len(body) / 1024:>7.0f}KiB")
+    engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
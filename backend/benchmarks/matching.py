@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark: feed de necessidades para voluntários (NeedIndex.search).
+
+Monta o índice em memória com --needs necessidades abertas espalhadas pela
+região metropolitana de BH (abrigos mais densos no centro) e mede o tempo
+de um feed de --limit itens para --queries voluntários em posições
+aleatórias, com e sem filtro de categorias - o que GET /api/matching/feed
+paga depois que o índice está carregado. Compara com a varredura de todas
+as necessidades.
+
+Uso (a partir de backend/):
+    python benchmarks/matching.py [--needs 100000] [--queries 1000] [--limit 20]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CENTER = (-19.9191, -43.9386)
+CATEGORIES = 12
+
+
+def synthetic_needs(count: int, seed: int = 1):
+    from app.services.matching import IndexedNeed
+
+    rng = random.Random(seed)
+    now = time.time()
+    needs = []
+    for i in range(count):
+        spread = 0.05 if i % 3 == 0 else 0.6  # a third of them in the center
+        needs.append(IndexedNeed(
+            shelter_id=i // 4 + 1, category_id=i % CATEGORIES + 1, location_id=i // 4 + 1,
+            latitude=CENTER[0] + rng.gauss(0, spread), longitude=CENTER[1] + rng.gauss(0, spread),
+            quantity_remaining=rng.randint(1, 200), urgency=round(rng.uniform(0, 3), 4),
+            last_activity=now - rng.uniform(0, 7 * 86400),
+        ))
+    return needs
+
+
+def measure(search, points, label: str):
+    times = []
+    for lat, lng, categories in points:
+        start = time.perf_counter()
+        search(lat, lng, categories)
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    p95 = times[int(len(times) * 0.95) - 1]
+    print(f"{label:<28} mediana {statistics.median(times):7.3f} ms   p95 {p95:7.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--needs", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    from app.services.matching import NeedIndex
+
+    needs = synthetic_needs(args.needs)
+    index = NeedIndex()
+    start = time.perf_counter()
+    index.replace(needs)
+    print(f"{args.needs} necessidades indexadas em {(time.perf_counter() - start) * 1000:.0f} ms "
+          f"({index.stats()['cells']} células)")
+
+    rng = random.Random(2)
+    points = [(CENTER[0] + rng.gauss(0, 0.3), CENTER[1] + rng.gauss(0, 0.3)) for _ in range(args.queries)]
+    now = time.time()
+
+    measure(lambda lat, lng, c: index.search(lat, lng, c, 10, args.limit, now),
+            [(lat, lng, None) for lat, lng in points], "índice, todas categorias")
+    measure(lambda lat, lng, c: index.search(lat, lng, c, 10, args.limit, now),
+            [(lat, lng, {1 + i % CATEGORIES, 1 + (i + 5) % CATEGORIES}) for i, (lat, lng) in enumerate(points)],
+            "índice, 2 categorias")
+
+    scan = NeedIndex(cell_km=1000)  # uma célula: pontua todas as necessidades
+    scan.replace(needs)
+    measure(lambda lat, lng, c: scan.search(lat, lng, c, 10, args.limit, now),
+            [(lat, lng, None) for lat, lng in points[:max(1, args.queries // 20)]], "varredura completa")
+
+
+if __name__ == "__main__":
+    main()
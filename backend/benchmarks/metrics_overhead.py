@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark: custo do MetricsMiddleware + listeners SQL por requisição.
+
+Compara o mesmo app FastAPI (um endpoint sync com 1 SELECT) com e sem a
+coleta de métricas, e mede as primitivas (Histogram.observe, Counter.inc).
+
+Uso (a partir de backend/):
+    python benchmarks/metrics_overhead.py [--requests 3000]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from app.core.metrics import (
+    MetricsMiddleware, Counter, Histogram, MetricsRegistry,
+)
+from app.core.sql_instrumentation import install_sql_listeners
+
+
+def build_app(with_metrics: bool) -> FastAPI:
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    def read_item(item_id: int):
+        with engine.connect() as conn:
+            value = conn.execute(text("SELECT :v"), {"v": item_id}).scalar()
+        return {"id": value}
+
+    if with_metrics:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def drive(app: FastAPI, requests: int) -> list:
+    transport = httpx.ASGITransport(app=app)
+    timings = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(200):  # warm-up
+            await client.get(f"/items/{i}")
+        for i in range(requests):
+            started = time.perf_counter()
+            await client.get(f"/items/{i}")
+            timings.append(time.perf_counter() - started)
+    return timings
+
+
+def bench_primitives(iterations: int = 200_000):
+    registry = MetricsRegistry()
+    hist = registry.register(Histogram("h", "h", ("method", "route")))
+    counter = registry.register(Counter("c", "c", ("method", "route", "status")))
+
+    started = time.perf_counter()
+    for i in range(iterations):
+        hist.observe(0.001 * (i % 100), "GET", "/api/x")
+    observe_ns = (time.perf_counter() - started) / iterations * 1e9
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        counter.inc("GET", "/api/x", "200")
+    inc_ns = (time.perf_counter() - started) / iterations * 1e9
+    return observe_ns, inc_ns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=3000)
+    args = parser.parse_args()
+
+    baseline = asyncio.run(drive(build_app(False), args.requests))
+    install_sql_listeners()
+    instrumented = asyncio.run(drive(build_app(True), args.requests))
+
+    def summary(samples):
+        ordered = sorted(samples)
+        return statistics.mean(ordered) * 1e6, ordered[int(len(ordered) * 0.99)] * 1e6
+
+    base_mean, base_p99 = summary(baseline)
+    inst_mean, inst_p99 = summary(instrumented)
+    observe_ns, inc_ns = bench_primitives()
+
+    print(f"requests: {args.requests}")
+    print(f"baseline      mean={base_mean:8.1f}us  p99={base_p99:8.1f}us")
+    print(f"instrumented  mean={inst_mean:8.1f}us  p99={inst_p99:8.1f}us")
+    print(f"overhead      mean={inst_mean - base_mean:8.1f}us "
+          f"({(inst_mean / base_mean - 1) * 100:.1f}%)")
+    print(f"Histogram.observe: {observe_ns:.0f}ns  Counter.inc: {inc_ns:.0f}ns")
+
+
+if __name__ == "__main__":
+    main()
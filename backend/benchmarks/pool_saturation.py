@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark: comportamento do pool de conexões no limite (carga em rajada).
+
+N threads disputam um pool pequeno; cada "requisição" faz checkout, executa
+um SELECT e segura a conexão por --hold-ms (simulando o trabalho do endpoint).
+Para cada cenário mostra vazão, espera no checkout (p50/p95/max), timeouts e a
+ocupação máxima observada por pool_status() (o que /health/db reporta).
+
+Uso (a partir de backend/):
+    python benchmarks/pool_saturation.py [--url sqlite:///./bench_pool.db] [--threads 32]
+        [--requests 400] [--hold-ms 20] [--timeout 1.0]
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, exc, text
+
+from app.database import InstrumentedQueuePool, pool_status
+
+
+def run_scenario(url, pool_size, max_overflow, threads, requests, hold, timeout):
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    engine = create_engine(
+        url, connect_args=connect_args, poolclass=InstrumentedQueuePool,
+        pool_size=pool_size, max_overflow=max_overflow, pool_timeout=timeout, pool_pre_ping=True,
+    )
+    engine.pool.metrics_name = f"bench-{pool_size}-{max_overflow}"
+
+    waits, timeouts, peak = [], [0], {"checked_out": 0, "status": "ok"}
+    lock = threading.Lock()
+    remaining = [requests]
+
+    def worker():
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            started = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    wait = time.perf_counter() - started
+                    conn.execute(text("SELECT 1"))
+                    status = pool_status(engine)
+                    time.sleep(hold)
+            except exc.TimeoutError:
+                with lock:
+                    timeouts[0] += 1
+                continue
+            with lock:
+                waits.append(wait)
+                if status["checked_out"] > peak["checked_out"]:
+                    peak.update(checked_out=status["checked_out"], status=status["status"])
+
+    pool_threads = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for t in pool_threads:
+        t.start()
+    for t in pool_threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+
+    waits.sort()
+    pct = lambda p: waits[min(len(waits) - 1, int(len(waits) * p))] * 1000 if waits else 0.0
+    print(
+        f"pool={pool_size:>2}+{max_overflow:<2} threads={threads:>3} "
+        f"ok={len(waits):>4} timeouts={timeouts[0]:>4} "
+        f"rps={len(waits) / elapsed:8.1f} "
+        f"wait p50={pct(0.50):7.1f}ms p95={pct(0.95):7.1f}ms max={pct(1.0):7.1f}ms "
+        f"peak={peak['checked_out']:>2} ({peak['status']})"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite:///./bench_pool.db")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--hold-ms", type=float, default=20.0)
+    parser.add_argument("--timeout", type=float, default=1.0)
+    args = parser.parse_args()
+
+    print(f"url={args.url} hold={args.hold_ms}ms pool_timeout={args.timeout}s requests={args.requests}")
+    for pool_size, max_overflow in ((2, 0), (5, 0), (5, 10), (20, 10)):
+        run_scenario(args.url, pool_size, max_overflow, args.threads, args.requests,
+                     args.hold_ms / 1000.0, args.timeout)
+
+    if args.url.startswith("sqlite:///./bench_pool"):
+        os.remove(args.url.replace("sqlite:///", ""))
+
+
+if __name__ == "__main__":
+    main()
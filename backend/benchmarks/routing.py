@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark: rota do voluntário (app.services.routing.plan_route).
+
+Gera --deliveries entregas com coleta e destino espalhados pela região
+metropolitana de BH e mede, para cada orçamento de tempo, a distância da
+rota planejada contra a só construída (vizinho mais próximo viável). Com
+--exact N compara, em rotas de N entregas, o planejador com a melhor
+ordem exata (força bruta sobre as permutações viáveis).
+
+Uso (a partir de backend/):
+    python benchmarks/routing.py [--deliveries 30] [--budgets 0,10,50,200] [--exact 3]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from itertools import permutations
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CENTER = (-19.9191, -43.9386)
+
+
+def stops(count: int, rng: random.Random):
+    from app.services.routing import DROPOFF, PICKUP, Stop
+
+    def point():
+        return CENTER[0] + rng.gauss(0, 0.08), CENTER[1] + rng.gauss(0, 0.08)
+
+    return [(Stop(i, PICKUP, None, *point()), Stop(i, DROPOFF, None, *point())) for i in range(count)]
+
+
+def exact_km(start, pairs):
+    from app.core.geo import haversine_km
+
+    best = float("inf")
+    for order in permutations([stop for pair in pairs for stop in pair]):
+        picked, previous, total = set(), start, 0.0
+        for stop in order:
+            if stop.action == "dropoff" and stop.delivery_id not in picked:
+                break
+            picked.add(stop.delivery_id)
+            total += haversine_km(previous.latitude, previous.longitude, stop.latitude, stop.longitude)
+            previous = stop
+        else:
+            best = min(best, total)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deliveries", type=int, default=30)
+    parser.add_argument("--budgets", default="0,10,50,200", help="orçamentos em ms, separados por vírgula")
+    parser.add_argument("--instances", type=int, default=10)
+    parser.add_argument("--exact", type=int, default=3, help="entregas por rota comparada com o ótimo (0 = não)")
+    args = parser.parse_args()
+
+    from app.services.routing import Stop, plan_route
+
+    rng = random.Random(1)
+    start = Stop(0, "start", None, *CENTER)
+    instances = [stops(args.deliveries, rng) for _ in range(args.instances)]
+    baseline = None
+    for budget in [float(b) for b in args.budgets.split(",")]:
+        distances, times = [], []
+        for pairs in instances:
+            began = time.perf_counter()
+            distances.append(plan_route(pairs, start=start, budget_ms=budget).distance_km)
+            times.append(time.perf_counter() - began)
+        baseline = baseline or distances
+        ratio = statistics.mean(d / b for d, b in zip(distances, baseline))
+        print(f"{args.deliveries} entregas, orçamento {budget:.0f} ms: {statistics.mean(distances):.1f} km "
+              f"({ratio:.3f}× do primeiro orçamento), mediana {statistics.median(times) * 1000:.1f} ms")
+
+    if args.exact:
+        ratios = []
+        for _ in range(args.instances):
+            pairs = stops(args.exact, rng)
+            ratios.append(plan_route(pairs, start=start).distance_km / exact_km(start, pairs))
+        print(f"rotas de {args.exact} entregas: planejada / ótima média {statistics.mean(ratios):.4f}, "
+              f"pior {max(ratios):.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark: serialização das listas grandes (10k linhas por padrão).
+
+Compara, para /api/deliveries/, /api/inventory/requests/public e
+/api/categories/ (com atributos), sobre as mesmas linhas ORM já carregadas:
+
+    jsonable      validação do response_model + jsonable_encoder + json.dumps
+                  (caminho clássico do FastAPI / JSONResponse)
+    dump_json     validação do response_model + dump_json do Pydantic
+                  (o que o FastAPI atual faz com response_model)
+    projetor      Projector (app.core.json_projection) + orjson
+
+e confere que o projetor gera exatamente os mesmos bytes que o dump_json.
+
+Uso (a partir de backend/):
+    python benchmarks/serialization.py [--rows 10000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+DB_PATH = "./bench_serialization.db"
+DB_URL = f"sqlite:///{DB_PATH}"
+
+
+def remove_db():
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(DB_PATH + suffix):
+            os.remove(DB_PATH + suffix)
+
+
+def seed(session_factory, rows: int):
+    from app.models import User, Category, CategoryAttribute, DeliveryLocation, Delivery, ProductBatch
+    from app.inventory_models import ShelterRequest
+    from app.shared.enums import BatchStatus, DeliveryStatus, ProductType
+
+    db = session_factory()
+    volunteer = User(email="voluntario@bench.org", name="Voluntário", roles="volunteer",
+                     hashed_password="x", approved=True, tipos_produtos=["meal", "hygiene"])
+    provider = User(email="fornecedor@bench.org", name="Fornecedor", roles="provider,volunteer",
+                    hashed_password="x", approved=True, latitude=-19.9, longitude=-43.9)
+    # rows/20 categorias com 20 atributos cada = `rows` atributos no payload de categorias
+    categories = [Category(name=f"cat_{i}", display_name=f"Categoria {i}", sort_order=i, icon="📦")
+                  for i in range(max(rows // 20, 1))]
+    db.add_all([volunteer, provider, *categories])
+    db.flush()
+    for category in categories:
+        db.add_all([CategoryAttribute(category_id=category.id, name=f"attr_{j}", display_name=f"Atributo {j}",
+                                      options=[{"value": "P", "label": "Pequeno"}, {"value": "G", "label": "Grande"}])
+                    for j in range(20)])
+    location = DeliveryLocation(name="Abrigo", address="Rua 1", user_id=provider.id, approved=True)
+    batch = ProductBatch(provider_id=provider.id, product_type=ProductType.MEAL, quantity=rows,
+                         quantity_available=rows, status=BatchStatus.READY)
+    db.add_all([location, batch])
+    db.flush()
+    for i in range(rows):
+        category = categories[i % len(categories)]
+        db.add(Delivery(delivery_location_id=location.id, batch_id=batch.id if i % 2 else None,
+                        volunteer_id=volunteer.id if i % 3 == 0 else None, product_type=ProductType.MEAL,
+                        category_id=category.id, quantity=1 + i % 7, status=DeliveryStatus.AVAILABLE))
+        db.add(ShelterRequest(shelter_id=provider.id, category_id=category.id, quantity_requested=10,
+                              status="active", metadata_cache={"tamanho": "P"}))
+    db.commit()
+    db.close()
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from app.database import Base
+    from app.repositories import queries
+    from app.schemas import DeliveryResponse
+    from app.category_schemas import CategoryResponse
+    from app.inventory_schemas import ShelterRequestResponse
+    from app.core.json_projection import Projector
+
+    remove_db()
+    engine = create_engine(DB_URL)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    try:
+        seed(session_factory, args.rows)
+        db = session_factory()
+        cases = [
+            ("/api/deliveries/", DeliveryResponse, queries.map_deliveries()),
+            ("/api/inventory/requests/public", ShelterRequestResponse, queries.public_shelter_requests()),
+            ("/api/categories/", CategoryResponse, queries.categories()),
+        ]
+        for path, model, statement in cases:
+            rows = db.execute(statement).unique().scalars().all()
+            adapter = TypeAdapter(List[model])
+            projector = Projector(model)
+            expected = adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+            same = projector.dumps(rows) == expected
+
+            jsonable = timed(lambda: json.dumps(jsonable_encoder(
+                adapter.validate_python(rows, from_attributes=True)), separators=(",", ":")).encode(), args.repeat)
+            dump_json = timed(lambda: adapter.dump_json(adapter.validate_python(rows, from_attributes=True)),
+                              args.repeat)
+            projected = timed(lambda: projector.dumps(rows), args.repeat)
+            print(f"{path} ({len(rows)} linhas, {len(expected) / 1024:.0f} KiB, bytes idênticos: {same})")
+            print(f"  jsonable   {jsonable:8.1f}ms")
+            print(f"  dump_json  {dump_json:8.1f}ms")
+            print(f"  projetor   {projected:8.1f}ms  ({dump_json / projected:.1f}x vs dump_json, "
+                  f"{jsonable / projected:.1f}x vs jsonable)")
+        db.close()
+    finally:
+        engine.dispose()
+        remove_db()
+
+
+if __name__ == "__main__":
+    main()
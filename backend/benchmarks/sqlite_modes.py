@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Benchmark: SQLite padrão vs modo ajustado (WAL + pragmas + fila única de escrita).
+
+N threads executam, em paralelo, os dois fluxos de escrita mais frequentes:
+  - commit:  voluntário compromete uma doação (INSERT em deliveries e
+             UPDATE em shelter_requests.quantity_pending)
+  - confirm: abrigo confirma a entrega (UPDATE em deliveries, UPDATE em
+             inventory_items e INSERT em inventory_transactions)
+Para cada modo mostra vazão (transações/s), latência p50/p95 e quantos
+commits falharam com "database is locked".
+
+Uso (a partir de backend/):
+    python benchmarks/sqlite_modes.py [--threads 16] [--transactions 2000]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, exc
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import User, Category, DeliveryLocation, Delivery
+from app.shared.enums import DeliveryStatus, ProductType
+from app.inventory_models import InventoryItem, InventoryTransaction, ShelterRequest, TransactionType
+from app.core.sqlite_mode import create_sqlite_engine
+
+DB_PATH = "./bench_sqlite_modes.db"
+
+
+def remove_db():
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(DB_PATH + suffix):
+            os.remove(DB_PATH + suffix)
+
+
+def build_engine(mode, threads):
+    url = f"sqlite:///{DB_PATH}"
+    pool = dict(pool_size=threads, max_overflow=0)
+    if mode == "padrão":
+        # timeout=1s: o padrão do sqlite3 (5s) só esconde a contenção
+        return create_engine(url, connect_args={"check_same_thread": False, "timeout": 1.0}, **pool)
+    return create_sqlite_engine(url, **pool)
+
+
+def seed(Session):
+    db = Session()
+    shelter = User(email="abrigo@bench", name="Abrigo", roles="shelter", hashed_password="x", approved=True)
+    volunteer = User(email="voluntario@bench", name="Voluntário", roles="volunteer", hashed_password="x")
+    category = Category(name="agua", display_name="Água")
+    db.add_all([shelter, volunteer, category])
+    db.flush()
+    location = DeliveryLocation(name="Abrigo", address="Rua 1", user_id=shelter.id, approved=True)
+    db.add(location)
+    db.flush()
+    request = ShelterRequest(shelter_id=shelter.id, category_id=category.id, quantity_requested=10 ** 9)
+    item = InventoryItem(shelter_id=shelter.id, category_id=category.id)
+    db.add_all([request, item])
+    db.commit()
+    ids = dict(volunteer=volunteer.id, category=category.id, location=location.id,
+               request=request.id, item=item.id)
+    db.close()
+    return ids
+
+
+def commit_flow(db, ids):
+    delivery = Delivery(delivery_location_id=ids["location"], volunteer_id=ids["volunteer"],
+                        product_type=ProductType.MEAL, category_id=ids["category"], quantity=1,
+                        status=DeliveryStatus.PENDING_CONFIRMATION)
+    db.add(delivery)
+    request = db.get(ShelterRequest, ids["request"])
+    request.quantity_pending = (request.quantity_pending or 0) + 1
+    db.commit()
+    return delivery.id
+
+
+def confirm_flow(db, ids, delivery_id):
+    delivery = db.get(Delivery, delivery_id)
+    delivery.status = DeliveryStatus.DELIVERED
+    item = db.get(InventoryItem, ids["item"])
+    item.quantity_in_stock += 1
+    item.quantity_available += 1
+    db.add(InventoryTransaction(inventory_item_id=item.id, transaction_type=TransactionType.DONATION_RECEIVED,
+                                quantity_change=1, balance_after=item.quantity_in_stock,
+                                reserved_after=item.quantity_reserved, available_after=item.quantity_available,
+                                delivery_id=delivery_id))
+    db.commit()
+
+
+def run_mode(mode, threads, transactions):
+    remove_db()
+    engine = build_engine(mode, threads)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    ids = seed(Session)
+
+    latencies, locked = [], [0]
+    lock = threading.Lock()
+    remaining = [transactions]
+
+    def worker():
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            started = time.perf_counter()
+            db = Session()
+            try:
+                delivery_id = commit_flow(db, ids)
+                confirm_flow(db, ids, delivery_id)
+            except exc.OperationalError as e:
+                db.rollback()
+                if "locked" not in str(e):
+                    raise
+                with lock:
+                    locked[0] += 1
+                continue
+            finally:
+                db.close()
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+    remove_db()
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+    print(
+        f"{mode:<9} threads={threads:>3} ok={len(latencies):>5} locked={locked[0]:>5} "
+        f"tps={len(latencies) / elapsed:8.1f} p50={pct(0.50):7.1f}ms p95={pct(0.95):7.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--transactions", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"fluxo commit+confirm, {args.transactions} transações")
+    for mode in ("padrão", "ajustado"):
+        run_mode(mode, args.threads, args.transactions)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tempo de cold start (import do app, lifespan e primeira requisição).
+
+Cada rodada é um processo Python novo que importa app.main, entra no
+lifespan (ensure_schema) e faz a primeira requisição (GET /api/categories/).
+Mostra a mediana de --runs rodadas com LAZY_ROUTERS=true e false e a quebra
+por fase de /health/startup.
+
+Com --max-import-ms / --max-first-request-ms o script termina com código 1
+quando a mediana passa do orçamento (para pegar regressões no CI).
+
+Uso (a partir de backend/):
+    python benchmarks/startup_time.py [--runs 5] [--max-import-ms 2000]
+        [--max-first-request-ms 500]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    ready = time.perf_counter()
+    client.get("/api/categories/")
+    first = time.perf_counter()
+    report = client.get("/health/startup").json()
+print("RESULT " + json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "lifespan_ms": (ready - imported) * 1000,
+    "first_request_ms": (first - ready) * 1000,
+    "phases_ms": report["phases_ms"],
+}))
+"""
+
+
+def run_once(lazy: bool) -> dict:
+    env = dict(os.environ, LAZY_ROUTERS="true" if lazy else "false", LOG_LEVEL="WARNING",
+               DATABASE_URL="sqlite:///./bench_startup.db")
+    output = subprocess.run([sys.executable, "-c", CHILD], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    line = next(line for line in output.splitlines() if line.startswith("RESULT "))
+    return json.loads(line[len("RESULT "):])
+
+
+def summarize(label: str, results: list) -> dict:
+    median = {key: statistics.median(r[key] for r in results)
+              for key in ("import_ms", "lifespan_ms", "first_request_ms")}
+    phases = {name: statistics.median(r["phases_ms"][name] for r in results)
+              for name in results[0]["phases_ms"]}
+    print(f"{label:<18} import={median['import_ms']:7.1f}ms lifespan={median['lifespan_ms']:6.1f}ms "
+          f"primeira requisição={median['first_request_ms']:6.1f}ms")
+    print(" " * 18 + " fases: " + ", ".join(f"{name}={ms:.1f}" for name, ms in phases.items()))
+    return median
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=None)
+    parser.add_argument("--max-first-request-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    try:
+        eager = summarize("LAZY_ROUTERS=false", [run_once(lazy=False) for _ in range(args.runs)])
+        lazy = summarize("LAZY_ROUTERS=true", [run_once(lazy=True) for _ in range(args.runs)])
+    finally:
+        db_path = os.path.join(BACKEND_DIR, "bench_startup.db")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+    print(f"\nganho no import: {eager['import_ms'] - lazy['import_ms']:.1f}ms")
+    failed = False
+    if args.max_import_ms is not None and lazy["import_ms"] > args.max_import_ms:
+        print(f"REGRESSÃO: import {lazy['import_ms']:.1f}ms > {args.max_import_ms:.0f}ms")
+        failed = True
+    if args.max_first_request_ms is not None and lazy["first_request_ms"] > args.max_first_request_ms:
+        print(f"REGRESSÃO: primeira requisição {lazy['first_request_ms']:.1f}ms > {args.max_first_request_ms:.0f}ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,25 +7,28 @@ Executa o seed se o banco estiver vazio, depois inicia a API
 import os
 import sys
 import traceback
+from sqlalchemy import exists
 from app.database import SessionLocal, engine
 from app import models
+from app.core.startup import ensure_schema
 
 def check_database_empty():
-    """Verifica se o banco está vazio"""
+    """Verifica se o banco está vazio (uma única consulta EXISTS)"""
     try:
         db = SessionLocal()
-        user_count = db.query(models.User).count()
-        location_count = db.query(models.DeliveryLocation).count()
-        batch_count = db.query(models.ProductBatch).count()
+        has_users, has_locations, has_batches = db.query(
+            exists().where(models.User.id.isnot(None)),
+            exists().where(models.DeliveryLocation.id.isnot(None)),
+            exists().where(models.ProductBatch.id.isnot(None)),
+        ).one()
         db.close()
         
         print(f"📊 Status do banco:")
-        print(f"   • Usuários: {user_count}")
-        print(f"   • Locais: {location_count}")
-        print(f"   • Batches: {batch_count}")
+        print(f"   • Usuários: {'sim' if has_users else 'nenhum'}")
+        print(f"   • Locais: {'sim' if has_locations else 'nenhum'}")
+        print(f"   • Batches: {'sim' if has_batches else 'nenhum'}")
         
-        is_empty = user_count == 0 and location_count == 0 and batch_count == 0
-        return is_empty
+        return not (has_users or has_locations or has_batches)
     except Exception as e:
         print(f"⚠️ Erro ao verificar banco: {e}")
         traceback.print_exc()
@@ -81,8 +84,9 @@ if __name__ == "__main__":
     # Criar tabelas
     print("\n📋 Criando/verificando tabelas do banco...")
     try:
-        models.Base.metadata.create_all(bind=engine)
-        print("✅ Tabelas criadas/verificadas com sucesso")
+        # Pula o create_all quando o banco já está no head do Alembic
+        schema = ensure_schema(engine, models.Base.metadata)
+        print(f"✅ Tabelas criadas/verificadas com sucesso ({schema})")
     except Exception as e:
         print(f"❌ Erro ao criar tabelas: {e}")
         traceback.print_exc()
@@ -7,6 +7,15 @@ from sqlalchemy.orm import Session
 from sqlalchemy.pool import StaticPool
 from app.database import Base
 from app.application.services.pickup_service import PickupCodeModel
+from app.core.query_tracker import assert_query_budget
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "query_budget(max_queries=None, max_repeats=None): falha se alguma requisição "
+        "do teste exceder o número de queries ou repetir a mesma query (N+1)",
+    )
 
 
 @pytest.fixture(scope="session")
@@ -43,3 +52,26 @@ def db(test_engine, setup_database_session):
         yield session
     finally:
         session.close()
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Orçamento de queries por requisição (detecção de N+1).
+
+        def test_x(client, query_budget):
+            with query_budget(max_queries=5, max_repeats=1):
+                client.get("/api/...")
+    """
+    return assert_query_budget
+
+
+@pytest.fixture(autouse=True)
+def _enforce_query_budget_marker(request):
+    """Aplica @pytest.mark.query_budget(...) a todas as requisições do teste."""
+    marker = request.node.get_closest_marker("query_budget")
+    if marker is None:
+        yield
+        return
+    with assert_query_budget(*marker.args, **marker.kwargs):
+        yield
@@ -0,0 +1,113 @@
+"""
+Tests for the async read path (AsyncSession when available, sync adapter otherwise).
+"""
+import asyncio
+import importlib.util
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.database import Base, get_db
+from app.models import Category, CategoryAttribute
+from app.repositories import queries
+from app.async_database import SyncSessionAdapter, async_url
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_async_db.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="function")
+def seeded():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    water = Category(name="agua", display_name="Água", sort_order=2)
+    clothes = Category(name="roupa", display_name="Roupas", sort_order=1)
+    db.add_all([water, clothes, Category(name="antiga", display_name="Antiga", active=False)])
+    db.flush()
+    db.add(CategoryAttribute(category_id=clothes.id, name="tamanho", display_name="Tamanho"))
+    db.commit()
+    db.close()
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def client(seeded):
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+
+
+class TestAsyncUrl:
+    def test_unsupported_and_memory_urls(self):
+        assert async_url("sqlite:///:memory:") is None
+        assert async_url("mysql://user@host/db") is None
+
+    def test_requires_driver(self):
+        expected = "sqlite+aiosqlite:///./x.db" if importlib.util.find_spec("aiosqlite") else None
+        assert async_url("sqlite:///./x.db") == expected
+        expected = "postgresql+asyncpg://u@h/db" if importlib.util.find_spec("asyncpg") else None
+        assert async_url("postgres://u@h/db") == expected
+
+
+class TestSyncSessionAdapter:
+    def test_results_are_buffered(self, seeded):
+        session = TestingSessionLocal()
+        adapter = SyncSessionAdapter(session)
+
+        async def run():
+            result = await adapter.execute(queries.categories())
+            await adapter.close()
+            return result.scalars().all()
+
+        categories = asyncio.run(run())
+        assert [c.name for c in categories] == ["roupa", "agua"]
+        # Attributes were loaded eagerly: usable after the session closed
+        assert [a.name for a in categories[0].attributes] == ["tamanho"]
+
+
+class TestAsyncEndpoints:
+    def test_categories_endpoint(self, client):
+        response = client.get("/api/categories/")
+        assert response.status_code == 200
+        body = response.json()
+        assert [c["name"] for c in body] == ["roupa", "agua"]
+        assert body[0]["attributes"][0]["name"] == "tamanho"
+
+    def test_inactive_categories(self, client):
+        names = {c["name"] for c in client.get("/api/categories/?active_only=false").json()}
+        assert names == {"agua", "roupa", "antiga"}
+
+    def test_health_reports_async_mode(self, client):
+        assert isinstance(client.get("/health/db").json()["async_sessions"], bool)
+
+
+class TestAsyncSession:
+    def test_shared_statements_on_async_session(self, seeded):
+        pytest.importorskip("greenlet")
+        pytest.importorskip("aiosqlite")
+        from app.async_database import build_async_engine
+
+        async def run():
+            async_engine = build_async_engine(SQLALCHEMY_DATABASE_URL)
+            try:
+                from sqlalchemy.ext.asyncio import AsyncSession
+                async with AsyncSession(async_engine) as session:
+                    result = await session.execute(queries.categories())
+                    return [(c.name, [a.name for a in c.attributes]) for c in result.scalars().all()]
+            finally:
+                await async_engine.dispose()
+
+        assert asyncio.run(run()) == [("roupa", ["tamanho"]), ("agua", [])]
@@ -0,0 +1,158 @@
+"""
+Tests for response compression and the precompressed public payload cache.
+"""
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.database import Base, get_db
+from app.models import Category
+from app.routers.categories import category_cache
+from app.core.compression import CompressionMiddleware, choose_encoding
+from app.core.data_versions import DATA_VERSIONS
+from app.core.response_cache import clear_payload_caches
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_compression.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="function")
+def client():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    db.add_all([Category(name=f"categoria_{i}", display_name=f"Categoria {i} 📦", sort_order=i) for i in range(40)])
+    db.commit()
+    db.close()
+    clear_payload_caches()
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+    Base.metadata.drop_all(bind=engine)
+
+
+def small_app(body: bytes, chunks: int = 1, media_type: str = "application/json"):
+    inner = FastAPI()
+
+    @inner.get("/")
+    def endpoint():
+        if chunks == 1:
+            return PlainTextResponse(body, media_type=media_type)
+        size = len(body) // chunks + 1
+        return StreamingResponse(iter([body[i:i + size] for i in range(0, len(body), size)]),
+                                 media_type=media_type)
+
+    return TestClient(CompressionMiddleware(inner, minimum_size=100))
+
+
+class TestChooseEncoding:
+    def test_prefers_supported_and_honours_q0(self):
+        assert choose_encoding("gzip, deflate") == "gzip"
+        assert choose_encoding("gzip;q=0, deflate") is None
+        assert choose_encoding("identity") is None
+        assert choose_encoding("*") in ("br", "gzip")
+
+
+class TestCompressionMiddleware:
+    def test_compresses_above_threshold(self):
+        response = small_app(b'{"a": "' + b"x" * 500 + b'"}').get("/", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert response.json()["a"] == "x" * 500
+
+    def test_small_body_is_left_alone(self):
+        response = small_app(b'{"a": 1}').get("/", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+
+    def test_small_streamed_body_is_left_alone(self):
+        response = small_app(b'{"a": 1, "b": 2}', chunks=3).get("/", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+        assert response.json() == {"a": 1, "b": 2}
+
+    def test_streamed_body_is_compressed(self):
+        body = b"[" + b",".join(b'{"id": %d}' % i for i in range(200)) + b"]"
+        response = small_app(body, chunks=5).get("/", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert len(response.json()) == 200
+
+    def test_event_streams_and_binary_are_not_compressed(self):
+        for media_type in ("text/event-stream", "image/png"):
+            response = small_app(b"x" * 500, chunks=2, media_type=media_type).get(
+                "/", headers={"Accept-Encoding": "gzip"})
+            assert "content-encoding" not in response.headers
+
+    def test_client_without_accept_encoding(self):
+        response = small_app(b"x" * 500).get("/", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+
+
+class TestPublicPayloadCache:
+    def test_compressed_once_per_data_version(self, client):
+        first = client.get("/api/categories/", headers={"Accept-Encoding": "gzip"})
+        assert first.headers["content-encoding"] == "gzip"
+        assert len(first.json()) == 40
+        (entry,) = category_cache._entries.values()
+        stored = entry.encoded["gzip"]
+        assert gzip.decompress(stored) == entry.body
+
+        second = client.get("/api/categories/", headers={"Accept-Encoding": "gzip"})
+        assert second.content == first.content
+        (same_entry,) = category_cache._entries.values()
+        assert same_entry is entry and same_entry.encoded["gzip"] is stored
+
+    def test_write_invalidates(self, client):
+        before = client.get("/api/categories/").json()
+        version = DATA_VERSIONS.version("categories")
+        db = TestingSessionLocal()
+        db.add(Category(name="nova", display_name="Nova", sort_order=99))
+        db.commit()
+        db.close()
+        assert DATA_VERSIONS.version("categories") == version + 1
+        after = client.get("/api/categories/").json()
+        assert len(after) == len(before) + 1
+
+    def test_rollback_does_not_invalidate(self, client):
+        version = DATA_VERSIONS.version("categories")
+        db = TestingSessionLocal()
+        db.add(Category(name="descartada", display_name="Descartada"))
+        db.flush()
+        db.rollback()
+        db.close()
+        assert DATA_VERSIONS.version("categories") == version
+
+    def test_etag_revalidation(self, client):
+        first = client.get("/api/categories/")
+        etag = first.headers["etag"]
+        assert client.get("/api/categories/", headers={"If-None-Match": etag}).status_code == 304
+        db = TestingSessionLocal()
+        db.query(Category).filter(Category.name == "categoria_0").update({"display_name": "Renomeada"})
+        db.commit()
+        db.close()
+        changed = client.get("/api/categories/", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+
+    def test_query_string_variants(self, client):
+        client.get("/api/categories/?active_only=true")
+        client.get("/api/categories/?active_only=false")
+        assert len(category_cache._entries) == 2
+
+    def test_health_reports_caches(self, client):
+        client.get("/api/categories/")
+        body = client.get("/health/cache").json()
+        assert body["caches"]["categories"]["entries"] == 1
+        assert "gzip" in body["encodings"]
@@ -0,0 +1,247 @@
+"""
+Tests for the automatic dispatcher (assignment, offers, accept / decline, expiry).
+"""
+import random
+from datetime import datetime, timedelta
+from itertools import permutations
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.database import Base, get_db
+from app.models import Category, Delivery, DeliveryLocation, DispatchOffer, User
+from app.auth import get_password_hash, create_access_token
+from app.core.events import get_event_bus
+from app.core.geo import haversine_km
+from app.services.dispatch import Courier, Job, assign
+from app.shared.enums import DeliveryStatus, OfferStatus, ProductType
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_dispatch.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+ADMIN, SHELTER, NEAR, FAR, CLOTHES_ONLY = 1, 2, 3, 4, 5
+LAT, LNG = -19.9191, -43.9386
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="function")
+def client():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    volunteer = dict(roles="volunteer", hashed_password=get_password_hash("x"), approved=True)
+    db.add_all([
+        User(id=ADMIN, email="admin@test.com", name="Admin", roles="admin",
+             hashed_password=get_password_hash("x"), approved=True),
+        User(id=SHELTER, email="abrigo@test.com", name="Abrigo", roles="shelter",
+             hashed_password=get_password_hash("x"), approved=True),
+        User(id=NEAR, email="perto@test.com", name="Perto", latitude=LAT + 0.01, longitude=LNG,
+             delivery_capacity=4, **volunteer),
+        User(id=FAR, email="longe@test.com", name="Longe", latitude=LAT + 0.1, longitude=LNG, **volunteer),
+        User(id=CLOTHES_ONLY, email="roupas@test.com", name="Roupas", latitude=LAT, longitude=LNG,
+             tipos_produtos=["clothing"], **volunteer),
+        Category(id=1, name="alimentos", display_name="Alimentos", legacy_product_type="meal"),
+        Category(id=2, name="roupas", display_name="Roupas", legacy_product_type="clothing"),
+        DeliveryLocation(id=1, name="Abrigo", address="Rua 1", user_id=SHELTER, approved=True,
+                         latitude=LAT, longitude=LNG),
+    ])
+    db.commit()
+    db.close()
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+    Base.metadata.drop_all(bind=engine)
+
+
+def headers(email):
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': email})}"}
+
+
+def add_delivery(quantity=10, category_id=1):
+    db = TestingSessionLocal()
+    delivery = Delivery(delivery_location_id=1, product_type=ProductType.MEAL, category_id=category_id,
+                        quantity=quantity, status=DeliveryStatus.AVAILABLE)
+    db.add(delivery)
+    db.commit()
+    delivery_id = delivery.id
+    db.close()
+    return delivery_id
+
+
+def run_round(client):
+    response = client.post("/api/dispatch/run", headers=headers("admin@test.com"))
+    assert response.status_code == 200
+    return response.json()
+
+
+def offers(client, email):
+    response = client.get("/api/dispatch/offers", headers=headers(email))
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.fixture
+def events():
+    received = []
+    bus = get_event_bus()
+    bus.subscribe("dispatch.*", received.append)
+    yield received
+    bus._handlers["dispatch.*"].remove(received.append)
+
+
+@pytest.fixture
+def foreign_keys():
+    """Enforce ForeignKeys on this module's engine, as the tuned SQLite profile does."""
+    def enable(dbapi_connection, _):
+        dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+    engine.dispose()
+    event.listen(engine, "connect", enable)
+    yield
+    event.remove(engine, "connect", enable)
+    engine.dispose()
+
+
+class TestAssign:
+    def test_nearest_pairs_and_categories(self):
+        jobs = [Job(1, LAT, LNG, 5, category_id=1), Job(2, LAT + 0.1, LNG, 5, category_id=2)]
+        couriers = [Courier(10, LAT + 0.001, LNG, categories={2}), Courier(11, LAT + 0.02, LNG),
+                    Courier(12, LAT + 0.1, LNG, capacity=3)]
+        pairs = {(a.job.id, a.courier.id, a.quantity) for a in assign(jobs, couriers)}
+        assert pairs == {(1, 11, 5), (2, 12, 3)}
+
+    def test_exclusions_and_max_distance(self):
+        jobs = [Job(1, LAT, LNG, 5)]
+        couriers = [Courier(10, LAT, LNG), Courier(11, LAT + 1, LNG)]
+        assert assign(jobs, couriers, excluded=frozenset({(1, 10)}), max_distance_km=30) == []
+
+    def test_greedy_is_within_half_of_optimal_weight(self):
+        rng = random.Random(5)
+        for _ in range(20):
+            jobs = [Job(i, LAT + rng.uniform(-0.05, 0.05), LNG + rng.uniform(-0.05, 0.05), 1) for i in range(5)]
+            couriers = [Courier(i, LAT + rng.uniform(-0.05, 0.05), LNG + rng.uniform(-0.05, 0.05))
+                        for i in range(5)]
+
+            def weight(job, courier):
+                return 1 / (1 + haversine_km(job.latitude, job.longitude, courier.latitude, courier.longitude))
+
+            greedy = sum(weight(a.job, a.courier) for a in assign(jobs, couriers, candidates=5))
+            best = max(sum(weight(jobs[i], couriers[p]) for i, p in enumerate(perm))
+                       for perm in permutations(range(5)))
+            assert greedy >= best / 2
+
+
+class TestOffers:
+    def test_round_offers_and_accept_commits(self, client, events):
+        delivery_id = add_delivery(quantity=10)
+        report = run_round(client)
+        assert report["offered"] == 1 and report["deliveries"] == 1 and report["volunteers"] == 3
+
+        [offer] = offers(client, "perto@test.com")
+        assert offer["delivery_id"] == delivery_id and offer["quantity"] == 4  # capacity
+        assert offers(client, "roupas@test.com") == []
+        assert [e.event_type for e in events] == ["dispatch.offered"]
+        assert run_round(client)["offered"] == 0  # delivery and volunteer both have an open offer
+
+        response = client.post(f"/api/dispatch/offers/{offer['id']}/accept", headers=headers("perto@test.com"))
+        assert response.status_code == 200 and response.json()["status"] == "accepted"
+        db = TestingSessionLocal()
+        committed = db.get(Delivery, response.json()["committed_delivery_id"])
+        assert committed.volunteer_id == NEAR and committed.quantity == 4
+        assert committed.status == DeliveryStatus.PENDING_CONFIRMATION
+        assert db.get(Delivery, delivery_id).quantity == 6
+        db.close()
+        assert events[-1].payload["state"] == "accepted"
+
+        # the rest goes to the next idle volunteer
+        assert run_round(client)["offered"] == 1
+        assert offers(client, "longe@test.com")[0]["quantity"] == 6
+
+    def test_decline_is_not_offered_again(self, client):
+        add_delivery()
+        run_round(client)
+        offer_id = offers(client, "perto@test.com")[0]["id"]
+        assert client.post(f"/api/dispatch/offers/{offer_id}/decline",
+                           headers=headers("perto@test.com")).json()["status"] == "declined"
+        run_round(client)
+        assert offers(client, "perto@test.com") == []
+        assert len(offers(client, "longe@test.com")) == 1
+
+    def test_expired_and_withdrawn(self, client, events):
+        delivery_id = add_delivery()
+        run_round(client)
+        offer_id = offers(client, "perto@test.com")[0]["id"]
+        db = TestingSessionLocal()
+        db.get(DispatchOffer, offer_id).expires_at = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+        db.close()
+        response = client.post(f"/api/dispatch/offers/{offer_id}/accept", headers=headers("perto@test.com"))
+        assert response.status_code == 409
+
+        run_round(client)  # offered to the next volunteer
+        offer_id = offers(client, "longe@test.com")[0]["id"]
+        db = TestingSessionLocal()
+        db.get(Delivery, delivery_id).status = DeliveryStatus.CANCELLED
+        db.commit()
+        db.close()
+        report = run_round(client)
+        assert report["closed"]["withdrawn"] == 1 and report["offered"] == 0
+        db = TestingSessionLocal()
+        assert db.get(DispatchOffer, offer_id).status == OfferStatus.WITHDRAWN
+        db.close()
+        assert [e.payload.get("state") for e in events if e.event_type == "dispatch.offer_closed"] == [
+            "expired", "withdrawn"]
+
+    def test_offers_are_private_and_admin_only_run(self, client):
+        add_delivery()
+        run_round(client)
+        offer_id = offers(client, "perto@test.com")[0]["id"]
+        assert client.post(f"/api/dispatch/offers/{offer_id}/accept",
+                           headers=headers("longe@test.com")).status_code == 404
+        assert client.post("/api/dispatch/run", headers=headers("perto@test.com")).status_code == 403
+        status = client.get("/api/dispatch/status", headers=headers("admin@test.com")).json()
+        assert status["enabled"] is False and status["rounds"] >= 1
+
+    def test_busy_volunteer_is_skipped(self, client):
+        db = TestingSessionLocal()
+        db.add(Delivery(delivery_location_id=1, product_type=ProductType.MEAL, quantity=1, volunteer_id=NEAR,
+                        status=DeliveryStatus.RESERVED))
+        db.commit()
+        db.close()
+        add_delivery()
+        run_round(client)
+        assert offers(client, "perto@test.com") == []
+        assert len(offers(client, "longe@test.com")) == 1
+
+    def test_offered_deliveries_can_still_be_cancelled(self, foreign_keys, client):
+        declined = add_delivery(quantity=10)
+        run_round(client)
+        offer_id = offers(client, "perto@test.com")[0]["id"]
+        client.post(f"/api/dispatch/offers/{offer_id}/decline", headers=headers("perto@test.com"))
+        response = client.delete(f"/api/deliveries/{declined}", headers=headers("abrigo@test.com"))
+        assert response.status_code == 200
+        db = TestingSessionLocal()
+        assert db.get(DispatchOffer, offer_id) is None
+        db.close()
+
+        add_delivery(quantity=10)
+        run_round(client)
+        offer_id = offers(client, "perto@test.com")[0]["id"]
+        committed = client.post(f"/api/dispatch/offers/{offer_id}/accept",
+                                headers=headers("perto@test.com")).json()["committed_delivery_id"]
+        response = client.delete(f"/api/deliveries/{committed}", headers=headers("perto@test.com"))
+        assert response.status_code == 200
+        db = TestingSessionLocal()
+        offer = db.get(DispatchOffer, offer_id)
+        assert offer.status == OfferStatus.ACCEPTED and offer.committed_delivery_id is None
+        db.close()
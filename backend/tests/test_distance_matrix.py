@@ -0,0 +1,161 @@
+"""
+Tests for the distance matrix (lazy rows, incremental updates, nearest locations).
+"""
+import random
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.database import Base, get_db
+from app.models import DeliveryLocation, User
+from app.auth import get_password_hash
+from app.core.distance_matrix import DistanceMatrix, np
+from app.core.geo import haversine_km
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_distance_matrix.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+LAT, LNG = -19.9191, -43.9386
+BACKENDS = [pytest.param(True, id="numpy", marks=pytest.mark.skipif(np is None, reason="numpy not installed")),
+            pytest.param(False, id="python")]
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="function")
+def client():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    db.add_all([
+        User(id=1, email="abrigo@test.com", name="Abrigo", roles="shelter",
+             hashed_password=get_password_hash("x"), approved=True),
+        DeliveryLocation(id=1, name="Perto", address="Rua 1", approved=True, latitude=LAT + 0.01, longitude=LNG),
+        DeliveryLocation(id=2, name="Longe", address="Rua 2", approved=True, latitude=LAT + 0.5, longitude=LNG),
+        DeliveryLocation(id=3, name="Meio", address="Rua 3", approved=True, latitude=LAT + 0.1, longitude=LNG),
+        DeliveryLocation(id=4, name="Pendente", address="Rua 4", approved=False, latitude=LAT, longitude=LNG),
+        DeliveryLocation(id=5, name="Sem coordenadas", address="Rua 5", approved=True),
+    ])
+    db.commit()
+    db.close()
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+    Base.metadata.drop_all(bind=engine)
+
+
+class Snapshot:
+    """The part of ReferenceSnapshot the matrix reads."""
+
+    def __init__(self, generation, points):
+        self.generation = generation
+        self._records = [SimpleNamespace(id=i, latitude=lat, longitude=lng) for i, (lat, lng) in points.items()]
+
+    def locations(self):
+        return self._records
+
+
+def random_points(rng, count, first_id=1):
+    return {i: (LAT + rng.uniform(-0.5, 0.5), LNG + rng.uniform(-0.5, 0.5)) for i in range(first_id, first_id + count)}
+
+
+def assert_matches(matrix, points, pairs=200, rng=None):
+    rng = rng or random.Random(0)
+    ids = list(points)
+    for _ in range(pairs):
+        a, b = rng.choice(ids), rng.choice(ids)
+        expected = 0.0 if a == b else haversine_km(*points[a], *points[b])
+        assert matrix.km(a, b) == pytest.approx(expected, rel=1e-5, abs=1e-4)
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+class TestDistanceMatrix:
+    def test_rows_are_computed_lazily(self, use_numpy):
+        points = random_points(random.Random(1), 300)
+        matrix = DistanceMatrix(block_rows=64, use_numpy=use_numpy)
+        matrix.sync(Snapshot(1, points))
+        assert matrix.stats()["rows_ready"] == 0
+        assert matrix.km(1, 2) == pytest.approx(haversine_km(*points[1], *points[2]), rel=1e-5)
+        assert 0 < matrix.stats()["rows_ready"] <= 64
+        assert_matches(matrix, points)
+        assert matrix.km(1, 999) is None
+        stats = matrix.stats()
+        assert stats["bytes"] == stats["capacity"] ** 2 * 4  # float32
+
+    def test_incremental_add_move_and_remove(self, use_numpy):
+        rng = random.Random(2)
+        points = random_points(rng, 100)
+        matrix = DistanceMatrix(block_rows=16, use_numpy=use_numpy)
+        matrix.sync(Snapshot(1, points))
+        assert_matches(matrix, points, pairs=2000)  # every row computed
+        computed = matrix.rows_computed
+
+        points[7] = (LAT + 0.3, LNG - 0.2)             # moved
+        points.update(random_points(rng, 2, first_id=500))  # added
+        del points[3]                                  # removed
+        matrix.sync(Snapshot(2, points))
+        assert matrix.incremental_updates == 3 and matrix.resets == 0
+        assert matrix.rows_computed - computed == 3
+        assert matrix.km(3, 1) is None
+        assert_matches(matrix, points, pairs=2000)
+
+        matrix.sync(Snapshot(1, random_points(rng, 5)))  # older version: ignored
+        assert matrix.stats()["version"] == 2
+
+    def test_large_change_resets_rows(self, use_numpy):
+        rng = random.Random(3)
+        points = random_points(rng, 50)
+        matrix = DistanceMatrix(use_numpy=use_numpy)
+        matrix.sync(Snapshot(1, points))
+        matrix.km(1, 2)
+        moved = {i: point if i % 2 else (point[0] + 0.1, point[1]) for i, point in points.items()}  # keeps 1
+        matrix.sync(Snapshot(2, moved))
+        assert matrix.resets == 1 and matrix.stats()["rows_ready"] == 0
+        assert_matches(matrix, moved)
+
+    def test_growth_and_limit(self, use_numpy):
+        rng = random.Random(4)
+        points = random_points(rng, 40)
+        matrix = DistanceMatrix(max_locations=100, use_numpy=use_numpy)
+        matrix.sync(Snapshot(1, points))
+        assert_matches(matrix, points)
+        points.update(random_points(rng, 40, first_id=100))
+        matrix.sync(Snapshot(2, points))
+        assert matrix.stats()["capacity"] >= 80
+        assert_matches(matrix, points)
+        points.update(random_points(rng, 40, first_id=200))
+        matrix.sync(Snapshot(3, points))
+        assert matrix.stats()["enabled"] is False
+        assert_matches(matrix, points)
+
+    def test_from_point_and_nearest(self, use_numpy):
+        points = {1: (LAT + 0.01, LNG), 2: (LAT + 0.5, LNG), 3: (LAT + 0.1, LNG)}
+        matrix = DistanceMatrix(use_numpy=use_numpy)
+        matrix.sync(Snapshot(1, points))
+        distances = matrix.from_point(LAT, LNG)
+        assert distances[2] == pytest.approx(haversine_km(LAT, LNG, *points[2]), rel=1e-6)
+        assert [i for i, _ in matrix.nearest(LAT, LNG, 2)] == [1, 3]
+        assert [i for i, _ in matrix.nearest(LAT, LNG, 5, max_km=20)] == [1, 3]
+        assert [i for i, _ in matrix.nearest(LAT, LNG, 5, ids=[2, 3, 9])] == [3, 2]
+
+
+class TestNearestEndpoint:
+    def test_nearest_active_approved_locations(self, client):
+        response = client.get("/api/locations/nearest", params={"lat": LAT, "lng": LNG, "limit": 2})
+        assert response.status_code == 200
+        body = response.json()
+        assert [(l["id"], l["name"]) for l in body] == [(1, "Perto"), (3, "Meio")]
+        assert body[0]["distance_km"] == pytest.approx(haversine_km(LAT, LNG, LAT + 0.01, LNG), abs=1e-3)
+        far = client.get("/api/locations/nearest", params={"lat": LAT, "lng": LNG, "max_km": 20}).json()
+        assert [l["id"] for l in far] == [1, 3]
+        assert client.get("/api/locations/nearest", params={"lat": 100, "lng": LNG}).status_code == 422
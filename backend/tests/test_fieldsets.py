@@ -0,0 +1,167 @@
+"""
+Tests for sparse fieldsets (`?fields=`) on the list endpoints.
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.database import Base, get_db
+from app.models import Category, Delivery, DeliveryLocation, ProductBatch, User
+from app.inventory_models import ShelterRequest
+from app.schemas import DeliveryResponse
+from app.repositories import queries
+from app.shared.enums import BatchStatus, DeliveryStatus, ProductType
+from app.core.json_projection import Projector, canonical_fields, parse_fields
+from app.core.response_cache import clear_payload_caches
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_fieldsets.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="function")
+def client():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    provider = User(email="fornecedor@test.com", name="Fornecedor", roles="provider,volunteer",
+                    hashed_password="x", approved=True, latitude=-19.9, longitude=-43.9)
+    food = Category(name="alimentos", display_name="Alimentos", icon="🍞")
+    db.add_all([provider, food])
+    db.flush()
+    location = DeliveryLocation(name="Abrigo", address="Rua 1", latitude=-19.92, longitude=-43.94,
+                                user_id=provider.id, approved=True, active=True)
+    batch = ProductBatch(provider_id=provider.id, product_type=ProductType.MEAL, quantity=10,
+                         quantity_available=10, status=BatchStatus.READY)
+    db.add_all([location, batch])
+    db.flush()
+    db.add_all([
+        Delivery(delivery_location_id=location.id, batch_id=batch.id, product_type=ProductType.MEAL,
+                 category_id=food.id, quantity=3, status=DeliveryStatus.AVAILABLE, pickup_code="123456"),
+        Delivery(delivery_location_id=location.id, volunteer_id=provider.id, product_type=ProductType.MEAL,
+                 quantity=1, status=DeliveryStatus.RESERVED),
+        ShelterRequest(shelter_id=provider.id, category_id=food.id, quantity_requested=5, status="active"),
+    ])
+    db.commit()
+    db.close()
+    clear_payload_caches()
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+    Base.metadata.drop_all(bind=engine)
+
+
+def capture_sql(statement) -> str:
+    statements = []
+
+    def before_execute(conn, cursor, sql, parameters, context, executemany):
+        statements.append(sql)
+
+    event.listen(engine, "before_cursor_execute", before_execute)
+    db = TestingSessionLocal()
+    try:
+        db.execute(statement).scalars().all()
+    finally:
+        db.close()
+        event.remove(engine, "before_cursor_execute", before_execute)
+    return "\n".join(statements)
+
+
+class TestParseFields:
+    def test_nested_paths(self):
+        tree = parse_fields(DeliveryResponse, "id, status,category.name,category.icon")
+        assert tree == {"id": None, "status": None, "category": {"name": None, "icon": None}}
+        assert parse_fields(DeliveryResponse, "") is None
+        assert parse_fields(DeliveryResponse, None) is None
+
+    def test_whole_nested_object_wins(self):
+        assert parse_fields(DeliveryResponse, "category.name,category") == {"category": None}
+        assert parse_fields(DeliveryResponse, "category,category.name") == {"category": None}
+
+    def test_unknown_and_scalar_paths_are_rejected(self):
+        with pytest.raises(ValueError, match="nope"):
+            parse_fields(DeliveryResponse, "id,nope")
+        with pytest.raises(ValueError, match="status"):
+            parse_fields(DeliveryResponse, "status.value")
+
+    def test_canonical_form_is_order_independent(self):
+        first = parse_fields(DeliveryResponse, "status,id,category.name")
+        second = parse_fields(DeliveryResponse, "category.name,id,status")
+        assert canonical_fields(first) == canonical_fields(second) == "category(name),id,status"
+
+
+class TestSparseProjection:
+    def test_subset_matches_full_projection(self, client):
+        db = TestingSessionLocal()
+        try:
+            rows = db.execute(queries.map_deliveries()).scalars().all()
+            projector = Projector(DeliveryResponse)
+            full = projector.dump(rows)
+            tree = parse_fields(DeliveryResponse, "id,status,category.name")
+            sparse = projector.dump(rows, tree)
+        finally:
+            db.close()
+        for whole, part in zip(full, sparse):
+            assert list(part) == ["id", "status", "category"]
+            assert part["id"] == whole["id"] and part["status"] == whole["status"]
+            assert part["category"] == (None if whole["category"] is None else {"name": whole["category"]["name"]})
+        assert projector.projector_for(tree) is projector.projector_for(dict(reversed(list(tree.items()))))
+
+    def test_unselected_columns_are_not_loaded(self):
+        Base.metadata.create_all(bind=engine)
+        try:
+            tree = parse_fields(DeliveryResponse, "id,status,category.name")
+            sql = capture_sql(queries.map_deliveries(tree))
+            assert "pickup_code" not in sql and "product_batches" not in sql and "users" not in sql
+            assert "categories" in sql
+            full = capture_sql(queries.map_deliveries())
+            assert "pickup_code" in full and "product_batches" in full
+        finally:
+            Base.metadata.drop_all(bind=engine)
+
+    def test_nested_whole_object_loads_its_relations(self):
+        Base.metadata.create_all(bind=engine)
+        try:
+            sql = capture_sql(queries.map_deliveries(parse_fields(DeliveryResponse, "id,batch")))
+            assert "product_batches" in sql and "users" in sql
+            assert "hashed_password" not in sql
+        finally:
+            Base.metadata.drop_all(bind=engine)
+
+
+class TestSparseEndpoints:
+    def test_map_deliveries(self, client):
+        body = client.get("/api/deliveries/?fields=id,status,category.name").json()
+        assert len(body) == 2
+        assert all(list(item) == ["id", "status", "category"] for item in body)
+        assert {item["category"]["name"] if item["category"] else None for item in body} == {"alimentos", None}
+        assert len(client.get("/api/deliveries/").json()[0]) == len(DeliveryResponse.model_fields)
+
+    def test_unknown_field_is_a_400(self, client):
+        response = client.get("/api/deliveries/?fields=id,hashed_password")
+        assert response.status_code == 400
+        assert "hashed_password" in response.json()["detail"]
+
+    def test_other_list_endpoints(self, client):
+        available = client.get("/api/deliveries/available?fields=id,quantity").json()
+        assert available == [{"id": available[0]["id"], "quantity": 3}]
+        locations = client.get("/api/locations/?fields=id,latitude,longitude").json()
+        assert locations == [{"id": locations[0]["id"], "latitude": -19.92, "longitude": -43.94}]
+        requests = client.get("/api/inventory/requests/public?fields=category_id,quantity_requested").json()
+        assert [set(item) for item in requests] == [{"category_id", "quantity_requested"}]
+        users = client.get("/api/users/?fields=name,roles").json()
+        assert users == [{"name": "Fornecedor", "roles": ["provider", "volunteer"]}]
+
+    def test_full_payload_unchanged_without_fields(self, client):
+        available = client.get("/api/deliveries/available").json()
+        assert available[0]["category"]["name"] == "alimentos"
+        assert available[0]["batch"]["quantity"] == 10
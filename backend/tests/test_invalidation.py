@@ -0,0 +1,141 @@
+"""
+Tests for the cross-worker cache invalidation bus.
+"""
+import time
+
+import pytest
+
+from app.main import app  # noqa: F401 - installs the data version listeners
+from app.core import invalidation
+from app.core.data_versions import DATA_VERSIONS
+from app.core.invalidation import (
+    INVALIDATION_BUS,
+    InvalidationBus,
+    LocalBackend,
+    SQLiteBackend,
+    build_backend,
+)
+from app.core.response_cache import CachedPayload, PayloadCache
+from app.repositories.reference_data import REFERENCE_DATA
+
+
+def wait_for(condition, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return condition()
+
+
+def remote(namespace, key=None) -> dict:
+    """A message as another worker would have published it."""
+    return {"ns": namespace, "key": key, "origin": "other-worker", "sent": time.time()}
+
+
+@pytest.fixture
+def workers(tmp_path):
+    """Two buses sharing one SQLite broker file, like two uvicorn workers."""
+    path = str(tmp_path / "invalidation.db")
+    buses = [InvalidationBus(SQLiteBackend(path, poll_interval=0.005)) for _ in range(2)]
+    for bus in buses:
+        bus.start()
+    yield buses
+    for bus in buses:
+        bus.stop()
+
+
+class TestBus:
+    def test_publish_runs_local_handlers_by_namespace(self):
+        bus = InvalidationBus(LocalBackend())
+        seen = []
+        bus.subscribe("a", lambda key: seen.append(("a", key)))
+        bus.subscribe("b", lambda key: seen.append(("b", key)))
+        bus.publish("a", "x")
+        assert seen == [("a", "x")]
+
+    def test_own_messages_are_ignored_and_resync_reaches_everyone(self):
+        bus = InvalidationBus(LocalBackend())
+        seen = []
+        bus.subscribe("a", seen.append)
+        bus.subscribe("b", seen.append)
+        bus._receive({"ns": "a", "key": "x", "origin": bus.worker_id})
+        assert seen == []
+        bus._receive({"ns": "*", "key": None, "origin": ""})
+        assert seen == [None, None]
+
+    def test_failing_handler_does_not_stop_the_others(self):
+        bus = InvalidationBus(LocalBackend())
+        seen = []
+        bus.subscribe("a", lambda key: 1 / 0)
+        bus.subscribe("a", seen.append)
+        bus.publish("a", "x")
+        assert seen == ["x"]
+
+
+class TestSQLiteBroker:
+    def test_reaches_the_other_worker_only_once(self, workers):
+        first, second = workers
+        received_first, received_second = [], []
+        first.subscribe("reference_data", received_first.append)
+        second.subscribe("reference_data", received_second.append)
+
+        started = time.monotonic()
+        first.publish("reference_data", "reload")
+        assert wait_for(lambda: received_second == ["reload"])
+        assert time.monotonic() - started < 1.0
+        time.sleep(0.05)
+        assert received_first == ["reload"]  # local handler, not echoed back
+        assert second.stats()["received"] == 1
+
+    def test_history_is_not_replayed_to_new_workers(self, tmp_path):
+        path = str(tmp_path / "invalidation.db")
+        old = InvalidationBus(SQLiteBackend(path))
+        old.publish("reference_data", "before")
+        late = InvalidationBus(SQLiteBackend(path, poll_interval=0.005))
+        seen = []
+        late.subscribe("reference_data", seen.append)
+        late.start()
+        try:
+            time.sleep(0.05)
+            assert seen == []
+        finally:
+            late.stop()
+            old.stop()
+
+
+class TestBackendSelection:
+    def test_redis_url_without_package_falls_back(self, monkeypatch):
+        monkeypatch.setattr(invalidation, "REDIS_URL", "redis://localhost:6379")
+        monkeypatch.setattr(invalidation, "INVALIDATION_SQLITE_PATH", "")
+        monkeypatch.setattr(invalidation, "redis", None)
+        assert isinstance(build_backend("auto"), LocalBackend)
+        with pytest.raises(RuntimeError):
+            build_backend("redis")
+
+    def test_sqlite_needs_a_path(self, monkeypatch):
+        monkeypatch.setattr(invalidation, "INVALIDATION_SQLITE_PATH", "")
+        with pytest.raises(RuntimeError):
+            build_backend("sqlite")
+
+
+class TestCacheSubscriptions:
+    def test_remote_table_bump_reaches_data_versions_and_reference_data(self):
+        version = DATA_VERSIONS.version("categories")
+        generation = REFERENCE_DATA.stats()["generation"]
+        INVALIDATION_BUS._receive(remote("data_versions", "categories,deliveries"))
+        assert DATA_VERSIONS.version("categories") == version + 1
+        assert REFERENCE_DATA.stats()["generation"] > generation
+
+    def test_unrelated_tables_keep_reference_data(self):
+        generation = REFERENCE_DATA.stats()["generation"]
+        INVALIDATION_BUS._receive(remote("data_versions", "deliveries"))
+        assert REFERENCE_DATA.stats()["generation"] == generation
+
+    def test_payload_cache_purge_by_name(self):
+        kept = PayloadCache("test_kept", tables=("deliveries",))
+        purged = PayloadCache("test_purged", tables=("deliveries",))
+        for cache in (kept, purged):
+            cache.put("/", CachedPayload("v", b"[]"))
+        INVALIDATION_BUS._receive(remote("payload_cache", "test_purged"))
+        assert kept.stats()["entries"] == 1 and purged.stats()["entries"] == 0
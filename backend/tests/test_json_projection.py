@@ -0,0 +1,155 @@
+"""
+Tests for the compiled JSON projectors used by the large list endpoints.
+"""
+from datetime import datetime, timezone
+from typing import List
+
+import pytest
+from fastapi import APIRouter
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.testclient import TestClient
+from pydantic import BaseModel, TypeAdapter, field_validator
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.database import Base, get_db
+from app.models import Category, CategoryAttribute, Delivery, DeliveryLocation, ProductBatch, User
+from app.inventory_models import ShelterRequest
+from app.schemas import DeliveryResponse
+from app.category_schemas import CategoryResponse
+from app.inventory_schemas import ShelterRequestResponse
+from app.repositories import queries
+from app.shared.enums import BatchStatus, DeliveryStatus, ProductType
+from app.core.json_projection import Projector, compile_projector
+from app.core.responses import ORJSONResponse
+from app.core.server_timing import ServerTimingRoute
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_json_projection.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="function")
+def seeded():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    provider = User(email="fornecedor@test.com", name="Fornecedor", roles="{provider, volunteer}",
+                    hashed_password="x", approved=True, latitude=-19.9, tipos_produtos=["meal"])
+    clothes = Category(name="roupa", display_name="Roupas", icon="👕")
+    db.add_all([provider, clothes])
+    db.flush()
+    db.add(CategoryAttribute(category_id=clothes.id, name="tamanho", display_name="Tamanho",
+                             options=[{"value": "P", "label": "Pequeno"}]))
+    location = DeliveryLocation(name="Abrigo", address="Rua 1", user_id=provider.id, approved=True)
+    batch = ProductBatch(provider_id=provider.id, product_type=ProductType.MEAL, quantity=10,
+                         quantity_available=10, status=BatchStatus.READY)
+    db.add_all([location, batch])
+    db.flush()
+    db.add_all([
+        Delivery(delivery_location_id=location.id, batch_id=batch.id, volunteer_id=provider.id,
+                 product_type=ProductType.MEAL, category_id=clothes.id, quantity=3,
+                 status=DeliveryStatus.RESERVED, accepted_at=datetime(2026, 1, 2, 10, 30, 0, 250000)),
+        Delivery(delivery_location_id=location.id, product_type=ProductType.CLOTHING, quantity=1,
+                 status=DeliveryStatus.AVAILABLE),
+        ShelterRequest(shelter_id=provider.id, category_id=clothes.id, quantity_requested=5,
+                       status="active", metadata_cache={"tamanho": "P"}),
+    ])
+    db.commit()
+    db.close()
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def client(seeded):
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+
+
+def pydantic_json(model, rows) -> bytes:
+    adapter = TypeAdapter(List[model])
+    return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+
+class TestProjectorOutput:
+    @pytest.mark.parametrize("model, statement", [
+        (DeliveryResponse, queries.map_deliveries()),
+        (CategoryResponse, queries.categories()),
+        (ShelterRequestResponse, queries.public_shelter_requests()),
+    ])
+    def test_matches_response_model_bytes(self, seeded, model, statement):
+        db = TestingSessionLocal()
+        try:
+            rows = db.execute(statement).unique().scalars().all()
+            assert rows
+            assert Projector(model).dumps(rows) == pydantic_json(model, rows)
+        finally:
+            db.close()
+
+    def test_before_validator_and_utc_datetime(self):
+        user = User(id=1, email="a@b.org", name="Ana", roles="{volunteer, shelter}", approved=True,
+                    active=True, created_at=datetime(2026, 1, 1, tzinfo=timezone.utc))
+        delivery = Delivery(id=1, delivery_location_id=1, quantity=1, product_type=ProductType.MEAL,
+                            status=DeliveryStatus.AVAILABLE, created_at=datetime(2026, 1, 1), volunteer=user)
+        assert Projector(DeliveryResponse).dumps([delivery]) == pydantic_json(DeliveryResponse, [delivery])
+        assert compile_projector(DeliveryResponse)(delivery)["volunteer"]["roles"] == ["volunteer", "shelter"]
+
+    def test_unsupported_schema_fails_at_compile_time(self):
+        class Upper(BaseModel):
+            name: str
+
+            @field_validator("name")
+            @classmethod
+            def upper(cls, value):
+                return value.upper()
+
+        with pytest.raises(TypeError, match="upper"):
+            compile_projector(Upper)
+
+
+class TestProjectedEndpoints:
+    @pytest.mark.parametrize("path, model, statement", [
+        ("/api/deliveries/", DeliveryResponse, queries.map_deliveries()),
+        ("/api/categories/", CategoryResponse, queries.categories()),
+        ("/api/inventory/requests/public", ShelterRequestResponse, queries.public_shelter_requests()),
+    ])
+    def test_endpoint_body_matches_schema(self, client, path, model, statement):
+        response = client.get(path)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        db = TestingSessionLocal()
+        try:
+            assert response.content == pydantic_json(model, db.execute(statement).unique().scalars().all())
+        finally:
+            db.close()
+
+    def test_openapi_keeps_response_models(self, client):
+        schema = client.get("/openapi.json").json()
+        ok = schema["paths"]["/api/deliveries/"]["get"]["responses"]["200"]
+        assert ok["content"]["application/json"]["schema"]["items"]["$ref"].endswith("DeliveryResponse")
+
+
+class TestDefaultResponseClass:
+    def test_untyped_routes_render_with_orjson(self):
+        router = APIRouter(route_class=ServerTimingRoute)
+        router.get("/untyped")(lambda: {"ok": True})
+        router.get("/typed", response_model=CategoryResponse)(lambda: None)
+        untyped, typed = router.routes
+        assert untyped.response_class.value is ORJSONResponse
+        # Typed routes keep the default placeholder, i.e. FastAPI's Pydantic dump_json path
+        assert isinstance(typed.response_class, DefaultPlaceholder)
+        assert typed.response_class.value is not ORJSONResponse
+
+    def test_orjson_rendering(self, client):
+        assert ORJSONResponse({1: datetime(2026, 1, 1, tzinfo=timezone.utc)}).body == b'{"1":"2026-01-01T00:00:00Z"}'
+        assert client.get("/health/startup").json()["phases_ms"]
@@ -0,0 +1,197 @@
+"""
+Tests for the live map stream (SSE deltas from the domain event bus).
+"""
+import asyncio
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.database import Base, get_db
+from app.models import Category, DeliveryLocation, User
+from app.auth import get_password_hash, create_access_token
+from app.core.events import ShelterNeedsChanged, emit_after_commit, get_event_bus
+from app.core.sse import DeltaStream
+from app.services.map_updates import MAP_DELTAS
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_live_updates.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="function")
+def client():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    db.add_all([
+        User(email="admin@test.com", name="Admin", roles="admin", hashed_password=get_password_hash("x"),
+             approved=True),
+        User(email="abrigo@test.com", name="Abrigo", roles="shelter", hashed_password=get_password_hash("x"),
+             approved=True),
+        Category(name="agua", display_name="Água"),
+    ])
+    db.flush()
+    shelter = db.query(User).filter(User.email == "abrigo@test.com").one()
+    db.add(DeliveryLocation(name="Abrigo", address="Rua 1", user_id=shelter.id, approved=False))
+    db.commit()
+    db.close()
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+    Base.metadata.drop_all(bind=engine)
+
+
+def headers(email):
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': email})}"}
+
+
+def parse(frames: bytes):
+    """[(id, event, data)] of a chunk of SSE frames."""
+    events = []
+    for block in frames.decode().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if "event" in fields:
+            events.append((fields["id"], fields["event"], orjson.loads(fields["data"])))
+    return events
+
+
+def deltas_after(cursor):
+    return parse(b"".join(frame for _, frame in MAP_DELTAS.since(cursor)))
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestDeltaStream:
+    def test_resume_from_last_event_id(self):
+        stream = DeltaStream("test", replay_size=8)
+        first = stream.publish("need.changed", {"shelter_id": 1})
+        stream.publish("need.changed", {"shelter_id": 2})
+
+        async def read():
+            frames = stream.frames(first)
+            assert (await frames.__anext__()).startswith(b"retry:")
+            chunk = await frames.__anext__()
+            await frames.aclose()
+            return chunk
+
+        assert [data for _, _, data in parse(run(read()))] == [{"shelter_id": 2}]
+
+    def test_unknown_or_evicted_ids_reset(self):
+        stream = DeltaStream("test", replay_size=2)
+        first = stream.publish("a", {})
+        for _ in range(3):
+            stream.publish("b", {})
+        assert stream.cursor_for(first) is None
+        assert stream.cursor_for("otherepoch-1") is None
+        assert stream.cursor_for(f"{stream.epoch}-999") is None
+        assert stream.cursor_for(None) == 4
+
+        async def read():
+            frames = stream.frames(first)
+            await frames.__anext__()
+            chunk = await frames.__anext__()
+            await frames.aclose()
+            return chunk
+
+        assert parse(run(read())) == [(stream.last_id, "reset", {})]
+
+    def test_one_publish_reaches_every_waiting_client(self):
+        stream = DeltaStream("test", keepalive=5)
+
+        async def scenario():
+            clients = [stream.frames() for _ in range(500)]
+            for frames in clients:
+                await frames.__anext__()
+            reads = [asyncio.create_task(frames.__anext__()) for frames in clients]
+            await asyncio.sleep(0.01)
+            assert stream.clients == 500
+            # published from a worker thread, like a sync endpoint's commit
+            await asyncio.to_thread(stream.publish, "need.changed", {"shelter_id": 7})
+            chunks = await asyncio.wait_for(asyncio.gather(*reads), 2)
+            for frames in clients:
+                await frames.aclose()
+            return chunks
+
+        chunks = run(scenario())
+        assert len(set(chunks)) == 1 and parse(chunks[0])[0][1] == "need.changed"
+        assert stream.clients == 0
+
+    def test_idle_connections_get_keepalives(self):
+        stream = DeltaStream("test", keepalive=0.01)
+
+        async def read():
+            frames = stream.frames()
+            await frames.__anext__()
+            chunk = await frames.__anext__()
+            await frames.aclose()
+            return chunk
+
+        assert run(read()) == b": keepalive\n\n"
+
+
+class TestTransactionalEmit:
+    def test_events_wait_for_commit_and_rollback_drops_them(self, client):
+        seen = []
+        get_event_bus().subscribe("shelter.needs_changed", seen.append)
+        db = TestingSessionLocal()
+        try:
+            emit_after_commit(db, ShelterNeedsChanged(1, 2))
+            emit_after_commit(db, ShelterNeedsChanged(1, 2))
+            assert seen == []
+            db.commit()
+            assert len(seen) == 1
+            emit_after_commit(db, ShelterNeedsChanged(1, 3))
+            db.rollback()
+            db.commit()
+            assert len(seen) == 1
+        finally:
+            db.close()
+            get_event_bus()._handlers["shelter.needs_changed"].remove(seen.append)
+
+
+class TestMapStream:
+    def test_request_lifecycle_becomes_deltas(self, client):
+        cursor = MAP_DELTAS.cursor_for(None)
+        response = client.post("/api/inventory/requests", headers=headers("abrigo@test.com"),
+                               json={"category_id": 1, "quantity_requested": 30})
+        assert response.status_code == 200
+        request_id = response.json()["id"]
+        created = deltas_after(cursor)
+        assert [(event, data) for _, event, data in created] == [
+            ("need_request.created", {"request_id": request_id, "shelter_id": 2, "category_id": 1,
+                                      "quantity": 30}),
+        ]
+
+        cursor = MAP_DELTAS.cursor_for(None)
+        assert client.post(f"/api/inventory/requests/{request_id}/cancel",
+                           headers=headers("abrigo@test.com")).status_code == 200
+        assert [event for _, event, _ in deltas_after(cursor)] == ["need.changed"]
+
+    def test_location_approval_and_rejected_writes(self, client):
+        cursor = MAP_DELTAS.cursor_for(None)
+        assert client.post("/api/inventory/requests", headers=headers("abrigo@test.com"),
+                           json={"category_id": 99, "quantity_requested": 1}).status_code == 404
+        assert client.post("/api/locations/1/approve", headers=headers("admin@test.com")).status_code == 200
+        assert [(event, data) for _, event, data in deltas_after(cursor)] == [
+            ("location.approved", {"location_id": 1, "user_id": 2}),
+        ]
+
+    def test_endpoint_limits_clients(self, client, monkeypatch):
+        monkeypatch.setattr(MAP_DELTAS, "max_clients", 0)
+        response = client.get("/api/live/map")
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
+        assert client.get("/api/live/map/status").json()["clients"] == 0
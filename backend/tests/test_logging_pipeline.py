@@ -0,0 +1,120 @@
+"""
+Tests for the non-blocking structured logging pipeline.
+"""
+import gzip
+import json
+import logging
+import queue
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.logging_config import (
+    JsonFormatter, DebugSamplingFilter, RequestContextFilter,
+    StructuredQueueHandler, CompressingRotatingFileHandler,
+)
+from app.core.request_context import start_request_context, reset_request_context
+
+
+def make_record(level=logging.INFO, msg="hello %s", args=("world",), **extra):
+    record = logging.LogRecord("app.test", level, __file__, 10, msg, args, None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+class TestJsonFormatter:
+    def test_emits_structured_fields(self):
+        record = make_record(request_id="abc123", delivery_id=42)
+        payload = json.loads(JsonFormatter().format(record))
+        assert payload["message"] == "hello world"
+        assert payload["level"] == "INFO"
+        assert payload["logger"] == "app.test"
+        assert payload["request_id"] == "abc123"
+        assert payload["delivery_id"] == 42
+
+    def test_includes_exception_text(self):
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            import sys
+            record = logging.LogRecord("app.test", logging.ERROR, __file__, 1, "failed", (), sys.exc_info())
+        payload = json.loads(JsonFormatter().format(record))
+        assert "RuntimeError: boom" in payload["exception"]
+
+
+class TestQueueHandler:
+    def test_prepare_keeps_record_structured(self):
+        log_queue = queue.SimpleQueue()
+        handler = StructuredQueueHandler(log_queue)
+        handler.addFilter(RequestContextFilter())
+
+        ctx, token = start_request_context("GET", "/x", request_id="req-1")
+        try:
+            handler.handle(make_record(delivery_id=7))
+        finally:
+            reset_request_context(token)
+
+        queued = log_queue.get_nowait()
+        assert queued.getMessage() == "hello world"
+        assert queued.request_id == "req-1"
+        assert queued.delivery_id == 7
+
+    def test_request_id_outside_request(self):
+        record = make_record()
+        RequestContextFilter().filter(record)
+        assert record.request_id == "-"
+
+
+class TestDebugSampling:
+    def test_info_always_passes(self):
+        sampler = DebugSamplingFilter(0.0)
+        assert sampler.filter(make_record(logging.INFO, request_id="r"))
+        assert not sampler.filter(make_record(logging.DEBUG, request_id="r"))
+
+    def test_sampling_is_consistent_per_request(self):
+        sampler = DebugSamplingFilter(0.5)
+        for request_id in ("a1", "b2", "c3", "d4"):
+            decisions = {sampler.filter(make_record(logging.DEBUG, request_id=request_id)) for _ in range(5)}
+            assert len(decisions) == 1
+
+    def test_sampling_rate_is_approximate(self):
+        sampler = DebugSamplingFilter(0.25)
+        kept = sum(
+            sampler.filter(make_record(logging.DEBUG, request_id=f"req-{i}")) for i in range(4000)
+        )
+        assert 700 < kept < 1300
+
+
+class TestRotation:
+    def test_rotated_files_are_gzipped(self, tmp_path):
+        log_file = tmp_path / "app.log"
+        handler = CompressingRotatingFileHandler(log_file, max_bytes=200, backup_count=3, rotate_daily=False)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        for i in range(30):
+            handler.emit(make_record(msg="line %d " + "x" * 40, args=(i,)))
+        handler.close()
+
+        rotated = sorted(p.name for p in tmp_path.iterdir() if p.name.endswith(".gz"))
+        assert rotated == ["app.log.1.gz", "app.log.2.gz", "app.log.3.gz"]
+        with gzip.open(tmp_path / "app.log.1.gz", "rt") as fh:
+            assert "line" in fh.read()
+
+
+class TestCorrelationId:
+    @pytest.fixture
+    def client(self):
+        return TestClient(app)
+
+    def test_response_carries_generated_request_id(self, client):
+        response = client.get("/health")
+        assert len(response.headers["x-request-id"]) == 32
+
+    def test_incoming_request_id_is_propagated(self, client):
+        response = client.get("/health", headers={"X-Request-ID": "trace-123"})
+        assert response.headers["x-request-id"] == "trace-123"
+
+    def test_malformed_request_id_is_replaced(self, client):
+        response = client.get("/health", headers={"X-Request-ID": "bad id\twith spaces"})
+        assert response.headers["x-request-id"] != "bad id\twith spaces"
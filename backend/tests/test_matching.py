@@ -0,0 +1,200 @@
+"""
+Tests for the volunteer matching feed (spatial / category need index).
+"""
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.database import Base, get_db
+from app.models import Category, DeliveryLocation, User
+from app.auth import get_password_hash, create_access_token
+from app.core.geo import GeoGrid, haversine_km
+from app.inventory_models import ShelterRequest
+from app.services.matching import NEED_INDEX, IndexedNeed, NeedIndex
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_matching.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+VOLUNTEER, NEAR, FAR, HIDDEN = 1, 2, 3, 4
+# Praça Sete, Belo Horizonte
+LAT, LNG = -19.9191, -43.9386
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="function")
+def client():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    shelters = [User(id=user_id, email=f"abrigo{user_id}@test.com", name=f"Abrigo {user_id}", roles="shelter",
+                     hashed_password=get_password_hash("x"), approved=True) for user_id in (NEAR, FAR, HIDDEN)]
+    db.add_all([
+        User(id=VOLUNTEER, email="voluntario@test.com", name="Voluntário", roles="volunteer",
+             hashed_password=get_password_hash("x"), approved=True, latitude=LAT, longitude=LNG,
+             delivery_capacity=5, tipos_produtos=["meal"]),
+        *shelters,
+        Category(id=1, name="alimentos", display_name="Alimentos", legacy_product_type="meal"),
+        Category(id=2, name="roupas", display_name="Roupas", legacy_product_type="clothing"),
+        Category(id=3, name="marmitas", display_name="Marmitas", parent_id=1),
+        DeliveryLocation(id=1, name="Abrigo Perto", address="Rua 1", user_id=NEAR, approved=True,
+                         latitude=LAT + 0.005, longitude=LNG),
+        DeliveryLocation(id=2, name="Abrigo Longe", address="Rua 2", user_id=FAR, approved=True,
+                         latitude=LAT + 0.2, longitude=LNG),
+        DeliveryLocation(id=3, name="Abrigo Oculto", address="Rua 3", user_id=HIDDEN, approved=False,
+                         latitude=LAT, longitude=LNG),
+    ])
+    db.commit()
+    db.close()
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+    Base.metadata.drop_all(bind=engine)
+
+
+def headers(email="voluntario@test.com"):
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': email})}"}
+
+
+def add_request(shelter_id, category_id, quantity):
+    db = TestingSessionLocal()
+    request = ShelterRequest(shelter_id=shelter_id, category_id=category_id, quantity_requested=quantity,
+                             status="pending")
+    db.add(request)
+    db.commit()
+    request_id = request.id
+    db.close()
+    return request_id
+
+
+def feed(client, **params):
+    response = client.get("/api/matching/feed", headers=headers(), params=params)
+    assert response.status_code == 200
+    return [(item["shelter_id"], item["category_id"]) for item in response.json()], response.json()
+
+
+def need(shelter_id, category_id, lat, lng, urgency=1.0, remaining=10, hours_ago=0.0, now=1e9):
+    return IndexedNeed(shelter_id, category_id, shelter_id, lat, lng, remaining, urgency, now - hours_ago * 3600)
+
+
+class TestGeo:
+    def test_haversine(self):
+        # Belo Horizonte - Rio de Janeiro, ~340 km
+        assert 335 < haversine_km(-19.9191, -43.9386, -22.9068, -43.1729) < 345
+        assert haversine_km(LAT, LNG, LAT, LNG) == 0
+
+    def test_ring_bound_never_overestimates(self):
+        grid = GeoGrid(5)
+        rng = random.Random(3)
+        center = grid.cell(LAT, LNG)
+        for radius in range(6):
+            bound = grid.ring_min_km(LAT, radius)
+            for cell in grid.ring(center, radius):
+                for _ in range(5):
+                    lat = (cell[0] + rng.random()) * grid.step
+                    lng = (cell[1] + rng.random()) * grid.step
+                    assert haversine_km(LAT, LNG, lat, lng) >= bound
+
+
+class TestSearch:
+    def test_distance_urgency_and_staleness(self):
+        index = NeedIndex()
+        index.replace([
+            need(1, 1, LAT + 0.005, LNG, urgency=0.1),           # ~0.5 km, almost covered
+            need(2, 1, LAT + 0.045, LNG, urgency=3.0),           # ~5 km, large and uncovered
+            need(3, 1, LAT - 0.1, LNG, urgency=1.0),
+            need(4, 1, LAT + 0.1, LNG, urgency=1.0, hours_ago=24),
+        ])
+        ranked = [m.need.shelter_id for m in index.search(LAT, LNG, now=1e9)]
+        assert ranked[0] == 2
+        assert ranked.index(4) < ranked.index(3)  # same distance and urgency: the forgotten one first
+
+    def test_categories_capacity_and_max_distance(self):
+        index = NeedIndex(max_distance_km=50)
+        index.replace([need(1, 1, LAT, LNG, remaining=12), need(2, 2, LAT, LNG), need(3, 1, LAT + 1, LNG)])
+        matches = index.search(LAT, LNG, categories={1}, capacity=5, now=1e9)
+        assert [(m.need.shelter_id, m.suggested_quantity) for m in matches] == [(1, 5)]
+        assert {m.need.shelter_id for m in index.search(LAT, LNG, now=1e9)} == {1, 2}
+
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        needs = [need(i, rng.randint(1, 4), LAT + rng.uniform(-0.8, 0.8), LNG + rng.uniform(-0.8, 0.8),
+                      urgency=rng.uniform(0, 3), hours_ago=rng.uniform(0, 100)) for i in range(3000)]
+        index, scan = NeedIndex(), NeedIndex(cell_km=1000)  # one cell: every need is scored
+        index.replace(needs)
+        scan.replace(needs)
+        for _ in range(20):
+            lat, lng = LAT + rng.uniform(-0.5, 0.5), LNG + rng.uniform(-0.5, 0.5)
+            categories = rng.choice([None, {1}, {2, 3}])
+            expected = scan.search(lat, lng, categories, limit=20, now=1e9)
+            got = index.search(lat, lng, categories, limit=20, now=1e9)
+            assert [m.need.key for m in got] == [m.need.key for m in expected]
+
+    def test_patch_moves_and_removes(self):
+        index = NeedIndex()
+        index.replace([need(1, 1, LAT, LNG), need(2, 1, LAT, LNG)])
+        index.patch([(1, 1), (2, 1)], [need(1, 1, LAT + 0.3, LNG)])
+        assert [m.need.key for m in index.search(LAT, LNG, now=1e9)] == [(1, 1)]
+        assert index.stats()["needs"] == 1
+
+
+class TestFeed:
+    def test_profile_categories_and_capacity(self, client):
+        add_request(NEAR, 1, 3)
+        add_request(NEAR, 3, 20)      # subcategory of a declared type
+        add_request(NEAR, 2, 10)      # clothing: not declared
+        add_request(FAR, 1, 50)
+        add_request(HIDDEN, 1, 50)    # location not approved
+        keys, items = feed(client)
+        assert set(keys) == {(NEAR, 1), (NEAR, 3), (FAR, 1)}
+        by_key = {(item["shelter_id"], item["category_id"]): item for item in items}
+        assert by_key[(NEAR, 3)]["suggested_quantity"] == 5 and by_key[(NEAR, 1)]["suggested_quantity"] == 3
+        assert by_key[(NEAR, 3)]["location_name"] == "Abrigo Perto"
+        assert by_key[(FAR, 1)]["distance_km"] > 20
+
+        keys, _ = feed(client, category_id=2, lat=LAT + 0.2, lng=LNG)
+        assert keys == [(NEAR, 2)]
+
+    def test_index_follows_commits(self, client):
+        request_id = add_request(NEAR, 1, 10)
+        assert feed(client)[0] == [(NEAR, 1)]
+        loads = NEED_INDEX.loads
+
+        add_request(FAR, 1, 10)
+        assert set(feed(client)[0]) == {(NEAR, 1), (FAR, 1)}
+        db = TestingSessionLocal()
+        db.get(ShelterRequest, request_id).status = "cancelled"
+        db.commit()
+        db.close()
+        assert feed(client)[0] == [(FAR, 1)]
+        assert NEED_INDEX.loads == loads  # patched, not reloaded
+
+        db = TestingSessionLocal()
+        db.execute(update(DeliveryLocation).where(DeliveryLocation.id == 2).values(active=False))
+        db.commit()
+        db.close()
+        assert feed(client)[0] == []
+        assert NEED_INDEX.loads == loads + 1
+
+    def test_location_required(self, client):
+        db = TestingSessionLocal()
+        db.get(User, VOLUNTEER).latitude = None
+        db.commit()
+        db.close()
+        response = client.get("/api/matching/feed", headers=headers())
+        assert response.status_code == 400
+        assert client.get("/api/matching/feed", params={"lat": LAT, "lng": LNG},
+                          headers=headers()).status_code == 200
+
+    def test_requires_login(self, client):
+        assert client.get("/api/matching/feed").status_code in (401, 403)
@@ -0,0 +1,103 @@
+"""
+Tests for the Prometheus metrics endpoint and collectors.
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.database import Base, get_db
+from app.models import DeliveryLocation
+from app.core.metrics import (
+    REGISTRY, Counter, Histogram, MetricsRegistry,
+    REQUESTS_TOTAL, REQUEST_LATENCY, DB_REQUEST_STATEMENTS, UNMATCHED_ROUTE,
+)
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_metrics.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="function")
+def client():
+    app.dependency_overrides[get_db] = override_get_db
+    Base.metadata.create_all(bind=engine)
+    REGISTRY.clear()
+    yield TestClient(app)
+    Base.metadata.drop_all(bind=engine)
+    app.dependency_overrides.pop(get_db, None)
+
+
+class TestMetricTypes:
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        hist = registry.register(Histogram("latency", "Latency.", ("route",), buckets=(0.1, 1.0)))
+        hist.observe(0.05, "/a")
+        hist.observe(0.5, "/a")
+        hist.observe(5.0, "/a")
+
+        text = registry.render()
+        assert 'latency_bucket{route="/a",le="0.1"} 1' in text
+        assert 'latency_bucket{route="/a",le="1"} 2' in text
+        assert 'latency_bucket{route="/a",le="+Inf"} 3' in text
+        assert 'latency_count{route="/a"} 3' in text
+        assert "# TYPE latency histogram" in text
+
+    def test_counter_escapes_label_values(self):
+        registry = MetricsRegistry()
+        counter = registry.register(Counter("hits", "Hits.", ("path",)))
+        counter.inc('a"b')
+        assert 'hits{path="a\\"b"} 1' in registry.render()
+
+    def test_duplicate_registration_rejected(self):
+        registry = MetricsRegistry()
+        registry.register(Counter("dup", "Dup."))
+        with pytest.raises(ValueError):
+            registry.register(Counter("dup", "Dup."))
+
+
+class TestMetricsMiddleware:
+    def test_route_label_uses_template_not_raw_url(self, client):
+        db = TestingSessionLocal()
+        location = DeliveryLocation(name="Abrigo", address="Rua 1", approved=True)
+        db.add(location)
+        db.commit()
+        location_id = location.id
+        db.close()
+
+        assert client.get(f"/api/locations/{location_id}").status_code == 200
+        assert client.get("/api/locations/999999").status_code == 404
+
+        route = "/api/locations/{location_id}"
+        assert REQUESTS_TOTAL.value("GET", route, "200") == 1
+        assert REQUESTS_TOTAL.value("GET", route, "404") == 1
+        assert REQUEST_LATENCY.count("GET", route) == 2
+        assert f"/api/locations/{location_id}" not in REGISTRY.render()
+
+    def test_sql_statements_counted_per_request(self, client):
+        client.get("/api/locations/")
+        assert DB_REQUEST_STATEMENTS.count("/api/locations/") == 1
+        assert DB_REQUEST_STATEMENTS.sum("/api/locations/") >= 1
+
+    def test_unknown_path_grouped_as_unmatched(self, client):
+        client.get("/does/not/exist/123")
+        assert REQUESTS_TOTAL.value("GET", UNMATCHED_ROUTE, "404") == 1
+
+    def test_metrics_endpoint_exposition(self, client):
+        client.get("/health")
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        body = response.text
+        assert 'http_requests_total{method="GET",route="/health",status="200"} 1' in body
+        assert "http_requests_in_progress" in body
+        assert "http_response_size_bytes_bucket" in body
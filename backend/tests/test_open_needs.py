@@ -0,0 +1,194 @@
+"""
+Tests for the materialized open needs table (per shelter and category).
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.database import Base, get_db
+from app.models import Category, Delivery, DeliveryLocation, User
+from app.auth import get_password_hash, create_access_token
+from app.inventory_models import OpenNeed, ShelterRequest, ShelterRequestDelivery
+from app.repositories.open_needs import check_open_needs, urgency_score
+from app.services.inventory_service import on_delivery_cancelled, on_delivery_confirmed
+from app.shared.enums import DeliveryStatus, ProductType
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_open_needs.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+SHELTER, ADMIN, VOLUNTEER = 1, 2, 3
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="function")
+def client():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    db.add_all([
+        User(id=SHELTER, email="abrigo@test.com", name="Abrigo", roles="shelter",
+             hashed_password=get_password_hash("x"), approved=True),
+        User(id=ADMIN, email="admin@test.com", name="Admin", roles="admin",
+             hashed_password=get_password_hash("x"), approved=True),
+        User(id=VOLUNTEER, email="voluntario@test.com", name="Voluntário", roles="volunteer",
+             hashed_password=get_password_hash("x"), approved=True),
+        Category(id=1, name="agua", display_name="Água"),
+        Category(id=2, name="roupas", display_name="Roupas"),
+        DeliveryLocation(id=1, name="Abrigo", address="Rua 1", user_id=SHELTER, approved=True),
+    ])
+    db.commit()
+    db.close()
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+    Base.metadata.drop_all(bind=engine)
+
+
+def headers(email):
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': email})}"}
+
+
+def needs():
+    db = TestingSessionLocal()
+    try:
+        return {(n.shelter_id, n.category_id): (n.open_requests, n.quantity_remaining, n.urgency)
+                for n in db.execute(select(OpenNeed)).scalars()}
+    finally:
+        db.close()
+
+
+def create_request(client, category_id, quantity):
+    response = client.post("/api/inventory/requests", headers=headers("abrigo@test.com"),
+                           json={"category_id": category_id, "quantity_requested": quantity})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def delivery_for(db, request_id, quantity):
+    """A delivery committed to `request_id` (pending quantity included)."""
+    delivery = Delivery(delivery_location_id=1, volunteer_id=VOLUNTEER, category_id=1,
+                        product_type=ProductType.MEAL, quantity=quantity, status=DeliveryStatus.RESERVED)
+    db.add(delivery)
+    db.flush()
+    db.add(ShelterRequestDelivery(request_id=request_id, delivery_id=delivery.id, quantity=quantity))
+    db.get(ShelterRequest, request_id).quantity_pending += quantity
+    return delivery
+
+
+class TestUrgency:
+    def test_uncovered_share_weighted_by_gap(self):
+        assert urgency_score(10, 0) == 0.0
+        assert urgency_score(100, 90) > urgency_score(5, 5) > urgency_score(2, 1)
+
+
+class TestMaintenance:
+    def test_requests_aggregate_per_shelter_and_category(self, client):
+        create_request(client, 1, 10)
+        create_request(client, 1, 5)
+        create_request(client, 2, 3)
+        assert needs() == {
+            (SHELTER, 1): (2, 15, urgency_score(15, 15)),
+            (SHELTER, 2): (1, 3, urgency_score(3, 3)),
+        }
+
+    def test_delivery_hooks_move_remaining(self, client):
+        request_id = create_request(client, 1, 10)
+        db = TestingSessionLocal()
+        delivery = delivery_for(db, request_id, 4)
+        db.commit()
+        assert needs()[(SHELTER, 1)][1] == 6
+
+        on_delivery_cancelled(db, delivery, VOLUNTEER)
+        db.commit()
+        assert needs()[(SHELTER, 1)][1] == 10
+
+        delivery = delivery_for(db, request_id, 10)
+        db.commit()
+        assert (SHELTER, 1) not in needs()  # all of it on the way
+
+        on_delivery_confirmed(db, delivery, VOLUNTEER)
+        db.commit()
+        db.close()
+        assert needs() == {}
+
+    def test_adjustment_and_cancellation(self, client):
+        request_id = create_request(client, 1, 10)
+        assert client.post(f"/api/inventory/requests/adjust/{request_id}", headers=headers("abrigo@test.com"),
+                           json={"adjustment_type": "increase", "quantity_change": 5}).status_code == 200
+        assert needs()[(SHELTER, 1)][1] == 15
+        assert client.post(f"/api/inventory/requests/{request_id}/cancel",
+                           headers=headers("abrigo@test.com")).status_code == 200
+        assert needs() == {}
+
+    def test_rollback_leaves_table_alone(self, client):
+        create_request(client, 1, 10)
+        db = TestingSessionLocal()
+        db.add(ShelterRequest(shelter_id=SHELTER, category_id=1, quantity_requested=50, status="pending"))
+        db.flush()
+        db.rollback()
+        db.close()
+        assert needs()[(SHELTER, 1)][1] == 10
+
+    def test_bulk_update_rebuilds(self, client):
+        create_request(client, 1, 10)
+        create_request(client, 2, 3)
+        db = TestingSessionLocal()
+        db.execute(update(ShelterRequest).where(ShelterRequest.category_id == 2).values(status="cancelled"))
+        db.commit()
+        db.close()
+        assert set(needs()) == {(SHELTER, 1)}
+
+
+class TestConsistency:
+    def test_checker_reports_and_repairs_drift(self, client):
+        create_request(client, 1, 10)
+        create_request(client, 2, 3)
+        db = TestingSessionLocal()
+        # writes the hooks cannot see
+        db.connection().exec_driver_sql("UPDATE shelter_requests SET quantity_received = 4 WHERE category_id = 1")
+        db.connection().exec_driver_sql("DELETE FROM open_needs WHERE category_id = 2")
+        db.commit()
+        db.close()
+
+        response = client.post("/api/admin/open-needs/check", headers=headers("admin@test.com"))
+        report = response.json()
+        assert report["consistent"] is False and report["repaired"] is False
+        assert report["sample"]["stale"] == [[SHELTER, 1]] and report["sample"]["missing"] == [[SHELTER, 2]]
+
+        report = client.post("/api/admin/open-needs/check", headers=headers("admin@test.com"),
+                             params={"repair": True}).json()
+        assert report["repaired"] is True
+        assert needs()[(SHELTER, 1)][1] == 6 and (SHELTER, 2) in needs()
+        db = TestingSessionLocal()
+        assert check_open_needs(db)["consistent"] is True
+        db.close()
+
+    def test_checker_is_admin_only(self, client):
+        assert client.post("/api/admin/open-needs/check",
+                           headers=headers("abrigo@test.com")).status_code == 403
+
+
+class TestPublicEndpoint:
+    def test_most_urgent_first_and_filters(self, client):
+        create_request(client, 1, 100)
+        create_request(client, 2, 2)
+        rows = client.get("/api/inventory/needs/public").json()
+        assert [(row["category_id"], row["quantity_remaining"]) for row in rows] == [(1, 100), (2, 2)]
+        assert rows[0]["urgency"] > rows[1]["urgency"]
+
+        filtered = client.get("/api/inventory/needs/public", params={"category_id": 2}).json()
+        assert [row["category_id"] for row in filtered] == [2]
+
+    def test_cached_payload_follows_writes(self, client):
+        assert client.get("/api/inventory/needs/public").json() == []
+        create_request(client, 1, 7)
+        assert client.get("/api/inventory/needs/public").json()[0]["quantity_remaining"] == 7
@@ -0,0 +1,68 @@
+"""
+Tests for connection pool telemetry and the pool health endpoint.
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc, text
+
+from app.main import app
+from app.database import InstrumentedQueuePool, pool_status
+from app.core.metrics import DB_POOL_CHECKOUTS, DB_POOL_TIMEOUTS, DB_POOL_CHECKED_OUT, DB_POOL_WAIT
+
+
+@pytest.fixture
+def small_engine():
+    engine = create_engine(
+        "sqlite:///./test_pool.db",
+        connect_args={"check_same_thread": False},
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.1,
+    )
+    engine.pool.metrics_name = "test"
+    DB_POOL_CHECKOUTS.clear()
+    DB_POOL_TIMEOUTS.clear()
+    DB_POOL_WAIT.clear()
+    yield engine
+    engine.dispose()
+
+
+class TestPoolTelemetry:
+    def test_checkouts_and_occupancy(self, small_engine):
+        with small_engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            assert DB_POOL_CHECKED_OUT.value("test") == 1
+            assert pool_status(small_engine)["saturation"] == 0.5
+        assert DB_POOL_CHECKOUTS.value("test") == 1
+        assert DB_POOL_CHECKED_OUT.value("test") == 0
+        assert DB_POOL_WAIT.count("test") == 1
+
+    def test_exhaustion_reports_saturation_and_timeouts(self, small_engine):
+        first = small_engine.connect()
+        second = small_engine.connect()
+        try:
+            status = pool_status(small_engine)
+            assert status["status"] == "saturated"
+            assert status["checked_out"] == status["capacity"] == 2
+            assert status["saturation"] == 1.0
+
+            with pytest.raises(exc.TimeoutError):
+                small_engine.connect()
+            assert DB_POOL_TIMEOUTS.value("test") == 1
+            assert pool_status(small_engine)["checkout_timeouts"] == 1
+        finally:
+            first.close()
+            second.close()
+        assert pool_status(small_engine)["status"] == "ok"
+
+    def test_metrics_name_survives_dispose(self, small_engine):
+        small_engine.dispose()
+        assert small_engine.pool.metrics_name == "test"
+
+
+class TestPoolHealthEndpoint:
+    def test_reports_pool(self):
+        response = TestClient(app).get("/health/db")
+        assert response.status_code == 200
+        assert response.json()["pool"]["status"] in ("ok", "busy", "saturated")
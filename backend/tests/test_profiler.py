@@ -0,0 +1,133 @@
+"""
+Tests for the on-demand request profiler.
+"""
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.database import Base, get_db
+from app.models import User, DeliveryLocation
+from app.auth import get_password_hash, create_access_token
+from app.core.profiler import PROFILE_STORE, ProfileStore, RequestProfile, _requested_mode
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_profiler.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="function")
+def client():
+    app.dependency_overrides[get_db] = override_get_db
+    Base.metadata.create_all(bind=engine)
+    PROFILE_STORE.clear()
+    db = TestingSessionLocal()
+    db.add_all([
+        User(email="admin@test.com", name="Admin", roles="admin",
+             hashed_password=get_password_hash("x"), approved=True),
+        User(email="volunteer@test.com", name="Volunteer", roles="volunteer",
+             hashed_password=get_password_hash("x"), approved=True),
+        DeliveryLocation(name="Abrigo", address="Rua 1", approved=True),
+    ])
+    db.commit()
+    db.close()
+    yield TestClient(app)
+    Base.metadata.drop_all(bind=engine)
+    app.dependency_overrides.pop(get_db, None)
+
+
+def auth(email):
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': email})}"}
+
+
+class TestRequestedMode:
+    def test_disabled_without_flag(self):
+        assert _requested_mode({"headers": [], "query_string": b"active=true"}) is None
+
+    def test_header_and_query_flags(self):
+        assert _requested_mode({"headers": [(b"x-profile", b"1")], "query_string": b""}) == "store"
+        assert _requested_mode({"headers": [], "query_string": b"_profile=html"}) == "html"
+        assert _requested_mode({"headers": [], "query_string": b"_profile=nope"}) is None
+
+
+class TestRequestProfile:
+    def test_samples_attached_threads(self):
+        profile = RequestProfile("GET", "/x", "req", interval=0.001)
+        done = threading.Event()
+
+        def busy():
+            profile.attach_current_thread()
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                sum(range(100))
+            done.set()
+
+        profile.start()
+        worker = threading.Thread(target=busy)
+        worker.start()
+        worker.join()
+        profile.stop()
+
+        report = profile.to_dict()
+        assert report["samples"] > 0
+        assert any("busy" in f["function"] for f in report["top_functions"])
+
+    def test_store_is_bounded(self):
+        store = ProfileStore(max_reports=2)
+        profiles = [RequestProfile("GET", f"/{i}", "r") for i in range(3)]
+        for profile in profiles:
+            store.add(profile)
+        assert store.get(profiles[0].id) is None
+        assert [p.id for p in store.list()] == [profiles[2].id, profiles[1].id]
+
+
+class TestProfilerMiddleware:
+    def test_admin_profile_is_stored(self, client):
+        response = client.get("/api/locations/", headers={**auth("admin@test.com"), "X-Profile": "1"})
+        assert response.status_code == 200
+        assert isinstance(response.json(), list)
+        profile_url = response.headers["x-profile-url"]
+
+        report = client.get(profile_url, headers=auth("admin@test.com")).json()
+        assert report["route"] == "/api/locations/"
+        assert report["status_code"] == 200
+        assert report["sql"]["count"] >= 1
+        assert "delivery_locations" in report["sql"]["statements"][0]["statement"]
+
+        listing = client.get("/api/admin/profiles", headers=auth("admin@test.com")).json()
+        assert listing[0]["id"] == response.headers["x-profile-id"]
+
+    def test_inline_json_and_html_reports(self, client):
+        response = client.get("/api/locations/?_profile=json", headers=auth("admin@test.com"))
+        assert response.headers["x-profile-original-status"] == "200"
+        assert "top_functions" in response.json()
+
+        response = client.get("/api/locations/?_profile=html", headers=auth("admin@test.com"))
+        assert response.headers["content-type"].startswith("text/html")
+        assert "<h2>SQL</h2>" in response.text
+
+    def test_non_admin_flag_is_ignored(self, client):
+        response = client.get("/api/locations/?_profile=json", headers=auth("volunteer@test.com"))
+        assert "x-profile-id" not in response.headers
+        assert isinstance(response.json(), list)
+        assert PROFILE_STORE.list() == []
+
+    def test_anonymous_flag_is_ignored(self, client):
+        response = client.get("/api/locations/", headers={"X-Profile": "1"})
+        assert "x-profile-id" not in response.headers
+
+    def test_reports_require_admin(self, client):
+        assert client.get("/api/admin/profiles", headers=auth("volunteer@test.com")).status_code == 403
+        assert client.get("/api/admin/profiles/unknown", headers=auth("admin@test.com")).status_code == 404
@@ -0,0 +1,189 @@
+"""
+Tests for the request-scoped query tracker (N+1 detection and query budgets).
+"""
+import logging
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.database import Base, get_db
+from app.models import User, Category, Delivery, DeliveryLocation, ProductBatch
+from app.inventory_models import InventoryItem, InventoryTransaction, TransactionType
+from app.auth import get_password_hash, create_access_token
+from app.core import query_tracker
+from app.core.query_tracker import QueryBudgetExceeded, QueryTrackerMiddleware, track_queries
+from app.core.request_context import RequestContextMiddleware
+from app.repositories.reference_data import reference_data
+from app.shared.enums import BatchStatus, DeliveryStatus, ProductType
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_query_budget.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+CATEGORY_COUNT = 6
+VOLUNTEER_COUNT = 4
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+# A deliberate N+1 (one query per category) for the tracker itself: the
+# application endpoints are expected to stay within their budgets
+probe = FastAPI()
+probe.add_middleware(QueryTrackerMiddleware)
+probe.add_middleware(RequestContextMiddleware)
+
+
+@probe.get("/probe/n-plus-one")
+def n_plus_one(db=Depends(override_get_db)):
+    ids = [row.id for row in db.query(Category.id).all()]
+    return [db.query(Category).filter(Category.id == i).first().name for i in ids]
+
+
+@pytest.fixture(scope="function")
+def client():
+    app.dependency_overrides[get_db] = override_get_db
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    shelter = User(email="shelter@test.com", name="Abrigo", roles="shelter",
+                   hashed_password=get_password_hash("x"), approved=True)
+    admin = User(email="admin@test.com", name="Admin", roles="admin",
+                 hashed_password=get_password_hash("x"), approved=True)
+    volunteers = [User(email=f"vol{i}@test.com", name=f"Voluntario {i}", roles="volunteer",
+                       hashed_password=get_password_hash("x"), approved=True) for i in range(VOLUNTEER_COUNT)]
+    db.add_all([shelter, admin, *volunteers])
+    db.flush()
+    location = DeliveryLocation(name="Abrigo", address="Rua 1", approved=True, user_id=shelter.id)
+    db.add(location)
+    db.flush()
+    for i in range(CATEGORY_COUNT):
+        category = Category(name=f"cat_{i}", display_name=f"Categoria {i}")
+        db.add(category)
+        db.flush()
+        item = InventoryItem(shelter_id=shelter.id, category_id=category.id,
+                             quantity_in_stock=10, quantity_available=10)
+        db.add(item)
+        db.flush()
+        # The dashboard loads the item of each recent transaction one by one (N+1)
+        db.add(InventoryTransaction(inventory_item_id=item.id, transaction_type=TransactionType.INITIAL_STOCK,
+                                    quantity_change=10, balance_after=10, reserved_after=0, available_after=10))
+    # One batch split between the volunteers, each delivery still on its way
+    batch = ProductBatch(provider_id=admin.id, product_type=ProductType.MEAL, quantity=VOLUNTEER_COUNT,
+                         quantity_available=0, status=BatchStatus.IN_DELIVERY)
+    db.add(batch)
+    db.flush()
+    for volunteer in volunteers:
+        db.add(Delivery(batch_id=batch.id, delivery_location_id=location.id, volunteer_id=volunteer.id,
+                        category_id=category.id, product_type=ProductType.MEAL, quantity=1,
+                        status=DeliveryStatus.PICKED_UP, delivery_code="123456"))
+    db.commit()
+    reference_data(db)  # budgets below are per request, not for the first load of the reference tables
+    db.close()
+    yield TestClient(app)
+    Base.metadata.drop_all(bind=engine)
+    app.dependency_overrides.pop(get_db, None)
+
+
+def headers(email):
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': email})}"}
+
+
+def shelter_headers():
+    return headers("shelter@test.com")
+
+
+class TestQueryTracker:
+    def test_repeated_statements_grouped_per_request(self, client):
+        with track_queries(repeat_threshold=CATEGORY_COUNT) as tracker:
+            assert TestClient(probe).get("/probe/n-plus-one").status_code == 200
+
+        (request_id, route), = tracker.requests().items()
+        assert route == "GET /probe/n-plus-one"
+        repeated = tracker.repeated(request_id)
+        assert any("FROM categories" in sql for sql, _ in repeated)
+
+    def test_statements_outside_requests_are_ignored(self, client):
+        with track_queries() as tracker:
+            db = TestingSessionLocal()
+            db.query(Category).all()
+            db.close()
+        assert tracker.requests() == {}
+
+
+class TestQueryBudget:
+    def test_n_plus_one_breaks_budget(self, client, query_budget):
+        with pytest.raises(QueryBudgetExceeded) as excinfo:
+            with query_budget(max_repeats=2):
+                TestClient(probe).get("/probe/n-plus-one")
+        assert "GET /probe/n-plus-one" in str(excinfo.value)
+        assert "categories" in str(excinfo.value)
+
+    def test_statement_count_budget(self, client, query_budget):
+        with pytest.raises(QueryBudgetExceeded):
+            with query_budget(max_queries=1):
+                client.get("/api/inventory/dashboard", headers=shelter_headers())
+
+    @pytest.mark.query_budget(max_queries=2, max_repeats=1)
+    def test_marker_enforces_budget(self, client):
+        assert client.get("/api/locations/").status_code == 200
+
+
+class TestEndpointBudgets:
+    """Endpoints that used to issue one query per row, seeded with several rows each."""
+
+    @pytest.mark.query_budget(max_queries=2, max_repeats=1)
+    def test_admin_list_deliveries(self, client):
+        response = client.get("/api/admin/deliveries", headers=headers("admin@test.com"))
+        assert response.status_code == 200
+        assert sorted(d["volunteer"]["name"] for d in response.json()) == [
+            f"Voluntario {i}" for i in range(VOLUNTEER_COUNT)]
+
+    @pytest.mark.query_budget(max_queries=5, max_repeats=1)
+    def test_shelter_dashboard(self, client):
+        response = client.get("/api/inventory/dashboard", headers=shelter_headers())
+        assert response.status_code == 200
+        assert len(response.json()["recent_transactions"]) == CATEGORY_COUNT
+
+    @pytest.mark.query_budget(max_queries=2, max_repeats=1)
+    def test_shelter_deliveries(self, client):
+        response = client.get("/api/inventory/shelter-deliveries", headers=shelter_headers())
+        assert response.status_code == 200
+        assert sorted(d["volunteer_name"] for d in response.json()) == [
+            f"Voluntario {i}" for i in range(VOLUNTEER_COUNT)]
+
+    def test_confirm_delivery(self, client, query_budget):
+        db = TestingSessionLocal()
+        delivery_ids = [d.id for d in db.query(Delivery).order_by(Delivery.id)]
+        db.close()
+        for email, delivery_id in zip([f"vol{i}@test.com" for i in range(VOLUNTEER_COUNT)], delivery_ids):
+            # the batch and the volunteer are loaded again for the response after the commit;
+            # the last confirmation also completes the batch
+            with query_budget(max_queries=16, max_repeats=2):
+                response = client.post(f"/api/deliveries/{delivery_id}/confirm-delivery",
+                                       json={"delivery_code": "123456"}, headers=headers(email))
+            assert response.status_code == 200
+        db = TestingSessionLocal()
+        assert db.query(ProductBatch).one().status == BatchStatus.COMPLETED
+        db.close()
+
+
+class TestDevWarning:
+    def test_middleware_logs_n_plus_one(self, client, monkeypatch, caplog):
+        monkeypatch.setattr(query_tracker, "N_PLUS_ONE_DETECTION", "warn")
+        monkeypatch.setattr(query_tracker, "N_PLUS_ONE_THRESHOLD", 3)
+        with caplog.at_level(logging.WARNING, logger="app.core.query_tracker"):
+            TestClient(probe).get("/probe/n-plus-one")
+
+        warnings = [r for r in caplog.records if r.getMessage() == "Possible N+1 query"]
+        assert warnings
+        assert warnings[0].route == "/probe/n-plus-one"
+        assert warnings[0].repeats >= CATEGORY_COUNT
@@ -0,0 +1,115 @@
+"""
+Tests for read-replica routing (two SQLite files stand in for primary and replica).
+"""
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.database import Base, get_db, READ_ROUTER
+from app.models import User, DeliveryLocation
+from app.auth import get_password_hash, create_access_token
+
+primary_engine = create_engine("sqlite:///./test_replica_primary.db", connect_args={"check_same_thread": False})
+replica_engine = create_engine("sqlite:///./test_replica_replica.db", connect_args={"check_same_thread": False})
+PrimarySession = sessionmaker(autocommit=False, autoflush=False, bind=primary_engine)
+ReplicaSession = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+
+
+def override_get_db():
+    try:
+        db = PrimarySession()
+        yield db
+    finally:
+        db.close()
+
+
+def seed(session_factory, location_name):
+    db = session_factory()
+    db.add(DeliveryLocation(name=location_name, address="Rua 1", approved=True))
+    db.commit()
+    db.close()
+
+
+@pytest.fixture(scope="function")
+def client(monkeypatch):
+    app.dependency_overrides[get_db] = override_get_db
+    Base.metadata.create_all(bind=primary_engine)
+    Base.metadata.create_all(bind=replica_engine)
+    db = PrimarySession()
+    db.add(User(email="admin@test.com", name="Admin", roles="admin",
+                hashed_password=get_password_hash("x"), approved=True))
+    db.commit()
+    db.close()
+    # Réplica "atrasada": cada banco tem um local diferente
+    seed(PrimarySession, "Primário")
+    seed(ReplicaSession, "Réplica")
+
+    monkeypatch.setattr(READ_ROUTER, "replica_sessionmaker", ReplicaSession)
+    READ_ROUTER.reset()
+    yield TestClient(app)
+    READ_ROUTER.reset()
+    Base.metadata.drop_all(bind=primary_engine)
+    Base.metadata.drop_all(bind=replica_engine)
+    app.dependency_overrides.pop(get_db, None)
+
+
+def admin_headers():
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': 'admin@test.com'})}"}
+
+
+def location_names(client, headers=None):
+    response = client.get("/api/locations/", headers=headers or {})
+    assert response.status_code == 200
+    return {location["name"] for location in response.json()}
+
+
+class TestReadRouting:
+    def test_reads_go_to_replica(self, client):
+        assert location_names(client) == {"Réplica"}
+        assert location_names(client, admin_headers()) == {"Réplica"}
+
+    def test_writes_stay_on_primary(self, client):
+        response = client.post("/api/locations/", headers=admin_headers(),
+                               json={"name": "Novo", "address": "Rua 2"})
+        assert response.status_code == 201
+        db = ReplicaSession()
+        assert db.query(DeliveryLocation).filter_by(name="Novo").count() == 0
+        db.close()
+
+    def test_read_your_writes(self, client):
+        headers = admin_headers()
+        created = client.post("/api/locations/", headers=headers, json={"name": "Novo", "address": "Rua 2"})
+        client.post(f"/api/locations/{created.json()['id']}/approve", headers=headers)
+
+        # Quem escreveu lê do primário; os demais continuam na réplica
+        assert location_names(client, headers) == {"Primário", "Novo"}
+        assert location_names(client) == {"Réplica"}
+
+    def test_stickiness_expires(self, client, monkeypatch):
+        monkeypatch.setattr(READ_ROUTER, "sticky_seconds", 0)
+        headers = admin_headers()
+        client.post("/api/locations/", headers=headers, json={"name": "Novo", "address": "Rua 2"})
+        assert location_names(client, headers) == {"Réplica"}
+
+    def test_reads_without_commit_do_not_stick(self, client):
+        headers = admin_headers()
+        client.get("/api/auth/me", headers=headers)
+        assert location_names(client, headers) == {"Réplica"}
+
+
+class TestFallback:
+    def test_unavailable_replica_falls_back_to_primary(self, client, monkeypatch):
+        broken = create_engine("sqlite:////nonexistent-dir/replica.db")
+        monkeypatch.setattr(READ_ROUTER, "replica_sessionmaker", sessionmaker(bind=broken))
+        assert location_names(client) == {"Primário"}
+        # Depois da falha a réplica fica de fora até retry_seconds
+        monkeypatch.setattr(READ_ROUTER, "replica_sessionmaker", ReplicaSession)
+        assert location_names(client) == {"Primário"}
+
+    def test_without_replica_reads_primary(self, client, monkeypatch):
+        monkeypatch.setattr(READ_ROUTER, "replica_sessionmaker", None)
+        assert location_names(client) == {"Primário"}
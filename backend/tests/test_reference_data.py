@@ -0,0 +1,162 @@
+"""
+Tests for the in-process reference data cache (categories, attributes, locations).
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.database import Base, get_db
+from app.models import Category, CategoryAttribute, DeliveryLocation, User
+from app.auth import get_password_hash, create_access_token
+from app.repositories.reference_data import REFERENCE_DATA, reference_data
+from app.shared.metadata_helpers import validate_metadata
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_reference_data.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="function")
+def client():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    admin = User(email="admin@test.com", name="Admin", roles="admin",
+                 hashed_password=get_password_hash("x"), approved=True)
+    clothes = Category(name="roupa", display_name="Roupas", icon="👕", legacy_product_type="clothing")
+    db.add_all([admin, clothes])
+    db.flush()
+    db.add_all([
+        Category(name="roupa_crianca", display_name="Roupas de Criança", parent_id=clothes.id),
+        CategoryAttribute(category_id=clothes.id, name="tamanho", display_name="Tamanho", required=True,
+                          options=[{"value": "P", "label": "Pequeno"}, {"value": "M", "label": "Médio"}]),
+        CategoryAttribute(category_id=clothes.id, name="antigo", display_name="Antigo", active=False),
+        DeliveryLocation(name="Abrigo", address="Rua 1", user_id=admin.id, approved=True),
+    ])
+    db.commit()
+    db.close()
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+    Base.metadata.drop_all(bind=engine)
+
+
+def admin_headers():
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': 'admin@test.com'})}"}
+
+
+def count_reference_queries(fn) -> int:
+    statements = []
+
+    def before_execute(conn, cursor, sql, parameters, context, executemany):
+        if "FROM categories" in sql or "FROM delivery_locations" in sql:
+            statements.append(sql)
+
+    event.listen(engine, "before_cursor_execute", before_execute)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_execute)
+    return len(statements)
+
+
+class TestSnapshot:
+    def test_lookups(self, client):
+        db = TestingSessionLocal()
+        try:
+            refs = reference_data(db)
+        finally:
+            db.close()
+        clothes = refs.category_by_name("roupa")
+        assert refs.category_by_legacy_type("clothing") is clothes
+        assert [child.name for child in clothes.children] == ["roupa_crianca"]
+        assert refs.category_by_name("roupa_crianca").parent is clothes
+        assert [a.name for a in refs.attributes(clothes.id)] == ["tamanho"]
+        assert [a.name for a in refs.attributes(clothes.id, active_only=False)] == ["antigo", "tamanho"]
+        assert refs.attribute(clothes.id, "antigo") is None
+        assert refs.location_for_user(1).name == "Abrigo"
+        assert refs.category_name(999) == "Unknown"
+
+    def test_readers_share_one_load(self, client):
+        category_id = client.get("/api/categories/").json()[0]["id"]
+
+        def read():
+            assert client.get(f"/api/categories/{category_id}").status_code == 200
+            assert len(client.get(f"/api/categories/{category_id}/attributes").json()) == 1
+            assert client.get("/api/categories/legacy-mapping/clothing").json()["id"] == category_id
+
+        assert count_reference_queries(read) == 0
+
+    def test_hierarchy_response(self, client):
+        clothes = next(c for c in client.get("/api/categories/").json() if c["name"] == "roupa")
+        body = client.get(f"/api/categories/{clothes['id']}").json()
+        assert [child["name"] for child in body["children"]] == ["roupa_crianca"]
+        assert body["attributes"][0]["options"][1]["label"] == "Médio"
+
+    def test_metadata_validation_uses_cache(self, client):
+        db = TestingSessionLocal()
+        try:
+            clothes_id = reference_data(db).category_by_name("roupa").id
+            assert validate_metadata(db, clothes_id, {"tamanho": "P"}) == (True, [])
+            valid, errors = validate_metadata(db, clothes_id, {"tamanho": "GG"})
+            assert not valid and "GG" in errors[0]
+            assert validate_metadata(db, clothes_id, {})[0] is False
+        finally:
+            db.close()
+
+
+class TestInvalidation:
+    def test_committed_write_invalidates(self, client):
+        client.get("/api/categories/1/attributes")
+        generation = REFERENCE_DATA.stats()["generation"]
+        response = client.post("/api/categories/1/attributes", json={
+            "category_id": 1, "name": "genero", "display_name": "Gênero", "attribute_type": "text"})
+        assert response.status_code == 201
+        assert REFERENCE_DATA.stats()["generation"] > generation
+        assert {a["name"] for a in client.get("/api/categories/1/attributes").json()} == {"tamanho", "genero"}
+
+    def test_uncommitted_rows_are_not_published(self, client):
+        db = TestingSessionLocal()
+        try:
+            db.add(Category(name="rascunho", display_name="Rascunho"))
+            db.flush()
+            assert reference_data(db).category_by_name("rascunho") is not None
+            db.rollback()
+        finally:
+            db.close()
+        db = TestingSessionLocal()
+        try:
+            assert reference_data(db).category_by_name("rascunho") is None
+        finally:
+            db.close()
+
+    def test_raw_sql_needs_explicit_invalidation(self, client):
+        db = TestingSessionLocal()
+        try:
+            reference_data(db)
+            db.execute(text("UPDATE categories SET display_name = 'Vestuário' WHERE name = 'roupa'"))
+            db.commit()
+            assert reference_data(db).category_by_name("roupa").display_name == "Roupas"
+        finally:
+            db.close()
+        response = client.post("/api/admin/reference-data/reload", headers=admin_headers())
+        assert response.status_code == 200
+        assert response.json()["snapshot"]["categories"] == 2
+        db = TestingSessionLocal()
+        try:
+            assert reference_data(db).category_by_name("roupa").display_name == "Vestuário"
+        finally:
+            db.close()
+
+    def test_reload_requires_admin(self, client):
+        assert client.post("/api/admin/reference-data/reload").status_code == 401
+        assert client.get("/api/admin/reference-data", headers=admin_headers()).status_code == 200
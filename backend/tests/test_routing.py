@@ -0,0 +1,173 @@
+"""
+Tests for the volunteer route planner (pickup before drop-off, time budget, /my-route).
+"""
+import random
+import time
+from itertools import permutations
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.database import Base, get_db
+from app.models import Delivery, DeliveryLocation, User
+from app.auth import get_password_hash, create_access_token
+from app.core.geo import haversine_km
+from app.services.routing import DROPOFF, PICKUP, Stop, plan_route
+from app.shared.enums import DeliveryStatus, ProductType
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_routing.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+SHELTER, VOLUNTEER, OTHER = 1, 2, 3
+LAT, LNG = -19.9191, -43.9386
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="function")
+def client():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    db.add_all([
+        User(id=SHELTER, email="abrigo@test.com", name="Abrigo", roles="shelter",
+             hashed_password=get_password_hash("x"), approved=True),
+        User(id=VOLUNTEER, email="vol@test.com", name="Vol", roles="volunteer", latitude=LAT, longitude=LNG,
+             hashed_password=get_password_hash("x"), approved=True),
+        User(id=OTHER, email="outro@test.com", name="Outro", roles="volunteer",
+             hashed_password=get_password_hash("x"), approved=True),
+        # on a line going north: 1 (origin) ... 4
+        *[DeliveryLocation(id=i, name=f"Local {i}", address=f"Rua {i}", user_id=SHELTER, approved=True,
+                           latitude=LAT + 0.01 * i, longitude=LNG) for i in range(1, 5)],
+        DeliveryLocation(id=9, name="Sem coordenadas", address="Rua 9", user_id=SHELTER, approved=True),
+    ])
+    db.commit()
+    db.close()
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+    Base.metadata.drop_all(bind=engine)
+
+
+def headers(email):
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': email})}"}
+
+
+def add_delivery(destination, status, pickup=None, volunteer_id=VOLUNTEER):
+    db = TestingSessionLocal()
+    delivery = Delivery(delivery_location_id=destination, pickup_location_id=pickup, volunteer_id=volunteer_id,
+                        product_type=ProductType.MEAL, quantity=1, status=status)
+    db.add(delivery)
+    db.commit()
+    delivery_id = delivery.id
+    db.close()
+    return delivery_id
+
+
+def random_pairs(rng, count, direct=0):
+    pairs = []
+    for i in range(count):
+        pickup = None if i < direct else Stop(i, PICKUP, None, LAT + rng.uniform(-0.1, 0.1),
+                                              LNG + rng.uniform(-0.1, 0.1))
+        pairs.append((pickup, Stop(i, DROPOFF, None, LAT + rng.uniform(-0.1, 0.1), LNG + rng.uniform(-0.1, 0.1))))
+    return pairs
+
+
+def route_km(start, stops):
+    points = ([start] if start else []) + stops
+    return sum(haversine_km(a.latitude, a.longitude, b.latitude, b.longitude) for a, b in zip(points, points[1:]))
+
+
+def optimal_km(start, pairs):
+    stops = [stop for pair in pairs for stop in pair if stop is not None]
+    has_pickup = {pickup.delivery_id for pickup, _ in pairs if pickup is not None}
+    best = float("inf")
+    for order in permutations(stops):
+        picked = set()
+        ok = True
+        for stop in order:
+            if stop.action == PICKUP:
+                picked.add(stop.delivery_id)
+            elif stop.delivery_id in has_pickup and stop.delivery_id not in picked:
+                ok = False
+                break
+        if ok:
+            best = min(best, route_km(start, list(order)))
+    return best
+
+
+class TestPlanner:
+    def test_precedence_and_distance(self):
+        rng = random.Random(3)
+        start = Stop(0, "start", None, LAT, LNG)
+        for _ in range(20):
+            pairs = random_pairs(rng, 12, direct=3)
+            route = plan_route(pairs, start=start, budget_ms=20)
+            assert len(route.stops) == 21
+            position = {(s.delivery_id, s.action): i for i, s in enumerate(route.stops)}
+            for pickup, dropoff in pairs:
+                if pickup is not None:
+                    assert position[(pickup.delivery_id, PICKUP)] < position[(dropoff.delivery_id, DROPOFF)]
+            assert route.distance_km == pytest.approx(route_km(start, route.stops))
+            assert sum(route.legs_km) == pytest.approx(route.distance_km)
+
+    def test_small_routes_are_optimal(self):
+        rng = random.Random(7)
+        start = Stop(0, "start", None, LAT, LNG)
+        for _ in range(15):
+            pairs = random_pairs(rng, 3, direct=1)
+            route = plan_route(pairs, start=start, budget_ms=30)
+            assert route.distance_km == pytest.approx(optimal_km(start, pairs), rel=1e-6)
+
+    def test_time_budget(self):
+        pairs = random_pairs(random.Random(1), 60)
+        started = time.perf_counter()
+        route = plan_route(pairs, budget_ms=30)
+        # construction plus the last move in progress on top of the budget
+        assert (time.perf_counter() - started) * 1000 < 500
+        assert len(route.stops) == 120
+
+    def test_without_start_and_empty(self):
+        assert plan_route([]).stops == []
+        pairs = random_pairs(random.Random(2), 1)
+        route = plan_route(pairs)
+        assert [s.action for s in route.stops] == [PICKUP, DROPOFF] and route.legs_km[0] == 0
+
+
+class TestMyRoute:
+    def test_route_through_active_deliveries(self, client):
+        far = add_delivery(4, DeliveryStatus.RESERVED, pickup=1)      # pickup 1 -> drop-off 4
+        near = add_delivery(2, DeliveryStatus.PICKED_UP, pickup=3)    # already picked up: drop-off 2 only
+        direct = add_delivery(3, DeliveryStatus.PENDING_CONFIRMATION)  # direct donation: drop-off 3
+        add_delivery(2, DeliveryStatus.DELIVERED, pickup=1)
+        add_delivery(2, DeliveryStatus.RESERVED, pickup=1, volunteer_id=OTHER)
+        missing = add_delivery(9, DeliveryStatus.RESERVED, pickup=1)
+
+        response = client.get("/api/deliveries/my-route", headers=headers("vol@test.com"))
+        assert response.status_code == 200
+        body = response.json()
+        assert [(s["delivery_id"], s["action"], s["location_id"]) for s in body["stops"]] == [
+            (far, "pickup", 1), (near, "dropoff", 2), (direct, "dropoff", 3), (far, "dropoff", 4)]
+        assert body["stops"][0]["location_name"] == "Local 1"
+        assert body["distance_km"] == pytest.approx(haversine_km(LAT, LNG, LAT + 0.04, LNG), rel=1e-3)
+        assert body["unroutable"] == [missing]
+        assert body["estimated_minutes"] > 0
+
+    def test_start_override_and_budget_limit(self, client):
+        add_delivery(1, DeliveryStatus.PICKED_UP)
+        add_delivery(4, DeliveryStatus.PICKED_UP)
+        body = client.get("/api/deliveries/my-route", params={"lat": LAT + 0.05, "lng": LNG},
+                          headers=headers("vol@test.com")).json()
+        assert [s["location_id"] for s in body["stops"]] == [4, 1]
+        assert client.get("/api/deliveries/my-route", params={"budget_ms": 10 ** 6},
+                          headers=headers("vol@test.com")).status_code == 422
+        assert client.get("/api/deliveries/my-route", headers=headers("outro@test.com")).json()["stops"] == []
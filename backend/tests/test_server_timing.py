@@ -0,0 +1,96 @@
+"""
+Tests for the Server-Timing breakdown header.
+"""
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.database import Base, get_db
+from app.models import User, DeliveryLocation, Category, Delivery
+from app.shared.enums import DeliveryStatus, ProductType
+from app.auth import get_password_hash, create_access_token
+from app.core import server_timing
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_server_timing.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="function")
+def client():
+    app.dependency_overrides[get_db] = override_get_db
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    volunteer = User(email="volunteer@test.com", name="Volunteer", roles="volunteer",
+                     hashed_password=get_password_hash("x"), approved=True)
+    location = DeliveryLocation(name="Abrigo", address="Rua 1", approved=True)
+    category = Category(name="agua", display_name="Água")
+    db.add_all([volunteer, location, category])
+    db.flush()
+    for quantity in (5, 10, 15):
+        db.add(Delivery(
+            delivery_location_id=location.id, volunteer_id=volunteer.id, category_id=category.id,
+            product_type=ProductType.GENERIC, quantity=quantity, status=DeliveryStatus.PENDING_CONFIRMATION,
+        ))
+    db.commit()
+    db.close()
+    yield TestClient(app)
+    Base.metadata.drop_all(bind=engine)
+    app.dependency_overrides.pop(get_db, None)
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(server_timing, "SERVER_TIMING_ENABLED", True)
+
+
+def auth():
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': 'volunteer@test.com'})}"}
+
+
+def parse(header):
+    return {
+        match.group(1): float(match.group(2))
+        for match in re.finditer(r"(\w+);dur=([\d.]+)", header)
+    }
+
+
+class TestServerTiming:
+    def test_disabled_by_default(self, client):
+        response = client.get("/api/deliveries/my-deliveries", headers=auth())
+        assert response.status_code == 200
+        assert "server-timing" not in response.headers
+
+    def test_breakdown_segments(self, client, enabled):
+        response = client.get("/api/deliveries/my-deliveries", headers=auth())
+        assert response.status_code == 200
+        header = response.headers["server-timing"]
+        segments = parse(header)
+        assert set(segments) == {"auth", "db", "orm", "serialize", "total"}
+        assert segments["total"] >= segments["serialize"]
+        assert 'desc="2 queries"' in header
+
+    def test_results_unchanged_when_enabled(self, client, enabled):
+        enabled_body = client.get("/api/deliveries/my-deliveries", headers=auth()).json()
+        server_timing.SERVER_TIMING_ENABLED = False
+        disabled_body = client.get("/api/deliveries/my-deliveries", headers=auth()).json()
+        assert enabled_body == disabled_body
+        assert len(enabled_body) == 3
+        assert enabled_body[0]["category"]["name"] == "agua"
+
+    def test_public_endpoint_has_no_auth_segment(self, client, enabled):
+        header = client.get("/api/locations/").headers["server-timing"]
+        assert "auth;" not in header
+        assert "serialize;" in header
@@ -0,0 +1,249 @@
+"""
+Tests for the live shelter dashboard channel (WebSocket fed by the inventory hooks).
+"""
+import asyncio
+from contextlib import contextmanager
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.websockets import WebSocketDisconnect
+
+from app.main import app
+from app.database import Base, get_db
+from app.models import Category, Delivery, DeliveryLocation, User
+from app.auth import get_password_hash, create_access_token
+from app.core.invalidation import INVALIDATION_BUS
+from app.core.websocket_hub import CLOSE_TRY_AGAIN, ChannelHub
+from app.routers import live
+from app.inventory_models import InventoryItem
+from app.services.inventory_service import on_delivery_confirmed
+from app.services.shelter_updates import SHELTER_UPDATES
+from app.shared.enums import DeliveryStatus, ProductType
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_shelter_live.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+SHELTER, OTHER_SHELTER, ADMIN, VOLUNTEER = 1, 2, 3, 4
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="function")
+def client():
+    # Singletons outlive the other modules' tests: no clients left over, no remote messages
+    INVALIDATION_BUS.stop()
+    SHELTER_UPDATES.clear()
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    db.add_all([
+        User(id=SHELTER, email="abrigo@test.com", name="Abrigo", roles="shelter",
+             hashed_password=get_password_hash("x"), approved=True),
+        User(id=OTHER_SHELTER, email="outro@test.com", name="Outro", roles="shelter",
+             hashed_password=get_password_hash("x"), approved=True),
+        User(id=ADMIN, email="admin@test.com", name="Admin", roles="admin",
+             hashed_password=get_password_hash("x"), approved=True),
+        User(id=VOLUNTEER, email="voluntario@test.com", name="Voluntário", roles="volunteer",
+             hashed_password=get_password_hash("x"), approved=True),
+        Category(id=1, name="agua", display_name="Água"),
+        DeliveryLocation(id=1, name="Abrigo", address="Rua 1", user_id=SHELTER, approved=True),
+    ])
+    db.commit()
+    db.close()
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+    SHELTER_UPDATES.clear()
+
+
+def token(email):
+    return create_access_token(data={"sub": email})
+
+
+def headers(email):
+    return {"Authorization": f"Bearer {token(email)}"}
+
+
+@contextmanager
+def connect(client, email, **params):
+    query = "&".join(f"{name}={value}" for name, value in params.items())
+    with client.websocket_connect(f"/api/live/shelter?{query}") as ws:
+        ws.send_json({"type": "auth", "token": token(email)})
+        yield ws
+
+
+class TestShelterChannel:
+    def test_stock_changes_and_low_stock_alert(self, client):
+        with connect(client, "abrigo@test.com") as ws:
+            assert ws.receive_json() == {"type": "ready", "data": {"shelter_id": SHELTER}}
+            db = TestingSessionLocal()
+            item = InventoryItem(shelter_id=SHELTER, category_id=1, quantity_in_stock=10,
+                                 quantity_available=10, min_threshold=5)
+            db.add(item)
+            db.commit()
+            item_id = item.id
+            db.close()
+            stock = ws.receive_json()
+            assert stock["type"] == "stock.changed"
+            assert stock["data"]["quantity_available"] == 10 and stock["data"]["is_low_stock"] is False
+
+            assert client.patch(f"/api/inventory/items/{item_id}", headers=headers("abrigo@test.com"),
+                                json={"quantity_adjustment": -6}).status_code == 200
+            assert ws.receive_json()["data"]["quantity_available"] == 4
+            assert ws.receive_json() == {"type": "alert.low_stock", "data": {
+                "item_id": item_id, "category_id": 1, "quantity_available": 4, "min_threshold": 5}}
+
+            # already low: no second alert
+            assert client.patch(f"/api/inventory/items/{item_id}", headers=headers("abrigo@test.com"),
+                                json={"quantity_adjustment": -1}).status_code == 200
+            assert ws.receive_json()["type"] == "stock.changed"
+            assert client.patch(f"/api/inventory/items/{item_id}", headers=headers("abrigo@test.com"),
+                                json={"quantity_adjustment": 10}).status_code == 200
+            assert ws.receive_json()["data"]["is_low_stock"] is False
+
+    def test_delivery_hook_pushes_incoming_and_stock(self, client):
+        with connect(client, "abrigo@test.com") as ws:
+            ws.receive_json()
+            db = TestingSessionLocal()
+            try:
+                delivery = Delivery(delivery_location_id=1, volunteer_id=VOLUNTEER, category_id=1,
+                                    product_type=ProductType.MEAL, quantity=7, status=DeliveryStatus.DELIVERED)
+                db.add(delivery)
+                db.flush()
+                on_delivery_confirmed(db, delivery, VOLUNTEER)
+                db.flush()
+                db.rollback()  # nothing is pushed for rolled back work
+
+                delivery = Delivery(delivery_location_id=1, volunteer_id=VOLUNTEER, category_id=1,
+                                    product_type=ProductType.MEAL, quantity=3, status=DeliveryStatus.DELIVERED)
+                db.add(delivery)
+                db.flush()
+                on_delivery_confirmed(db, delivery, VOLUNTEER)
+                db.commit()
+                delivery_id = delivery.id
+            finally:
+                db.close()
+            # the hook creates the item (flushed at 0) and then receives into it
+            messages = {message["type"]: message["data"] for message in
+                        (ws.receive_json(), ws.receive_json(), ws.receive_json())}
+            assert messages["delivery.incoming"] == {"delivery_id": delivery_id, "category_id": 1,
+                                                     "quantity": 3, "state": "delivered"}
+            assert messages["stock.changed"]["quantity_in_stock"] == 3
+
+    def test_channels_are_per_shelter(self, client):
+        with connect(client, "outro@test.com") as other, connect(client, "admin@test.com",
+                                                                  shelter_id=SHELTER) as admin:
+            assert other.receive_json()["data"] == {"shelter_id": OTHER_SHELTER}
+            assert admin.receive_json()["data"] == {"shelter_id": SHELTER}
+            db = TestingSessionLocal()
+            db.add(InventoryItem(shelter_id=SHELTER, category_id=1, quantity_in_stock=2, quantity_available=2))
+            db.commit()
+            db.close()
+            assert admin.receive_json()["type"] == "stock.changed"
+            status = client.get("/api/live/shelter/status").json()
+            assert status["connections"] == 2 and status["channels"] == 2
+            assert SHELTER_UPDATES.publish(OTHER_SHELTER, "needs.changed", {"category_id": 1}) == 1
+            assert other.receive_json() == {"type": "needs.changed", "data": {"category_id": 1}}
+        assert client.get("/api/live/shelter/status").json()["connections"] == 0
+
+    @pytest.mark.parametrize("email, params", [
+        ("voluntario@test.com", {}),
+        ("abrigo@test.com", {"shelter_id": OTHER_SHELTER}),
+        ("admin@test.com", {}),
+    ])
+    def test_refuses_other_channels(self, client, email, params):
+        with pytest.raises(WebSocketDisconnect) as refused:
+            with connect(client, email, **params) as ws:
+                ws.receive_json()
+        assert refused.value.code == 1008
+
+    @pytest.mark.parametrize("first_message", [
+        {"type": "auth"},
+        {"type": "subscribe", "token": "x"},
+        {"type": "auth", "token": "not-a-jwt"},
+    ])
+    def test_refuses_missing_or_bad_auth(self, client, first_message):
+        with pytest.raises(WebSocketDisconnect) as refused:
+            with client.websocket_connect("/api/live/shelter") as ws:
+                ws.send_json(first_message)
+                ws.receive_json()
+        assert refused.value.code == 1008
+
+    def test_token_in_url_is_not_accepted(self, client, monkeypatch):
+        monkeypatch.setattr(live, "LIVE_AUTH_TIMEOUT_SECONDS", 0.05)
+        with pytest.raises(WebSocketDisconnect) as refused:
+            with client.websocket_connect(f"/api/live/shelter?token={token('abrigo@test.com')}") as ws:
+                ws.receive_json()  # no auth message: closed after the timeout
+        assert refused.value.code == 1008
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent, self.closed = [], None
+        self.disconnect = asyncio.Event()
+
+    async def send_text(self, text):
+        self.sent.append(text)
+        await asyncio.sleep(0)
+
+    async def receive(self):
+        await self.disconnect.wait()
+        return {"type": "websocket.disconnect"}
+
+    async def close(self, code=1000, reason=None):
+        self.closed = code
+
+
+class TestChannelHub:
+    def test_slow_client_is_closed_instead_of_buffering(self):
+        hub = ChannelHub("test", queue_size=3, ping=5)
+
+        async def scenario():
+            socket = FakeSocket()
+            serving = asyncio.create_task(hub.serve(socket, 1))
+            await asyncio.sleep(0)
+            for n in range(10):  # all queued before the client gets to run
+                hub.publish(1, "stock.changed", {"n": n})
+            await asyncio.sleep(0)
+            await asyncio.wait_for(serving, 1)
+            return socket
+
+        socket = asyncio.run(scenario())
+        assert socket.closed == CLOSE_TRY_AGAIN
+        assert len(socket.sent) == 1 + 3  # ready + the queue
+        assert hub.dropped == 1 and hub.connections == 0
+
+    def test_pings_idle_clients_and_counts_rate(self):
+        hub = ChannelHub("test", ping=0.01)
+
+        async def scenario():
+            socket = FakeSocket()
+            serving = asyncio.create_task(hub.serve(socket, 1))
+            await asyncio.sleep(0.05)
+            hub.publish(1, "needs.changed", {})
+            await asyncio.sleep(0.01)
+            socket.disconnect.set()
+            await asyncio.wait_for(serving, 1)
+            return socket
+
+        socket = asyncio.run(scenario())
+        assert '{"type":"ping"}' in socket.sent
+        assert '{"type":"needs.changed","data":{}}' in socket.sent
+        stats = hub.stats()
+        assert stats["sent"] == 1 and stats["messages_per_second"] > 0 and stats["connections"] == 0
+
+    def test_connection_limit(self):
+        hub = ChannelHub("test", max_connections=0)
+        socket = FakeSocket()
+        asyncio.run(hub.serve(socket, 1))
+        assert socket.closed == CLOSE_TRY_AGAIN and socket.sent == []
@@ -0,0 +1,171 @@
+"""
+Tests for single-flight rebuilds and stale-while-revalidate in the public payload cache.
+"""
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+from app.core.data_versions import DATA_VERSIONS
+from app.core.response_cache import PayloadCache
+from app.core.single_flight import SingleFlight
+
+
+def make_request(query: str = "", path: str = "/api/locations/") -> Request:
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": query.encode(),
+                    "headers": [], "scheme": "http", "server": ("testserver", 80)})
+
+
+class SlowBuild:
+    """build() that blocks until released and counts how often it ran."""
+
+    def __init__(self, body: bytes = b"[]"):
+        self.body = body
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> bytes:
+        self.calls += 1
+        await self.release.wait()
+        return self.body
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestSingleFlight:
+    def test_concurrent_callers_share_one_run(self):
+        async def scenario():
+            flights = SingleFlight()
+            build = SlowBuild(b"x")
+            tasks = [asyncio.create_task(flights.run("k", build)) for _ in range(50)]
+            await asyncio.sleep(0)
+            build.release.set()
+            results = await asyncio.gather(*tasks)
+            return build.calls, results, flights.stats()
+
+        calls, results, stats = run(scenario())
+        assert calls == 1
+        assert results == [b"x"] * 50
+        assert stats == {"in_flight": 0, "led": 1, "joined": 49}
+
+    def test_failure_reaches_waiters_and_is_not_remembered(self):
+        async def scenario():
+            flights = SingleFlight()
+            release = asyncio.Event()
+
+            async def failing():
+                await release.wait()
+                raise RuntimeError("db down")
+
+            tasks = [asyncio.create_task(flights.run("k", failing)) for _ in range(3)]
+            await asyncio.sleep(0)
+            release.set()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+
+            async def ok():
+                return "ok"
+
+            return results, await flights.run("k", ok)
+
+        results, retry = run(scenario())
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert retry == "ok"
+
+    def test_cancelled_follower_does_not_cancel_the_flight(self):
+        async def scenario():
+            flights = SingleFlight()
+            build = SlowBuild(b"x")
+            leader = asyncio.create_task(flights.run("k", build))
+            await asyncio.sleep(0)
+            follower = asyncio.create_task(flights.run("k", build))
+            await asyncio.sleep(0)
+            follower.cancel()
+            build.release.set()
+            return await leader
+
+        assert run(scenario()) == b"x"
+
+    def test_flight_from_a_closed_loop_is_discarded(self):
+        flights = SingleFlight()
+
+        async def abandon():
+            asyncio.create_task(flights.run("k", SlowBuild()))
+            await asyncio.sleep(0)
+
+        run(abandon())
+
+        async def ok():
+            return "ok"
+
+        assert run(flights.run("k", ok)) == "ok"
+
+
+class TestPayloadCacheCoalescing:
+    @pytest.fixture
+    def cache(self):
+        return PayloadCache("test_single_flight", tables=("single_flight_table",), ttl=60)
+
+    def test_cold_burst_runs_one_build(self, cache):
+        async def scenario():
+            build = SlowBuild(b'[{"id": 1}]')
+            tasks = [asyncio.create_task(cache.respond(make_request("city_id=bh&active_only=true"), build))
+                     for _ in range(100)]
+            await asyncio.sleep(0)
+            build.release.set()
+            return build.calls, await asyncio.gather(*tasks)
+
+        calls, responses = run(scenario())
+        assert calls == 1
+        assert {r.body for r in responses} == {b'[{"id": 1}]'}
+        assert cache.stats()["flights"]["joined"] == 99
+
+    def test_query_params_are_normalized(self, cache):
+        async def scenario():
+            build = SlowBuild()
+            build.release.set()
+            await cache.respond(make_request("b=2&a=1%2C3"), build)
+            await cache.respond(make_request("a=1,3&b=2"), build)
+            return build.calls
+
+        assert run(scenario()) == 1
+
+    def test_readers_get_previous_payload_while_rebuilding(self, cache):
+        async def scenario():
+            first = SlowBuild(b"[1]")
+            first.release.set()
+            await cache.respond(make_request(), first)
+            DATA_VERSIONS.bump(["single_flight_table"])
+
+            second = SlowBuild(b"[1,2]")
+            leader = asyncio.create_task(cache.respond(make_request(), second))
+            await asyncio.sleep(0)
+            readers = [await cache.respond(make_request(), second) for _ in range(5)]
+            second.release.set()
+            return second.calls, [r.body for r in readers], (await leader).body
+
+        calls, stale, fresh = run(scenario())
+        assert calls == 1
+        assert stale == [b"[1]"] * 5
+        assert fresh == b"[1,2]"
+
+    def test_too_old_entries_are_not_served_stale(self, cache):
+        cache.stale_seconds = 0
+        cache.ttl = 0
+
+        async def scenario():
+            first = SlowBuild(b"[1]")
+            first.release.set()
+            await cache.respond(make_request(), first)
+            await asyncio.sleep(0.01)
+
+            second = SlowBuild(b"[1,2]")
+            tasks = [asyncio.create_task(cache.respond(make_request(), second)) for _ in range(3)]
+            await asyncio.sleep(0)
+            second.release.set()
+            return second.calls, [r.body for r in await asyncio.gather(*tasks)]
+
+        calls, bodies = run(scenario())
+        assert calls == 1
+        assert bodies == [b"[1,2]"] * 3
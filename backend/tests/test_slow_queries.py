@@ -0,0 +1,110 @@
+"""
+Tests for the slow query log and its EXPLAIN capture.
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.database import Base, get_db
+from app.models import User, DeliveryLocation
+from app.auth import get_password_hash, create_access_token
+from app.core.slow_queries import SLOW_QUERY_LOG, SlowQueryLog, normalize_sql, parameter_shapes
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_slow_queries.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="function")
+def client(monkeypatch):
+    app.dependency_overrides[get_db] = override_get_db
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    db.add_all([
+        User(email="admin@test.com", name="Admin", roles="admin",
+             hashed_password=get_password_hash("x"), approved=True),
+        DeliveryLocation(name="Abrigo", address="Rua 1", approved=True),
+    ])
+    db.commit()
+    db.close()
+    SLOW_QUERY_LOG.clear()
+    # Every statement counts as "slow"
+    monkeypatch.setattr(SLOW_QUERY_LOG, "threshold", 1e-9)
+    yield TestClient(app)
+    monkeypatch.undo()
+    SLOW_QUERY_LOG.wait_for_plans()
+    SLOW_QUERY_LOG.clear()
+    Base.metadata.drop_all(bind=engine)
+    app.dependency_overrides.pop(get_db, None)
+
+
+def admin_headers():
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': 'admin@test.com'})}"}
+
+
+class TestNormalization:
+    def test_literals_and_binds_become_placeholders(self):
+        sql = "SELECT * FROM users WHERE email = 'a@b.c' AND id = 42 AND roles LIKE ?"
+        assert normalize_sql(sql) == "SELECT * FROM users WHERE email = ? AND id = ? AND roles LIKE ?"
+
+    def test_in_lists_collapse(self):
+        short = normalize_sql("SELECT id FROM t WHERE id IN (?, ?)")
+        long = normalize_sql("SELECT id FROM t WHERE id IN (%(id_1)s, %(id_2)s, %(id_3)s)")
+        assert short == long == "SELECT id FROM t WHERE id IN (?...)"
+
+    def test_parameter_shapes_hide_values(self):
+        assert parameter_shapes({"email_1": "secret@x.com", "id": 3}) == {"email_1": "str", "id": "int"}
+        assert parameter_shapes(("x", 1.5)) == ["str", "float"]
+        assert parameter_shapes([("a",), ("b",)], executemany=True) == {"executemany": 2, "row": ["str"]}
+
+
+class TestSlowQueryLog:
+    def test_ring_buffer_is_bounded(self):
+        log = SlowQueryLog(threshold=0.001, max_records=3, explain=False)
+        conn = engine.connect()
+        try:
+            for i in range(5):
+                log.record(conn, f"SELECT {i}", (), 0.5)
+        finally:
+            conn.close()
+        assert len(log.list()) == 3
+
+    def test_explain_is_captured_asynchronously(self):
+        log = SlowQueryLog(threshold=0.001, max_records=10)
+        Base.metadata.create_all(bind=engine)
+        with engine.connect() as conn:
+            entry = log.record(conn, "SELECT * FROM users WHERE email = ?", ("x",), 0.5)
+        log.wait_for_plans()
+        assert any("users" in line for line in entry["plan"])
+
+    def test_explain_statements_are_not_logged(self, client):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        SLOW_QUERY_LOG.wait_for_plans()
+        assert all(not q["sql"].startswith("EXPLAIN") for q in SLOW_QUERY_LOG.list())
+
+
+class TestSlowQueryEndpoint:
+    def test_records_route_and_plan(self, client):
+        assert client.get("/api/locations/").status_code == 200
+        SLOW_QUERY_LOG.wait_for_plans()
+
+        response = client.get("/api/admin/slow-queries", headers=admin_headers())
+        assert response.status_code == 200
+        queries = [q for q in response.json()["queries"] if q["route"] == "/api/locations/"]
+        assert queries
+        assert "delivery_locations" in queries[0]["sql"]
+        assert isinstance(queries[0]["plan"], list)
+
+    def test_requires_admin(self, client):
+        assert client.get("/api/admin/slow-queries").status_code == 401
@@ -0,0 +1,124 @@
+"""
+Tests for the tuned SQLite mode (pragmas and the single-writer queue).
+"""
+import os
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Category
+from app.core.sqlite_mode import WriterQueue, create_sqlite_engine
+
+DB_PATH = "./test_sqlite_mode.db"
+
+
+@pytest.fixture
+def tuned_engine():
+    engine = create_sqlite_engine(f"sqlite:///{DB_PATH}", pool_size=8, max_overflow=0)
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(DB_PATH + suffix):
+            os.remove(DB_PATH + suffix)
+
+
+class TestPragmas:
+    def test_applied_on_connect(self, tuned_engine):
+        with tuned_engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+            assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 1
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+
+
+class TestWriterQueue:
+    def test_fifo_handoff(self):
+        queue = WriterQueue()
+        assert queue.acquire(timeout=0.1)
+        order = []
+
+        def writer(n):
+            assert queue.acquire(timeout=2)
+            order.append(n)
+            queue.release()
+
+        threads = []
+        for n in range(3):
+            t = threading.Thread(target=writer, args=(n,))
+            t.start()
+            threads.append(t)
+            while queue.queued <= n:
+                time.sleep(0.001)
+        queue.release()
+        for t in threads:
+            t.join()
+        assert order == [0, 1, 2]
+
+    def test_timeout(self):
+        queue = WriterQueue()
+        assert queue.acquire(timeout=0.1)
+        assert not queue.acquire(timeout=0.05)
+        assert queue.queued == 0
+        queue.release()
+        assert queue.acquire(timeout=0.05)
+
+
+class TestSingleWriter:
+    def test_concurrent_commits_do_not_lock(self, tuned_engine):
+        Session = sessionmaker(bind=tuned_engine)
+        errors = []
+
+        def worker(n):
+            for i in range(20):
+                db = Session()
+                try:
+                    db.add(Category(name=f"cat_{n}_{i}", display_name="x"))
+                    db.commit()
+                except Exception as e:  # pragma: no cover - the failure being tested
+                    errors.append(e)
+                finally:
+                    db.close()
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert errors == []
+        db = Session()
+        assert db.query(Category).count() == 160
+        db.close()
+
+    def test_queue_released_on_rollback_and_close(self, tuned_engine):
+        Session = sessionmaker(bind=tuned_engine)
+        queue = tuned_engine.sqlite_writer_queue
+
+        db = Session()
+        db.add(Category(name="rolled_back", display_name="x"))
+        db.flush()
+        assert not queue.acquire(timeout=0.01)
+        db.rollback()
+        db.close()
+
+        db = Session()
+        db.add(Category(name="abandoned", display_name="x"))
+        db.flush()
+        db.close()
+        assert queue.acquire(timeout=0.1)
+        queue.release()
+
+    def test_reads_do_not_join_queue(self, tuned_engine):
+        queue = tuned_engine.sqlite_writer_queue
+        assert queue.acquire(timeout=0.1)
+        try:
+            with tuned_engine.connect() as conn:
+                assert conn.execute(text("SELECT count(*) FROM categories")).scalar() == 0
+        finally:
+            queue.release()
@@ -0,0 +1,121 @@
+"""
+Tests for the startup path: schema check, lazy routers and the timing report.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect, text
+
+from app.main import app
+from app.database import Base
+from app.core import startup
+from app.core.lazy_routers import LazyRouter, add_lazy_router, load_all
+
+DB_PATH = "./test_startup.db"
+
+
+def write_revision(directory, revision, down_revision):
+    (directory / f"{revision}_x.py").write_text(
+        f'"""x"""\nrevision = {revision!r}\ndown_revision = {down_revision!r}\n', encoding="utf-8"
+    )
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(f"sqlite:///{DB_PATH}")
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+    engine.dispose()
+
+
+class TestAlembicHeads:
+    def test_repository_migrations_have_one_head(self):
+        assert len(startup.alembic_heads()) == 1
+
+    def test_chain_and_merge(self, tmp_path):
+        write_revision(tmp_path, "a1", None)
+        write_revision(tmp_path, "b2", "a1")
+        write_revision(tmp_path, "c3", "a1")
+        assert startup.alembic_heads(tmp_path) == {"b2", "c3"}
+        write_revision(tmp_path, "d4", ("b2", "c3"))
+        assert startup.alembic_heads(tmp_path) == {"d4"}
+
+
+class TestEnsureSchema:
+    def test_creates_tables_without_alembic(self, engine):
+        assert startup.ensure_schema(engine, Base.metadata) == "create_all"
+        assert inspect(engine).has_table("users")
+
+    def test_skips_create_all_at_head(self, engine):
+        head, = startup.alembic_heads()
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)"))
+            conn.execute(text("INSERT INTO alembic_version VALUES (:v)"), {"v": head})
+        assert startup.ensure_schema(engine, Base.metadata) == "alembic_head"
+        assert not inspect(engine).has_table("users")
+
+    def test_behind_head_still_creates(self, engine):
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)"))
+            conn.execute(text("INSERT INTO alembic_version VALUES ('old')"))
+        assert startup.ensure_schema(engine, Base.metadata) == "create_all"
+
+    def test_modes(self, engine):
+        assert startup.ensure_schema(engine, Base.metadata, mode="never") == "disabled"
+        assert not inspect(engine).has_table("users")
+
+
+    def test_lifespan_creates_every_mapped_table(self, tmp_path):
+        # Fresh interpreter: only what app.main registers itself, not the models other tests imported
+        db_path = tmp_path / "empty.db"
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}", "SCHEMA_AUTO_CREATE": "auto"}
+        script = "from fastapi.testclient import TestClient\nfrom app.main import app\nwith TestClient(app): pass\n"
+        subprocess.run([sys.executable, "-c", script], env=env, check=True, capture_output=True)
+
+        load_all(app)  # every router (and the models they import) in this process
+        created = set(inspect(create_engine(f"sqlite:///{db_path}")).get_table_names())
+        assert "product_configurations" in created
+        assert set(Base.metadata.tables) <= created
+
+
+class TestLazyRouters:
+    def test_router_imported_on_first_request(self):
+        lazy_app = FastAPI()
+        add_lazy_router(lazy_app, "app.routers.product_config", "/api/product-config")
+        placeholder, = lazy_app.state.lazy_routers
+        assert isinstance(lazy_app.router.routes[-1], LazyRouter)
+
+        client = TestClient(lazy_app)
+        assert client.get("/api/other").status_code == 404
+        assert not placeholder.loaded
+
+        # Unsupported method: answered by the real router (405), not the placeholder
+        assert client.patch("/api/product-config/").status_code == 405
+        assert placeholder.loaded
+        assert placeholder not in lazy_app.router.routes
+
+    def test_openapi_loads_pending_routers(self):
+        lazy_app = FastAPI()
+        add_lazy_router(lazy_app, "app.routers.product_config", "/api/product-config")
+        assert "/api/product-config/" in lazy_app.openapi()["paths"]
+
+    def test_main_app_serves_lazy_routes(self):
+        load_all(app)
+        assert all(placeholder.loaded for placeholder in getattr(app.state, "lazy_routers", []))
+        assert TestClient(app).get("/api/dashboard/stats").status_code in (200, 401, 403)
+
+
+class TestStartupReport:
+    def test_health_startup(self):
+        with TestClient(app) as client:
+            client.get("/health")
+            report = client.get("/health/startup").json()
+        assert {"models", "routers", "schema"} <= set(report["phases_ms"])
+        assert report["ready_ms"] > 0
+        assert report["first_request_ms"] is not None
@@ -0,0 +1,205 @@
+"""
+Tests for the per-user state projection and the long-poll /api/me/state.
+"""
+import threading
+import time
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.database import Base, get_db
+from app.models import Delivery, DeliveryLocation, User
+from app.auth import get_password_hash, create_access_token
+from app.core.invalidation import INVALIDATION_BUS
+from app.inventory_models import ShelterRequest
+from app.repositories.user_state import USER_STATE
+from app.shared.enums import DeliveryStatus, ProductType
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_user_state.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+VOLUNTEER, SHELTER = 1, 2
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="function")
+def client():
+    # Singletons outlive the other modules' databases: start from an empty projection
+    INVALIDATION_BUS.stop()
+    USER_STATE.clear()
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    db.add_all([
+        User(id=VOLUNTEER, email="voluntario@test.com", name="Voluntário", roles="volunteer",
+             hashed_password=get_password_hash("x"), approved=True),
+        User(id=SHELTER, email="abrigo@test.com", name="Abrigo", roles="shelter",
+             hashed_password=get_password_hash("x"), approved=True),
+        DeliveryLocation(id=1, name="Abrigo", address="Rua 1", user_id=SHELTER, approved=True),
+    ])
+    db.commit()
+    db.close()
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+    USER_STATE.clear()
+
+
+def headers(user_id):
+    email = {VOLUNTEER: "voluntario@test.com", SHELTER: "abrigo@test.com"}[user_id]
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': email})}"}
+
+
+def state(client, user_id, **params):
+    response = client.get("/api/me/state", headers=headers(user_id), params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def commit(fn):
+    db = TestingSessionLocal()
+    try:
+        result = fn(db)
+        db.commit()
+        return result
+    finally:
+        db.close()
+
+
+def add_delivery(db, status=DeliveryStatus.RESERVED):
+    delivery = Delivery(delivery_location_id=1, volunteer_id=VOLUNTEER, product_type=ProductType.MEAL,
+                        quantity=3, status=status)
+    db.add(delivery)
+    db.flush()
+    return delivery.id
+
+
+def set_status(delivery_id, status):
+    def change(db):
+        db.get(Delivery, delivery_id).status = status
+    commit(change)
+
+
+class TestProjection:
+    def test_initial_state(self, client):
+        body = state(client, VOLUNTEER)
+        assert body["changed"] is True and body["user_id"] == VOLUNTEER
+        assert body["counts"] == {"deliveries": 0, "incoming": 0, "requests": 0, "batches": 0,
+                                  "reservations": 0}
+
+    def test_commits_update_loaded_projections_without_reloading(self, client):
+        before = {user: state(client, user)["version"] for user in (VOLUNTEER, SHELTER)}
+        loads = USER_STATE.loads
+        delivery_id = commit(add_delivery)
+
+        volunteer, shelter = state(client, VOLUNTEER), state(client, SHELTER)
+        assert [d["id"] for d in volunteer["deliveries"]] == [delivery_id]
+        assert volunteer["deliveries"][0]["status"] == "reserved"
+        assert [d["id"] for d in shelter["incoming"]] == [delivery_id]
+        assert volunteer["version"] != before[VOLUNTEER] and shelter["version"] != before[SHELTER]
+        assert USER_STATE.loads == loads
+
+        set_status(delivery_id, DeliveryStatus.DELIVERED)
+        assert state(client, VOLUNTEER)["deliveries"] == []
+        assert state(client, SHELTER)["incoming"] == []
+        assert USER_STATE.loads == loads
+
+    def test_reassigned_delivery_leaves_the_old_volunteer(self, client):
+        delivery_id = commit(add_delivery)
+        state(client, VOLUNTEER)
+
+        def reassign(db):
+            db.get(Delivery, delivery_id).volunteer_id = None
+        commit(reassign)
+        assert state(client, VOLUNTEER)["deliveries"] == []
+
+    def test_version_is_content_based(self, client):
+        version = state(client, VOLUNTEER)["version"]
+        delivery_id = commit(add_delivery)
+        set_status(delivery_id, DeliveryStatus.CANCELLED)
+        assert state(client, VOLUNTEER)["version"] == version
+
+    def test_rollback_changes_nothing(self, client):
+        version = state(client, SHELTER)["version"]
+        db = TestingSessionLocal()
+        try:
+            db.add(ShelterRequest(shelter_id=SHELTER, category_id=1, quantity_requested=5, status="pending"))
+            db.flush()
+            db.rollback()
+        finally:
+            db.close()
+        assert state(client, SHELTER)["version"] == version
+
+    def test_bulk_update_reloads(self, client):
+        delivery_id = commit(add_delivery)
+        state(client, VOLUNTEER)
+        loads = USER_STATE.loads
+        commit(lambda db: db.execute(update(Delivery).where(Delivery.id == delivery_id)
+                                     .values(status=DeliveryStatus.EXPIRED)))
+        assert state(client, VOLUNTEER)["deliveries"] == []
+        assert USER_STATE.loads == loads + 1
+
+    def test_other_worker_changes_drop_the_projection(self, client):
+        state(client, SHELTER)
+        db = TestingSessionLocal()
+        db.execute(ShelterRequest.__table__.insert().values(
+            shelter_id=SHELTER, category_id=1, quantity_requested=5, status="pending"))
+        db.commit()
+        db.close()
+        assert state(client, SHELTER)["requests"] == []  # raw insert: not seen here
+
+        key = orjson.dumps({"users": [SHELTER], "locations": []}).decode()
+        INVALIDATION_BUS._receive({"ns": "user_state", "key": key, "origin": "other-worker"})
+        assert len(state(client, SHELTER)["requests"]) == 1
+
+
+class TestLongPoll:
+    def test_unchanged_version_times_out(self, client):
+        version = state(client, VOLUNTEER)["version"]
+        started = time.monotonic()
+        body = state(client, VOLUNTEER, version=version, timeout=0.2)
+        assert body == {"version": version, "changed": False}
+        assert 0.2 <= time.monotonic() - started < 2
+
+    def test_stale_version_answers_at_once(self, client):
+        body = state(client, VOLUNTEER, version=12345, timeout=30)
+        assert body["changed"] is True
+
+    def test_commit_wakes_the_waiting_request(self, client):
+        version = state(client, VOLUNTEER)["version"]
+        result = {}
+
+        def poll():
+            started = time.monotonic()
+            result["body"] = state(client, VOLUNTEER, version=version, timeout=10)
+            result["elapsed"] = time.monotonic() - started
+
+        thread = threading.Thread(target=poll)
+        thread.start()
+        deadline = time.monotonic() + 5
+        while USER_STATE.stats()["waiting"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)  # until the request waits, not a guessed delay
+        commit(add_delivery)
+        thread.join(timeout=10)
+        assert result["body"]["changed"] is True
+        assert len(result["body"]["deliveries"]) == 1
+        assert result["elapsed"] < 5
+        assert USER_STATE.stats()["waiting"] == 0
+
+    def test_requires_login_and_bounds_timeout(self, client):
+        assert client.get("/api/me/state").status_code == 401
+        assert client.get("/api/me/state", headers=headers(VOLUNTEER),
+                          params={"version": 1, "timeout": 600}).status_code == 422